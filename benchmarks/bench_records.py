@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+持仓/结果记录的内存分配基准测试
+
+对比原有实现（每个持仓构建一个字典、每次调用返回新字典）与
+带 __slots__ 的记录对象（src/records.py）的内存分配和耗时。
+
+使用方法:
+    uv run python benchmarks/bench_records.py
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fixed_point import MarketScale
+from src.records import Position, PositionsResult
+
+POSITIONS_PER_ACCOUNT = 20
+POLLS = 5000
+
+
+def make_account_positions():
+    """模拟 SDK 返回的账户持仓对象"""
+    return [
+        SimpleNamespace(
+            market_id=market_id,
+            symbol=f"SYM{market_id}",
+            position=f"{(market_id + 1) * 0.01:.5f}" if market_id % 2 else f"-{(market_id + 1) * 0.01:.5f}",
+            avg_entry_price="50000.0",
+            unrealized_pnl="1.25",
+            realized_pnl="0.5",
+        )
+        for market_id in range(POSITIONS_PER_ACCOUNT)
+    ]
+
+
+def poll_dicts(raw_positions, timestamp):
+    """原有实现：逐项解析并构建字典"""
+    positions = []
+    for position in raw_positions:
+        try:
+            amount = float(position.position)
+        except (ValueError, TypeError):
+            amount = 0.0
+        positions.append({
+            'market_id': position.market_id,
+            'symbol': position.symbol,
+            'side': 'long' if amount > 0 else 'short',
+            'position': abs(amount),
+            'position_raw': amount,
+            'avg_entry_price': position.avg_entry_price,
+            'unrealized_pnl': position.unrealized_pnl,
+            'realized_pnl': position.realized_pnl,
+        })
+    return {'success': True, 'positions': positions, 'error': None, 'timestamp': timestamp}
+
+
+def poll_records(raw_positions, timestamp, scales):
+    """新实现：持仓视图 + 带 __slots__ 的结果"""
+    positions = [Position(position, scales.get(position.market_id)) for position in raw_positions]
+    return PositionsResult(True, positions, None, timestamp)
+
+
+def consume(result, symbol):
+    """模拟 HedgePair 的使用方式：只读取一个交易对的浮动盈亏"""
+    total = 0.0
+    for position in result['positions']:
+        if position.get('symbol') == symbol:
+            total += float(position.get('unrealized_pnl', 0))
+    return total
+
+
+def measure(name, poll):
+    """测量保留全部结果时的内存峰值和耗时"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    retained = []
+    for i in range(POLLS):
+        result = poll(i)
+        consume(result, 'SYM3')
+        retained.append(result)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} 峰值内存 {peak / 1024 / 1024:8.2f} MiB   耗时 {elapsed * 1000:8.1f} ms   "
+          f"({POLLS} 次轮询 x {POSITIONS_PER_ACCOUNT} 个持仓)")
+    return peak, elapsed
+
+
+def main():
+    raw_positions = make_account_positions()
+    scales = {market_id: MarketScale(size_decimals=5) for market_id in range(POSITIONS_PER_ACCOUNT)}
+
+    before = measure("字典(原有)", lambda i: poll_dicts(raw_positions, float(i)))
+    after = measure("记录(新)", lambda i: poll_records(raw_positions, float(i), scales))
+
+    print(f"内存减少 {(1 - after[0] / before[0]) * 100:.1f}%，耗时变化 {(after[1] / before[1] - 1) * 100:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
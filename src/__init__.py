@@ -1 +1,9 @@
-from .lighter_api import LighterAPI
+# 包级导出按需加载：导入 src.xxx 子模块时不会连带导入 lighter_api
+__all__ = ['LighterAPI']
+
+
+def __getattr__(name):
+    if name == 'LighterAPI':
+        from .lighter_api import LighterAPI
+        return LighterAPI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,108 @@
+"""
+账户持仓快照
+
+监控循环每一轮开始时调用 begin_cycle()，之后同一轮内每个账户只查询一次持仓，
+按 (账户, 市场ID) 建立索引，所有交易对从快照中读取自己市场的持仓。
+同一账户被多个交易对使用、或同一轮内被并发读取时，只发起一次查询。
+"""
+
+import asyncio
+import logging
+
+from src.records import PositionsResult
+
+logger = logging.getLogger(__name__)
+
+
+class AccountSnapshot:
+    """一个账户在某一轮的持仓快照"""
+
+    __slots__ = ('cycle', 'success', 'error', 'timestamp', 'positions', 'by_market')
+
+    def __init__(self, cycle, result):
+        self.cycle = cycle
+        self.success = result.get('success', False)
+        self.error = result.get('error')
+        self.timestamp = result.get('timestamp')
+        self.positions = list(result.get('positions') or [])
+        self.by_market = {}
+        for position in self.positions:
+            self.by_market.setdefault(position.market_id, []).append(position)
+
+
+class AccountSnapshotService:
+    """按账户共享的持仓快照"""
+
+    def __init__(self):
+        self.cycle = 0
+        self._snapshots = {}  # 账户键 -> AccountSnapshot
+        self._pending = {}    # 账户键 -> 进行中的查询任务
+        self.fetches = 0      # 实际发起的持仓查询次数
+        self.reads = 0        # 交易对读取持仓的次数
+
+    @staticmethod
+    def account_key(api):
+        """账户键：同一网络上的同一账户索引共享快照"""
+        return (api.base_url, api.account_index)
+
+    def begin_cycle(self):
+        """开始新的一轮，之前的快照在下次读取时重新查询"""
+        self.cycle += 1
+
+    async def get_positions(self, api, market_index=None):
+        """
+        从本轮快照中读取账户的持仓
+
+        Args:
+            api (LighterAPI): 账户的API客户端（本轮尚无快照时用于查询）
+            market_index: 市场ID，为 None 时返回所有市场的持仓
+
+        Returns:
+            PositionsResult: 与 LighterAPI.get_open_positions() 相同的结构
+        """
+        self.reads += 1
+        snapshot = await self._snapshot(api)
+        if not snapshot.success:
+            return PositionsResult(False, [], snapshot.error, snapshot.timestamp)
+        if market_index is None:
+            positions = snapshot.positions
+        else:
+            positions = snapshot.by_market.get(market_index, [])
+        return PositionsResult(True, positions, None, snapshot.timestamp)
+
+    async def _snapshot(self, api):
+        key = self.account_key(api)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.cycle == self.cycle:
+            return snapshot
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._fetch(key, api, self.cycle))
+        # 一个读取方被取消不影响其他等待同一查询的交易对
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, key, api, cycle):
+        try:
+            self.fetches += 1
+            result = await api.get_open_positions(market_index=None)
+            snapshot = AccountSnapshot(cycle, result)
+            if not snapshot.success:
+                logger.warning("账户 %s 持仓查询失败: %s", api.account_index, snapshot.error)
+            self._snapshots[key] = snapshot
+            return snapshot
+        finally:
+            self._pending.pop(key, None)
+
+    def snapshot(self):
+        """
+        统计
+
+        Returns:
+            dict: {'cycle': int, 'accounts': int, 'fetches': int, 'reads': int}
+        """
+        return {
+            'cycle': self.cycle,
+            'accounts': len(self._snapshots),
+            'fetches': self.fetches,
+            'reads': self.reads,
+        }
@@ -0,0 +1,244 @@
+"""
+自适应止损轮询
+
+按每个交易对距离止损阈值的远近和最近的盈亏波动决定轮询间隔：
+
+- 剩余空间 = 浮动盈亏 + 止损阈值（亏损再扩大多少 USD 会触发止损）
+- 波动速度 = 最近若干次检查之间盈亏变化的平均速度（USD/秒）
+- 间隔取以下两者中较小的一个，并限制在 [min_interval, max_interval] 之间：
+  - 按波动速度估计的触发时间除以安全系数：剩余空间 / (波动速度 × safety_factor)
+  - 按剩余空间比例缩放的最大间隔：max_interval × 剩余空间 / 止损阈值
+
+所有交易对的检查共享一个令牌桶预算（每分钟检查次数），到期的交易对多于预算时优先检查剩余空间最小的。
+预算至少为每个交易对每 max_interval 秒一次（随交易对数量增加），并且距上次检查已达 max_interval 的交易对
+不受预算限制，保证任何交易对的检查间隔都不超过 max_interval。
+"""
+
+import collections
+import time
+
+
+class _PollState:
+    __slots__ = ('samples', 'interval', 'next_due', 'headroom_ratio', 'velocity')
+
+    def __init__(self, window):
+        self.samples = collections.deque(maxlen=window)  # (time.monotonic(), 浮动盈亏)
+        self.interval = None
+        self.next_due = 0.0
+        self.headroom_ratio = None
+        self.velocity = 0.0
+
+
+class AdaptivePoller:
+    """按风险分配止损检查频率"""
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict): polling 配置段
+                - min_interval: 最短轮询间隔（秒），默认2
+                - max_interval: 最长轮询间隔（秒），默认30
+                - safety_factor: 波动速度的安全系数，默认3
+                - volatility_window: 估计波动速度使用的检查次数，默认20
+                - checks_per_minute: 所有交易对每分钟的检查次数预算，默认120（交易对较多时至少为
+                  交易对数 × 60 / max_interval）
+                - burst: 预算允许的突发检查次数，默认10
+        """
+        config = config or {}
+        self.min_interval = config.get('min_interval', 2)
+        self.max_interval = config.get('max_interval', 30)
+        self.safety_factor = config.get('safety_factor', 3)
+        self.volatility_window = config.get('volatility_window', 20)
+        self.checks_per_minute = config.get('checks_per_minute', 120)
+        self.burst = config.get('burst', 10)
+
+        self._states = {}  # pair_id -> _PollState
+        self._tokens = float(self.burst)
+        self._last_refill = None
+        self._rate = self.checks_per_minute  # 当前生效的每分钟检查次数预算
+        self.deferred = 0  # 因预算不足推迟的检查次数
+
+    def interval_for(self, floating_pnl, stop_loss_threshold, velocity=0.0):
+        """
+        计算轮询间隔
+
+        Args:
+            floating_pnl (float): 浮动盈亏
+            stop_loss_threshold (float): 止损阈值（取绝对值）
+            velocity (float): 盈亏变化速度（USD/秒）
+
+        Returns:
+            float: 轮询间隔（秒）
+        """
+        threshold = abs(stop_loss_threshold)
+        headroom = floating_pnl + threshold
+        if headroom <= 0 or threshold == 0:
+            return self.min_interval
+        interval = self.max_interval * headroom / threshold
+        if velocity > 0:
+            interval = min(interval, headroom / (velocity * self.safety_factor))
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def record(self, pair_id, floating_pnl, stop_loss_threshold, now=None):
+        """
+        记录一次检查结果并安排下一次检查
+
+        Args:
+            pair_id (str): 交易对ID
+            floating_pnl (float): 本次检查的浮动盈亏（None 表示未知，等同于 retry()）
+            stop_loss_threshold (float): 止损阈值
+            now (float): 当前 time.monotonic()
+
+        Returns:
+            float: 下一次检查的间隔（秒）
+        """
+        if floating_pnl is None:
+            return self.retry(pair_id, now)
+        if now is None:
+            now = time.monotonic()
+        state = self._states.get(pair_id)
+        if state is None:
+            state = self._states[pair_id] = _PollState(self.volatility_window)
+        state.samples.append((now, floating_pnl))
+        state.velocity = self._velocity(state.samples)
+        threshold = abs(stop_loss_threshold)
+        state.headroom_ratio = (floating_pnl + threshold) / threshold if threshold else 0.0
+        state.interval = self.interval_for(floating_pnl, stop_loss_threshold, state.velocity)
+        state.next_due = now + state.interval
+        return state.interval
+
+    def retry(self, pair_id, now=None):
+        """
+        本次检查没有得到浮动盈亏（如持仓查询失败）：不记录样本，按最短间隔安排重试
+
+        Args:
+            pair_id (str): 交易对ID
+            now (float): 当前 time.monotonic()
+
+        Returns:
+            float: 下一次检查的间隔（秒）
+        """
+        if now is None:
+            now = time.monotonic()
+        state = self._states.get(pair_id)
+        if state is None:
+            state = self._states[pair_id] = _PollState(self.volatility_window)
+        state.interval = self.min_interval
+        state.next_due = now + self.min_interval
+        return state.interval
+
+    @staticmethod
+    def _velocity(samples):
+        """相邻两次检查之间盈亏变化速度的平均值（USD/秒）"""
+        if len(samples) < 2:
+            return 0.0
+        total_change = 0.0
+        total_time = 0.0
+        previous_time, previous_pnl = samples[0]
+        for sample_time, pnl in list(samples)[1:]:
+            total_change += abs(pnl - previous_pnl)
+            total_time += sample_time - previous_time
+            previous_time, previous_pnl = sample_time, pnl
+        return total_change / total_time if total_time > 0 else 0.0
+
+    def _refill(self, now, pair_count):
+        # 预算至少够每个交易对每 max_interval 秒检查一次
+        self._rate = max(self.checks_per_minute, pair_count * 60 / self.max_interval)
+        if self._last_refill is not None:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self._rate / 60)
+        self._last_refill = now
+
+    def _overdue(self, state, now):
+        """距上次检查已达 max_interval（或从未检查过），不受预算限制"""
+        return state is None or not state.samples or now - state.samples[-1][0] >= self.max_interval
+
+    def due_pairs(self, pairs, now=None):
+        """
+        选出本轮需要检查的交易对（按剩余空间从小到大，受预算限制）
+
+        新加入的交易对立即到期；已移除的交易对的状态被清理。
+
+        Args:
+            pairs (list): HedgePair 列表
+            now (float): 当前 time.monotonic()
+
+        Returns:
+            list: 需要检查的 HedgePair
+        """
+        if now is None:
+            now = time.monotonic()
+        active = {pair.pair_id for pair in pairs}
+        for pair_id in list(self._states):
+            if pair_id not in active:
+                del self._states[pair_id]
+
+        due = []
+        for pair in pairs:
+            state = self._states.get(pair.pair_id)
+            if state is None or state.next_due <= now:
+                # 未检查过的交易对最优先
+                ratio = -1.0 if state is None or state.headroom_ratio is None else state.headroom_ratio
+                due.append((ratio, state.next_due if state else 0.0, pair, self._overdue(state, now)))
+        due.sort(key=lambda item: (item[0], item[1]))
+
+        self._refill(now, len(pairs))
+        allowed = max(int(self._tokens), 0)
+        # 预算内按剩余空间从小到大检查；超出预算的交易对中，已达到最长间隔的仍然检查
+        selected = due[:allowed] + [item for item in due[allowed:] if item[3]]
+        self.deferred += len(due) - len(selected)
+        self._tokens = max(0.0, self._tokens - len(selected))
+        return [pair for _, _, pair, _ in selected]
+
+    def next_wakeup(self, pairs, now=None):
+        """
+        距离下一次需要检查的时间（秒）
+
+        Args:
+            pairs (list): HedgePair 列表
+            now (float): 当前 time.monotonic()
+        """
+        if now is None:
+            now = time.monotonic()
+        next_due = None
+        for pair in pairs:
+            state = self._states.get(pair.pair_id)
+            due_at = now if state is None else state.next_due
+            next_due = due_at if next_due is None else min(next_due, due_at)
+        if next_due is None:
+            return self.max_interval
+        wait = next_due - now
+        if wait <= 0 and self._tokens < 1:
+            # 已有到期的交易对，等待预算恢复一次检查
+            wait = (1 - self._tokens) * 60 / self._rate
+        return max(0.05, min(self.max_interval, wait))
+
+    def interval(self, pair_id):
+        """交易对当前的轮询间隔（尚未检查过时为 None）"""
+        state = self._states.get(pair_id)
+        return None if state is None else state.interval
+
+    def snapshot(self):
+        """
+        轮询状态快照
+
+        Returns:
+            dict: {
+                'tokens': float,      # 剩余检查预算
+                'rate': float,        # 当前生效的每分钟检查次数预算
+                'deferred': int,      # 因预算不足推迟的检查次数
+                'pairs': dict         # pair_id -> {'interval', 'velocity', 'headroom_ratio'}
+            }
+        """
+        return {
+            'tokens': self._tokens,
+            'rate': self._rate,
+            'deferred': self.deferred,
+            'pairs': {
+                pair_id: {
+                    'interval': state.interval,
+                    'velocity': state.velocity,
+                    'headroom_ratio': state.headroom_ratio,
+                }
+                for pair_id, state in self._states.items()
+            },
+        }
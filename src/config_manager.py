@@ -1,58 +1,280 @@
-import yaml
 import os
 
+import yaml
+
+# 优先使用 libyaml 的 C 加载器，未安装 libyaml 时回退到纯 Python 加载器
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+class ConfigValidationError(ValueError):
+    """配置验证错误，errors 中包含本次验证发现的所有错误"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        if len(self.errors) == 1:
+            message = self.errors[0]
+        else:
+            message = f"配置文件存在 {len(self.errors)} 个错误:\n" + "\n".join(f"  - {error}" for error in self.errors)
+        super().__init__(message)
+
+
+class Field:
+    """配置字段定义"""
+
+    def __init__(self, types, required=True, positive=False):
+        """
+        Args:
+            types (tuple): 允许的类型
+            required (bool): 是否必填
+            positive (bool): 数值是否必须大于0
+        """
+        self.types = types
+        self.required = required
+        self.positive = positive
+
+
+NUMBER = (int, float)
+
+# 顶层配置项
+CONFIG_SCHEMA = {
+    'trading_pair': Field((str,)),
+    'leverage': Field(NUMBER, positive=True),
+    'position_size': Field(NUMBER, positive=True),
+    'stop_loss_threshold': Field(NUMBER),
+    'proxy_pool': Field((list,)),
+    'api_credentials': Field((list,)),
+    'hedge_pairs': Field((list,), required=False),
+}
+
+# 代理池中的每个代理
+PROXY_SCHEMA = {
+    'name': Field((str,)),
+    'host': Field((str,)),
+    'port': Field((int, str)),
+    'username': Field((str,), required=False),
+    'password': Field((str,), required=False),
+}
+
+# 每个API凭证
+CREDENTIAL_SCHEMA = {
+    'account_name': Field((str,)),
+    'api_key': Field((str,)),
+    'account_index': Field((int,)),
+    'api_key_index': Field((int,)),
+    'network': Field((str,)),
+    'proxy': Field((str, type(None)), required=False),
+    'api_keys': Field((list,), required=False),
+}
+
+# API凭证中的其他API密钥（与主密钥属于同一账户，用于分散签名交易）
+API_KEY_SCHEMA = {
+    'api_key': Field((str,)),
+    'api_key_index': Field((int,)),
+}
+
+# 每个对冲配对
+HEDGE_PAIR_SCHEMA = {
+    'pair_name': Field((str,)),
+    'long_account': Field((str,)),
+    'short_account': Field((str,)),
+    'markets': Field((list,), required=False),
+    'stop_loss_threshold': Field(NUMBER, required=False),
+}
+
+# 多市场对冲配对中的每个市场（未指定的参数使用顶层配置）
+MARKET_SCHEMA = {
+    'symbol': Field((str,)),
+    'position_size': Field(NUMBER, required=False, positive=True),
+    'stop_loss_threshold': Field(NUMBER, required=False),
+}
+
+
+def _compile_schema(schema, missing_message, type_message):
+    """
+    将字段定义编译为验证函数（模块加载时编译一次，验证时不再遍历字段定义）
+
+    Args:
+        schema (dict): 字段名到 Field 的映射
+        missing_message (str): 缺少字段时的错误信息模板（参数: prefix, key）
+        type_message (str): 类型或取值错误时的错误信息模板（参数: prefix, key, value）
+
+    Returns:
+        function: validate(item, prefix) -> list[str]
+    """
+    checks = []
+    for key, field in schema.items():
+        def check(item, prefix, key=key, field=field):
+            if key not in item:
+                return [missing_message.format(prefix=prefix, key=key)] if field.required else []
+            value = item[key]
+            # bool 是 int 的子类，不作为数值接受
+            if not isinstance(value, field.types) or isinstance(value, bool):
+                return [type_message.format(prefix=prefix, key=key, value=value)]
+            if field.positive and value <= 0:
+                return [type_message.format(prefix=prefix, key=key, value=value)]
+            return []
+        checks.append(check)
+
+    def validate(item, prefix=''):
+        if not isinstance(item, dict):
+            return [f"{prefix}格式不正确，应为键值对"]
+        errors = []
+        for check in checks:
+            errors.extend(check(item, prefix))
+        return errors
+
+    return validate
+
+
+_validate_top_level = _compile_schema(
+    CONFIG_SCHEMA, "配置文件缺少必要的配置项: {key}", "配置项 {key} 的值无效: {value}"
+)
+_validate_proxy = _compile_schema(
+    PROXY_SCHEMA, "{prefix}代理配置缺少必要的配置项: {key}", "{prefix}代理配置的 {key} 无效: {value}"
+)
+_validate_credential = _compile_schema(
+    CREDENTIAL_SCHEMA, "{prefix}API凭证缺少必要的配置项: {key}", "{prefix}API凭证的 {key} 无效: {value}"
+)
+_validate_api_key = _compile_schema(
+    API_KEY_SCHEMA, "{prefix}API密钥缺少必要的配置项: {key}", "{prefix}API密钥的 {key} 无效: {value}"
+)
+_validate_hedge_pair = _compile_schema(
+    HEDGE_PAIR_SCHEMA, "{prefix}对冲配对缺少必要的配置项: {key}", "{prefix}对冲配对的 {key} 无效: {value}"
+)
+_validate_market = _compile_schema(
+    MARKET_SCHEMA, "{prefix}市场缺少必要的配置项: {key}", "{prefix}市场的 {key} 无效: {value}"
+)
+
+
+def validate_config(config):
+    """
+    验证配置并返回所有错误（不在第一个错误处停止）
+
+    Args:
+        config (dict): 配置信息
+
+    Returns:
+        list: 错误信息列表，为空表示验证通过
+    """
+    if not isinstance(config, dict):
+        return ["配置文件为空或格式不正确"]
+
+    errors = _validate_top_level(config)
+
+    # 验证代理池配置
+    proxy_pool = config.get('proxy_pool')
+    proxy_names = set()
+    if isinstance(proxy_pool, list):
+        if not proxy_pool:
+            errors.append("代理池配置不能为空")
+        for i, proxy in enumerate(proxy_pool):
+            prefix = f"第{i+1}个"
+            errors.extend(_validate_proxy(proxy, prefix))
+            if not isinstance(proxy, dict):
+                continue
+            # 如果提供了认证信息，必须同时提供用户名和密码
+            if 'username' in proxy and 'password' not in proxy:
+                errors.append(f"{prefix}代理配置提供了用户名但缺少密码")
+            if 'password' in proxy and 'username' not in proxy:
+                errors.append(f"{prefix}代理配置提供了密码但缺少用户名")
+            if 'name' in proxy:
+                if proxy['name'] in proxy_names:
+                    errors.append(f"{prefix}代理配置的名称重复: {proxy['name']}")
+                proxy_names.add(proxy['name'])
+
+    # 验证API凭证
+    credentials = config.get('api_credentials')
+    account_names = set()
+    if isinstance(credentials, list):
+        if len(credentials) < 2:
+            errors.append("至少需要提供2个API凭证")
+        for i, credential in enumerate(credentials):
+            prefix = f"第{i+1}个"
+            errors.extend(_validate_credential(credential, prefix))
+            if not isinstance(credential, dict):
+                continue
+            if 'account_name' in credential:
+                if credential['account_name'] in account_names:
+                    errors.append(f"{prefix}API凭证的账户名称重复: {credential['account_name']}")
+                account_names.add(credential['account_name'])
+            # 验证网络类型
+            if isinstance(credential.get('network'), str) and credential['network'] not in ('mainnet', 'testnet'):
+                errors.append(f"{prefix}API凭证的网络类型不支持: {credential['network']}，仅支持 'mainnet' 或 'testnet'")
+            # 代理必须引用代理池中存在的代理
+            if credential.get('proxy') and isinstance(proxy_pool, list) and credential['proxy'] not in proxy_names:
+                errors.append(f"{prefix}API凭证引用的代理不存在: {credential['proxy']}")
+            # 其他API密钥的索引不能与主密钥或彼此重复
+            api_keys = credential.get('api_keys')
+            if isinstance(api_keys, list):
+                key_indexes = {credential.get('api_key_index')}
+                for j, api_key in enumerate(api_keys):
+                    key_prefix = f"{prefix}API凭证的第{j+1}个"
+                    errors.extend(_validate_api_key(api_key, key_prefix))
+                    if isinstance(api_key, dict) and isinstance(api_key.get('api_key_index'), int):
+                        if api_key['api_key_index'] in key_indexes:
+                            errors.append(f"{prefix}API凭证的API密钥索引重复: {api_key['api_key_index']}")
+                        key_indexes.add(api_key['api_key_index'])
+
+    # 验证对冲配对与API凭证的交叉引用
+    hedge_pairs = config.get('hedge_pairs')
+    pair_names = set()
+    if isinstance(hedge_pairs, list):
+        for i, pair in enumerate(hedge_pairs):
+            prefix = f"第{i+1}个"
+            errors.extend(_validate_hedge_pair(pair, prefix))
+            if not isinstance(pair, dict):
+                continue
+            if 'pair_name' in pair:
+                if pair['pair_name'] in pair_names:
+                    errors.append(f"{prefix}对冲配对的名称重复: {pair['pair_name']}")
+                pair_names.add(pair['pair_name'])
+            for role, label in (('long_account', '做多'), ('short_account', '做空')):
+                if role in pair and isinstance(credentials, list) and pair[role] not in account_names:
+                    errors.append(f"{prefix}对冲配对的{label}账户不存在: {pair[role]}")
+            if pair.get('long_account') is not None and pair.get('long_account') == pair.get('short_account'):
+                errors.append(f"{prefix}对冲配对的做多账户和做空账户不能相同: {pair['long_account']}")
+            markets = pair.get('markets')
+            if isinstance(markets, list):
+                if not markets:
+                    errors.append(f"{prefix}对冲配对的市场列表不能为空")
+                symbols = set()
+                for j, market in enumerate(markets):
+                    market_prefix = f"{prefix}对冲配对的第{j+1}个"
+                    errors.extend(_validate_market(market, market_prefix))
+                    if isinstance(market, dict) and isinstance(market.get('symbol'), str):
+                        symbol = market['symbol'].upper()
+                        if symbol in symbols:
+                            errors.append(f"{prefix}对冲配对的市场重复: {market['symbol']}")
+                        symbols.add(symbol)
+
+    return errors
+
+
 def load_config(config_path='config.yaml'):
     """
     加载配置文件
-    
+
+    使用 C 加载器解析 YAML（未安装 libyaml 时回退到纯 Python 加载器），并一次性报告所有验证错误。
+    配置中包含私钥，因此不在磁盘上缓存解析结果。
+
     Args:
         config_path (str): 配置文件路径
-        
+
     Returns:
         dict: 配置信息字典
     """
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"配置文件 {config_path} 不存在")
-    
-    with open(config_path, 'r', encoding='utf-8') as file:
-        config = yaml.safe_load(file)
-    
-    # 验证必要配置项
-    required_keys = ['trading_pair', 'leverage', 'position_size', 'stop_loss_threshold', 'proxy_pool', 'api_credentials']
-    for key in required_keys:
-        if key not in config:
-            raise ValueError(f"配置文件缺少必要的配置项: {key}")
-    
-    # 验证代理池配置
-    if not config['proxy_pool']:
-        raise ValueError("代理池配置不能为空")
-    
-    # 验证代理池中的每个代理配置
-    for i, proxy in enumerate(config['proxy_pool']):
-        required_proxy_keys = ['name', 'host', 'port']
-        for key in required_proxy_keys:
-            if key not in proxy:
-                raise ValueError(f"第{i+1}个代理配置缺少必要的配置项: {key}")
-        
-        # 如果提供了认证信息，必须同时提供用户名和密码
-        if 'username' in proxy and 'password' not in proxy:
-            raise ValueError(f"第{i+1}个代理配置提供了用户名但缺少密码")
-        if 'password' in proxy and 'username' not in proxy:
-            raise ValueError(f"第{i+1}个代理配置提供了密码但缺少用户名")
-    
-    # 验证API凭证数量
-    if len(config['api_credentials']) < 2:
-        raise ValueError("至少需要提供2个API凭证")
-    
-    # 验证每个API凭证是否包含必要的字段
-    for i, credential in enumerate(config['api_credentials']):
-        required_credential_keys = ['account_name', 'api_key', 'account_index', 'api_key_index', 'network']
-        for key in required_credential_keys:
-            if key not in credential:
-                raise ValueError(f"第{i+1}个API凭证缺少必要的配置项: {key}")
-        
-        # 验证网络类型
-        if credential['network'] not in ['mainnet', 'testnet']:
-            raise ValueError(f"第{i+1}个API凭证的网络类型不支持: {credential['network']}，仅支持 'mainnet' 或 'testnet'")
-    
-    return config
\ No newline at end of file
+
+    with open(config_path, encoding='utf-8') as file:
+        config = yaml.load(file, Loader=_YamlLoader)
+
+    # 验证配置，一次报告所有错误
+    errors = validate_config(config)
+    if errors:
+        raise ConfigValidationError(errors)
+
+    return config
@@ -0,0 +1,212 @@
+"""
+配置热加载
+
+定期检查配置文件，内容变化时重新加载并与运行中的配置比较，只把差异交给机器人处理：
+新增/删除/变更的交易对、账户代理变化以及可在线生效的交易参数（包括交易对和各市场的止损阈值、
+各市场的开仓金额）。只有在线参数变化的交易对不会被平仓重建。
+文件哈希和配置加载在线程中执行，不阻塞事件循环。
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+
+from src.config_manager import load_config
+
+logger = logging.getLogger(__name__)
+
+# 可以在线生效的交易参数
+LIVE_PARAMS = ('stop_loss_threshold', 'leverage', 'position_size')
+
+# 交易对和 markets 中可以在线生效的参数（变化时更新运行中的交易对，不平仓重建）
+LIVE_PAIR_PARAMS = ('stop_loss_threshold',)
+LIVE_MARKET_PARAMS = ('stop_loss_threshold', 'position_size')
+
+# 变化后需要重启才能生效的参数（启动时创建的组件不会按新配置重建）
+RESTART_PARAMS = (
+    'trading_pair', 'scheduler', 'execution', 'quote_guard', 'nonce', 'polling', 'rebalance',
+    'netting', 'orders', 'pnl', 'signing', 'state', 'loop_monitor', 'metrics', 'logging',
+)
+
+
+def _effective_proxy(credential, proxy_pool):
+    """账户实际使用的代理配置"""
+    proxy_name = credential.get('proxy')
+    if not proxy_name:
+        return None
+    return {proxy['name']: proxy for proxy in proxy_pool}.get(proxy_name)
+
+
+def _credential_identity(credential):
+    """账户凭证中决定客户端身份的字段（不含代理）"""
+    return {key: value for key, value in credential.items() if key != 'proxy'}
+
+
+def _pair_identity(pair):
+    """交易对配置中需要重建交易对才能生效的部分（去掉可在线生效的参数）"""
+    identity = {key: value for key, value in pair.items() if key not in LIVE_PAIR_PARAMS}
+    if isinstance(pair.get('markets'), list):
+        identity['markets'] = [
+            {key: value for key, value in market.items() if key not in LIVE_MARKET_PARAMS}
+            for market in pair['markets']
+        ]
+    return identity
+
+
+def diff_config(old_config, new_config):
+    """
+    比较两份配置
+
+    Args:
+        old_config (dict): 运行中的配置
+        new_config (dict): 新加载的配置
+
+    Returns:
+        dict: {
+            'added_pairs': list,       # 新增的交易对名称
+            'removed_pairs': list,     # 删除的交易对名称
+            'changed_pairs': list,     # 账户或凭证变化、需要重建的交易对名称
+            'pair_params': dict,       # 只有在线参数变化的交易对名称 -> 新的交易对配置
+            'proxy_changes': dict,     # 账户名称 -> 新代理配置（None 表示不使用代理）
+            'params': dict,            # 变化的在线参数 -> 新值
+            'restart_required': list,  # 变化但无法在线生效的参数
+            'notification_changed': bool
+        }
+    """
+    old_accounts = {acc['account_name']: acc for acc in old_config.get('api_credentials', [])}
+    new_accounts = {acc['account_name']: acc for acc in new_config.get('api_credentials', [])}
+    old_pairs = {pair['pair_name']: pair for pair in old_config.get('hedge_pairs', [])}
+    new_pairs = {pair['pair_name']: pair for pair in new_config.get('hedge_pairs', [])}
+
+    # 凭证变化（不含代理）的账户，使用这些账户的交易对需要重建
+    changed_accounts = {
+        name for name in old_accounts.keys() & new_accounts.keys()
+        if _credential_identity(old_accounts[name]) != _credential_identity(new_accounts[name])
+    }
+
+    changed_pairs = []
+    pair_params = {}
+    for name in old_pairs.keys() & new_pairs.keys():
+        old_pair, new_pair = old_pairs[name], new_pairs[name]
+        accounts = (new_pair['long_account'], new_pair['short_account'])
+        if (_pair_identity(old_pair) != _pair_identity(new_pair)
+                or any(account in changed_accounts for account in accounts)):
+            changed_pairs.append(name)
+        elif old_pair != new_pair:
+            pair_params[name] = new_pair
+
+    proxy_changes = {}
+    old_pool = old_config.get('proxy_pool', [])
+    new_pool = new_config.get('proxy_pool', [])
+    for name in old_accounts.keys() & new_accounts.keys():
+        if name in changed_accounts:
+            continue
+        new_proxy = _effective_proxy(new_accounts[name], new_pool)
+        if _effective_proxy(old_accounts[name], old_pool) != new_proxy:
+            proxy_changes[name] = new_proxy
+
+    return {
+        'added_pairs': sorted(new_pairs.keys() - old_pairs.keys()),
+        'removed_pairs': sorted(old_pairs.keys() - new_pairs.keys()),
+        'changed_pairs': sorted(changed_pairs),
+        'pair_params': pair_params,
+        'proxy_changes': proxy_changes,
+        'params': {
+            key: new_config.get(key) for key in LIVE_PARAMS
+            if old_config.get(key) != new_config.get(key)
+        },
+        'restart_required': [
+            key for key in RESTART_PARAMS if old_config.get(key) != new_config.get(key)
+        ],
+        'notification_changed': old_config.get('notification') != new_config.get('notification'),
+    }
+
+
+def is_empty_diff(diff):
+    """差异是否为空"""
+    return not any(diff.values())
+
+
+class ConfigWatcher:
+    """配置文件监视器"""
+
+    def __init__(self, config_path, on_change, interval=5):
+        """
+        初始化配置文件监视器
+
+        Args:
+            config_path (str): 配置文件路径
+            on_change: 协程函数，参数为新加载并验证通过的配置
+            interval (float): 检查间隔（秒）
+        """
+        self.config_path = config_path
+        self.on_change = on_change
+        self.interval = interval
+        self.running = False
+        self._last_stat = None
+        self._last_hash = None
+
+    def _file_state(self):
+        """返回文件的 (修改时间, 大小)，文件不存在时返回 None"""
+        try:
+            stat = os.stat(self.config_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _file_hash(self):
+        with open(self.config_path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def prime(self):
+        """记录当前文件状态作为基准（启动时调用，避免首次检查触发重新加载）"""
+        self._last_stat = self._file_state()
+        if self._last_stat is not None:
+            self._last_hash = self._file_hash()
+
+    async def check(self):
+        """
+        检查一次配置文件
+
+        Returns:
+            bool: 是否加载了新配置
+        """
+        state = self._file_state()
+        if state is None or state == self._last_stat:
+            return False
+        self._last_stat = state
+
+        # 修改时间变化但内容未变（如 touch）时不重新加载
+        file_hash = await asyncio.to_thread(self._file_hash)
+        if file_hash == self._last_hash:
+            return False
+
+        try:
+            new_config = await asyncio.to_thread(load_config, self.config_path)
+        except Exception as e:
+            # 新配置无效时保持运行中的配置，等待下一次修改
+            logger.error("配置文件重新加载失败，继续使用当前配置: %s", e)
+            self._last_hash = file_hash
+            return False
+
+        self._last_hash = file_hash
+        logger.info("检测到配置文件变化: %s", self.config_path)
+        await self.on_change(new_config)
+        return True
+
+    async def run(self):
+        """持续监视配置文件直到 stop() 被调用"""
+        self.running = True
+        if self._last_stat is None:
+            await asyncio.to_thread(self.prime)
+        while self.running:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("应用新配置时发生错误: %s", e)
+
+    def stop(self):
+        """停止监视"""
+        self.running = False
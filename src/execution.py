@@ -0,0 +1,391 @@
+"""
+滑点感知的下单执行模块
+
+根据本地订单簿深度估算市场冲击，超过滑点上限或单笔数量上限的订单会拆分为多笔子订单，
+两条腿的子订单按固定间隔同步提交（TWAP），每笔子订单都带有最差成交价保护。
+
+提供订单跟踪时，每一轮子订单等待两条腿都成交后才提交下一轮，成交质量报告记录实际成交数量和成交均价。
+任一子订单失败（或未成交）时停止执行，并用只减仓订单平掉本次已成交的子订单，不留下单边头寸。
+"""
+
+import asyncio
+import logging
+import math
+
+from src.order_tracker import OrderState
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_slippage_bps(book, side, quantity, reference_price=None):
+    """
+    估算按数量吃单相对参考价的滑点
+
+    Args:
+        book (OrderBook): 本地订单簿
+        side (str): 'buy' 或 'sell'
+        quantity (float): 成交数量
+        reference_price (float): 参考价，默认使用中间价
+
+    Returns:
+        tuple: (slippage_bps: float, vwap: float or None, filled: float)
+               深度不足时 slippage_bps 为 inf
+    """
+    reference_price = reference_price or book.mid_price()
+    vwap, filled = book.vwap_for_size(side, quantity)
+    if vwap is None or reference_price is None or filled < quantity:
+        return math.inf, vwap, filled
+    if side == 'buy':
+        slippage = (vwap - reference_price) / reference_price
+    else:
+        slippage = (reference_price - vwap) / reference_price
+    return slippage * 10000, vwap, filled
+
+
+def max_quantity_within_slippage(book, side, max_slippage_bps, upper_bound):
+    """
+    在滑点上限内单笔可成交的最大数量（二分查找，冲击随数量单调递增）
+
+    Args:
+        book (OrderBook): 本地订单簿
+        side (str): 'buy' 或 'sell'
+        max_slippage_bps (float): 滑点上限（基点）
+        upper_bound (float): 搜索上限
+
+    Returns:
+        float: 最大数量
+    """
+    low, high = 0.0, upper_bound
+    for _ in range(30):
+        middle = (low + high) / 2
+        slippage, _, _ = estimate_slippage_bps(book, side, middle)
+        if slippage <= max_slippage_bps:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def split_base_amount(base_amount, count, min_base_amount=0):
+    """
+    将整数 base_amount 拆分为若干子订单，每笔不低于最小基础数量
+
+    Args:
+        base_amount (int): 总数量（整数）
+        count (int): 期望的子订单数
+        min_base_amount (int): 最小基础数量（整数）
+
+    Returns:
+        list: 每笔子订单的整数数量，余数分摊到前面的子订单
+    """
+    if min_base_amount > 0:
+        count = min(count, max(base_amount // min_base_amount, 1))
+    count = max(count, 1)
+    child, remainder = divmod(base_amount, count)
+    return [child + 1 if index < remainder else child for index in range(count)]
+
+
+class OrderExecutor:
+    """下单执行器（多个交易对共享，统一限制并发子订单数）"""
+
+    def __init__(self, config=None):
+        """
+        初始化下单执行器
+
+        Args:
+            config (dict): 执行配置（config.yaml 中的 execution 段）
+                max_slippage_bps: 单笔子订单滑点上限（基点）
+                max_child_notional: 单笔子订单最大金额（USD）
+                max_children: 最大子订单数
+                child_interval: 子订单间隔（秒）
+                max_concurrent_orders: 全局并发子订单上限
+        """
+        config = config or {}
+        self.max_slippage_bps = config.get('max_slippage_bps', 20)
+        self.max_child_notional = config.get('max_child_notional', 5000)
+        self.max_children = config.get('max_children', 20)
+        self.child_interval = config.get('child_interval', 2)
+        self._order_semaphore = asyncio.Semaphore(config.get('max_concurrent_orders', 32))
+
+        # 每个交易对最近一次执行的成交质量报告
+        self.reports = {}
+
+    def plan_children(self, book, quantity, mid_price):
+        """
+        计算子订单拆分方案（两条腿使用相同的拆分）
+
+        Args:
+            book (OrderBook): 本地订单簿
+            quantity (float): 每条腿的总数量
+            mid_price (float): 参考中间价
+
+        Returns:
+            list: 每笔子订单的数量
+        """
+        child_limit = self.max_child_notional / mid_price if self.max_child_notional else quantity
+        if book is not None and book.is_two_sided():
+            # 买卖两侧分别计算滑点上限内的最大数量，取较小值
+            for side in ('buy', 'sell'):
+                child_limit = min(
+                    child_limit,
+                    max_quantity_within_slippage(book, side, self.max_slippage_bps, quantity)
+                )
+
+        if child_limit <= 0:
+            child_limit = quantity / self.max_children
+        count = min(max(math.ceil(quantity / child_limit - 1e-9), 1), self.max_children)
+
+        child_quantity = quantity / count
+        children = [child_quantity] * (count - 1)
+        children.append(quantity - child_quantity * (count - 1))
+        return children
+
+    def limit_price(self, side, mid_price):
+        """子订单最差成交价（买单上限/卖单下限）"""
+        offset = self.max_slippage_bps / 10000
+        if side == 'buy':
+            return mid_price * (1 + offset)
+        return mid_price * (1 - offset)
+
+    async def _submit_child(self, api, market_index, side, quantity, mid_price, leverage, base_amount=None):
+        """提交单笔子订单并返回子订单记录"""
+        book = api.order_books.get(market_index)
+        _, expected_vwap, _ = estimate_slippage_bps(book, side, quantity, mid_price) if book else (None, None, 0)
+        child = {
+            'side': side,
+            'quantity': quantity,
+            'base_amount': base_amount,
+            'limit_price': self.limit_price(side, mid_price),
+            'expected_vwap': expected_vwap,
+            'success': False,
+            'tx_hash': None,
+            'client_order_index': None,
+            'error': None,
+            'state': None,                # 订单跟踪的最终状态（未跟踪时为 None）
+            'filled_quantity': None,      # 实际成交数量（未跟踪时为 None）
+            'average_price': None,        # 实际成交均价（未跟踪或没有成交金额时为 None）
+        }
+        async with self._order_semaphore:
+            try:
+                result = await api.place_order(
+                    market_index=market_index,
+                    side=side,
+                    quantity=quantity,
+                    price=child['limit_price'],
+                    leverage=leverage,
+                    base_amount=base_amount
+                )
+            except Exception as e:
+                child['error'] = str(e)
+                return child
+        child['success'] = result.get('success', False)
+        child['tx_hash'] = result.get('tx_hash')
+        child['client_order_index'] = result.get('client_order_index')
+        child['error'] = result.get('error')
+        return child
+
+    async def execute_pair(self, pair, quantity, base_amount=None, order_tracker=None):
+        """
+        为对冲交易对执行开仓（两条腿按子订单同步提交）
+
+        Args:
+            pair (HedgePair): 对冲交易对
+            quantity (float): 每条腿的总数量
+            base_amount (int): 每条腿已缩放的整数数量（提供时子订单按整数拆分）
+            order_tracker (OrderTracker): 订单跟踪（可选，提供时等待每笔子订单成交并记录实际成交）
+
+        Returns:
+            dict: {
+                'success': bool,           # 所有子订单是否都提交成功（提供订单跟踪时还需全部成交）
+                'pair_id': str,            # 交易对ID
+                'arrival_price': float,    # 开始执行时的中间价
+                'legs': dict,              # 每条腿的成交质量（long/short）
+                'unwind': dict,            # 失败时平掉已成交子订单的只减仓订单（long/short），成功时为空
+                'error': str or None,      # 错误信息
+                'timestamp': float         # 完成时间戳
+            }
+        """
+        loop = asyncio.get_event_loop()
+        market_index = pair.market_index
+
+        price_result = await pair.api_long.get_market_price(market_index)
+        if not price_result.get('success', False):
+            return {
+                'success': False,
+                'pair_id': pair.pair_id,
+                'arrival_price': None,
+                'legs': {},
+                'unwind': {},
+                'error': f"无法获取市场价格: {price_result.get('error', '未知错误')}",
+                'timestamp': loop.time()
+            }
+        arrival_price = price_result['price']
+        children = self.plan_children(pair.api_long.order_books.get(market_index), quantity, arrival_price)
+        child_base_amounts = [None] * len(children)
+        if base_amount is not None:
+            # 按整数拆分，子订单数量直接交给签名器，不再经过浮点换算
+            scale = pair.api_long.get_market_scale(market_index)
+            child_base_amounts = split_base_amount(base_amount, len(children), scale.min_base_amount)
+            children = [float(scale.base_amount_to_decimal(amount)) for amount in child_base_amounts]
+        if len(children) > 1:
+            logger.info("交易对 %s 拆分为 %s 笔子订单，每笔约 %.6f", pair.pair_id, len(children), children[0])
+
+        legs = {
+            'long': {'side': 'buy', 'api': pair.api_long, 'children': []},
+            'short': {'side': 'sell', 'api': pair.api_short, 'children': []},
+        }
+        error = None
+        mid_price = arrival_price
+        for index, (child_quantity, child_base_amount) in enumerate(zip(children, child_base_amounts)):
+            if index > 0:
+                await asyncio.sleep(self.child_interval)
+                # 每笔子订单前刷新参考价（本地订单簿有效时不发起请求）
+                refreshed = await pair.api_long.get_market_price(market_index)
+                if refreshed.get('success', False):
+                    mid_price = refreshed['price']
+
+            results = await asyncio.gather(*[
+                self._submit_child(leg['api'], market_index, leg['side'], child_quantity, mid_price, pair.leverage,
+                                   child_base_amount)
+                for leg in legs.values()
+            ])
+            for leg, child in zip(legs.values(), results):
+                leg['children'].append(child)
+
+            failed = [child for child in results if not child['success']]
+            if not failed and order_tracker is not None:
+                await self._confirm_children(order_tracker, market_index, legs.values(), results)
+                failed = [child for child in results if child['state'] not in (None, OrderState.FILLED)]
+            if failed:
+                # 任一腿失败即停止后续子订单，避免两条腿差距继续扩大
+                error = f"第{index+1}笔子订单失败: {failed[0]['error'] or failed[0]['state']}"
+                logger.error("交易对 %s %s", pair.pair_id, error)
+                break
+
+        unwind = {}
+        if error is not None:
+            unwind = await self._unwind(pair, market_index, legs)
+
+        report = {
+            'success': error is None,
+            'pair_id': pair.pair_id,
+            'arrival_price': arrival_price,
+            'legs': {name: self._leg_quality(leg, quantity, arrival_price) for name, leg in legs.items()},
+            'unwind': unwind,
+            'error': error,
+            'timestamp': loop.time()
+        }
+        self.reports[pair.pair_id] = report
+        return report
+
+    @staticmethod
+    async def _confirm_children(order_tracker, market_index, legs, children):
+        """等待一轮子订单成交，把最终状态、成交数量和成交均价记录到子订单中"""
+        tracked = [
+            (child, order_tracker.track(leg['api'], market_index, child, child['base_amount']))
+            for leg, child in zip(legs, children)
+        ]
+        await asyncio.gather(*(order_tracker.wait(order) for _, order in tracked if order is not None))
+        for child, order in tracked:
+            if order is None:
+                # 无法跟踪（结果缺少 client_order_index）时按已提交处理
+                continue
+            child['state'] = order.state
+            child['filled_quantity'] = order.filled_base_amount
+            child['average_price'] = order.average_price
+            if order.error and not child['error']:
+                child['error'] = order.error
+
+    @staticmethod
+    def _filled(children):
+        """
+        子订单已成交的总量（未跟踪的已提交子订单按全部成交计算）
+
+        Returns:
+            tuple: (数量, 已缩放的整数数量；有部分成交或未提供整数数量时为 None)
+        """
+        quantity = 0.0
+        base_amount = 0
+        for child in children:
+            if not child['success']:
+                continue
+            if child['state'] in (None, OrderState.FILLED):
+                quantity += child['quantity']
+                if base_amount is not None and child['base_amount'] is not None:
+                    base_amount += child['base_amount']
+                else:
+                    base_amount = None
+            elif child['filled_quantity']:
+                quantity += child['filled_quantity']
+                base_amount = None
+        return quantity, base_amount
+
+    async def _unwind(self, pair, market_index, legs):
+        """执行失败后用只减仓订单平掉每条腿本次已成交的子订单"""
+        unwind = {}
+        for name, leg in legs.items():
+            quantity, base_amount = self._filled(leg['children'])
+            if quantity <= 0:
+                continue
+            side = 'sell' if leg['side'] == 'buy' else 'buy'
+            try:
+                result = await leg['api'].place_order(
+                    market_index=market_index,
+                    side=side,
+                    quantity=quantity,
+                    price=None,
+                    leverage=pair.leverage,
+                    base_amount=base_amount,
+                    reduce_only=True
+                )
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            unwind[name] = {
+                'side': side,
+                'quantity': quantity,
+                'base_amount': base_amount,
+                'success': result.get('success', False),
+                'tx_hash': result.get('tx_hash'),
+                'error': result.get('error'),
+            }
+            if unwind[name]['success']:
+                logger.info("交易对 %s %s 腿已提交只减仓订单平掉已成交的 %s", pair.pair_id, name, quantity)
+            else:
+                logger.error("交易对 %s %s 腿平掉已成交的 %s 失败: %s，头寸不平衡，请手动处理或启用对冲再平衡",
+                             pair.pair_id, name, quantity, unwind[name]['error'])
+        return unwind
+
+    @staticmethod
+    def _leg_quality(leg, requested_quantity, arrival_price):
+        """汇总单条腿的成交质量"""
+        submitted = [child for child in leg['children'] if child['success']]
+        submitted_quantity = sum(child['quantity'] for child in submitted)
+        priced = [child for child in submitted if child['expected_vwap'] is not None]
+        expected_vwap = None
+        slippage_bps = None
+        if priced:
+            priced_quantity = sum(child['quantity'] for child in priced)
+            expected_vwap = sum(child['expected_vwap'] * child['quantity'] for child in priced) / priced_quantity
+            sign = 1 if leg['side'] == 'buy' else -1
+            slippage_bps = sign * (expected_vwap - arrival_price) / arrival_price * 10000
+        # 订单跟踪提供的实际成交
+        filled = [child for child in submitted if child['average_price'] is not None and child['filled_quantity']]
+        fill_vwap = None
+        fill_slippage_bps = None
+        if filled:
+            filled_quantity = sum(child['filled_quantity'] for child in filled)
+            fill_vwap = sum(child['average_price'] * child['filled_quantity'] for child in filled) / filled_quantity
+            sign = 1 if leg['side'] == 'buy' else -1
+            fill_slippage_bps = sign * (fill_vwap - arrival_price) / arrival_price * 10000
+        return {
+            'side': leg['side'],
+            'requested_quantity': requested_quantity,
+            'submitted_quantity': submitted_quantity,
+            'child_orders': len(leg['children']),
+            'expected_vwap': expected_vwap,
+            'expected_slippage_bps': slippage_bps,
+            'filled_quantity': OrderExecutor._filled(leg['children'])[0],
+            'fill_vwap': fill_vwap,
+            'fill_slippage_bps': fill_slippage_bps,
+            'children': leg['children'],
+        }
@@ -0,0 +1,167 @@
+"""
+定点数价格与数量换算
+
+每个市场根据 supported_size_decimals / supported_price_decimals 计算一次缩放因子，
+数量和价格在提交给签名器之前始终以缩放后的整数表示，中间计算使用 Decimal，
+避免 0.0002 * 100000 = 19.999999 这类浮点误差导致的数量错误和下单被拒。
+"""
+
+from decimal import Decimal, ROUND_DOWN, ROUND_UP, ROUND_HALF_EVEN, ROUND_FLOOR
+
+# 未获取市场信息时的默认精度（与原有默认乘数 1000000 / 100 一致）
+DEFAULT_SIZE_DECIMALS = 6
+DEFAULT_PRICE_DECIMALS = 2
+
+
+def to_decimal(value):
+    """
+    将数值转换为 Decimal
+
+    浮点数按其十进制字符串表示转换（0.1 -> Decimal('0.1')），而不是二进制展开。
+
+    Args:
+        value: int / float / str / Decimal
+
+    Returns:
+        Decimal: 转换结果
+    """
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+class MarketScale:
+    """单个市场的定点缩放因子"""
+
+    __slots__ = ('size_decimals', 'price_decimals', 'size_multiplier', 'price_multiplier', 'min_base_amount')
+
+    def __init__(self, size_decimals=DEFAULT_SIZE_DECIMALS, price_decimals=DEFAULT_PRICE_DECIMALS,
+                 min_base_amount=None):
+        """
+        初始化市场缩放因子
+
+        Args:
+            size_decimals (int): 数量精度（小数位数）
+            price_decimals (int): 价格精度（小数位数）
+            min_base_amount: 最小基础数量（未缩放），可选
+        """
+        self.size_decimals = int(size_decimals)
+        self.price_decimals = int(price_decimals)
+        self.size_multiplier = 10 ** self.size_decimals
+        self.price_multiplier = 10 ** self.price_decimals
+        self.min_base_amount = (
+            self.to_base_amount(min_base_amount, rounding=ROUND_UP) if min_base_amount is not None else 0
+        )
+
+    @classmethod
+    def from_market_info(cls, market_info):
+        """
+        根据市场信息对象创建缩放因子
+
+        Args:
+            market_info: find_market_by_symbol 返回的市场信息对象
+
+        Returns:
+            MarketScale: 缩放因子
+        """
+        return cls(
+            size_decimals=getattr(market_info, 'supported_size_decimals', DEFAULT_SIZE_DECIMALS),
+            price_decimals=getattr(market_info, 'supported_price_decimals', DEFAULT_PRICE_DECIMALS),
+            min_base_amount=getattr(market_info, 'min_base_amount', None)
+        )
+
+    def to_base_amount(self, quantity, rounding=ROUND_DOWN):
+        """
+        数量转换为缩放后的整数 base_amount
+
+        Args:
+            quantity: 数量
+            rounding: Decimal 舍入方式，默认向零舍入（不超过请求数量）
+
+        Returns:
+            int: base_amount
+        """
+        scaled = to_decimal(quantity) * self.size_multiplier
+        return int(scaled.to_integral_value(rounding=rounding))
+
+    def to_price(self, price, rounding=ROUND_HALF_EVEN):
+        """
+        价格转换为缩放后的整数价格
+
+        Args:
+            price: 价格
+            rounding: Decimal 舍入方式，默认四舍六入
+
+        Returns:
+            int: 整数价格
+        """
+        scaled = to_decimal(price) * self.price_multiplier
+        return int(scaled.to_integral_value(rounding=rounding))
+
+    def worst_price(self, side, price):
+        """
+        最差成交价转换为整数价格，向中间价方向舍入（买单向下、卖单向上），保证不放宽保护
+
+        Args:
+            side (str): 'buy' 或 'sell'
+            price: 价格
+
+        Returns:
+            int: 整数价格
+        """
+        return self.to_price(price, rounding=ROUND_DOWN if side == 'buy' else ROUND_UP)
+
+    def base_amount_to_decimal(self, base_amount):
+        """base_amount 转换回数量（Decimal）"""
+        return Decimal(base_amount) / self.size_multiplier
+
+    def price_to_decimal(self, price_int):
+        """整数价格转换回价格（Decimal）"""
+        return Decimal(price_int) / self.price_multiplier
+
+    def notional_to_base_amount(self, usd_amount, price):
+        """
+        USD金额按价格转换为 base_amount（向下取整）
+
+        Args:
+            usd_amount: USD金额
+            price: 价格
+
+        Returns:
+            int: base_amount
+        """
+        quantity = to_decimal(usd_amount) / to_decimal(price)
+        return int((quantity * self.size_multiplier).to_integral_value(rounding=ROUND_FLOOR))
+
+    def validate_base_amount(self, base_amount):
+        """
+        提交前校验 base_amount
+
+        Returns:
+            str or None: 错误信息，校验通过时返回 None
+        """
+        if base_amount <= 0:
+            return f"数量转换后为 {base_amount}，必须大于 0"
+        if base_amount < self.min_base_amount:
+            return f"数量 {base_amount} 小于最小基础数量 {self.min_base_amount}"
+        return None
+
+
+_market_scales = {}
+
+
+def get_market_scales(network):
+    """
+    获取网络共享的市场缩放因子表（市场ID -> MarketScale）
+
+    同一网络的市场精度相同，只要任一客户端查找过市场，所有客户端（包括做空账户）都使用该市场的精度。
+
+    Args:
+        network (str): 网络（mainnet / testnet）
+
+    Returns:
+        dict: 市场ID -> MarketScale
+    """
+    return _market_scales.setdefault(network, {})
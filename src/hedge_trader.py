@@ -1,15 +1,102 @@
 import logging
-from src.lighter_api import LighterAPI
 import asyncio
+import functools
+import time
+
+from src.fixed_point import get_market_scales
+from src.logging_setup import bind_log_context
+from src.nonce_manager import get_nonce_allocator
+from src.pair_state import PairLifecycle, PairState
+from src.quote_guard import get_quote_guard
+from src.records import OrderResult
+from src.request_scheduler import Lane, get_scheduler, request_lane
+from src.signing_keys import SigningKey
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def stop_loss_triggered(floating_pnl, stop_loss_threshold):
+    """
+    止损判定规则（实盘监控与参数扫描共用）
+
+    Args:
+        floating_pnl (float): 浮动盈亏
+        stop_loss_threshold (float): 止损阈值（取绝对值）
+
+    Returns:
+        bool: 浮动亏损是否超过阈值
+    """
+    return floating_pnl < -abs(stop_loss_threshold)
+
+
+def summarize_positions(positions, symbol):
+    """
+    汇总账户在某个交易对上的持仓量和浮动盈亏
+
+    Args:
+        positions (list): 持仓列表
+        symbol (str): 交易对符号
+
+    Returns:
+        tuple: (持仓量: float, 浮动盈亏: float)
+    """
+    size = 0.0
+    total_pnl = 0
+    for position in positions:
+        if position.get('symbol') == symbol:
+            size += float(position.get('position', 0))
+            pnl_value = position.get('unrealized_pnl', 0)
+            # 确保pnl_value是数字类型
+            if isinstance(pnl_value, str):
+                try:
+                    pnl_value = float(pnl_value)
+                except (ValueError, TypeError):
+                    pnl_value = 0
+            total_pnl += pnl_value
+    return size, total_pnl
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def pnl_components(positions, symbol):
+    """
+    汇总账户在某个交易对上的盈亏分量（供盈亏记账使用）
+
+    Args:
+        positions (list): 持仓列表
+        symbol (str): 交易对符号
+
+    Returns:
+        dict: {'realized': 已实现盈亏, 'unrealized': 浮动盈亏, 'funding': 资金费收支}
+    """
+    components = {'realized': 0.0, 'unrealized': 0.0, 'funding': 0.0}
+    for position in positions:
+        if position.get('symbol') == symbol:
+            components['realized'] += _to_float(position.get('realized_pnl'))
+            components['unrealized'] += _to_float(position.get('unrealized_pnl'))
+            # 支付的资金费为负收益
+            components['funding'] -= _to_float(position.get('funding_paid'))
+    return components
+
+
+def _pair_log_context(method):
+    """在交易对的异步方法执行期间，为日志绑定交易对名称"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        with bind_log_context(pair=self.pair_name):
+            return await method(self, *args, **kwargs)
+    return wrapper
+
+
 class HedgePair:
     """对冲交易对"""
     
-    def __init__(self, account_long, account_short, config):
+    def __init__(self, account_long, account_short, config, executor=None):
         """
         初始化对冲交易对
         
@@ -17,37 +104,17 @@ class HedgePair:
             account_long (dict): 做多账户信息
             account_short (dict): 做空账户信息
             config (dict): 配置信息
+            executor (OrderExecutor): 下单执行器（可选，未提供时每条腿直接提交一笔市价单）
         """
         self.account_long = account_long
         self.account_short = account_short
         self.config = config
         self.pair_id = f"{account_long['account_name']}-{account_short['account_name']}"
+        self.pair_name = self.pair_id  # 由机器人设置为配置中的 pair_name
         
-        # 获取代理池
-        proxy_pool = config.get('proxy_pool', [])
-        proxy_pool_dict = {proxy['name']: proxy for proxy in proxy_pool}
-        
-        # 为做多账户初始化API客户端
-        long_proxy_name = account_long.get('proxy')
-        long_proxy_config = proxy_pool_dict.get(long_proxy_name) if long_proxy_name else None
-        self.api_long = LighterAPI(
-            api_key=account_long['api_key'],
-            network=account_long.get('network', 'mainnet'),
-            proxy_config=long_proxy_config,
-            account_index=account_long.get('account_index', 0),
-            api_key_index=account_long.get('api_key_index', 0)
-        )
-        
-        # 为做空账户初始化API客户端
-        short_proxy_name = account_short.get('proxy')
-        short_proxy_config = proxy_pool_dict.get(short_proxy_name) if short_proxy_name else None
-        self.api_short = LighterAPI(
-            api_key=account_short['api_key'],
-            network=account_short.get('network', 'mainnet'),
-            proxy_config=short_proxy_config,
-            account_index=account_short.get('account_index', 0),
-            api_key_index=account_short.get('api_key_index', 0)
-        )
+        # API客户端在首次使用时才创建（见 api_long/api_short 属性）
+        self._api_long = None
+        self._api_short = None
         
         # 交易参数
         self.symbol = config['trading_pair']
@@ -59,8 +126,178 @@ class HedgePair:
         self.order_long = None
         self.order_short = None
         
-        logger.info(f"创建对冲交易对: {self.pair_id}")
+        # 下单执行器及最近一次开仓的成交质量报告
+        self.executor = executor
+        self.execution_report = None
+        
+        # 账户持仓快照（由机器人设置，多个交易对共享；未设置时直接查询）
+        self.account_snapshots = None
+        
+        # 跨交易对的订单轧差（由机器人设置，共用账户的交易对同时下单时合并为一笔；未设置时直接下单）
+        self.order_netter = None
+        
+        # 订单生命周期跟踪（由机器人设置，开仓后等待两条腿成交确认；未设置时以提交成功为准）
+        self.order_tracker = None
+        
+        # 生命周期状态（INIT -> OPENING -> OPEN -> CLOSING -> FLAT / ERROR，见 src/pair_state.py）
+        self.lifecycle = PairLifecycle(self.pair_id)
+        
+        # 最近一次止损检查的状态（指标接口直接读取，不发起请求）
+        self.last_pnl = None
+        self.last_check_time = None  # time.monotonic()
+        self.skipped_checks = 0      # 持仓查询不完整而跳过的止损检查次数
+        self.last_check_ok = False   # 最近一次止损检查是否得到了新的浮动盈亏
+        self.long_size = 0.0
+        self.short_size = 0.0
+        
+        # 盈亏记账：最近一次检查每条腿的盈亏分量，以及每条腿累计成交金额（USD，用于估算手续费）
+        self.pnl_components = {}
+        self.traded_notional = 0.0
+        
+        logger.info("创建对冲交易对: %s", self.pair_id)
+
+    def _create_api(self, account):
+        """为账户创建API客户端（使用账户配置的代理，同一代理上的账户共享请求调度器，每个API密钥一个签名通道，同一API密钥共享 nonce 分配器，同一网络共享报价检查和市场精度）"""
+        from src.lighter_api import LighterAPI
+        
+        proxy_pool_dict = {proxy['name']: proxy for proxy in self.config.get('proxy_pool', [])}
+        proxy_name = account.get('proxy')
+        scheduler_config = self.config.get('scheduler', {})
+        scheduler = None
+        if scheduler_config.get('enabled', True):
+            scheduler = get_scheduler(proxy_name or 'direct', scheduler_config)
+        network = account.get('network', 'mainnet')
+        account_index = account.get('account_index', 0)
+        api_key_index = account.get('api_key_index', 0)
+        nonce_config = self.config.get('nonce', {})
+        
+        # 主密钥和 api_keys 中的其他密钥，每个密钥一个签名通道
+        keys = [{'api_key': account['api_key'], 'api_key_index': api_key_index}]
+        keys.extend(account.get('api_keys', []))
+        signing_keys = []
+        for key in keys:
+            nonces = None
+            if nonce_config.get('enabled', True):
+                nonces = get_nonce_allocator(network, account_index, key['api_key_index'], nonce_config)
+            signing_keys.append(SigningKey(key['api_key'], key['api_key_index'], nonces))
+        
+        return LighterAPI(
+            api_key=account['api_key'],
+            network=network,
+            proxy_config=proxy_pool_dict.get(proxy_name) if proxy_name else None,
+            account_index=account_index,
+            api_key_index=api_key_index,
+            scheduler=scheduler,
+            signing_keys=signing_keys,
+            key_cooldown=self.config.get('signing', {}).get('key_cooldown', 10),
+            quote_guard=get_quote_guard(network, self.config.get('quote_guard')),
+            market_scales=get_market_scales(network)
+        )
+
+    @property
+    def api_long(self):
+        """做多账户的API客户端"""
+        if self._api_long is None:
+            self._api_long = self._create_api(self.account_long)
+        return self._api_long
+
+    @api_long.setter
+    def api_long(self, api):
+        self._api_long = api
+
+    @property
+    def api_short(self):
+        """做空账户的API客户端"""
+        if self._api_short is None:
+            self._api_short = self._create_api(self.account_short)
+        return self._api_short
+
+    @api_short.setter
+    def api_short(self, api):
+        self._api_short = api
 
+    def update_params(self, config, pair_config=None):
+        """
+        在线更新交易参数（不重建API客户端）
+        
+        Args:
+            config (dict): 新配置
+            pair_config (dict): hedge_pairs 中本交易对的新配置（单市场交易对不使用）
+        """
+        self.config = config
+        self.leverage = config['leverage']
+        self.position_size = config['position_size']
+
+    def api_clients(self):
+        """已创建的API客户端（不触发延迟创建）"""
+        return [api for api in (self._api_long, self._api_short) if api is not None]
+
+    async def close_clients(self):
+        """关闭两个账户的API客户端（未创建的客户端无需关闭）"""
+        for api in self.api_clients():
+            await api.close()
+
+    def metrics(self, now=None):
+        """
+        交易对的监控指标（只读取内存中的状态，不发起请求）
+        
+        Args:
+            now (float): 当前 time.monotonic()，批量采集时由调用方传入
+            
+        Returns:
+            dict: 交易对的指标
+        """
+        if now is None:
+            now = time.monotonic()
+        clients = self.api_clients()
+        lifecycle = self.lifecycle.snapshot(now)
+        return {
+            'pair_name': self.pair_name,
+            'pair_id': self.pair_id,
+            'symbol': self.symbol,
+            'state': lifecycle['state'],
+            'state_age': lifecycle['state_age'],
+            'time_in_state': lifecycle['time_in_state'],
+            'market_index': self.market_index,
+            'floating_pnl': self.last_pnl,
+            'stop_loss_threshold': self.config['stop_loss_threshold'],
+            'last_check_age': None if self.last_check_time is None else now - self.last_check_time,
+            'skipped_checks': self.skipped_checks,
+            'long_size': self.long_size,
+            'short_size': self.short_size,
+            'in_flight': sum(api.in_flight for api in clients),
+            'retries': sum(api.retry_count for api in clients),
+            'markets': [{
+                'symbol': self.symbol,
+                'market_index': self.market_index,
+                'floating_pnl': self.last_pnl,
+                'stop_loss_threshold': self.config['stop_loss_threshold'],
+                'long_size': self.long_size,
+                'short_size': self.short_size,
+                'closed': False,
+            }],
+        }
+
+    def symbols(self):
+        """交易对涉及的市场符号"""
+        return (self.symbol,)
+
+    def hedge_markets(self):
+        """参与对冲的市场 [(交易对符号, 市场ID), ...]（供再平衡使用）"""
+        if self.market_index is None:
+            return []
+        return [(self.symbol, self.market_index)]
+
+    def stop_loss_state(self):
+        """
+        最接近触发的止损检查（供自适应轮询使用）
+
+        Returns:
+            tuple: (浮动盈亏, 止损阈值)
+        """
+        return self.last_pnl, self.config['stop_loss_threshold']
+
+    @_pair_log_context
     async def initialize(self):
         """
         异步初始化对冲交易对
@@ -72,7 +309,7 @@ class HedgePair:
         初始化市场ID
         """
         try:
-            logger.info(f"查找交易对 {self.symbol} 的市场信息...")
+            logger.info("查找交易对 %s 的市场信息...", self.symbol)
             
             # 使用做多账户查找市场信息（两个账户应该在同一网络，所以市场ID相同）
             market_result = await self.api_long.find_market_by_symbol(self.symbol)
@@ -80,170 +317,303 @@ class HedgePair:
             if market_result.get('success', False):
                 self.market_index = market_result['market_id']
                 market_info = market_result['market_info']
-                logger.info(f"✓ 找到交易对 {self.symbol}，市场ID: {self.market_index}")
-                logger.info(f"  市场状态: {market_info.status}")
-                logger.info(f"  最小基础数量: {market_info.min_base_amount}")
-                logger.info(f"  最小报价数量: {market_info.min_quote_amount}")
+                logger.info("✓ 找到交易对 %s，市场ID: %s", self.symbol, self.market_index)
+                logger.info("  市场状态: %s", market_info.status)
+                logger.info("  最小基础数量: %s", market_info.min_base_amount)
+                logger.info("  最小报价数量: %s", market_info.min_quote_amount)
             else:
-                logger.error(f"✗ 查找交易对失败: {market_result.get('error', '未知错误')}")
+                logger.error("✗ 查找交易对失败: %s", market_result.get('error', '未知错误'))
                 # 如果查找失败，使用默认值0作为fallback
                 self.market_index = 0
-                logger.warning(f"使用默认市场索引: {self.market_index}")
+                logger.warning("使用默认市场索引: %s", self.market_index)
                 
         except Exception as e:
-            logger.error(f"初始化市场ID失败: {e}")
+            logger.error("初始化市场ID失败: %s", e)
             # 如果发生异常，使用默认值0作为fallback
             self.market_index = 0
-            logger.warning(f"使用默认市场索引: {self.market_index}")
+            logger.warning("使用默认市场索引: %s", self.market_index)
 
+    @_pair_log_context
     async def open_positions(self):
         """
-        开仓建立对冲头寸
+        开仓建立对冲头寸（开仓过程中的价格查询也走开仓通道）
         """
+        self.lifecycle.transition(PairState.OPENING)
+        self.order_long = self.order_short = None
+        with request_lane(Lane.OPEN):
+            success = await self._open_positions()
+        if success:
+            self.lifecycle.transition(PairState.OPEN)
+        elif self.order_long is None and self.order_short is None:
+            self.lifecycle.transition(PairState.FLAT, "未提交订单")
+        else:
+            self.lifecycle.transition(PairState.ERROR, "开仓失败")
+        return success
+
+    async def _open_positions(self):
         try:
             # 检查是否已初始化market_index
             if self.market_index is None:
-                logger.error(f"未初始化market_index，无法开仓 {self.pair_id}")
+                logger.error("未初始化market_index，无法开仓 %s", self.pair_id)
                 return False
             
             # 将USD金额转换为交易对数量
-            logger.info(f"将USD金额 {self.position_size} USD 转换为 {self.symbol} 数量...")
+            logger.info("将USD金额 %s USD 转换为 %s 数量...", self.position_size, self.symbol)
             
             # 使用做多账户进行转换（两个账户应该在同一网络，所以价格相同）
             quantity_result = await self.api_long.usd_to_quantity(self.market_index, self.position_size)
             
             if not quantity_result.get('success', False):
-                logger.error(f"USD到数量转换失败: {quantity_result.get('error', '未知错误')}")
+                logger.error("USD到数量转换失败: %s", quantity_result.get('error', '未知错误'))
                 return False
             
             quantity = quantity_result['quantity']
+            base_amount = quantity_result['base_amount']
             current_price = quantity_result['price']
             
-            logger.info(f"转换结果: {self.position_size} USD = {quantity:.6f} {self.symbol} (价格: {current_price:.2f} USD)")
+            logger.info("转换结果: %s USD = %.6f %s (价格: %.2f USD)", self.position_size, quantity, self.symbol, current_price)
             
-            # 做多账户下单买入
-            self.order_long = await self.api_long.place_order(
-                market_index=self.market_index,
-                side='buy',
-                price=None,  # 市价单
-                quantity=quantity,
-                leverage=self.leverage
-            )
+            if self.executor is not None:
+                # 按订单簿深度拆分子订单，两条腿同步提交
+                self.execution_report = await self.executor.execute_pair(self, quantity, base_amount=base_amount,
+                                                                         order_tracker=self.order_tracker)
+                self.order_long = self.execution_report['legs'].get('long')
+                self.order_short = self.execution_report['legs'].get('short')
+                
+                if not self.execution_report['success']:
+                    # 执行器已用只减仓订单平掉已成交的子订单
+                    logger.error("开仓执行失败 %s: %s", self.pair_id, self.execution_report['error'])
+                    return False
+                
+                for leg_name, leg in self.execution_report['legs'].items():
+                    logger.info(
+                        "对冲头寸已建立: %s %s 子订单 %s 笔, 预估滑点 %s bps, 实际成交均价 %s, 实际滑点 %s bps",
+                        self.pair_id, leg_name, leg['child_orders'], leg['expected_slippage_bps'],
+                        leg['fill_vwap'], leg['fill_slippage_bps']
+                    )
+                self.traded_notional += self.position_size
+                return True
             
-            # 做空账户下单卖出
-            self.order_short = await self.api_short.place_order(
-                market_index=self.market_index,
-                side='sell',
-                price=None,  # 市价单
-                quantity=quantity,
-                leverage=self.leverage
+            # 做多账户买入、做空账户卖出，两条腿同时提交（不等待前一条腿返回）
+            results = await asyncio.gather(
+                self._place_market_order(self.api_long, self.market_index, 'buy', base_amount),
+                self._place_market_order(self.api_short, self.market_index, 'sell', base_amount),
+                return_exceptions=True
+            )
+            # 抛出异常的腿按提交失败处理，与 success=False 的结果一起在确认成交前检查
+            self.order_long, self.order_short = (
+                OrderResult(False, error=str(result)) if isinstance(result, BaseException) else result
+                for result in results
             )
+            if not await self._confirm_fills(self.symbol, self.market_index, base_amount,
+                                             self.order_long, self.order_short):
+                return False
             
-            logger.info(f"对冲头寸已建立: {self.pair_id}")
-            logger.info(f"做多订单: {self.order_long}")
-            logger.info(f"做空订单: {self.order_short}")
+            self.traded_notional += self.position_size
+            logger.info("对冲头寸已建立: %s", self.pair_id)
+            logger.debug("做多订单: %s", self.order_long)
+            logger.debug("做空订单: %s", self.order_short)
             
             return True
         except Exception as e:
-            logger.error(f"开仓失败 {self.pair_id}: {str(e)}")
+            logger.error("开仓失败 %s: %s", self.pair_id, e)
             return False
 
+    async def _place_market_order(self, api, market_index, side, base_amount):
+        """提交市价单（设置了订单轧差时与其他交易对的同时下单合并）"""
+        if self.order_netter is not None:
+            return await self.order_netter.place_order(
+                api, self.pair_id, market_index, side, base_amount, leverage=self.leverage
+            )
+        return await api.place_order(
+            market_index=market_index,
+            side=side,
+            price=None,  # 市价单
+            base_amount=base_amount,
+            leverage=self.leverage
+        )
+
+    async def _confirm_fills(self, symbol, market_index, base_amount, order_long, order_short):
+        """
+        检查两条腿的下单结果并等待成交确认
+        
+        Returns:
+            bool: 两条腿是否都全部成交
+        """
+        return await self._confirm_orders(symbol, market_index, [
+            ('做多', self.api_long, order_long, base_amount),
+            ('做空', self.api_short, order_short, base_amount),
+        ])
+
+    async def _confirm_orders(self, symbol, market_index, orders):
+        """
+        检查下单结果并等待成交确认（未设置订单跟踪时只检查下单结果）
+        
+        Args:
+            orders (list): [(腿名称, api, 下单结果, 提交的数量), ...]
+        
+        Returns:
+            bool: 所有订单是否都提交成功且（设置了订单跟踪时）全部成交
+        """
+        failed = False
+        submitted = []
+        for leg_name, api, result, base_amount in orders:
+            if result.get('success', False):
+                submitted.append((leg_name, api, result, base_amount))
+            else:
+                logger.error("%s下单失败 %s %s: %s", leg_name, self.pair_id, symbol, result.get('error'))
+                failed = True
+        if self.order_tracker is None:
+            return not failed
+        # 其他订单失败时仍等待已提交订单的结果，记录实际成交了多少
+        tracked = [
+            (leg_name, self.order_tracker.track(api, market_index, result, base_amount))
+            for leg_name, api, result, base_amount in submitted
+        ]
+        await asyncio.gather(*(self.order_tracker.wait(order) for _, order in tracked if order is not None))
+        confirmed = not failed
+        for leg_name, order in tracked:
+            if order is None:
+                continue
+            if order.filled:
+                if failed:
+                    logger.warning("%s订单已成交 %s %s: 已成交 %s，头寸不平衡",
+                                   leg_name, self.pair_id, symbol, order.filled_base_amount)
+                continue
+            confirmed = False
+            logger.error(
+                "%s订单未成交 %s %s: 状态 %s, 已成交 %s%s",
+                leg_name, self.pair_id, symbol, order.state, order.filled_base_amount,
+                f", 错误: {order.error}" if order.error else ""
+            )
+        return confirmed
+
+    async def _cancel_order(self, api, market_index, order_index):
+        """撤单（设置了订单轧差时，相同的并发撤单只提交一次）"""
+        if self.order_netter is not None:
+            return await self.order_netter.cancel_order(api, market_index, order_index)
+        return await api.close_position(market_index=market_index, order_index=order_index)
+
+    @_pair_log_context
     async def get_floating_pnl(self):
         """
         获取浮动盈亏
         
         Returns:
-            float: 浮动盈亏值
+            float or None: 浮动盈亏值；任一条腿的持仓查询失败（包括监控请求排队超时被丢弃）时为 None，
+                表示未知，不能只按另一条腿的盈亏判断止损
         """
         try:
             # 检查是否已初始化market_index
             if self.market_index is None:
-                logger.error(f"未初始化market_index，无法获取浮动盈亏 {self.pair_id}")
-                return 0
-            
-            # 获取两个账户的持仓信息
-            positions_long = await self.api_long.get_open_positions(market_index=self.market_index)
-            positions_short = await self.api_short.get_open_positions(market_index=self.market_index)
-            
-            # 计算总浮动盈亏
-            total_pnl = 0
-            
-            # 累加做多账户的盈亏
-            if positions_long and 'positions' in positions_long:
-                for position in positions_long['positions']:
-                    if position.get('symbol') == self.symbol:
-                        pnl_value = position.get('unrealized_pnl', 0)
-                        # 确保pnl_value是数字类型
-                        if isinstance(pnl_value, str):
-                            try:
-                                pnl_value = float(pnl_value)
-                            except (ValueError, TypeError):
-                                pnl_value = 0
-                        total_pnl += pnl_value
-            
-            # 累加做空账户的盈亏
-            if positions_short and 'positions' in positions_short:
-                for position in positions_short['positions']:
-                    if position.get('symbol') == self.symbol:
-                        pnl_value = position.get('unrealized_pnl', 0)
-                        # 确保pnl_value是数字类型
-                        if isinstance(pnl_value, str):
-                            try:
-                                pnl_value = float(pnl_value)
-                            except (ValueError, TypeError):
-                                pnl_value = 0
-                        total_pnl += pnl_value
-            
-            return total_pnl
+                logger.error("未初始化market_index，无法获取浮动盈亏 %s", self.pair_id)
+                return None
+            
+            # 获取两个账户在本市场的持仓信息
+            positions_long, positions_short = await asyncio.gather(
+                self._get_positions(self.api_long),
+                self._get_positions(self.api_short)
+            )
+            for leg_name, positions in (('做多', positions_long), ('做空', positions_short)):
+                if not positions or not positions.get('success', False):
+                    logger.warning("%s账户持仓查询失败 %s: %s", leg_name, self.pair_id,
+                                   positions.get('error') if positions else None)
+                    return None
+            
+            # 两条腿的盈亏之和
+            self.long_size, long_pnl = summarize_positions(positions_long['positions'], self.symbol)
+            self.pnl_components['long'] = pnl_components(positions_long['positions'], self.symbol)
+            self.short_size, short_pnl = summarize_positions(positions_short['positions'], self.symbol)
+            self.pnl_components['short'] = pnl_components(positions_short['positions'], self.symbol)
+            return long_pnl + short_pnl
         except Exception as e:
-            logger.error(f"获取浮动盈亏失败 {self.pair_id}: {str(e)}")
-            return 0
+            logger.error("获取浮动盈亏失败 %s: %s", self.pair_id, e)
+            return None
 
+    async def _get_positions(self, api):
+        """读取账户在本市场的持仓（有账户快照时从快照读取）"""
+        if self.account_snapshots is not None:
+            return await self.account_snapshots.get_positions(api, self.market_index)
+        return await api.get_open_positions(market_index=self.market_index)
+
+    @_pair_log_context
     async def is_stop_loss_triggered(self):
         """
         检查是否触发止损
         
         Returns:
-            bool: 是否触发止损
+            bool: 是否触发止损（浮动盈亏未知时跳过本次检查，返回 False）
         """
         floating_pnl = await self.get_floating_pnl()
+        self.last_check_ok = floating_pnl is not None
+        if floating_pnl is None:
+            self.skipped_checks += 1
+            logger.warning("浮动盈亏未知，跳过本次止损检查 %s", self.pair_id)
+            return False
         stop_loss_threshold = self.config['stop_loss_threshold']
+        self.last_pnl = floating_pnl
+        self.last_check_time = time.monotonic()
         
         # 如果浮动亏损超过阈值，触发止损
-        if floating_pnl < -abs(stop_loss_threshold):
-            logger.info(f"触发止损 {self.pair_id}: 浮动盈亏 {floating_pnl} USD")
+        if stop_loss_triggered(floating_pnl, stop_loss_threshold):
+            logger.info("触发止损 %s: 浮动盈亏 %s USD", self.pair_id, floating_pnl)
             return True
         
         return False
 
+    async def close_triggered_positions(self):
+        """平掉触发止损的头寸（单市场交易对即全部平仓）"""
+        return await self.close_positions()
+
+    @_pair_log_context
     async def close_positions(self):
         """
-        平仓
+        平仓（两条腿同时提交，所有请求走紧急平仓通道）
+        
+        Returns:
+            bool: 两条腿是否都平仓成功
         """
+        if self.lifecycle.state == PairState.FLAT:
+            # 本进程已确认平仓，不需要再提交
+            return True
+        self.lifecycle.transition(PairState.CLOSING)
+        with request_lane(Lane.EMERGENCY_CLOSE):
+            success = await self._close_positions()
+        self.lifecycle.transition(PairState.FLAT if success else PairState.ERROR, None if success else "平仓失败")
+        return success
+
+    async def _close_positions(self):
         try:
             # 检查是否已初始化market_index
             if self.market_index is None:
-                logger.error(f"未初始化market_index，无法平仓 {self.pair_id}")
+                logger.error("未初始化market_index，无法平仓 %s", self.pair_id)
                 return False
             
-            # 平仓做多头寸
+            # 两条腿同时平仓，一条腿失败不影响另一条腿的提交
             # 注意：这里需要订单索引，简化实现使用默认值0
-            result_long = await self.api_long.close_position(
-                market_index=self.market_index,
-                order_index=0
+            result_long, result_short = await asyncio.gather(
+                self._cancel_order(self.api_long, self.market_index, 0),
+                self._cancel_order(self.api_short, self.market_index, 0),
+                return_exceptions=True
             )
             
-            # 平仓做空头寸
-            result_short = await self.api_short.close_position(
-                market_index=self.market_index,
-                order_index=0
-            )
+            failed = False
+            for leg_name, result in (('做多', result_long), ('做空', result_short)):
+                if isinstance(result, BaseException):
+                    logger.error("%s平仓失败 %s: %s", leg_name, self.pair_id, result)
+                    failed = True
+                elif not result.get('success', False):
+                    logger.error("%s平仓失败 %s: %s", leg_name, self.pair_id, result.get('error'))
+                    failed = True
+            if failed:
+                return False
             
-            logger.info(f"对冲头寸已平仓: {self.pair_id}")
-            logger.info(f"做多平仓结果: {result_long}")
-            logger.info(f"做空平仓结果: {result_short}")
+            self.traded_notional += self.position_size
+            logger.info("对冲头寸已平仓: %s", self.pair_id)
+            logger.debug("做多平仓结果: %s", result_long)
+            logger.debug("做空平仓结果: %s", result_short)
             
             return True
         except Exception as e:
-            logger.error(f"平仓失败 {self.pair_id}: {str(e)}")
+            logger.error("平仓失败 %s: %s", self.pair_id, e)
             return False
\ No newline at end of file
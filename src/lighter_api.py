@@ -1,8 +1,16 @@
 import logging
-import lighter
 import asyncio
-import aiohttp
+import contextlib
+import itertools
+import json
+import time
 from typing import Callable, Any
+from src.order_book import OrderBook
+from src.quote_guard import QuoteGuard
+from src.fixed_point import MarketScale
+from src.records import OrderResult, PriceResult, Position, PositionsResult
+from src.request_scheduler import Lane, effective_lane
+from src.signing_keys import SigningKey, SigningKeySelector, is_rate_limit_error
 
 class APIError(Exception):
     """API错误基类"""
@@ -16,12 +24,24 @@ class PermanentAPIError(APIError):
     """永久性API错误（不可重试）"""
     pass
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 批量交易接口成功时的返回码
+BATCH_CODE_OK = 200
+
+# 客户端订单索引：进程内所有客户端共享，从启动时的毫秒时间戳开始递增，重启后也不会与之前的订单重复
+_client_order_indexes = itertools.count(int(time.time() * 1000))
+
+
+def next_client_order_index():
+    """分配一个唯一的客户端订单索引"""
+    return next(_client_order_indexes)
+
+
 class LighterAPI:
-    def __init__(self, api_key, network='mainnet', proxy_config=None, account_index=0, api_key_index=0):
+    def __init__(self, api_key, network='mainnet', proxy_config=None, account_index=0, api_key_index=0,
+                 scheduler=None, nonces=None, signing_keys=None, key_cooldown=10, quote_guard=None,
+                 market_scales=None):
         self.api_key = api_key
         self.network = network
         self.account_index = account_index
@@ -47,9 +67,38 @@ class LighterAPI:
         
         # 基础数量乘数（将在获取市场信息时设置）
         self.base_amount_multiplier = None
+        
+        # 市场定点缩放因子（按市场ID，将在获取市场信息时设置），同一网络的客户端可以共享（见 get_market_scales）
+        self.market_scales = market_scales if market_scales is not None else {}
+        self._default_scale = MarketScale()
+        
+        # 本地订单簿（按市场ID），在有效期内直接使用本地数据而不重新请求
+        self.order_books = {}
+        self.order_book_max_age = 5  # 秒
+        
+        # 报价质量检查（见 src/quote_guard.py），同一网络的客户端可以共享报价历史
+        self.quote_guard = quote_guard if quote_guard is not None else QuoteGuard()
+        
+        # 市场信息缓存（按市场ID），由 find_market_by_symbol 填充
+        self.market_infos = {}
+        
+        # 优先级请求调度器（同一代理上的账户共享，见 src/request_scheduler.py），为 None 时直接发出请求
+        self.scheduler = scheduler
+        
+        # 签名通道（见 src/signing_keys.py）：每个API密钥一个，第一个为主密钥（即 api_key / api_key_index）。
+        # 每个密钥可以有自己的 nonce 分配器（见 src/nonce_manager.py），为 None 时由 SDK 自行查询 nonce
+        if signing_keys is None:
+            signing_keys = [SigningKey(api_key, api_key_index, nonces)]
+        self.signing_keys = SigningKeySelector(signing_keys, cooldown=key_cooldown)
+        
+        # 请求统计（指标接口直接读取）
+        self.in_flight = 0
+        self.request_count = 0
+        self.retry_count = 0
+        self.failure_count = 0
     
     async def _call_with_retry(self, api_func: Callable, operation_name: str, 
-                              is_critical: bool = True) -> Any:
+                              is_critical: bool = True, lane: Lane = Lane.MONITOR) -> Any:
         """
         带重试机制的API调用
         
@@ -57,17 +106,22 @@ class LighterAPI:
             api_func: 要执行的API函数
             operation_name: 操作名称（用于日志）
             is_critical: 是否为关键操作（失败时抛出异常）
+            lane: 请求的默认通道（request_lane() 绑定了更高优先级的通道时使用后者）
             
         Returns:
             API调用结果
         """
         last_error = None
+        lane = effective_lane(lane)
         
         for attempt in range(self.max_retries):
+            self.request_count += 1
+            if attempt > 0:
+                self.retry_count += 1
             try:
-                result = await api_func()
+                result = await self._scheduled_call(api_func, lane)
                 if attempt > 0:
-                    logger.info(f"{operation_name} 在第{attempt+1}次重试后成功")
+                    logger.info("%s 在第%s次重试后成功", operation_name, attempt + 1)
                 return result
                 
             except Exception as e:
@@ -79,21 +133,22 @@ class LighterAPI:
                     if attempt < self.max_retries - 1:
                         delay = self.retry_delay_base ** attempt
                         logger.warning(
-                            f"{operation_name} 临时失败 (尝试 {attempt+1}/{self.max_retries}): {error_msg}"
+                            "%s 临时失败 (尝试 %s/%s): %s", operation_name, attempt + 1, self.max_retries, error_msg
                         )
-                        logger.info(f"等待 {delay} 秒后重试...")
+                        logger.info("等待 %s 秒后重试...", delay)
                         await asyncio.sleep(delay)
                         continue
                     else:
                         logger.error(
-                            f"{operation_name} 重试{self.max_retries}次后仍然失败: {error_msg}"
+                            "%s 重试%s次后仍然失败: %s", operation_name, self.max_retries, error_msg
                         )
                 else:
                     # 永久性错误，不重试
-                    logger.error(f"{operation_name} 永久性失败: {error_msg}")
+                    logger.error("%s 永久性失败: %s", operation_name, error_msg)
                     break
         
         # 所有重试都失败
+        self.failure_count += 1
         error_result = {
             'success': False,
             'error': str(last_error),
@@ -105,9 +160,94 @@ class LighterAPI:
             # 但调用方可以选择捕获异常或检查返回结果
             raise PermanentAPIError(f"{operation_name} 失败: {str(last_error)}")
         else:
-            logger.error(f"{operation_name} 失败，但允许继续运行: {str(last_error)}")
+            logger.error("%s 失败，但允许继续运行: %s", operation_name, last_error)
             return error_result
     
+    async def _scheduled_call(self, api_func: Callable, lane: Lane) -> Any:
+        """通过调度器（如果有）按通道排队执行一次请求"""
+        if self.scheduler is None:
+            return await self._tracked_call(api_func)
+        return await self.scheduler.submit(lane, lambda: self._tracked_call(api_func))
+
+    async def _tracked_call(self, api_func: Callable) -> Any:
+        """执行一次请求并维护在途请求数"""
+        self.in_flight += 1
+        try:
+            return await api_func()
+        finally:
+            self.in_flight -= 1
+
+    async def _fetch_next_nonce(self, api_key_index=None):
+        """从交易所查询本账户指定API密钥（默认主密钥）的下一个 nonce"""
+        import lighter
+        self._initialize_client()
+        if api_key_index is None:
+            api_key_index = self.api_key_index
+        transaction_api = lighter.TransactionApi(self.client.api_client)
+        result = await transaction_api.next_nonce(account_index=self.account_index, api_key_index=api_key_index)
+        return result.nonce
+
+    def _signer_client(self, key):
+        """密钥对应的 SignerClient（主密钥使用 self.client，其他密钥首次使用时创建）"""
+        if key is self.signing_keys.primary:
+            self._initialize_client()
+            return self.client
+        if key.client is None:
+            key.client = self._create_signer_client(key.api_key, key.api_key_index)
+        return key.client
+
+    async def _signed(self, submit):
+        """
+        提交签名交易
+        
+        选择负载最低的可用API密钥；有 nonce 分配器时在本地分配 nonce，交易失败后重新同步。
+        密钥被限流时进入冷却期，同一笔交易改用下一个密钥提交。
+        
+        Args:
+            submit: 函数 (client, signing)，signing 为额外的签名参数字典（nonce、api_key_index），
+                    返回 SDK 的 (tx, tx_hash, err)
+            
+        Returns:
+            tuple: (tx, tx_hash, err)
+        """
+        tried = []
+        while True:
+            key = self.signing_keys.select(exclude=tried)
+            tried.append(key)
+            has_next = len(tried) < len(self.signing_keys.keys)
+            try:
+                tx, tx_hash, err = await self._signed_with(key, submit)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self.signing_keys.mark_rate_limited(key)
+                if not has_next:
+                    raise
+                logger.warning("API密钥 %s 被限流，切换到其他密钥: %s", key.api_key_index, e)
+                continue
+            if err and is_rate_limit_error(err):
+                self.signing_keys.mark_rate_limited(key)
+                if has_next:
+                    logger.warning("API密钥 %s 被限流，切换到其他密钥: %s", key.api_key_index, err)
+                    continue
+            return tx, tx_hash, err
+
+    async def _signed_with(self, key, submit):
+        """使用指定密钥提交一笔签名交易"""
+        client = self._signer_client(key)
+        key.in_flight += 1
+        key.submitted += 1
+        try:
+            if key.nonces is None:
+                return await submit(client, {})
+            async with key.nonces.lease(lambda: self._fetch_next_nonce(key.api_key_index)) as lease:
+                tx, tx_hash, err = await submit(client, {'nonce': lease.nonce, 'api_key_index': key.api_key_index})
+                if err:
+                    lease.failed()
+                return tx, tx_hash, err
+        finally:
+            key.in_flight -= 1
+
     def _is_temporary_error(self, error_msg: str) -> bool:
         """
         判断是否为临时性错误（可重试）
@@ -135,6 +275,10 @@ class LighterAPI:
             return
             
         try:
+            # SDK 在首次创建客户端时才导入，避免导入本模块就加载整个 SDK
+            import aiohttp
+            import lighter
+            
             # 创建配置对象
             config = lighter.Configuration(host=self.base_url)
             
@@ -142,37 +286,45 @@ class LighterAPI:
             if self.proxy_config:
                 proxy_url = f"http://{self.proxy_config['host']}:{self.proxy_config['port']}"
                 config.proxy = proxy_url
-                logger.info(f"设置代理: {proxy_url}")
+                logger.info("设置代理: %s", proxy_url)
                 
                 # 如果代理配置包含认证信息，设置代理认证头
                 if 'username' in self.proxy_config and 'password' in self.proxy_config:
                     auth = aiohttp.BasicAuth(self.proxy_config['username'], self.proxy_config['password'])
                     config.proxy_headers = {'Proxy-Authorization': auth.encode()}
-                    logger.info(f"设置代理认证: {self.proxy_config['username']}")
+                    logger.info("设置代理认证: %s", self.proxy_config['username'])
             
             # 创建SignerClient，使用配置文件中的账户索引和API密钥索引
-            self.client = lighter.SignerClient(
-                url=self.base_url,
-                private_key=self.api_key,
-                account_index=self.account_index,
-                api_key_index=self.api_key_index
-            )
-            
-            # 设置代理（如果需要）
-            if self.proxy_config:
-                proxy_url = f"http://{self.proxy_config['host']}:{self.proxy_config['port']}"
-                self.client.api_client.configuration.proxy = proxy_url
+            self.client = self._create_signer_client(self.api_key, self.api_key_index)
                 
-                # 如果代理配置包含认证信息，设置代理认证头
-                if 'username' in self.proxy_config and 'password' in self.proxy_config:
-                    auth = aiohttp.BasicAuth(self.proxy_config['username'], self.proxy_config['password'])
-                    self.client.api_client.configuration.proxy_headers = {'Proxy-Authorization': auth.encode()}
-                
-            logger.info(f"Lighter客户端初始化成功 (账户索引: {self.account_index}, API密钥索引: {self.api_key_index})")
+            logger.info("Lighter客户端初始化成功 (账户索引: %s, API密钥索引: %s)", self.account_index, self.api_key_index)
         except Exception as e:
-            logger.error(f"Lighter客户端初始化失败: {str(e)}")
+            logger.error("Lighter客户端初始化失败: %s", e)
             raise
 
+    def _create_signer_client(self, private_key, api_key_index):
+        """为指定的API密钥创建 SignerClient（使用当前代理配置）"""
+        import aiohttp
+        import lighter
+        
+        client = lighter.SignerClient(
+            url=self.base_url,
+            private_key=private_key,
+            account_index=self.account_index,
+            api_key_index=api_key_index
+        )
+        
+        # 设置代理（如果需要）
+        if self.proxy_config:
+            proxy_url = f"http://{self.proxy_config['host']}:{self.proxy_config['port']}"
+            client.api_client.configuration.proxy = proxy_url
+            
+            # 如果代理配置包含认证信息，设置代理认证头
+            if 'username' in self.proxy_config and 'password' in self.proxy_config:
+                auth = aiohttp.BasicAuth(self.proxy_config['username'], self.proxy_config['password'])
+                client.api_client.configuration.proxy_headers = {'Proxy-Authorization': auth.encode()}
+        return client
+
     async def get_account_info(self, account_index=None):
         """
         获取账户信息
@@ -190,6 +342,7 @@ class LighterAPI:
             account_index = self.account_index
         
         async def _get_account_info():
+            import lighter
             self._initialize_client()
             account_api = lighter.AccountApi(self.client.api_client)
             account_info = await account_api.account(by="index", value=str(account_index))
@@ -203,17 +356,24 @@ class LighterAPI:
         return await self._call_with_retry(
             _get_account_info, 
             "获取账户信息",
-            is_critical=False  # 查询操作，失败时返回错误信息
+            is_critical=False,  # 查询操作，失败时返回错误信息
+            lane=Lane.MONITOR
         )
 
-    async def get_open_positions(self, market_index=0):
+    async def get_open_positions(self, market_index=None):
         """
         获取持仓信息
         
+        持仓列表中的每一项是 SDK 持仓对象的只读视图（Position），字段在访问时解析，
+        支持 position['symbol'] / position.get('unrealized_pnl') 等原有访问方式。
+        
+        Args:
+            market_index: 市场ID，只返回该市场的持仓；为 None 时返回所有市场的持仓
+            
         Returns:
-            dict: {
+            PositionsResult: {
                 'success': bool,           # 查询是否成功
-                'positions': list,         # 持仓列表
+                'positions': list,         # 持仓列表（Position）
                 'error': str or None,      # 错误信息（如果查询失败）
                 'timestamp': float         # 查询时间戳
             }
@@ -226,175 +386,353 @@ class LighterAPI:
             
             # 如果获取账户信息失败
             if not account_result.get('success', False):
-                return {
-                    'success': False,
-                    'positions': [],
-                    'error': f"获取账户信息失败: {account_result.get('error', '未知错误')}",
-                    'timestamp': asyncio.get_event_loop().time()
-                }
+                return PositionsResult(
+                    False,
+                    [],
+                    f"获取账户信息失败: {account_result.get('error', '未知错误')}",
+                    asyncio.get_event_loop().time()
+                )
             
             account_info = account_result['account_info']
             
-            # 提取持仓信息
-            positions = []
-            for account in account_info.accounts:
-                for position in account.positions:
-                    # 根据position的正负判断方向
-                    position_amount = position.position
-                    # 确保position_amount是数字类型
-                    try:
-                        position_amount_num = float(position_amount)
-                    except (ValueError, TypeError):
-                        position_amount_num = 0.0
-                    
-                    side = 'long' if position_amount_num > 0 else 'short'
-                    
-                    positions.append({
-                        'market_id': position.market_id,
-                        'symbol': position.symbol,
-                        'side': side,
-                        'position': abs(position_amount_num),  # 持仓量取绝对值
-                        'position_raw': position_amount_num,    # 原始持仓量（带符号）
-                        'avg_entry_price': position.avg_entry_price,
-                        'unrealized_pnl': position.unrealized_pnl,
-                        'realized_pnl': position.realized_pnl
-                    })
+            # 提取持仓信息（包装原始对象，不逐项复制字段）
+            market_scales = self.market_scales
+            positions = [
+                Position(position, market_scales.get(position.market_id))
+                for account in account_info.accounts
+                for position in account.positions
+                if market_index is None or position.market_id == market_index
+            ]
             
-            return {
-                'success': True,
-                'positions': positions,
-                'error': None,
-                'timestamp': asyncio.get_event_loop().time()
-            }
+            return PositionsResult(True, positions, None, asyncio.get_event_loop().time())
         
         return await self._call_with_retry(
             _get_open_positions,
             "获取持仓信息",
-            is_critical=False  # 查询操作，失败时返回错误信息
+            is_critical=False,  # 查询操作，失败时返回错误信息
+            lane=Lane.MONITOR
         )
 
-    async def place_order(self, market_index, side, quantity, price=None, leverage=1, order_type='market'):
+    async def place_order(self, market_index, side, quantity=None, price=None, leverage=1, order_type='market',
+                          base_amount=None, price_int=None, reduce_only=False, client_order_index=None):
         """
         下单交易
         
+        数量和价格在提交前按市场精度转换为整数（见 src/fixed_point.py），
+        不满足最小基础数量或价格无效的订单在本地直接返回错误，不会提交。
+        
         Args:
             market_index: 市场索引
             side: 订单方向 ('buy' 或 'sell')
-            quantity: 数量
-            price: 价格（限价单需要，市价单为None）
+            quantity: 数量（提供 base_amount 时可省略）
+            price: 价格（限价单需要；市价单可选，作为最差成交价保护）
             leverage: 杠杆
             order_type: 订单类型 ('market' 或 'limit')
+            base_amount: 已缩放的整数数量（优先于 quantity）
+            price_int: 已缩放的整数价格（优先于 price）
+            reduce_only: 只减仓（用于对冲再平衡，不会增加或反向持仓）
+            client_order_index: 客户端订单索引（默认自动分配唯一索引，用于跟踪订单状态）
             
         Returns:
-            dict: {
+            OrderResult: {
                 'success': bool,           # 交易是否成功
                 'tx': object,              # 交易对象
                 'tx_hash': str,            # 交易哈希
                 'error': str or None,      # 错误信息（如果交易失败）
-                'timestamp': float         # 交易时间戳
+                'timestamp': float,        # 交易时间戳
+                'client_order_index': int  # 客户端订单索引（见 src/order_tracker.py）
             }
         """
+        order = self._prepare_order(market_index, side, quantity, price, order_type, base_amount, price_int,
+                                    reduce_only, client_order_index)
+        if isinstance(order, OrderResult):
+            return order
+        
+        return await self._call_with_retry(
+            self._order_call(order),
+            "下单交易",
+            is_critical=True,  # 交易操作，失败时返回错误信息
+            lane=Lane.OPEN
+        )
+
+    def _order_call(self, order):
+        """返回提交一笔已校验订单的请求函数（供 _call_with_retry 重试）"""
         async def _place_order():
             self._initialize_client()
+            tx, tx_hash, err = await self._signed(lambda client, signing: self._submit_order(client, order, signing))
             
-            # 确定订单方向
-            is_ask = (side.lower() == 'sell')
-            
-            # 根据订单类型决定下单方式
-            if order_type.lower() == 'market':
-                # 市价单
-                # 对于市价单，avg_execution_price 应该设置为一个合理的值
-                # 使用 1 作为默认值，避免 "OrderPrice should not be less than 1" 错误
-                
-                # 使用基础数量乘数计算base_amount
-                if self.base_amount_multiplier is None:
-                    # 如果没有设置乘数，使用默认值
-                    base_amount_multiplier = 1000000
-                else:
-                    base_amount_multiplier = self.base_amount_multiplier
-                
-                tx, tx_hash, err = await self.client.create_market_order(
-                    market_index=market_index,
-                    client_order_index=0,  # 简化实现，实际应使用唯一索引
-                    base_amount=int(quantity * base_amount_multiplier),  # 转换为整数单位
-                    avg_execution_price=1,  # 市价单使用最小价格值
-                    is_ask=is_ask
-                )
-            elif order_type.lower() == 'limit':
-                # 限价单
-                if price is None:
-                    return {
-                        'success': False,
-                        'tx': None,
-                        'tx_hash': None,
-                        'error': "限价单必须指定价格",
-                        'timestamp': asyncio.get_event_loop().time()
-                    }
-                
-                # 价格转换：根据市场精度转换价格
-                # 由于 supported_price_decimals=2，我们使用 100 作为转换因子
-                price_int = int(price * 100)
-                
-                # 验证价格是否有效
-                if price_int < 1:
-                    return {
-                        'success': False,
-                        'tx': None,
-                        'tx_hash': None,
-                        'error': f"下单失败: 价格 {price} 转换后为 {price_int}，必须大于等于 1",
-                        'timestamp': asyncio.get_event_loop().time()
-                    }
-                
-                # 使用基础数量乘数计算base_amount
-                if self.base_amount_multiplier is None:
-                    # 如果没有设置乘数，使用默认值
-                    base_amount_multiplier = 1000000
-                else:
-                    base_amount_multiplier = self.base_amount_multiplier
+            if err:
+                return self._order_error(order['client_order_index'], f"下单失败: {err}")
                 
-                tx, tx_hash, err = await self.client.create_order(
-                    market_index=market_index,
-                    client_order_index=0,  # 简化实现，实际应使用唯一索引
-                    base_amount=int(quantity * base_amount_multiplier),  # 转换为整数单位
-                    price=price_int,  # 使用转换后的整数价格
-                    is_ask=is_ask,
-                    order_type=lighter.SignerClient.ORDER_TYPE_LIMIT,
-                    time_in_force=lighter.SignerClient.ORDER_TIME_IN_FORCE_GOOD_TILL_TIME,
-                    reduce_only=False,
-                    trigger_price=0
-                )
+            return OrderResult(True, tx, tx_hash, None, asyncio.get_event_loop().time(), order['client_order_index'])
+        
+        return _place_order
+
+    @staticmethod
+    def _order_error(client_order_index, error):
+        return OrderResult(False, error=error, timestamp=asyncio.get_event_loop().time(),
+                           client_order_index=client_order_index)
+
+    def _prepare_order(self, market_index, side, quantity=None, price=None, order_type='market',
+                       base_amount=None, price_int=None, reduce_only=False, client_order_index=None):
+        """
+        把下单参数转换为整数数量和价格，并在本地校验
+        
+        Returns:
+            dict or OrderResult: 签名所需的参数；参数无效时返回失败的 OrderResult
+        """
+        if client_order_index is None:
+            client_order_index = next_client_order_index()
+        
+        order_type = order_type.lower()
+        if order_type not in ('market', 'limit'):
+            return self._order_error(client_order_index, f"不支持的订单类型: {order_type}")
+        
+        scale = self.get_market_scale(market_index)
+        
+        # 数量转换为整数 base_amount，并在本地校验
+        if base_amount is None:
+            if quantity is None:
+                return self._order_error(client_order_index, "下单失败: 必须指定数量")
+            base_amount = scale.to_base_amount(quantity)
+        base_amount_error = scale.validate_base_amount(base_amount)
+        if base_amount_error:
+            return self._order_error(client_order_index, f"下单失败: {base_amount_error}")
+        
+        # 价格转换为整数价格
+        if price_int is None and price is not None:
+            if order_type == 'market':
+                # 市价单的最差成交价向中间价方向舍入，不放宽保护
+                price_int = scale.worst_price(side.lower(), price)
             else:
-                return {
-                    'success': False,
-                    'tx': None,
-                    'tx_hash': None,
-                    'error': f"不支持的订单类型: {order_type}",
-                    'timestamp': asyncio.get_event_loop().time()
-                }
+                price_int = scale.to_price(price)
+        
+        if order_type == 'limit':
+            if price_int is None:
+                return self._order_error(client_order_index, "限价单必须指定价格")
+            # 验证价格是否有效
+            if price_int < 1:
+                return self._order_error(
+                    client_order_index, f"下单失败: 价格 {price} 转换后为 {price_int}，必须大于等于 1"
+                )
+        
+        return {
+            'market_index': market_index,
+            'client_order_index': client_order_index,
+            'base_amount': base_amount,
+            'price_int': price_int,
+            'is_ask': side.lower() == 'sell',
+            'order_type': order_type,
+            'reduce_only': reduce_only,
+        }
+
+    @staticmethod
+    def _submit_order(client, order, signing):
+        """签名并提交一笔已校验的订单，返回 SDK 的 (tx, tx_hash, err)"""
+        import lighter
+        
+        if order['order_type'] == 'market':
+            # 对于市价单，avg_execution_price 为最差成交价（买单上限/卖单下限）
+            # 未指定价格时使用 1 作为默认值，避免 "OrderPrice should not be less than 1" 错误
+            return client.create_market_order(
+                market_index=order['market_index'],
+                client_order_index=order['client_order_index'],
+                base_amount=order['base_amount'],
+                avg_execution_price=max(order['price_int'] or 1, 1),
+                is_ask=order['is_ask'],
+                reduce_only=order['reduce_only'],
+                **signing
+            )
+        return client.create_order(
+            market_index=order['market_index'],
+            client_order_index=order['client_order_index'],
+            base_amount=order['base_amount'],
+            price=order['price_int'],
+            is_ask=order['is_ask'],
+            order_type=lighter.SignerClient.ORDER_TYPE_LIMIT,
+            time_in_force=lighter.SignerClient.ORDER_TIME_IN_FORCE_GOOD_TILL_TIME,
+            reduce_only=order['reduce_only'],
+            trigger_price=0,
+            **signing
+        )
+
+    async def place_orders(self, orders, batch_size=50):
+        """
+        批量下单（可跨多个市场）
+        
+        所有订单先在本地校验和转换，无效的订单直接返回错误。SDK 提供批量交易接口
+        （SignerClient.sign_create_order 和 TransactionApi.send_tx_batch）时，同一个 API 密钥上
+        连续分配的 nonce 在本地签名，每 batch_size 笔一次提交；否则所有订单并发提交，
+        由 nonce 分配器在本地流水线分配 nonce，不等待前一笔返回。
+        
+        Args:
+            orders (list): 每项为 place_order() 的关键字参数字典
+            batch_size (int): 每次批量提交的订单数上限（不超过 nonce 分配器的在途上限）
             
-            if err:
-                return {
-                    'success': False,
-                    'tx': None,
-                    'tx_hash': None,
-                    'error': f"下单失败: {err}",
-                    'timestamp': asyncio.get_event_loop().time()
-                }
-                
-            return {
-                'success': True,
-                'tx': tx,
-                'tx_hash': tx_hash,
-                'error': None,
-                'timestamp': asyncio.get_event_loop().time()
-            }
+        Returns:
+            list: 每笔订单的 OrderResult，顺序与 orders 相同（单笔失败不影响其他订单）
+        """
+        results = [None] * len(orders)
+        prepared = []
+        for position, params in enumerate(orders):
+            params = dict(params)
+            params.pop('leverage', None)
+            order = self._prepare_order(**params)
+            if isinstance(order, OrderResult):
+                results[position] = order
+            else:
+                prepared.append((position, order))
+        if not prepared:
+            return results
         
-        return await self._call_with_retry(
-            _place_order,
-            "下单交易",
-            is_critical=True  # 交易操作，失败时返回错误信息
+        if self._supports_tx_batch():
+            for key in self.signing_keys.keys:
+                if key.nonces is not None:
+                    batch_size = min(batch_size, key.nonces.max_in_flight)
+            chunks = [prepared[i:i + batch_size] for i in range(0, len(prepared), batch_size)]
+            logger.info("批量下单: %s 笔订单分 %s 批提交 (账户索引: %s)", len(prepared), len(chunks), self.account_index)
+            submitted = await asyncio.gather(*(self._place_batch([order for _, order in chunk]) for chunk in chunks))
+            submitted = [result for chunk_results in submitted for result in chunk_results]
+        else:
+            submitted = await asyncio.gather(*(self._place_prepared(order) for _, order in prepared))
+        for (position, _), result in zip(prepared, submitted):
+            results[position] = result
+        return results
+
+    def _supports_tx_batch(self):
+        """SDK 是否提供本地签名和批量交易接口"""
+        import lighter
+        self._initialize_client()
+        return hasattr(self.client, 'sign_create_order') and hasattr(lighter.TransactionApi, 'send_tx_batch')
+
+    async def _place_prepared(self, order):
+        """逐笔提交一笔已校验的订单（失败时返回错误结果，不抛出异常）"""
+        try:
+            return await self._call_with_retry(self._order_call(order), "下单交易", is_critical=True, lane=Lane.OPEN)
+        except APIError as e:
+            return self._order_error(order['client_order_index'], str(e))
+
+    async def _place_batch(self, chunk):
+        """在本地签名一批订单，通过批量交易接口一次提交"""
+        async def _send_batch():
+            import lighter
+            key = self.signing_keys.select()
+            client = self._signer_client(key)
+            key.in_flight += len(chunk)
+            key.submitted += len(chunk)
+            try:
+                async with contextlib.AsyncExitStack() as stack:
+                    leases = []
+                    if key.nonces is not None:
+                        # 一批订单一次分配连续的 nonce（名额不足时整批等待，不会与其他批次互相占住名额）
+                        leases = await stack.enter_async_context(key.nonces.lease_many(
+                            lambda: self._fetch_next_nonce(key.api_key_index), len(chunk)
+                        ))
+                    tx_infos = []
+                    for index, order in enumerate(chunk):
+                        signing = {'nonce': leases[index].nonce} if leases else {}
+                        tx_info, err = self._sign_order(client, order, signing)
+                        if err:
+                            raise APIError(f"订单签名失败: {err}")
+                        tx_infos.append(tx_info)
+                    try:
+                        response = await lighter.TransactionApi(client.api_client).send_tx_batch(
+                            tx_types=json.dumps([lighter.SignerClient.TX_TYPE_CREATE_ORDER] * len(chunk)),
+                            tx_infos=json.dumps(tx_infos)
+                        )
+                    except Exception as e:
+                        if is_rate_limit_error(e):
+                            self.signing_keys.mark_rate_limited(key)
+                        raise
+                    return self._batch_results(chunk, response, leases)
+            finally:
+                key.in_flight -= len(chunk)
+        
+        result = await self._call_with_retry(_send_batch, "批量下单", is_critical=False, lane=Lane.OPEN)
+        if isinstance(result, dict):
+            return [self._order_error(order['client_order_index'], f"批量下单失败: {result['error']}")
+                    for order in chunk]
+        return result
+
+    def _batch_results(self, chunk, response, leases):
+        """
+        按批量交易接口的返回生成每笔订单的结果
+        
+        返回错误码时整批失败；返回的 tx_hash 少于订单数时，没有对应 tx_hash 的订单失败。
+        失败订单的 nonce 标记为失败，在途交易结束后重新同步。
+        """
+        timestamp = asyncio.get_event_loop().time()
+        code = getattr(response, 'code', None)
+        if code is not None and code != BATCH_CODE_OK:
+            error = f"批量下单失败: 错误码 {code} {getattr(response, 'message', None) or ''}".rstrip()
+            tx_hashes = []
+        else:
+            error = "批量下单返回中没有该订单的交易哈希"
+            tx_hashes = list(getattr(response, 'tx_hash', None) or [])
+        results = []
+        for index, order in enumerate(chunk):
+            tx_hash = tx_hashes[index] if index < len(tx_hashes) else None
+            if tx_hash:
+                results.append(OrderResult(True, None, tx_hash, None, timestamp, order['client_order_index']))
+                continue
+            if leases:
+                leases[index].failed()
+            results.append(self._order_error(order['client_order_index'], error))
+        if len(tx_hashes) < len(chunk):
+            logger.error("批量下单 %s 笔中 %s 笔失败 (账户索引: %s): %s",
+                         len(chunk), len(chunk) - len(tx_hashes), self.account_index, error)
+        return results
+
+    @staticmethod
+    def _sign_order(client, order, signing):
+        """在本地签名一笔已校验的订单，返回 (tx_info, err)"""
+        import lighter
+        
+        if order['order_type'] == 'market':
+            return client.sign_create_order(
+                market_index=order['market_index'],
+                client_order_index=order['client_order_index'],
+                base_amount=order['base_amount'],
+                price=max(order['price_int'] or 1, 1),
+                is_ask=order['is_ask'],
+                order_type=lighter.SignerClient.ORDER_TYPE_MARKET,
+                time_in_force=lighter.SignerClient.ORDER_TIME_IN_FORCE_IMMEDIATE_OR_CANCEL,
+                reduce_only=order['reduce_only'],
+                trigger_price=0,
+                order_expiry=lighter.SignerClient.DEFAULT_IOC_EXPIRY,
+                **signing
+            )
+        return client.sign_create_order(
+            market_index=order['market_index'],
+            client_order_index=order['client_order_index'],
+            base_amount=order['base_amount'],
+            price=order['price_int'],
+            is_ask=order['is_ask'],
+            order_type=lighter.SignerClient.ORDER_TYPE_LIMIT,
+            time_in_force=lighter.SignerClient.ORDER_TIME_IN_FORCE_GOOD_TILL_TIME,
+            reduce_only=order['reduce_only'],
+            trigger_price=0,
+            **signing
         )
 
+    def get_market_scale(self, market_id):
+        """
+        获取市场的定点缩放因子
+        
+        find_market_by_symbol 之后使用该市场的精度；否则使用默认精度
+        （与原有默认乘数 1000000 / 100 一致）。
+        
+        Args:
+            market_id: 市场ID
+            
+        Returns:
+            MarketScale: 缩放因子
+        """
+        scale = self.market_scales.get(market_id)
+        if scale is None:
+            scale = self._default_scale
+        return scale
+
     async def close_position(self, market_index, order_index):
         """
         平仓（取消订单）
@@ -412,10 +750,11 @@ class LighterAPI:
             self._initialize_client()
             
             # 取消订单来平仓
-            tx, tx_hash, err = await self.client.cancel_order(
+            tx, tx_hash, err = await self._signed(lambda client, signing: client.cancel_order(
                 market_index=market_index,
-                order_index=order_index
-            )
+                order_index=order_index,
+                **signing
+            ))
             
             if err:
                 return {
@@ -437,7 +776,8 @@ class LighterAPI:
         return await self._call_with_retry(
             _close_position,
             "平仓操作",
-            is_critical=True  # 交易操作，失败时返回错误信息
+            is_critical=True,  # 交易操作，失败时返回错误信息
+            lane=Lane.EMERGENCY_CLOSE
         )
 
     async def get_order_book(self, market_id=0):
@@ -453,6 +793,7 @@ class LighterAPI:
             }
         """
         async def _get_order_book():
+            import lighter
             self._initialize_client()
             order_api = lighter.OrderApi(self.client.api_client)
             order_book = await order_api.order_books(market_id=market_id)
@@ -466,7 +807,8 @@ class LighterAPI:
         return await self._call_with_retry(
             _get_order_book,
             "获取订单簿",
-            is_critical=False  # 查询操作，失败时返回错误信息
+            is_critical=False,  # 查询操作，失败时返回错误信息
+            lane=Lane.MONITOR
         )
 
     async def get_all_order_books(self):
@@ -482,6 +824,7 @@ class LighterAPI:
             }
         """
         async def _get_all_order_books():
+            import lighter
             self._initialize_client()
             order_api = lighter.OrderApi(self.client.api_client)
             order_books = await order_api.order_books()  # 不指定market_id获取所有
@@ -495,8 +838,67 @@ class LighterAPI:
         return await self._call_with_retry(
             _get_all_order_books,
             "获取所有订单簿",
-            is_critical=False  # 查询操作，失败时返回错误信息
+            is_critical=False,  # 查询操作，失败时返回错误信息
+            lane=Lane.MONITOR
+        )
+
+    def get_local_order_book(self, market_id):
+        """
+        获取本地订单簿（不存在时创建）
+        
+        Args:
+            market_id: 市场ID
+            
+        Returns:
+            OrderBook: 本地订单簿
+        """
+        book = self.order_books.get(market_id)
+        if book is None:
+            book = OrderBook(market_id)
+            self.order_books[market_id] = book
+        return book
+
+    def update_order_book(self, market_id, order_book, snapshot=False):
+        """
+        应用推送的订单簿数据（如 WebSocket 订单簿频道）
+        
+        Args:
+            market_id: 市场ID
+            order_book (dict): 包含 'bids'、'asks'，可选 'offset'
+            snapshot (bool): 是否为完整快照
+        """
+        book = self.get_local_order_book(market_id)
+        bids = order_book.get('bids', [])
+        asks = order_book.get('asks', [])
+        offset = order_book.get('offset')
+        if snapshot or book.last_update is None:
+            book.apply_snapshot(bids, asks, offset=offset)
+        else:
+            book.apply_delta(bids, asks, offset=offset)
+
+    def _fresh_order_book(self, market_id):
+        """返回在有效期内且买卖盘齐全的本地订单簿，否则返回 None"""
+        book = self.order_books.get(market_id)
+        if book is None or not book.is_two_sided():
+            return None
+        age = book.age()
+        if age is None or age > self.order_book_max_age:
+            return None
+        return book
+
+    def _checked_price(self, market_id, book):
+        """检查本地订单簿的最优报价，返回中间价（同一次订单簿更新只检查一次）"""
+        best_bid, best_ask = book.best_bid(), book.best_ask()
+        error = self.quote_guard.check(
+            market_id,
+            best_bid[0] if best_bid else None,
+            best_ask[0] if best_ask else None,
+            book.age(),
+            update=(id(book), book.last_update, book.offset)
         )
+        if error:
+            return PriceResult(False, 0, f"报价不可用: {error}", asyncio.get_event_loop().time())
+        return PriceResult(True, book.mid_price(), None, asyncio.get_event_loop().time())
 
     async def get_market_price(self, market_id):
         """
@@ -506,14 +908,23 @@ class LighterAPI:
             market_id: 市场ID
             
         Returns:
-            dict: {
+            PriceResult: {
                 'success': bool,           # 查询是否成功
                 'price': float,            # 当前价格
                 'error': str or None,      # 错误信息（如果查询失败）
                 'timestamp': float         # 查询时间戳
             }
+        
+        报价在使用前经过质量检查（单边、交叉、过期、价差过大、偏离最近报价的中位数），
+        不合格的报价返回失败，不会用于计算下单数量。
         """
+        # 本地订单簿仍然有效时直接使用，不发起请求
+        book = self._fresh_order_book(market_id)
+        if book is not None:
+            return self._checked_price(market_id, book)
+        
         async def _get_market_price():
+            import lighter
             self._initialize_client()
             order_api = lighter.OrderApi(self.client.api_client)
             
@@ -530,37 +941,21 @@ class LighterAPI:
                 
                 # 尝试从订单簿中提取价格信息
                 if hasattr(market_order_book, 'bids') and market_order_book.bids:
-                    # 如果有买盘数据，尝试获取最佳买价
-                    best_bid = float(market_order_book.bids[0].price)
-                    best_ask = float(market_order_book.asks[0].price)
-                    current_price = (best_bid + best_ask) / 2
-                    
-                    return {
-                        'success': True,
-                        'price': current_price,
-                        'error': None,
-                        'timestamp': asyncio.get_event_loop().time()
-                    }
+                    # 用快照刷新本地订单簿，后续数量计算直接使用本地深度
+                    book = self.get_local_order_book(market_id)
+                    book.apply_snapshot(market_order_book.bids, getattr(market_order_book, 'asks', None))
+                    return self._checked_price(market_id, book)
                 else:
                     # 如果订单簿中没有价格信息，返回错误
-                    return {
-                        'success': False,
-                        'price': 0,
-                        'error': "订单簿中没有价格信息",
-                        'timestamp': asyncio.get_event_loop().time()
-                    }
+                    return PriceResult(False, 0, "订单簿中没有价格信息", asyncio.get_event_loop().time())
             
-            return {
-                'success': False,
-                'price': 0,
-                'error': "无法获取市场价格",
-                'timestamp': asyncio.get_event_loop().time()
-            }
+            return PriceResult(False, 0, "无法获取市场价格", asyncio.get_event_loop().time())
         
         return await self._call_with_retry(
             _get_market_price,
             f"获取市场 {market_id} 价格",
-            is_critical=False
+            is_critical=False,
+            lane=Lane.MONITOR
         )
 
     async def find_market_by_symbol(self, symbol):
@@ -603,6 +998,8 @@ class LighterAPI:
                 target_symbol = symbol.upper()
                 for order_book in order_books_list:
                     if hasattr(order_book, 'symbol') and order_book.symbol.upper() == target_symbol:
+                        self.market_infos[order_book.market_id] = order_book
+                        
                         # 设置基础数量乘数
                         if hasattr(order_book, 'supported_size_decimals'):
                             self.base_amount_multiplier = pow(10, order_book.supported_size_decimals)
@@ -610,6 +1007,9 @@ class LighterAPI:
                             # 如果没有supported_size_decimals属性，使用默认值
                             self.base_amount_multiplier = 1000000
                         
+                        # 按市场精度计算一次定点缩放因子
+                        self.market_scales[order_book.market_id] = MarketScale.from_market_info(order_book)
+                        
                         return {
                             'success': True,
                             'market_info': order_book,
@@ -639,7 +1039,8 @@ class LighterAPI:
         return await self._call_with_retry(
             _find_market_by_symbol,
             f"查找交易对 {symbol}",
-            is_critical=False  # 查询操作，失败时返回错误信息
+            is_critical=False,  # 查询操作，失败时返回错误信息
+            lane=Lane.RECONCILE
         )
 
     async def get_market_min_base_amount(self, market_id):
@@ -657,6 +1058,16 @@ class LighterAPI:
                 'timestamp': float         # 查询时间戳
             }
         """
+        # 已缓存的市场信息直接使用，不发起请求
+        market_info = self.market_infos.get(market_id)
+        if market_info is not None and hasattr(market_info, 'min_base_amount'):
+            return {
+                'success': True,
+                'min_base_amount': float(market_info.min_base_amount),
+                'error': None,
+                'timestamp': asyncio.get_event_loop().time()
+            }
+        
         try:
             # 获取所有订单簿信息
             order_books_result = await self.get_all_order_books()
@@ -710,7 +1121,9 @@ class LighterAPI:
             dict: {
                 'success': bool,           # 转换是否成功
                 'quantity': float,         # 转换后的数量
-                'price': float,            # 使用的价格
+                'base_amount': int,        # 按市场精度缩放后的整数数量
+                'price': float,            # 使用的价格（有订单簿深度时为按深度吃单的有效价格）
+                'mid_price': float,        # 中间价
                 'error': str or None,      # 错误信息（如果转换失败）
                 'timestamp': float         # 转换时间戳
             }
@@ -728,11 +1141,23 @@ class LighterAPI:
                     'timestamp': asyncio.get_event_loop().time()
                 }
             
-            current_price = price_result['price']
+            mid_price = price_result['price']
+            current_price = mid_price
             
             # 计算数量：数量 = USD金额 / 价格
             quantity = usd_amount / current_price
             
+            # 本地订单簿有深度时，按买卖两侧实际吃单可成交数量取较小值，保证两条腿数量一致
+            book = self._fresh_order_book(market_id)
+            if book is not None:
+                buy_quantity, _, buy_complete = book.quantity_for_notional('buy', usd_amount)
+                sell_quantity, _, sell_complete = book.quantity_for_notional('sell', usd_amount)
+                if buy_complete and sell_complete:
+                    quantity = min(buy_quantity, sell_quantity)
+                    current_price = usd_amount / quantity
+                else:
+                    logger.warning("市场 %s 订单簿深度不足以成交 %s USD，使用中间价计算数量", market_id, usd_amount)
+            
             # 检查数量是否满足最小基础数量要求
             min_base_result = await self.get_market_min_base_amount(market_id)
             if min_base_result.get('success', False):
@@ -743,16 +1168,22 @@ class LighterAPI:
                     adjusted_quantity = min_base_amount
                     adjusted_usd_amount = adjusted_quantity * current_price
                     
-                    logger.warning(f"计算数量 {quantity:.6f} 小于最小基础数量 {min_base_amount:.6f}")
-                    logger.warning(f"将数量调整为最小基础数量: {adjusted_quantity:.6f}")
-                    logger.warning(f"对应的USD金额: {adjusted_usd_amount:.2f} USD")
+                    logger.warning("计算数量 %.6f 小于最小基础数量 %.6f", quantity, min_base_amount)
+                    logger.warning("将数量调整为最小基础数量: %.6f", adjusted_quantity)
+                    logger.warning("对应的USD金额: %.2f USD", adjusted_usd_amount)
                     
                     quantity = adjusted_quantity
             
+            # 按市场精度转换为整数数量，并保证不低于最小基础数量
+            scale = self.get_market_scale(market_id)
+            base_amount = max(scale.to_base_amount(quantity), scale.min_base_amount)
+            
             return {
                 'success': True,
                 'quantity': quantity,
+                'base_amount': base_amount,
                 'price': current_price,
+                'mid_price': mid_price,
                 'error': None,
                 'timestamp': asyncio.get_event_loop().time()
             }
@@ -779,6 +1210,7 @@ class LighterAPI:
             }
         """
         async def _get_active_orders():
+            import lighter
             self._initialize_client()
             
             # 如果没有指定账户索引，使用实例中的账户索引
@@ -800,7 +1232,49 @@ class LighterAPI:
         return await self._call_with_retry(
             _get_active_orders,
             "获取活跃订单",
-            is_critical=False  # 查询操作，失败时返回错误信息
+            is_critical=False,  # 查询操作，失败时返回错误信息
+            lane=Lane.RECONCILE
+        )
+
+    async def get_inactive_orders(self, market_id=0, limit=100):
+        """
+        获取最近结束的订单（已成交、已撤销）
+        
+        Args:
+            market_id: 市场ID
+            limit: 返回的订单数量上限
+        
+        Returns:
+            dict: {
+                'success': bool,           # 查询是否成功
+                'orders': list,            # 订单列表
+                'error': str or None,      # 错误信息（如果查询失败）
+                'timestamp': float         # 查询时间戳
+            }
+        """
+        async def _get_inactive_orders():
+            import lighter
+            self._initialize_client()
+            
+            order_api = lighter.OrderApi(self.client.api_client)
+            inactive_orders = await order_api.account_inactive_orders(
+                account_index=self.account_index,
+                limit=limit,
+                market_id=market_id
+            )
+            
+            return {
+                'success': True,
+                'orders': inactive_orders,
+                'error': None,
+                'timestamp': asyncio.get_event_loop().time()
+            }
+        
+        return await self._call_with_retry(
+            _get_inactive_orders,
+            "获取历史订单",
+            is_critical=False,  # 查询操作，失败时返回错误信息
+            lane=Lane.RECONCILE
         )
 
     async def close_all_positions(self):
@@ -817,13 +1291,15 @@ class LighterAPI:
             }
         """
         async def _close_all_positions():
+            import lighter
             self._initialize_client()
             
             # 取消所有订单
-            tx, tx_hash, err = await self.client.cancel_all_orders(
+            tx, tx_hash, err = await self._signed(lambda client, signing: client.cancel_all_orders(
                 time_in_force=lighter.SignerClient.CANCEL_ALL_TIF_IMMEDIATE,
-                time=0
-            )
+                time=0,
+                **signing
+            ))
             
             if err:
                 return {
@@ -845,19 +1321,40 @@ class LighterAPI:
         return await self._call_with_retry(
             _close_all_positions,
             "平仓所有头寸",
-            is_critical=True  # 交易操作，失败时返回错误信息
+            is_critical=True,  # 交易操作，失败时返回错误信息
+            lane=Lane.EMERGENCY_CLOSE
         )
 
+    async def set_proxy(self, proxy_config):
+        """
+        更换代理：关闭当前客户端，下一次调用时使用新代理重新初始化
+        
+        Args:
+            proxy_config (dict or None): 新代理配置
+        """
+        await self.close()
+        self.proxy_config = proxy_config
+        logger.info("账户索引 %s 代理已更换: %s", self.account_index, proxy_config['name'] if proxy_config else '不使用代理')
+
     async def close(self):
         """
         关闭客户端连接，清理资源
         """
+        # 其他API密钥的签名客户端
+        for key in self.signing_keys.keys[1:]:
+            if key.client is not None:
+                try:
+                    await key.client.close()
+                except Exception as e:
+                    logger.warning("关闭API密钥 %s 的客户端连接时出错: %s", key.api_key_index, e)
+                finally:
+                    key.client = None
         if self.client is not None:
             try:
                 await self.client.close()
                 logger.info("Lighter客户端连接已关闭")
             except Exception as e:
-                logger.warning(f"关闭Lighter客户端连接时出错: {e}")
+                logger.warning("关闭Lighter客户端连接时出错: %s", e)
             finally:
                 self.client = None
 
@@ -0,0 +1,227 @@
+"""
+非阻塞的结构化日志
+
+各模块只通过 logging.getLogger(__name__) 记录日志，由入口程序调用 configure_logging() 统一配置：
+
+- 日志记录放入有界队列后立即返回，由后台监听线程格式化并写入 stdout/文件，
+  监控循环不会因为磁盘或终端 I/O 阻塞；队列满时丢弃并计数
+- 消息使用 %-格式延迟格式化，被级别或采样过滤掉的日志不会格式化参数
+- 可选：指定的高频 logger 的 DEBUG 日志按时间窗口采样，被丢弃的条数附加在窗口内下一条输出的日志上；
+  下单、成交、状态转换、止损和通知等审计日志（AUDIT_LOGGERS 的 INFO 及以上）从不采样
+- bind_log_context() 绑定的上下文字段（如交易对名称）通过 contextvars 附加到每条日志
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextlib import contextmanager
+
+_log_context = contextvars.ContextVar('log_context', default={})
+
+_listener = None
+_queue_handler = None
+
+# 记录下单、成交、交易对状态、止损和通知的 logger：INFO 及以上的日志是交易审计记录，从不采样
+AUDIT_LOGGERS = (
+    'src.hedge_trader', 'src.multi_market', 'src.execution', 'src.order_netting', 'src.order_tracker',
+    'src.pair_state', 'src.rebalancer', 'src.notification', 'src.trading_bot',
+)
+
+
+def _logger_matches(name, prefixes):
+    """logger 名称是否为 prefixes 中的某个 logger 或其子 logger"""
+    return any(name == prefix or name.startswith(prefix + '.') for prefix in prefixes)
+
+
+@contextmanager
+def bind_log_context(**fields):
+    """
+    在当前上下文（及其创建的任务）中为日志附加字段
+
+    Args:
+        **fields: 上下文字段，如 pair='pair_1'
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def current_log_context():
+    """当前绑定的日志上下文字段"""
+    return _log_context.get()
+
+
+class ContextFilter(logging.Filter):
+    """在记录日志的线程中捕获上下文字段（监听线程中无法读取调用方的 contextvars）"""
+
+    def filter(self, record):
+        record.context = _log_context.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    高频日志采样
+
+    只对 loggers 中的 logger（及其子 logger）生效，按 (logger, 消息模板) 计数，
+    每个时间窗口内只输出前 burst 条，其余丢弃；窗口内下一条输出的日志会带上 sampled_dropped 字段，
+    记录此前丢弃的条数。高于 max_level 的日志（默认 INFO 及以上）总是输出，
+    AUDIT_LOGGERS 中的 INFO 及以上日志即使被列出也总是输出。
+    """
+
+    def __init__(self, loggers, interval=60, burst=20, max_level=logging.DEBUG):
+        super().__init__()
+        self.loggers = tuple(loggers)
+        self.interval = interval
+        self.burst = burst
+        self.max_level = max_level
+        self._windows = {}  # key -> [窗口开始时间, 已输出条数, 已丢弃条数]
+
+    def filter(self, record):
+        if record.levelno > self.max_level or not _logger_matches(record.name, self.loggers):
+            return True
+        if record.levelno >= logging.INFO and _logger_matches(record.name, AUDIT_LOGGERS):
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            dropped = window[2] if window is not None else 0
+            self._windows[key] = [now, 1, 0]
+            if dropped:
+                record.sampled_dropped = dropped
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """不格式化、不阻塞的队列处理器：格式化留给监听线程，队列满时丢弃并计数"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 同一进程内的队列无需序列化，保留 msg/args 由监听线程格式化
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'context', {}))
+        dropped = getattr(record, 'sampled_dropped', None)
+        if dropped:
+            entry['sampled_dropped'] = dropped
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，上下文字段以 key=value 形式附加在消息前"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        context = getattr(record, 'context', {})
+        dropped = getattr(record, 'sampled_dropped', None)
+        extras = [f"{key}={value}" for key, value in context.items()]
+        if dropped:
+            extras.append(f"sampled_dropped={dropped}")
+        if extras:
+            head, _, message = text.partition(': ')
+            text = f"{head} [{' '.join(extras)}]: {message}"
+        return text
+
+
+def configure_logging(config=None):
+    """
+    配置根日志（入口程序调用，可重复调用以应用新配置）
+
+    Args:
+        config (dict): logging 配置段
+            - level: 日志级别，默认 INFO
+            - format: 'json'（默认）或 'text'
+            - file: 日志文件路径，默认输出到 stderr
+            - queue_size: 队列容量，默认 10000
+            - sampling: 高频日志采样，默认关闭。{'loggers': [logger 名称], 'interval': 秒（默认60）,
+              'burst': 每个窗口每个位置的条数（默认20）, 'level': 采样的最高级别（默认 DEBUG）}
+
+    Returns:
+        NonBlockingQueueHandler: 根日志使用的队列处理器
+    """
+    global _listener, _queue_handler
+    config = config or {}
+    shutdown_logging()
+
+    if config.get('file'):
+        output = logging.FileHandler(config['file'], encoding='utf-8')
+    else:
+        output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(TextFormatter() if config.get('format') == 'text' else JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=config.get('queue_size', 10000))
+    handler = NonBlockingQueueHandler(log_queue)
+    sampling = config.get('sampling') or {}
+    if sampling.get('loggers'):
+        handler.addFilter(SamplingFilter(
+            sampling['loggers'],
+            interval=sampling.get('interval', 60),
+            burst=sampling.get('burst', 20),
+            max_level=logging.getLevelName(sampling.get('level', 'DEBUG'))
+        ))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(config.get('level', 'INFO'))
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    _queue_handler = handler
+    return handler
+
+
+def shutdown_logging():
+    """停止监听线程并写出队列中剩余的日志"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,218 @@
+"""
+事件循环健康监控
+
+- 心跳协程按固定间隔休眠，测量实际唤醒比预期晚了多少（调度延迟）
+- 看门狗线程在心跳超时时通过 sys._current_frames() 抓取事件循环线程的调用栈，
+  把阻塞事件循环的回调归因到当前任务和项目中的具体函数
+- 延迟超过告警阈值时（威胁止损检查的时效）调用告警回调，附带最近一次阻塞的归因
+
+统计结果通过指标接口对外提供。
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+PROJECT_SRC = os.path.dirname(os.path.abspath(__file__))
+
+# 不作为归因对象的标准库模块（事件循环自身的调度代码）
+_LOOP_INTERNAL_MODULES = ('asyncio', 'selectors', 'threading', 'concurrent')
+
+
+def attribute_frame(frame):
+    """
+    将调用栈归因到具体代码位置
+
+    优先选择最内层的项目代码（src/ 下、本模块除外），其次选择最内层的非事件循环内部代码。
+
+    Args:
+        frame: 调用栈最内层的帧
+
+    Returns:
+        tuple: (location: str, stack: list[str])  location 形如 'src.notification:send_email:48'
+    """
+    project_frame = None
+    external_frame = None
+    current = frame
+    while current is not None:
+        filename = os.path.abspath(current.f_code.co_filename)
+        module = current.f_globals.get('__name__', '?')
+        if project_frame is None and filename.startswith(PROJECT_SRC) and filename != os.path.abspath(__file__):
+            project_frame = current
+        if external_frame is None and module.split('.', 1)[0] not in _LOOP_INTERNAL_MODULES:
+            external_frame = current
+        current = current.f_back
+
+    chosen = project_frame or external_frame or frame
+    module = chosen.f_globals.get('__name__', '?')
+    location = f"{module}:{chosen.f_code.co_qualname}:{chosen.f_lineno}"
+    stack = [line.rstrip() for line in traceback.format_stack(frame, limit=8)]
+    return location, stack
+
+
+class LoopMonitor:
+    """事件循环延迟监控和慢回调检测"""
+
+    def __init__(self, config=None, on_alert=None):
+        """
+        Args:
+            config (dict): loop_monitor 配置段
+                - interval: 心跳间隔（秒），默认0.5
+                - block_threshold: 回调阻塞超过该时间（秒）视为慢回调，默认0.25
+                - alert_lag: 调度延迟超过该值（秒）时告警，默认5
+                - alert_cooldown: 两次告警的最小间隔（秒），默认300
+            on_alert: 协程函数，参数为 (标题, 内容)
+        """
+        config = config or {}
+        self.interval = config.get('interval', 0.5)
+        self.block_threshold = config.get('block_threshold', 0.25)
+        self.alert_lag = config.get('alert_lag', 5)
+        self.alert_cooldown = config.get('alert_cooldown', 300)
+        self.on_alert = on_alert
+
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.slow_callbacks = 0
+        self.slow_by_location = {}  # 归因位置 -> {'count': int, 'seconds': float}
+        self.recent_slow = collections.deque(maxlen=20)
+        self.alerts = 0
+
+        self.running = False
+        self._lock = threading.Lock()
+        self._last_beat = None
+        self._open_event = None
+        self._last_alert = None
+        self._loop_thread_id = None
+        self._watchdog = None
+        self._stop_event = threading.Event()
+
+    async def run(self):
+        """心跳协程：测量调度延迟并启动看门狗线程，直到 stop() 被调用"""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.running = True
+        self._stop_event.clear()
+        self._last_beat = time.monotonic()
+        self._watchdog = threading.Thread(target=self._watch, args=(loop,), name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+        try:
+            while self.running:
+                started = time.monotonic()
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(now - started - self.interval, 0.0)
+                self._record_lag(lag, now)
+                if lag >= self.alert_lag:
+                    await self._alert(lag, now)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """停止监控"""
+        self.running = False
+        self._stop_event.set()
+
+    def _record_lag(self, lag, now):
+        """记录一次心跳的调度延迟，并结束正在进行的慢回调记录"""
+        with self._lock:
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._last_beat = now
+            event = self._open_event
+            self._open_event = None
+            if event is not None:
+                # 心跳恢复时的延迟即为阻塞时长
+                event['duration'] = lag
+                self.slow_by_location[event['location']]['seconds'] += lag
+        if event is not None:
+            logger.warning("事件循环被阻塞 %.3f 秒: %s (任务: %s)", lag, event['location'], event['task'])
+
+    def _watch(self, loop):
+        """看门狗线程：心跳超时时抓取事件循环线程的调用栈"""
+        check_interval = max(self.block_threshold / 2, 0.01)
+        while not self._stop_event.wait(check_interval):
+            with self._lock:
+                beat = self._last_beat
+                already_open = self._open_event is not None
+            blocked = time.monotonic() - beat - self.interval
+            if already_open or blocked < self.block_threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            location, stack = attribute_frame(frame)
+            try:
+                task = asyncio.current_task(loop)
+            except RuntimeError:
+                task = None
+            event = {
+                'location': location,
+                'task': task.get_name() if task is not None else None,
+                'coroutine': getattr(task.get_coro(), '__qualname__', None) if task is not None else None,
+                'detected_at': time.time(),
+                'duration': None,
+                'stack': stack,
+            }
+            with self._lock:
+                # 检测期间心跳可能已经恢复
+                if self._last_beat != beat:
+                    continue
+                self._open_event = event
+                self.slow_callbacks += 1
+                self.recent_slow.append(event)
+                stats = self.slow_by_location.setdefault(location, {'count': 0, 'seconds': 0.0})
+                stats['count'] += 1
+
+    async def _alert(self, lag, now):
+        """调度延迟威胁止损时效时告警（带冷却时间）"""
+        if self._last_alert is not None and now - self._last_alert < self.alert_cooldown:
+            return
+        self._last_alert = now
+        self.alerts += 1
+        culprit = self.recent_slow[-1] if self.recent_slow else None
+        message = f"事件循环调度延迟 {lag:.1f} 秒，超过告警阈值 {self.alert_lag} 秒，止损检查可能延迟执行。"
+        if culprit is not None:
+            message += f"\n最近一次阻塞: {culprit['location']} (任务: {culprit['task']})"
+        logger.error(message)
+        if self.on_alert is not None:
+            try:
+                await self.on_alert("事件循环延迟告警", message)
+            except Exception as e:
+                logger.error("发送事件循环延迟告警失败: %s", e)
+
+    def snapshot(self):
+        """
+        监控状态快照
+
+        Returns:
+            dict: {
+                'last': float,             # 最近一次调度延迟（秒）
+                'max': float,              # 最大调度延迟（秒）
+                'slow_callbacks': int,     # 检测到的慢回调次数
+                'alerts': int,             # 告警次数
+                'by_location': dict,       # 归因位置 -> {'count', 'seconds'}
+                'recent': list             # 最近的慢回调（不含调用栈）
+            }
+        """
+        with self._lock:
+            recent = [
+                {key: value for key, value in event.items() if key != 'stack'}
+                for event in self.recent_slow
+            ]
+            by_location = {location: dict(stats) for location, stats in self.slow_by_location.items()}
+            return {
+                'last': self.last_lag,
+                'max': self.max_lag,
+                'slow_callbacks': self.slow_callbacks,
+                'alerts': self.alerts,
+                'by_location': by_location,
+                'recent': recent,
+            }
@@ -0,0 +1,335 @@
+"""
+指标与健康检查 HTTP 接口
+
+在机器人的事件循环中运行一个轻量的 HTTP 服务，提供每个交易对的浮动盈亏、距上次止损检查的时间、
+两条腿的持仓量、在途请求数、重试次数，各代理请求调度器的通道统计（见 src/request_scheduler.py），
+以及事件循环延迟和慢回调归因（见 src/loop_monitor.py）。
+所有数据都来自内存中的状态，抓取时不会向交易所发起任何请求。
+
+路由:
+    GET /metrics       Prometheus 文本格式
+    GET /metrics.json  JSON 格式
+    GET /health        JSON 格式（同 /metrics.json）
+
+另外可以通过 routes 注册带查询参数的 JSON 路由（例如盈亏时间序列 /pnl，见 src/pnl_tracker.py）。
+协程路由函数在事件循环中执行（需要读取数据库时自己把读取放到线程中）；普通函数在线程中执行，
+不能读取事件循环正在修改的内存状态。
+"""
+
+import asyncio
+import json
+import logging
+import math
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+
+
+def _escape_label(value):
+    """转义 Prometheus 标签值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    """格式化 Prometheus 样本值（None 表示尚无数据）"""
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    return repr(value)
+
+
+# (指标名, 类型, 说明, 取值字段)
+PAIR_METRICS = (
+    ('hedge_bot_pair_floating_pnl', 'gauge', '最近一次检查的浮动盈亏（USD）', 'floating_pnl'),
+    ('hedge_bot_pair_stop_loss_threshold', 'gauge', '止损阈值（USD）', 'stop_loss_threshold'),
+    ('hedge_bot_pair_last_check_age_seconds', 'gauge', '距上次止损检查的时间（秒）', 'last_check_age'),
+    ('hedge_bot_pair_in_flight_requests', 'gauge', '交易对两个账户的在途请求数', 'in_flight'),
+    ('hedge_bot_pair_retries_total', 'counter', '交易对两个账户的累计重试次数', 'retries'),
+    ('hedge_bot_pair_poll_interval_seconds', 'gauge', '当前的止损检查间隔（秒）', 'poll_interval'),
+)
+
+API_METRICS = (
+    ('hedge_bot_api_in_flight_requests', 'gauge', '所有账户的在途请求数', 'in_flight'),
+    ('hedge_bot_api_requests_total', 'counter', '累计请求次数（含重试）', 'requests'),
+    ('hedge_bot_api_retries_total', 'counter', '累计重试次数', 'retries'),
+    ('hedge_bot_api_failures_total', 'counter', '重试后仍失败的调用次数', 'failures'),
+)
+
+# 请求调度器每个通道的指标: (指标名, 类型, 说明, 取值字段)
+SCHEDULER_METRICS = (
+    ('hedge_bot_scheduler_queued_requests', 'gauge', '通道中排队的请求数', 'queued'),
+    ('hedge_bot_scheduler_requests_total', 'counter', '提交到通道的请求数', 'submitted'),
+    ('hedge_bot_scheduler_completed_total', 'counter', '通道中执行成功的请求数', 'completed'),
+    ('hedge_bot_scheduler_failed_total', 'counter', '通道中执行失败的请求数', 'failed'),
+    ('hedge_bot_scheduler_rejected_total', 'counter', '因队列已满被拒绝的请求数', 'rejected'),
+    ('hedge_bot_scheduler_expired_total', 'counter', '排队超过期限被丢弃的请求数', 'expired'),
+    ('hedge_bot_scheduler_wait_max_seconds', 'gauge', '请求在通道中的最长排队时间（秒）', 'wait_max'),
+)
+
+# 每个 API 密钥的签名交易和 nonce 分配指标（标签 api_key 为 网络/账户索引/API密钥索引）
+SIGNING_KEY_METRICS = (
+    ('hedge_bot_signing_in_flight', 'gauge', '使用该密钥的在途签名交易数', 'in_flight'),
+    ('hedge_bot_signing_submitted_total', 'counter', '使用该密钥提交的签名交易数', 'submitted'),
+    ('hedge_bot_signing_rate_limited_total', 'counter', '该密钥被限流的次数', 'rate_limited'),
+    ('hedge_bot_nonce_allocated_total', 'counter', '本地分配的 nonce 数', 'allocated'),
+    ('hedge_bot_nonce_resyncs_total', 'counter', '从交易所同步 nonce 的次数', 'resyncs'),
+    ('hedge_bot_nonce_errors_total', 'counter', '失败的签名交易数', 'errors'),
+)
+
+
+def render_prometheus(snapshot):
+    """
+    将指标快照渲染为 Prometheus 文本格式
+
+    Args:
+        snapshot (dict): HedgeTradingBot.get_metrics_snapshot() 的返回值
+
+    Returns:
+        str: Prometheus 文本
+    """
+    lines = [
+        '# HELP hedge_bot_running 机器人是否在运行',
+        '# TYPE hedge_bot_running gauge',
+        f"hedge_bot_running {_format_value(snapshot['running'])}",
+        '# HELP hedge_bot_pairs 交易对数量',
+        '# TYPE hedge_bot_pairs gauge',
+        f"hedge_bot_pairs {len(snapshot['pairs'])}",
+        '# HELP hedge_bot_loop_lag_seconds 最近一次测得的事件循环调度延迟（秒）',
+        '# TYPE hedge_bot_loop_lag_seconds gauge',
+        f"hedge_bot_loop_lag_seconds {_format_value(snapshot['loop_lag']['last'])}",
+        '# HELP hedge_bot_loop_lag_max_seconds 启动以来最大的事件循环调度延迟（秒）',
+        '# TYPE hedge_bot_loop_lag_max_seconds gauge',
+        f"hedge_bot_loop_lag_max_seconds {_format_value(snapshot['loop_lag']['max'])}",
+        '# HELP hedge_bot_loop_slow_callbacks_total 阻塞事件循环超过阈值的回调次数',
+        '# TYPE hedge_bot_loop_slow_callbacks_total counter',
+        f"hedge_bot_loop_slow_callbacks_total {snapshot['loop_lag']['slow_callbacks']}",
+        '# HELP hedge_bot_loop_lag_alerts_total 事件循环延迟告警次数',
+        '# TYPE hedge_bot_loop_lag_alerts_total counter',
+        f"hedge_bot_loop_lag_alerts_total {snapshot['loop_lag']['alerts']}",
+        '# HELP hedge_bot_loop_blocked_seconds_total 按代码位置归因的事件循环阻塞时长（秒）',
+        '# TYPE hedge_bot_loop_blocked_seconds_total counter',
+    ]
+    for location, stats in sorted(snapshot['loop_lag']['by_location'].items()):
+        lines.append(
+            f'hedge_bot_loop_blocked_seconds_total{{location="{_escape_label(location)}"}} '
+            f"{_format_value(stats['seconds'])}"
+        )
+
+    for name, metric_type, help_text, field in API_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {_format_value(snapshot['api'][field])}")
+
+    lines.append('# HELP hedge_bot_poll_deferred_total 因检查预算不足推迟的止损检查次数')
+    lines.append('# TYPE hedge_bot_poll_deferred_total counter')
+    lines.append(f"hedge_bot_poll_deferred_total {snapshot['polling']['deferred']}")
+
+    rebalance = snapshot.get('rebalance')
+    if rebalance is not None:
+        lines.append('# HELP hedge_bot_rebalance_orders_total 对冲再平衡提交的修正订单数')
+        lines.append('# TYPE hedge_bot_rebalance_orders_total counter')
+        lines.append(f"hedge_bot_rebalance_orders_total {rebalance['orders']}")
+        lines.append('# HELP hedge_bot_rebalance_failures_total 失败的对冲再平衡修正订单数')
+        lines.append('# TYPE hedge_bot_rebalance_failures_total counter')
+        lines.append(f"hedge_bot_rebalance_failures_total {rebalance['failures']}")
+
+    signing_keys = sorted(snapshot.get('signing_keys', {}).items())
+    for name, metric_type, help_text, field in SIGNING_KEY_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for key, values in signing_keys:
+            lines.append(f'{name}{{api_key="{_escape_label(key)}"}} {_format_value(values[field])}')
+
+    netting = snapshot.get('netting')
+    if netting is not None:
+        lines.append('# HELP hedge_bot_netting_intents_total 订单轧差收到的下单意图数')
+        lines.append('# TYPE hedge_bot_netting_intents_total counter')
+        lines.append(f"hedge_bot_netting_intents_total {netting['intents']}")
+        lines.append('# HELP hedge_bot_netting_orders_total 订单轧差实际提交的订单数')
+        lines.append('# TYPE hedge_bot_netting_orders_total counter')
+        lines.append(f"hedge_bot_netting_orders_total {netting['orders']}")
+
+    pair_states = snapshot.get('pair_states')
+    if pair_states is not None:
+        lines.append('# HELP hedge_bot_pair_state_transitions_total 交易对状态转换次数')
+        lines.append('# TYPE hedge_bot_pair_state_transitions_total counter')
+        for key, count in sorted(pair_states['transitions'].items()):
+            old_state, new_state = key.split('->')
+            lines.append(
+                f'hedge_bot_pair_state_transitions_total{{from="{old_state}",to="{new_state}"}} {count}'
+            )
+
+    quotes = sorted(snapshot.get('quotes', {}).items())
+    if quotes:
+        lines.append('# HELP hedge_bot_quotes_accepted_total 通过质量检查的报价数')
+        lines.append('# TYPE hedge_bot_quotes_accepted_total counter')
+        for network, stats in quotes:
+            lines.append(f'hedge_bot_quotes_accepted_total{{network="{_escape_label(network)}"}} {stats["accepted"]}')
+        lines.append('# HELP hedge_bot_quotes_rejected_total 被拒绝的报价数')
+        lines.append('# TYPE hedge_bot_quotes_rejected_total counter')
+        for network, stats in quotes:
+            for reason, count in sorted(stats['rejected'].items()):
+                lines.append(
+                    f'hedge_bot_quotes_rejected_total{{network="{_escape_label(network)}",reason="{reason}"}} {count}'
+                )
+
+    orders = snapshot.get('orders')
+    if orders is not None:
+        lines.append('# HELP hedge_bot_orders_pending 等待成交确认的订单数')
+        lines.append('# TYPE hedge_bot_orders_pending gauge')
+        lines.append(f"hedge_bot_orders_pending {orders['pending']}")
+        lines.append('# HELP hedge_bot_orders_total 已结束的订单数')
+        lines.append('# TYPE hedge_bot_orders_total counter')
+        for state in ('filled', 'partially_filled', 'canceled', 'rejected', 'expired'):
+            lines.append(f'hedge_bot_orders_total{{state="{state}"}} {orders[state]}')
+
+    schedulers = sorted(snapshot['schedulers'].items())
+    for name, metric_type, help_text, field in SCHEDULER_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for scheduler, lanes in schedulers:
+            for lane, stats in lanes.items():
+                lines.append(
+                    f'{name}{{scheduler="{_escape_label(scheduler)}",lane="{lane}"}} {_format_value(stats[field])}'
+                )
+
+    labels = [f'pair="{_escape_label(pair["pair_name"])}"' for pair in snapshot['pairs']]
+    for name, metric_type, help_text, field in PAIR_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for label, pair in zip(labels, snapshot['pairs']):
+            lines.append(f"{name}{{{label}}} {_format_value(pair[field])}")
+
+    lines.append('# HELP hedge_bot_pair_state 交易对当前的生命周期状态（当前状态为1）')
+    lines.append('# TYPE hedge_bot_pair_state gauge')
+    for label, pair in zip(labels, snapshot['pairs']):
+        if pair.get('state') is not None:
+            lines.append(f'hedge_bot_pair_state{{{label},state="{_escape_label(pair["state"])}"}} 1')
+    lines.append('# HELP hedge_bot_pair_state_age_seconds 交易对进入当前状态后的时间（秒）')
+    lines.append('# TYPE hedge_bot_pair_state_age_seconds gauge')
+    for label, pair in zip(labels, snapshot['pairs']):
+        if pair.get('state_age') is not None:
+            lines.append(f"hedge_bot_pair_state_age_seconds{{{label}}} {_format_value(pair['state_age'])}")
+
+    lines.append('# HELP hedge_bot_pair_leg_size 最近一次检查的持仓量')
+    lines.append('# TYPE hedge_bot_pair_leg_size gauge')
+    for label, pair in zip(labels, snapshot['pairs']):
+        lines.append(f'hedge_bot_pair_leg_size{{{label},leg="long"}} {_format_value(pair["long_size"])}')
+        lines.append(f'hedge_bot_pair_leg_size{{{label},leg="short"}} {_format_value(pair["short_size"])}')
+
+    lines.append('# HELP hedge_bot_pair_market_floating_pnl 交易对在每个市场上的浮动盈亏（USD）')
+    lines.append('# TYPE hedge_bot_pair_market_floating_pnl gauge')
+    for label, pair in zip(labels, snapshot['pairs']):
+        for market in pair['markets']:
+            lines.append(
+                f'hedge_bot_pair_market_floating_pnl{{{label},symbol="{_escape_label(market["symbol"])}"}} '
+                f'{_format_value(market["floating_pnl"])}'
+            )
+
+    lines.append('')
+    return '\n'.join(lines)
+
+
+class MetricsServer:
+    """指标 HTTP 服务（运行在机器人的事件循环中）"""
+
+    def __init__(self, snapshot_provider, host='127.0.0.1', port=9100, routes=None):
+        """
+        Args:
+            snapshot_provider: 无参函数，返回指标快照字典
+            host (str): 监听地址
+            port (int): 监听端口（0 表示由系统分配）
+            routes (dict): 额外的 JSON 路由，路径 -> 函数或协程函数(查询参数字典)，参数无效时抛出 ValueError
+        """
+        self.snapshot_provider = snapshot_provider
+        self.host = host
+        self.port = port
+        self.routes = routes or {}
+        self.server = None
+
+    async def start(self):
+        """开始监听"""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # 端口为 0 时记录实际分配的端口
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("指标接口已启动: http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        """停止监听"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def render(self, path):
+        """
+        生成指定路径的响应
+
+        Returns:
+            tuple: (状态码, Content-Type, 响应体)
+        """
+        if path == '/metrics':
+            return 200, PROMETHEUS_CONTENT_TYPE, render_prometheus(self.snapshot_provider())
+        if path in ('/metrics.json', '/health'):
+            return 200, JSON_CONTENT_TYPE, json.dumps(self.snapshot_provider(), ensure_ascii=False, default=str)
+        return 404, 'text/plain; charset=utf-8', 'not found\n'
+
+    async def render_route(self, path, query):
+        """
+        生成额外路由的响应（协程路由函数直接等待，普通函数在线程中执行）
+
+        Returns:
+            tuple: (状态码, Content-Type, 响应体)
+        """
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        route = self.routes[path]
+        try:
+            if asyncio.iscoroutinefunction(route):
+                result = await route(params)
+            else:
+                result = await asyncio.to_thread(route, params)
+        except ValueError as e:
+            return 400, 'text/plain; charset=utf-8', f"{e}\n"
+        return 200, JSON_CONTENT_TYPE, json.dumps(result, ensure_ascii=False, default=str)
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # 读取并丢弃请求头
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] != 'GET':
+                status, content_type, body = 405, 'text/plain; charset=utf-8', 'method not allowed\n'
+            else:
+                path, _, query = parts[1].partition('?')
+                if path in self.routes:
+                    status, content_type, body = await self.render_route(path, query)
+                else:
+                    status, content_type, body = self.render(path)
+
+            payload = body.encode('utf-8')
+            reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}[status]
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + payload
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error("处理指标请求失败: %s", e)
+        finally:
+            writer.close()
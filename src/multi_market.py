@@ -0,0 +1,378 @@
+"""
+多市场对冲
+
+一对做多/做空账户同时持有多个市场的对冲头寸，共享同一组API客户端和同一份账户持仓快照：
+
+- 每次检查每个账户只读取一次持仓，按市场ID分组后计算每个市场的浮动盈亏
+- 每个市场有自己的止损阈值，触发时只平掉该市场的两条腿
+- 所有市场的浮动盈亏之和超过交易对的总止损阈值时平掉全部市场
+
+配置示例（hedge_pairs 中的一项）:
+
+    pair_name: basket_1
+    long_account: account_1
+    short_account: account_2
+    stop_loss_threshold: 120      # 总止损阈值（默认使用顶层配置）
+    markets:
+      - symbol: BTC
+        position_size: 100        # 默认使用顶层配置
+        stop_loss_threshold: 50   # 默认使用顶层配置
+      - symbol: ETH
+"""
+
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from src.hedge_trader import HedgePair, _pair_log_context, pnl_components, stop_loss_triggered, summarize_positions
+from src.pair_state import PairState
+from src.records import OrderResult
+from src.request_scheduler import Lane, request_lane
+
+logger = logging.getLogger(__name__)
+
+
+class MarketLeg:
+    """多市场对冲交易对中的一个市场"""
+
+    def __init__(self, settings, config):
+        """
+        Args:
+            settings (dict): markets 中的一项
+            config (dict): 顶层配置（提供未指定的参数）
+        """
+        self.settings = settings
+        self.symbol = settings['symbol']
+        self.market_index = None
+        self.position_size = None
+        self.stop_loss_threshold = None
+        self.apply_defaults(config)
+
+        self.last_pnl = None
+        self.long_size = 0.0
+        self.short_size = 0.0
+        self.closed = False  # 已平仓或市场不可用，不再参与检查
+        self.order_long = None
+        self.order_short = None
+
+    def apply_defaults(self, config):
+        """按顶层配置更新未单独指定的参数"""
+        self.position_size = self.settings.get('position_size', config['position_size'])
+        self.stop_loss_threshold = self.settings.get('stop_loss_threshold', config['stop_loss_threshold'])
+
+    def update_settings(self, settings, config):
+        """
+        在线更新市场参数（不影响已有持仓）
+
+        Args:
+            settings (dict): markets 中该市场的新配置
+            config (dict): 顶层配置
+        """
+        self.settings = settings
+        self.apply_defaults(config)
+
+
+class MultiMarketHedgePair(HedgePair):
+    """一对账户上的多市场对冲"""
+
+    def __init__(self, account_long, account_short, config, markets, stop_loss_threshold=None, executor=None):
+        """
+        Args:
+            account_long (dict): 做多账户信息
+            account_short (dict): 做空账户信息
+            config (dict): 顶层配置
+            markets (list): 市场配置列表，每项至少包含 symbol
+            stop_loss_threshold (float): 所有市场合计的止损阈值（默认使用顶层配置）
+            executor (OrderExecutor): 下单执行器（可选）
+        """
+        super().__init__(account_long, account_short, config, executor=executor)
+        self.legs = [MarketLeg(market, config) for market in markets]
+        self.symbol = ','.join(leg.symbol for leg in self.legs)
+        # 各市场的市场ID在 MarketLeg 中；market_index 保持 None，按账户查询持仓时返回所有市场
+        self.market_index = None
+        self.aggregate_settings = stop_loss_threshold
+        self.stop_loss_threshold = config['stop_loss_threshold'] if stop_loss_threshold is None else stop_loss_threshold
+        # 最近一次检查中触发止损的市场
+        self.triggered_legs = []
+
+    def active_legs(self):
+        """仍在对冲中的市场"""
+        return [leg for leg in self.legs if not leg.closed]
+
+    def update_params(self, config, pair_config=None):
+        """
+        在线更新交易参数：顶层默认值、总止损阈值和各市场单独指定的参数
+
+        Args:
+            config (dict): 新配置
+            pair_config (dict): hedge_pairs 中本交易对的新配置（可选，未提供时只更新顶层默认值）
+        """
+        super().update_params(config, pair_config)
+        settings = {}
+        if pair_config is not None:
+            self.aggregate_settings = pair_config.get('stop_loss_threshold')
+            settings = {market['symbol']: market for market in pair_config.get('markets', [])}
+        for leg in self.legs:
+            leg.update_settings(settings.get(leg.symbol, leg.settings), config)
+        self.stop_loss_threshold = (
+            config['stop_loss_threshold'] if self.aggregate_settings is None else self.aggregate_settings
+        )
+
+    def symbols(self):
+        return tuple(leg.symbol for leg in self.active_legs())
+
+    def hedge_markets(self):
+        return [(leg.symbol, leg.market_index) for leg in self.active_legs() if leg.market_index is not None]
+
+    def stop_loss_state(self):
+        """在各市场止损和总止损中，返回剩余空间比例最小的一个"""
+        candidates = [(self.last_pnl, self.stop_loss_threshold)]
+        candidates.extend((leg.last_pnl, leg.stop_loss_threshold) for leg in self.active_legs())
+        candidates = [(pnl, threshold) for pnl, threshold in candidates if pnl is not None and threshold]
+        if not candidates:
+            return self.last_pnl, self.stop_loss_threshold
+        return min(candidates, key=lambda item: (item[0] + abs(item[1])) / abs(item[1]))
+
+    def metrics(self, now=None):
+        result = super().metrics(now)
+        result['stop_loss_threshold'] = self.stop_loss_threshold
+        result['markets'] = [
+            {
+                'symbol': leg.symbol,
+                'market_index': leg.market_index,
+                'floating_pnl': leg.last_pnl,
+                'stop_loss_threshold': leg.stop_loss_threshold,
+                'long_size': leg.long_size,
+                'short_size': leg.short_size,
+                'closed': leg.closed,
+            }
+            for leg in self.legs
+        ]
+        return result
+
+    @_pair_log_context
+    async def initialize(self):
+        """查找所有市场的市场ID，找不到的市场不参与交易"""
+        for leg in self.legs:
+            try:
+                market_result = await self.api_long.find_market_by_symbol(leg.symbol)
+            except Exception as e:
+                market_result = {'success': False, 'error': str(e)}
+            if market_result.get('success', False):
+                leg.market_index = market_result['market_id']
+                logger.info("✓ 找到交易对 %s，市场ID: %s", leg.symbol, leg.market_index)
+            else:
+                leg.closed = True
+                logger.error("✗ 查找交易对 %s 失败，该市场不参与交易: %s", leg.symbol, market_result.get('error', '未知错误'))
+
+    def _leg_view(self, leg):
+        """单个市场的交易对视图（供下单执行器使用）"""
+        return SimpleNamespace(
+            pair_id=f"{self.pair_id}:{leg.symbol}",
+            market_index=leg.market_index,
+            api_long=self.api_long,
+            api_short=self.api_short,
+            leverage=self.leverage,
+        )
+
+    @_pair_log_context
+    async def open_positions(self):
+        """
+        为所有可用市场开仓
+
+        Returns:
+            bool: 所有市场是否都开仓成功
+        """
+        legs = self.active_legs()
+        if not legs:
+            logger.error("没有可用的市场，无法开仓 %s", self.pair_id)
+            return False
+        self.lifecycle.transition(PairState.OPENING)
+        with request_lane(Lane.OPEN):
+            results = await asyncio.gather(*(self._open_leg(leg) for leg in legs))
+        success = all(results)
+        self.lifecycle.transition(PairState.OPEN if success else PairState.ERROR, None if success else "部分市场开仓失败")
+        return success
+
+    async def _open_leg(self, leg):
+        try:
+            quantity_result = await self.api_long.usd_to_quantity(leg.market_index, leg.position_size)
+            if not quantity_result.get('success', False):
+                logger.error("%s USD到数量转换失败: %s", leg.symbol, quantity_result.get('error', '未知错误'))
+                return False
+            quantity = quantity_result['quantity']
+            base_amount = quantity_result['base_amount']
+            logger.info(
+                "转换结果: %s USD = %.6f %s (价格: %.2f USD)",
+                leg.position_size, quantity, leg.symbol, quantity_result['price']
+            )
+
+            if self.executor is not None:
+                report = await self.executor.execute_pair(self._leg_view(leg), quantity, base_amount=base_amount,
+                                                          order_tracker=self.order_tracker)
+                leg.order_long = report['legs'].get('long')
+                leg.order_short = report['legs'].get('short')
+                if not report['success']:
+                    logger.error("%s 开仓执行失败 %s: %s", leg.symbol, self.pair_id, report['error'])
+                    return False
+            else:
+                # 一条腿抛出异常时不取消另一条腿，另一条腿的成交仍需确认
+                results = await asyncio.gather(
+                    self._place_market_order(self.api_long, leg.market_index, 'buy', base_amount),
+                    self._place_market_order(self.api_short, leg.market_index, 'sell', base_amount),
+                    return_exceptions=True
+                )
+                leg.order_long, leg.order_short = (
+                    OrderResult(False, error=str(result)) if isinstance(result, BaseException) else result
+                    for result in results
+                )
+                if not await self._confirm_fills(leg.symbol, leg.market_index, base_amount,
+                                                 leg.order_long, leg.order_short):
+                    return False
+            self.traded_notional += leg.position_size
+            logger.info("对冲头寸已建立: %s %s", self.pair_id, leg.symbol)
+            return True
+        except Exception as e:
+            logger.error("%s 开仓失败 %s: %s", leg.symbol, self.pair_id, e)
+            return False
+
+    async def _positions_by_market(self, api):
+        """读取账户所有市场的持仓（一次请求或一次快照读取）并按市场ID分组，失败时返回 None"""
+        if self.account_snapshots is not None:
+            result = await self.account_snapshots.get_positions(api)
+        else:
+            result = await api.get_open_positions(market_index=None)
+        if not result or not result.get('success', False):
+            return None
+        grouped = {}
+        for position in result['positions']:
+            grouped.setdefault(position.get('market_id'), []).append(position)
+        return grouped
+
+    @_pair_log_context
+    async def get_floating_pnl(self):
+        """
+        获取所有可用市场的浮动盈亏之和（同时更新每个市场的浮动盈亏和持仓量）
+
+        Returns:
+            float or None: 浮动盈亏值；任一账户的持仓查询失败时为 None（未知，不更新各市场的盈亏）
+        """
+        try:
+            long_by_market, short_by_market = await asyncio.gather(
+                self._positions_by_market(self.api_long),
+                self._positions_by_market(self.api_short)
+            )
+            if long_by_market is None or short_by_market is None:
+                logger.warning("持仓查询失败 %s: 做多 %s, 做空 %s", self.pair_id,
+                               '失败' if long_by_market is None else '成功',
+                               '失败' if short_by_market is None else '成功')
+                return None
+            total_pnl = 0
+            components = {}
+            for leg in self.active_legs():
+                leg_pnl = 0
+                for side, by_market in (('long', long_by_market), ('short', short_by_market)):
+                    positions = by_market.get(leg.market_index, ())
+                    size, pnl = summarize_positions(positions, leg.symbol)
+                    setattr(leg, f'{side}_size', size)
+                    leg_pnl += pnl
+                    # 盈亏记账按账户（腿）汇总所有市场
+                    side_components = components.setdefault(side, {'realized': 0.0, 'unrealized': 0.0, 'funding': 0.0})
+                    for name, value in pnl_components(positions, leg.symbol).items():
+                        side_components[name] += value
+                leg.last_pnl = leg_pnl
+                total_pnl += leg_pnl
+            self.pnl_components.update(components)
+            self.long_size = sum(leg.long_size for leg in self.active_legs())
+            self.short_size = sum(leg.short_size for leg in self.active_legs())
+            return total_pnl
+        except Exception as e:
+            logger.error("获取浮动盈亏失败 %s: %s", self.pair_id, e)
+            return None
+
+    @_pair_log_context
+    async def is_stop_loss_triggered(self):
+        """
+        检查各市场止损和总止损
+
+        Returns:
+            bool: 是否有市场需要平仓（需要平仓的市场记录在 triggered_legs 中；浮动盈亏未知时跳过本次检查）
+        """
+        floating_pnl = await self.get_floating_pnl()
+        self.last_check_ok = floating_pnl is not None
+        if floating_pnl is None:
+            self.skipped_checks += 1
+            self.triggered_legs = []
+            logger.warning("浮动盈亏未知，跳过本次止损检查 %s", self.pair_id)
+            return False
+        self.last_pnl = floating_pnl
+        self.last_check_time = time.monotonic()
+
+        legs = self.active_legs()
+        if legs and stop_loss_triggered(floating_pnl, self.stop_loss_threshold):
+            logger.info("触发总止损 %s: 浮动盈亏 %s USD", self.pair_id, floating_pnl)
+            self.triggered_legs = legs
+            return True
+
+        self.triggered_legs = [
+            leg for leg in legs
+            if leg.last_pnl is not None and stop_loss_triggered(leg.last_pnl, leg.stop_loss_threshold)
+        ]
+        for leg in self.triggered_legs:
+            logger.info("触发止损 %s %s: 浮动盈亏 %s USD", self.pair_id, leg.symbol, leg.last_pnl)
+        return bool(self.triggered_legs)
+
+    async def close_triggered_positions(self):
+        """只平掉最近一次检查中触发止损的市场"""
+        return await self.close_positions(self.triggered_legs)
+
+    @_pair_log_context
+    async def close_positions(self, legs=None):
+        """
+        平仓（所有市场的两条腿同时提交）
+
+        Args:
+            legs (list): 要平仓的市场，默认所有可用市场
+
+        Returns:
+            bool: 所有腿是否都平仓成功
+        """
+        legs = self.active_legs() if legs is None else list(legs)
+        if not legs or self.lifecycle.state == PairState.FLAT:
+            return True
+        self.lifecycle.transition(PairState.CLOSING)
+        with request_lane(Lane.EMERGENCY_CLOSE):
+            results = await asyncio.gather(*(self._close_leg(leg) for leg in legs))
+        self.triggered_legs = []
+        success = all(results)
+        if not success:
+            self.lifecycle.transition(PairState.ERROR, "平仓失败")
+        elif self.active_legs():
+            # 只平掉了部分市场，其余市场仍在对冲
+            self.lifecycle.transition(PairState.OPEN)
+        else:
+            self.lifecycle.transition(PairState.FLAT)
+        return success
+
+    async def _close_leg(self, leg):
+        # 注意：这里需要订单索引，简化实现使用默认值0（与 HedgePair.close_positions 一致）
+        result_long, result_short = await asyncio.gather(
+            self._cancel_order(self.api_long, leg.market_index, 0),
+            self._cancel_order(self.api_short, leg.market_index, 0),
+            return_exceptions=True
+        )
+        failed = False
+        for leg_name, result in (('做多', result_long), ('做空', result_short)):
+            if isinstance(result, BaseException):
+                logger.error("%s %s平仓失败 %s: %s", leg.symbol, leg_name, self.pair_id, result)
+                failed = True
+            elif not result.get('success', False):
+                logger.error("%s %s平仓失败 %s: %s", leg.symbol, leg_name, self.pair_id, result.get('error'))
+                failed = True
+        if failed:
+            return False
+        leg.closed = True
+        self.traded_notional += leg.position_size
+        logger.info("对冲头寸已平仓: %s %s", self.pair_id, leg.symbol)
+        return True
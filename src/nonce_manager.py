@@ -0,0 +1,205 @@
+"""
+签名交易的 nonce 分配
+
+同一账户的同一个 API 密钥（api_key_index）上的签名交易必须使用连续的 nonce。
+多个交易对共用一个账户、两条腿并发提交时，各自的 SignerClient 各自向交易所查询 nonce，
+会拿到相同的 nonce 而互相冲突、触发重试。
+
+NonceAllocator 按 (网络, 账户索引, API密钥索引) 共享：
+
+- 只在首次使用和出错后向交易所查询一次下一个 nonce，之后在本地递增分配
+- 同时允许 max_in_flight 个交易在途（流水线提交），超过时排队等待
+- 任何交易失败（返回错误或抛出异常）后，等在途交易全部结束，再从交易所重新同步 nonce
+"""
+
+import asyncio
+import collections
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class NonceLease:
+    """一次分配的 nonce，交易返回错误时调用 failed()"""
+
+    __slots__ = ('nonce', 'ok')
+
+    def __init__(self, nonce):
+        self.nonce = nonce
+        self.ok = True
+
+    def failed(self):
+        self.ok = False
+
+
+class NonceAllocator:
+    """单个 (账户, API密钥) 的 nonce 分配器"""
+
+    def __init__(self, key, max_in_flight=16):
+        """
+        Args:
+            key (tuple): (网络, 账户索引, API密钥索引)
+            max_in_flight (int): 同时在途的交易数上限
+        """
+        self.key = key
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._next = None  # 下一个可分配的 nonce，None 表示需要从交易所同步
+        self._syncing = None
+        self._waiters = collections.deque()
+        self.allocated = 0  # 已分配的 nonce 数
+        self.resyncs = 0    # 从交易所同步的次数
+        self.errors = 0     # 失败的交易数
+
+    async def acquire(self, fetch):
+        """
+        分配一个 nonce
+
+        Args:
+            fetch: 异步函数，返回交易所上的下一个 nonce（需要同步时调用）
+
+        Returns:
+            int: nonce
+        """
+        return (await self.acquire_many(fetch, 1))[0]
+
+    async def acquire_many(self, fetch, count):
+        """
+        一次分配 count 个连续的 nonce（批量交易使用）
+
+        在途名额足够时一次全部分配，不会只拿到一部分名额后等待其余名额，
+        因此多个批次共用一个分配器时不会互相占住名额而死锁。
+
+        Args:
+            fetch: 异步函数，返回交易所上的下一个 nonce（需要同步时调用）
+            count (int): 数量，不超过 max_in_flight
+
+        Returns:
+            list: 连续的 nonce
+        """
+        if count > self.max_in_flight:
+            raise ValueError(f"一次分配 {count} 个 nonce 超过在途上限 {self.max_in_flight}")
+        while True:
+            if self._next is not None and self.in_flight + count <= self.max_in_flight:
+                nonces = list(range(self._next, self._next + count))
+                self._next += count
+                self.in_flight += count
+                self.allocated += count
+                return nonces
+            if self._next is None and self.in_flight == 0:
+                # 同步期间到达的请求共享同一次查询
+                if self._syncing is None:
+                    self._syncing = asyncio.ensure_future(self._sync(fetch))
+                await asyncio.shield(self._syncing)
+                continue
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    async def _sync(self, fetch):
+        try:
+            self._next = int(await fetch())
+            self.resyncs += 1
+            logger.info("同步 nonce %s: 下一个 nonce %s", self.key, self._next)
+        finally:
+            self._syncing = None
+
+    def release(self, ok=True):
+        """
+        交易结束，释放在途名额
+
+        Args:
+            ok (bool): 交易是否成功；失败时在途交易全部结束后重新同步
+        """
+        self.in_flight -= 1
+        if not ok:
+            self.errors += 1
+            if self._next is not None:
+                logger.warning("交易失败，nonce %s 将在在途交易结束后重新同步", self.key)
+            self._next = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def lease(self, fetch):
+        """
+        分配 nonce 并在交易结束后释放（抛出异常视为失败）
+
+        用法:
+            async with allocator.lease(fetch) as lease:
+                tx, tx_hash, err = await client.create_order(..., nonce=lease.nonce)
+                if err:
+                    lease.failed()
+        """
+        lease = NonceLease(await self.acquire(fetch))
+        try:
+            yield lease
+        except BaseException:
+            lease.failed()
+            raise
+        finally:
+            self.release(lease.ok)
+
+    @asynccontextmanager
+    async def lease_many(self, fetch, count):
+        """
+        一次分配 count 个连续的 nonce，交易结束后全部释放（抛出异常时全部视为失败）
+
+        Yields:
+            list: NonceLease 列表
+        """
+        leases = [NonceLease(nonce) for nonce in await self.acquire_many(fetch, count)]
+        try:
+            yield leases
+        except BaseException:
+            for lease in leases:
+                lease.failed()
+            raise
+        finally:
+            for lease in leases:
+                self.release(lease.ok)
+
+    def snapshot(self):
+        """指标快照"""
+        return {
+            'in_flight': self.in_flight,
+            'allocated': self.allocated,
+            'resyncs': self.resyncs,
+            'errors': self.errors,
+        }
+
+
+_allocators = {}
+
+
+def get_nonce_allocator(network, account_index, api_key_index, config=None):
+    """
+    获取（或创建）指定账户和API密钥的 nonce 分配器，同一密钥的所有客户端共享
+
+    Args:
+        network (str): 网络（mainnet / testnet）
+        account_index (int): 账户索引
+        api_key_index (int): API密钥索引
+        config (dict): nonce 配置段（首次创建时使用）
+            - max_in_flight: 同时在途的交易数上限，默认16
+
+    Returns:
+        NonceAllocator: 分配器
+    """
+    key = (network, account_index, api_key_index)
+    allocator = _allocators.get(key)
+    if allocator is None:
+        allocator = _allocators[key] = NonceAllocator(key, (config or {}).get('max_in_flight', 16))
+    return allocator
+
+
+def all_nonce_allocators():
+    """所有已创建的分配器（键 -> 分配器）"""
+    return dict(_allocators)
@@ -1,10 +1,6 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import asyncio
 import logging
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class NotificationManager:
@@ -20,6 +16,67 @@ class NotificationManager:
         self.config = config
         self.notification_config = config.get('notification', {})
         
+        # 后台发送队列（start() 后启用，send_notification 只入队不阻塞事件循环）
+        self._queue = None
+        self._worker = None
+
+    @property
+    def started(self):
+        """是否已启动后台发送"""
+        return self._worker is not None
+
+    def start(self):
+        """在事件循环中启动后台发送任务"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """后台发送任务：在线程中逐条发送，避免同步 SMTP 调用阻塞事件循环"""
+        while True:
+            title, message = await self._queue.get()
+            try:
+                await asyncio.to_thread(self.send_email, title, message)
+            finally:
+                self._queue.task_done()
+
+    async def flush(self, timeout=None):
+        """
+        等待队列中的通知发送完毕
+        
+        Args:
+            timeout (float): 最长等待时间（秒），None 表示一直等待
+            
+        Returns:
+            bool: 是否在超时前全部发送
+        """
+        if self._queue is None:
+            return True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("仍有 %s 条通知未发送", self._queue.qsize())
+            return False
+
+    async def stop(self, timeout=None):
+        """
+        发送剩余通知后停止后台发送
+        
+        Returns:
+            bool: 是否在超时前全部发送
+        """
+        flushed = await self.flush(timeout)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._queue = None
+        self._worker = None
+        return flushed
+        
     def send_email(self, subject, message):
         """
         发送邮件通知
@@ -35,6 +92,11 @@ class NotificationManager:
             return
             
         try:
+            # 邮件相关模块只在实际发送时导入
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+            
             # 创建邮件对象
             msg = MIMEMultipart()
             msg['From'] = email_config.get('sender')
@@ -51,9 +113,9 @@ class NotificationManager:
             server.send_message(msg)
             server.quit()
             
-            logger.info(f"邮件通知已发送: {subject}")
+            logger.info("邮件通知已发送: %s", subject)
         except Exception as e:
-            logger.error(f"发送邮件通知失败: {str(e)}")
+            logger.error("发送邮件通知失败: %s", e)
     
     def send_notification(self, title, message):
         """
@@ -63,8 +125,11 @@ class NotificationManager:
             title (str): 通知标题
             message (str): 通知内容
         """
-        # 发送邮件通知
-        self.send_email(title, message)
-        
         # 记录到日志
-        logger.info(f"通知 - {title}: {message}")
\ No newline at end of file
+        logger.info("通知 - %s: %s", title, message)
+        
+        # 发送邮件通知（已启动后台发送时只入队）
+        if self._queue is not None:
+            self._queue.put_nowait((title, message))
+        else:
+            self.send_email(title, message)
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+本地订单簿
+
+每个市场维护一份按价格排序的价格档位数组，支持快照加载和增量更新，
+在本地完成最优价、深度加权中间价和按数量/金额的成交均价计算，不需要额外请求。
+"""
+
+import time
+from bisect import bisect_left
+
+
+def _parse_level(level):
+    """
+    解析单个价格档位
+
+    支持 (price, size) 元组、WebSocket 推送的字典 {'price', 'size'}
+    以及 SDK 返回的订单对象（price / remaining_base_amount 属性）。
+
+    Returns:
+        tuple: (price: float, size: float)
+    """
+    if isinstance(level, (tuple, list)):
+        price, size = level[0], level[1]
+    elif isinstance(level, dict):
+        price = level['price']
+        size = level.get('size', level.get('remaining_base_amount', 0))
+    else:
+        price = level.price
+        size = getattr(level, 'size', None)
+        if size is None:
+            size = getattr(level, 'remaining_base_amount', 0)
+    return float(price), float(size)
+
+
+class _BookSide:
+    """订单簿单边：排序键数组 + 价格到数量的映射，最优价位于数组末尾"""
+
+    def __init__(self, is_bid):
+        self.is_bid = is_bid
+        # 买盘按价格升序，卖盘按价格取负后升序，最优价始终在末尾
+        self.keys = []
+        self.sizes = {}
+
+    def _key(self, price):
+        return price if self.is_bid else -price
+
+    def clear(self):
+        self.keys.clear()
+        self.sizes.clear()
+
+    def set(self, price, size):
+        """设置价格档位数量，数量为0时删除档位"""
+        key = self._key(price)
+        if size <= 0:
+            if price in self.sizes:
+                del self.sizes[price]
+                index = bisect_left(self.keys, key)
+                del self.keys[index]
+            return
+        if price not in self.sizes:
+            # 大多数更新发生在最优价附近（数组末尾），插入代价很小
+            index = bisect_left(self.keys, key)
+            self.keys.insert(index, key)
+        self.sizes[price] = size
+
+    def best(self):
+        """最优价格档位 (price, size)，无档位时返回 None"""
+        if not self.keys:
+            return None
+        key = self.keys[-1]
+        price = key if self.is_bid else -key
+        return price, self.sizes[price]
+
+    def levels(self):
+        """从最优价开始依次迭代 (price, size)"""
+        for key in reversed(self.keys):
+            price = key if self.is_bid else -key
+            yield price, self.sizes[price]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class OrderBook:
+    """单个市场的本地订单簿"""
+
+    def __init__(self, market_id):
+        """
+        初始化本地订单簿
+
+        Args:
+            market_id: 市场ID
+        """
+        self.market_id = market_id
+        self.bids = _BookSide(is_bid=True)
+        self.asks = _BookSide(is_bid=False)
+        self.offset = None
+        self.last_update = None
+
+    def apply_snapshot(self, bids, asks, offset=None):
+        """
+        用完整快照替换本地订单簿，同一价格的多个订单会合并为一个档位
+
+        Args:
+            bids: 买盘档位列表
+            asks: 卖盘档位列表
+            offset: 快照序号（用于丢弃过期的增量更新）
+        """
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            side.clear()
+            aggregated = {}
+            for level in levels or []:
+                price, size = _parse_level(level)
+                aggregated[price] = aggregated.get(price, 0.0) + size
+            for price, size in aggregated.items():
+                side.set(price, size)
+        self.offset = offset
+        self.last_update = time.monotonic()
+
+    def apply_delta(self, bids=(), asks=(), offset=None):
+        """
+        应用增量更新，档位数量为0表示删除该档位
+
+        Args:
+            bids: 变化的买盘档位
+            asks: 变化的卖盘档位
+            offset: 更新序号，不大于当前序号的更新会被忽略
+
+        Returns:
+            bool: 是否应用了更新
+        """
+        if offset is not None and self.offset is not None and offset <= self.offset:
+            return False
+        for level in bids or []:
+            self.bids.set(*_parse_level(level))
+        for level in asks or []:
+            self.asks.set(*_parse_level(level))
+        if offset is not None:
+            self.offset = offset
+        self.last_update = time.monotonic()
+        return True
+
+    def age(self):
+        """距离最近一次更新的秒数，从未更新时返回 None"""
+        if self.last_update is None:
+            return None
+        return time.monotonic() - self.last_update
+
+    def is_two_sided(self):
+        """买卖盘是否都有档位"""
+        return len(self.bids) > 0 and len(self.asks) > 0
+
+    def best_bid(self):
+        """最优买价档位 (price, size)"""
+        return self.bids.best()
+
+    def best_ask(self):
+        """最优卖价档位 (price, size)"""
+        return self.asks.best()
+
+    def mid_price(self):
+        """最优买卖价的中间价，单边为空时返回 None"""
+        if not self.is_two_sided():
+            return None
+        return (self.bids.best()[0] + self.asks.best()[0]) / 2
+
+    def depth_weighted_mid(self, levels=5):
+        """
+        深度加权中间价
+
+        分别计算前 levels 档买盘和卖盘的成交量加权均价，再按对手方深度加权，
+        卖盘更薄时价格偏向卖价，反之偏向买价。
+
+        Args:
+            levels (int): 参与计算的档位数
+
+        Returns:
+            float: 深度加权中间价，单边为空时返回 None
+        """
+        if not self.is_two_sided():
+            return None
+
+        def side_vwap(side):
+            notional = depth = 0.0
+            for index, (price, size) in enumerate(side.levels()):
+                if index >= levels:
+                    break
+                notional += price * size
+                depth += size
+            return notional / depth, depth
+
+        bid_vwap, bid_depth = side_vwap(self.bids)
+        ask_vwap, ask_depth = side_vwap(self.asks)
+        return (bid_vwap * ask_depth + ask_vwap * bid_depth) / (bid_depth + ask_depth)
+
+    def vwap_for_size(self, side, quantity):
+        """
+        按数量吃单的成交均价
+
+        Args:
+            side (str): 'buy' 吃卖盘，'sell' 吃买盘
+            quantity (float): 成交数量
+
+        Returns:
+            tuple: (vwap: float or None, filled: float) 深度不足时 filled 小于 quantity
+        """
+        book_side = self.asks if side == 'buy' else self.bids
+        remaining = quantity
+        notional = 0.0
+        for price, size in book_side.levels():
+            take = min(size, remaining)
+            notional += take * price
+            remaining -= take
+            if remaining <= 0:
+                break
+        filled = quantity - max(remaining, 0.0)
+        if filled <= 0:
+            return None, 0.0
+        return notional / filled, filled
+
+    def quantity_for_notional(self, side, notional):
+        """
+        按USD金额吃单可成交的数量
+
+        Args:
+            side (str): 'buy' 吃卖盘，'sell' 吃买盘
+            notional (float): USD金额
+
+        Returns:
+            tuple: (quantity: float, vwap: float or None, complete: bool) complete 表示深度是否足够
+        """
+        book_side = self.asks if side == 'buy' else self.bids
+        remaining = notional
+        quantity = 0.0
+        for price, size in book_side.levels():
+            level_notional = price * size
+            if level_notional >= remaining:
+                quantity += remaining / price
+                remaining = 0.0
+                break
+            quantity += size
+            remaining -= level_notional
+        if quantity <= 0:
+            return 0.0, None, False
+        spent = notional - remaining
+        return quantity, spent / quantity, remaining <= 0
@@ -0,0 +1,194 @@
+"""
+跨交易对的订单轧差
+
+同一账户在多个对冲交易对中使用时，批量开仓/平仓会对同一市场逐个交易对发出订单。
+轧差层在一个很短的收集窗口内汇总同一 (账户, 市场) 的所有下单意图，只提交一笔净额订单：
+
+- 买入和卖出意图先在内部相互抵消（不需要提交订单），剩余的净额合并为一笔市价单
+- 净额订单的最差成交价取同方向意图中最保守的价格（买单取最低、卖单取最高）
+- 每个交易对收到自己的结果：内部抵消的数量（netted_amount）和由净额订单成交的数量（order_amount），
+  内部抵消按提交顺序分配给净额方向的意图
+- 相同的撤单请求（同一账户、市场、订单索引）只提交一次，结果共享给所有调用方
+
+只有其他下单参数（杠杆、reduce_only、订单类型等）完全相同的意图才会合并，避免只减仓的平仓单
+被并入开仓单。窗口内只有一个意图时直接按原参数提交。成交数量以提交为准（订单结果不包含成交回报）。
+"""
+
+import asyncio
+import logging
+
+from src.account_snapshot import AccountSnapshotService
+
+logger = logging.getLogger(__name__)
+
+
+class OrderIntent:
+    """一个交易对的下单意图"""
+
+    __slots__ = ('pair_id', 'side', 'base_amount', 'price', 'future')
+
+    def __init__(self, pair_id, side, base_amount, price, future):
+        self.pair_id = pair_id
+        self.side = side
+        self.base_amount = base_amount
+        self.price = price
+        self.future = future
+
+
+class OrderNetter:
+    """按 (账户, 市场) 汇总同时发生的下单意图"""
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict): netting 配置段
+                - enabled: 是否启用，默认启用
+                - window: 收集窗口（秒），默认0.05
+        """
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.window = config.get('window', 0.05)
+        self._batches = {}  # (账户键, 市场ID, 其他下单参数) -> [OrderIntent]
+        self._cancels = {}  # (账户键, 市场ID, 订单索引) -> 进行中的撤单任务
+        self.intents = 0    # 收到的下单意图数
+        self.orders = 0     # 实际提交的订单数
+        self.netted = 0     # 内部抵消的 base_amount 总量
+
+    async def place_order(self, api, pair_id, market_index, side, base_amount, price=None, **kwargs):
+        """
+        提交一个交易对的市价单意图
+
+        Args:
+            api (LighterAPI): 账户的API客户端
+            pair_id (str): 交易对ID（用于归属成交）
+            market_index: 市场ID
+            side (str): 'buy' 或 'sell'
+            base_amount (int): 已缩放的整数数量
+            price: 最差成交价（可选）
+            **kwargs: 其他 place_order 参数（原样传递给净额订单，参数不同的意图不合并）
+
+        Returns:
+            dict: {
+                'success': bool,
+                'tx': object, 'tx_hash': str,   # 净额订单的交易（完全内部抵消时为 None）
+                'client_order_index': int,       # 净额订单的客户端订单索引（完全内部抵消时为 None）
+                'error': str or None,
+                'timestamp': float,
+                'base_amount': int,              # 本交易对请求的数量
+                'netted_amount': int,            # 与其他交易对内部抵消的数量
+                'order_amount': int              # 由净额订单成交的数量
+            }
+        """
+        if not self.enabled:
+            return await api.place_order(market_index=market_index, side=side, price=price,
+                                         base_amount=base_amount, **kwargs)
+        self.intents += 1
+        key = (AccountSnapshotService.account_key(api), market_index, tuple(sorted(kwargs.items())))
+        loop = asyncio.get_running_loop()
+        intent = OrderIntent(pair_id, side.lower(), base_amount, price, loop.create_future())
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = []
+            loop.create_task(self._flush_later(key, api, market_index, kwargs))
+        batch.append(intent)
+        return await intent.future
+
+    async def _flush_later(self, key, api, market_index, kwargs):
+        await asyncio.sleep(self.window)
+        intents = self._batches.pop(key)
+        try:
+            results = await self._submit(api, market_index, intents, kwargs)
+        except Exception as e:
+            results = [self._result(intent, False, error=str(e)) for intent in intents]
+        for intent, result in zip(intents, results):
+            if not intent.future.done():
+                intent.future.set_result(result)
+
+    @staticmethod
+    def _result(intent, success, order=None, error=None, netted=0, ordered=0):
+        return {
+            'success': success,
+            'tx': order.get('tx') if order else None,
+            'tx_hash': order.get('tx_hash') if order else None,
+            'client_order_index': order.get('client_order_index') if order else None,
+            'error': error,
+            'timestamp': order.get('timestamp') if order else asyncio.get_running_loop().time(),
+            'base_amount': intent.base_amount,
+            'netted_amount': netted,
+            'order_amount': ordered,
+        }
+
+    async def _submit(self, api, market_index, intents, kwargs):
+        """提交一个收集窗口内的净额订单，返回每个意图的结果"""
+        if len(intents) == 1:
+            intent = intents[0]
+            self.orders += 1
+            order = await api.place_order(market_index=market_index, side=intent.side, price=intent.price,
+                                          base_amount=intent.base_amount, **kwargs)
+            success = order.get('success', False)
+            return [self._result(intent, success, order, order.get('error'), 0,
+                                 intent.base_amount if success else 0)]
+
+        buys = sum(intent.base_amount for intent in intents if intent.side == 'buy')
+        sells = sum(intent.base_amount for intent in intents if intent.side == 'sell')
+        net_side = 'buy' if buys >= sells else 'sell'
+        net_amount = abs(buys - sells)
+        crossed = min(buys, sells)
+        self.netted += crossed
+
+        # 内部抵消：反方向的意图全部抵消，净额方向的意图按提交顺序分配抵消数量
+        allocations = {}
+        remaining = crossed
+        for intent in intents:
+            if intent.side != net_side:
+                allocations[id(intent)] = intent.base_amount
+            else:
+                allocations[id(intent)] = min(remaining, intent.base_amount)
+                remaining -= allocations[id(intent)]
+
+        order = None
+        if net_amount > 0:
+            prices = [intent.price for intent in intents if intent.side == net_side and intent.price is not None]
+            price = None
+            if prices:
+                price = min(prices) if net_side == 'buy' else max(prices)
+            logger.info(
+                "订单轧差: 市场 %s 账户 %s 的 %s 个意图 (买 %s / 卖 %s) 合并为 %s %s",
+                market_index, api.account_index, len(intents), buys, sells, net_side, net_amount
+            )
+            self.orders += 1
+            order = await api.place_order(market_index=market_index, side=net_side, price=price,
+                                          base_amount=net_amount, **kwargs)
+
+        results = []
+        for intent in intents:
+            netted = allocations[id(intent)]
+            if intent.side != net_side or netted == intent.base_amount:
+                results.append(self._result(intent, True, None, None, netted, 0))
+            elif order.get('success', False):
+                results.append(self._result(intent, True, order, None, netted, intent.base_amount - netted))
+            else:
+                results.append(self._result(intent, False, order, order.get('error'), netted, 0))
+        return results
+
+    async def cancel_order(self, api, market_index, order_index):
+        """
+        撤单（同一账户、市场、订单索引的并发撤单只提交一次）
+
+        Returns:
+            dict: LighterAPI.close_position() 的结果
+        """
+        if not self.enabled:
+            return await api.close_position(market_index=market_index, order_index=order_index)
+        key = (AccountSnapshotService.account_key(api), market_index, order_index)
+        task = self._cancels.get(key)
+        if task is None:
+            task = self._cancels[key] = asyncio.ensure_future(
+                api.close_position(market_index=market_index, order_index=order_index)
+            )
+            task.add_done_callback(lambda _: self._cancels.pop(key, None))
+        return await asyncio.shield(task)
+
+    def snapshot(self):
+        """指标快照"""
+        return {'intents': self.intents, 'orders': self.orders, 'netted': self.netted}
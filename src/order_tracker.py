@@ -0,0 +1,311 @@
+"""
+订单生命周期跟踪
+
+下单结果只说明交易已提交（tx_hash），不说明订单是否成交。OrderTracker 按
+(账户, client_order_index) 跟踪每笔订单，直到成交、撤销或被拒绝：
+
+- pending: 已提交，交易所尚未返回订单
+- open: 在订单簿上挂单，尚未成交
+- partially_filled: 部分成交（订单结束时仍为部分成交表示剩余部分被撤销）
+- filled: 全部成交
+- canceled: 未成交即被撤销（如市价单没有对手盘）
+- rejected: 提交失败
+
+状态更新来源：
+
+- 推送：apply_update() 接收订单频道推送的订单数据（如 WebSocket account_orders 频道）
+- 轮询：没有推送时，run() 按 poll_interval 轮询，每个 (账户, 市场) 每轮只查询一次进行中订单和最近结束的订单，
+  同一账户同一市场的所有待确认订单共用这两次查询
+
+每笔订单有一个 future，wait() 等待订单结束（或超时）。轧差后多个交易对共享的净额订单只跟踪一次，
+所有交易对等待同一个 future。
+"""
+
+import asyncio
+import logging
+import time
+
+from src.account_snapshot import AccountSnapshotService
+
+logger = logging.getLogger(__name__)
+
+
+class OrderState:
+    """订单状态"""
+
+    PENDING = 'pending'
+    OPEN = 'open'
+    PARTIALLY_FILLED = 'partially_filled'
+    FILLED = 'filled'
+    CANCELED = 'canceled'
+    REJECTED = 'rejected'
+
+
+def _amount(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def order_state(order):
+    """
+    解析交易所返回的订单状态
+
+    Args:
+        order: 交易所订单（对象或字典），含 status、filled_base_amount、remaining_base_amount
+
+    Returns:
+        tuple: (状态, 是否已结束, 已成交数量, 剩余数量)，无法识别的状态返回 (None, False, ...)
+    """
+    get = order.get if isinstance(order, dict) else lambda name: getattr(order, name, None)
+    status = str(get('status') or '').lower()
+    filled = _amount(get('filled_base_amount'))
+    remaining = _amount(get('remaining_base_amount'))
+    if status == 'filled':
+        return OrderState.FILLED, True, filled, 0.0
+    if status.startswith('canceled') or status.startswith('cancelled') or status == 'expired':
+        # 部分成交后撤销的订单保持部分成交状态
+        state = OrderState.PARTIALLY_FILLED if filled > 0 else OrderState.CANCELED
+        return state, True, filled, remaining
+    if status in ('open', 'pending', 'in-progress'):
+        if filled > 0:
+            return OrderState.PARTIALLY_FILLED, False, filled, remaining
+        return (OrderState.OPEN if status == 'open' else OrderState.PENDING), False, filled, remaining
+    return None, False, filled, remaining
+
+
+class TrackedOrder:
+    """一笔被跟踪的订单"""
+
+    def __init__(self, api, market_index, client_order_index, tx_hash, base_amount, future):
+        self.api = api
+        self.market_index = market_index
+        self.client_order_index = client_order_index
+        self.tx_hash = tx_hash
+        self.base_amount = base_amount  # 提交的数量（已缩放的整数）
+        self.state = OrderState.PENDING
+        self.done = False
+        self.expired = False  # 超时仍未结束，不再跟踪
+        self.filled_base_amount = 0.0
+        self.filled_quote_amount = 0.0  # 已成交金额（交易所返回 filled_quote_amount 时）
+        self.remaining_base_amount = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.future = future
+
+    @property
+    def filled(self):
+        return self.state == OrderState.FILLED
+
+    @property
+    def average_price(self):
+        """成交均价（没有成交金额时为 None）"""
+        if self.filled_base_amount > 0 and self.filled_quote_amount > 0:
+            return self.filled_quote_amount / self.filled_base_amount
+        return None
+
+    def result(self):
+        """订单状态字典"""
+        return {
+            'success': self.filled,
+            'state': self.state,
+            'tx_hash': self.tx_hash,
+            'client_order_index': self.client_order_index,
+            'filled_base_amount': self.filled_base_amount,
+            'average_price': self.average_price,
+            'remaining_base_amount': self.remaining_base_amount,
+            'error': self.error,
+        }
+
+
+class OrderTracker:
+    """跟踪已提交订单直到成交、撤销或被拒绝"""
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict): orders 配置段
+                - enabled: 是否启用（开仓时等待两条腿成交确认），默认启用
+                - poll_interval: 没有推送时的轮询间隔（秒），默认1
+                - timeout: 订单确认超时（秒），超时后不再跟踪，默认30
+                - inactive_limit: 每次查询最近结束订单的数量，默认50
+        """
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.poll_interval = config.get('poll_interval', 1)
+        self.timeout = config.get('timeout', 30)
+        self.inactive_limit = config.get('inactive_limit', 50)
+        self._orders = {}  # (账户键, client_order_index) -> TrackedOrder
+        self.running = False
+        self.counts = {state: 0 for state in (
+            OrderState.FILLED, OrderState.PARTIALLY_FILLED, OrderState.CANCELED, OrderState.REJECTED
+        )}
+        self.expired = 0
+        self.polls = 0
+
+    def track(self, api, market_index, result, base_amount=None):
+        """
+        开始跟踪一笔下单结果
+
+        Args:
+            api (LighterAPI): 下单的账户客户端
+            market_index: 市场ID
+            result (dict): place_order() 或 OrderNetter.place_order() 的结果
+            base_amount (int): 提交的数量
+
+        Returns:
+            TrackedOrder or None: 结果中没有 client_order_index 时无法跟踪，返回 None
+        """
+        future = asyncio.get_running_loop().create_future()
+        order = TrackedOrder(api, market_index, result.get('client_order_index'), result.get('tx_hash'),
+                             base_amount, future)
+        if not result.get('success', False):
+            order.error = result.get('error')
+            self._finish(order, OrderState.REJECTED)
+            return order
+        if result.get('order_amount') == 0:
+            # 轧差时与其他交易对完全内部抵消，没有提交订单
+            order.filled_base_amount = base_amount
+            self._finish(order, OrderState.FILLED)
+            return order
+        if order.client_order_index is None:
+            logger.warning("订单结果缺少 client_order_index，无法跟踪成交: %s", result.get('tx_hash'))
+            return None
+        key = (AccountSnapshotService.account_key(api), order.client_order_index)
+        existing = self._orders.get(key)
+        if existing is not None:
+            # 轧差后多个交易对共享同一笔净额订单：共用一个跟踪项，结果分发给所有交易对
+            return existing
+        self._orders[key] = order
+        return order
+
+    def _finish(self, order, state):
+        order.state = state
+        order.done = True
+        self.counts[state] += 1
+        if not order.future.done():
+            order.future.set_result(order)
+
+    def apply_update(self, account_key, update):
+        """
+        应用一条订单更新（推送或轮询结果）
+
+        Args:
+            account_key (tuple): 账户键，见 AccountSnapshotService.account_key()
+            update: 交易所订单（对象或字典），含 client_order_index 和状态字段
+
+        Returns:
+            bool: 是否匹配到被跟踪的订单
+        """
+        get = update.get if isinstance(update, dict) else lambda name: getattr(update, name, None)
+        order = self._orders.get((account_key, get('client_order_index')))
+        if order is None:
+            return False
+        state, done, filled, remaining = order_state(update)
+        if state is None:
+            return True
+        order.filled_base_amount = filled
+        order.filled_quote_amount = _amount(get('filled_quote_amount'))
+        order.remaining_base_amount = remaining
+        if done:
+            del self._orders[(account_key, order.client_order_index)]
+            self._finish(order, state)
+            logger.debug("订单 %s 结束: %s (已成交 %s)", order.client_order_index, state, filled)
+        else:
+            order.state = state
+        return True
+
+    def pending(self):
+        """尚未结束的订单"""
+        return list(self._orders.values())
+
+    async def poll_once(self):
+        """
+        轮询一次所有待确认订单：每个 (账户, 市场) 查询一次进行中订单和最近结束的订单
+
+        Returns:
+            int: 本次结束的订单数
+        """
+        groups = {}
+        for (account_key, _), order in self._orders.items():
+            groups.setdefault((account_key, order.market_index), []).append(order)
+        if not groups:
+            return 0
+        self.polls += 1
+        before = len(self._orders)
+        await asyncio.gather(*(
+            self._poll_group(account_key, orders[0].api, market_index)
+            for (account_key, market_index), orders in groups.items()
+        ))
+        self._expire()
+        return before - len(self._orders)
+
+    async def _poll_group(self, account_key, api, market_index):
+        active, inactive = await asyncio.gather(
+            api.get_active_orders(market_id=market_index),
+            api.get_inactive_orders(market_id=market_index, limit=self.inactive_limit),
+            return_exceptions=True
+        )
+        for result in (active, inactive):
+            if isinstance(result, BaseException):
+                logger.warning("查询订单状态失败 %s 市场 %s: %s", account_key, market_index, result)
+                continue
+            if not result.get('success', False):
+                continue
+            orders = result.get('orders')
+            for update in getattr(orders, 'orders', orders) or []:
+                self.apply_update(account_key, update)
+
+    def _expire(self, now=None):
+        """超时仍未结束的订单不再跟踪，等待方拿到当前状态"""
+        if now is None:
+            now = time.monotonic()
+        for key, order in list(self._orders.items()):
+            if now - order.submitted_at > self.timeout:
+                del self._orders[key]
+                order.expired = True
+                order.done = True
+                self.expired += 1
+                logger.warning("订单 %s 超过 %s 秒未确认，当前状态: %s",
+                               order.client_order_index, self.timeout, order.state)
+                if not order.future.done():
+                    order.future.set_result(order)
+
+    async def wait(self, order, timeout=None):
+        """
+        等待订单结束
+
+        Args:
+            order (TrackedOrder): track() 返回的订单
+            timeout (float): 等待时间（秒），默认为配置的 timeout
+
+        Returns:
+            TrackedOrder: 订单（超时时 done 为 False，状态为最近一次更新的状态）
+        """
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            await asyncio.wait_for(asyncio.shield(order.future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return order
+
+    async def run(self):
+        """后台任务：有待确认订单时定期轮询，直到被取消"""
+        self.running = True
+        try:
+            while self.running:
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    logger.error("轮询订单状态失败: %s", e)
+        finally:
+            self.running = False
+
+    def snapshot(self):
+        """指标快照"""
+        snapshot = {'pending': len(self._orders), 'expired': self.expired, 'polls': self.polls}
+        snapshot.update(self.counts)
+        return snapshot
@@ -0,0 +1,233 @@
+"""
+对冲交易对的生命周期状态
+
+每个交易对有一个显式的状态机：
+
+    INIT ──> OPENING ──> OPEN ──> CLOSING ──> FLAT
+      │         │                    │          │
+      └─────────┴──────> ERROR <─────┘          └──> OPENING（重新开仓）
+
+- INIT: 刚创建，持仓未知（需要向交易所核对）
+- OPENING / CLOSING: 开仓 / 平仓进行中
+- OPEN: 两条腿都已确认建立
+- FLAT: 本进程确认已平仓（或核对后确认没有持仓）
+- ERROR: 开仓或平仓失败，持仓未知（需要向交易所核对）
+
+状态转换时调用注册的钩子，并记录每个状态累计停留的时间。配置了状态文件时，
+转换后把所有交易对的状态写入一个小 JSON 文件（原子替换），重启后恢复。在事件循环中，
+flush_delay 秒内的所有转换合并为一次写入，写入在线程中执行，不阻塞事件循环。
+恢复的状态只用于跳过不会导致开仓的查询：恢复为 OPEN 的交易对不再核对持仓、不重复开仓，
+其他恢复的状态仍按 INIT 核对。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PairState:
+    """交易对状态"""
+
+    INIT = 'init'
+    OPENING = 'opening'
+    OPEN = 'open'
+    CLOSING = 'closing'
+    FLAT = 'flat'
+    ERROR = 'error'
+
+    ALL = (INIT, OPENING, OPEN, CLOSING, FLAT, ERROR)
+
+
+# 允许的状态转换（OPENING -> FLAT 表示开仓在提交订单前失败）
+TRANSITIONS = {
+    PairState.INIT: {PairState.OPENING, PairState.OPEN, PairState.CLOSING, PairState.FLAT, PairState.ERROR},
+    PairState.OPENING: {PairState.OPEN, PairState.FLAT, PairState.ERROR},
+    PairState.OPEN: {PairState.CLOSING, PairState.ERROR},
+    PairState.CLOSING: {PairState.FLAT, PairState.OPEN, PairState.ERROR},
+    PairState.FLAT: {PairState.OPENING, PairState.OPEN, PairState.CLOSING, PairState.ERROR},
+    PairState.ERROR: {PairState.OPENING, PairState.OPEN, PairState.CLOSING, PairState.FLAT},
+}
+
+# 不需要止损检查的状态：已平仓没有持仓；开仓、平仓进行中由对应流程处理
+UNMONITORED_STATES = (PairState.FLAT, PairState.OPENING, PairState.CLOSING)
+
+
+class PairStateStore:
+    """把所有交易对的状态保存到一个 JSON 文件"""
+
+    def __init__(self, path, flush_delay=0.5):
+        """
+        Args:
+            path (str): 状态文件路径
+            flush_delay (float): 在事件循环中合并写入的延迟（秒）
+        """
+        self.path = path
+        self.flush_delay = flush_delay
+        self.states = self._load()
+        self.writes = 0
+        self._dirty = False
+        self._flush_task = None
+        self._write_lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("读取交易对状态文件失败 %s: %s", self.path, e)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, pair_id):
+        """交易对上次保存的状态（没有时为 None）"""
+        entry = self.states.get(pair_id)
+        if not isinstance(entry, dict) or entry.get('state') not in PairState.ALL:
+            return None
+        return entry['state']
+
+    def save(self, pair_id, state):
+        """
+        保存一个交易对的状态
+
+        在事件循环中只标记为待写入，flush_delay 秒后合并写入；不在事件循环中时立即写入。
+        """
+        self.states[pair_id] = {'state': state, 'updated_at': time.time()}
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_pending()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+        except asyncio.CancelledError:
+            # 事件循环结束前取消时同步写入，避免丢失最后的状态
+            self._write_pending()
+            raise
+
+    async def flush(self):
+        """在线程中写入待写入的状态"""
+        while self._dirty:
+            await asyncio.to_thread(self._write_pending)
+
+    def _write_pending(self):
+        """写入所有交易对的最新状态（写入临时文件后原子替换），写入之间互斥"""
+        with self._write_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            states = dict(self.states)
+            temp_path = f"{self.path}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(states, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+                self.writes += 1
+            except OSError as e:
+                logger.error("保存交易对状态失败 %s: %s", self.path, e)
+
+
+class PairLifecycle:
+    """单个交易对的状态机"""
+
+    def __init__(self, pair_id, store=None):
+        """
+        Args:
+            pair_id (str): 交易对ID
+            store (PairStateStore): 状态存储（可选）
+        """
+        self.pair_id = pair_id
+        self.state = PairState.INIT
+        self.restored = None  # 从状态文件恢复的状态
+        self.store = None
+        self.entered_at = time.monotonic()
+        self.time_in_state = {state: 0.0 for state in PairState.ALL}
+        self.transitions = 0
+        self.rejected = 0
+        self.hooks = []
+        if store is not None:
+            self.attach(store)
+
+    def attach(self, store):
+        """
+        使用状态存储，并恢复上次保存的状态
+
+        Returns:
+            str or None: 恢复的状态
+        """
+        self.store = store
+        self.restored = store.get(self.pair_id)
+        if self.restored == PairState.OPEN and self.state == PairState.INIT:
+            self.state = PairState.OPEN
+            logger.info("交易对 %s 恢复状态: %s", self.pair_id, self.restored)
+        return self.restored
+
+    def add_hook(self, hook):
+        """
+        注册状态转换钩子
+
+        Args:
+            hook: hook(pair_id, old_state, new_state, duration, reason)，duration 为离开的状态停留的时间（秒）
+        """
+        self.hooks.append(hook)
+
+    def transition(self, new_state, reason=None):
+        """
+        转换到新状态
+
+        Args:
+            new_state (str): PairState 中的状态
+            reason (str): 转换原因（记录日志、传给钩子）
+
+        Returns:
+            bool: 是否转换（不允许的转换被拒绝并记录警告；与当前状态相同时不转换）
+        """
+        old_state = self.state
+        if new_state == old_state:
+            return False
+        if new_state not in TRANSITIONS[old_state]:
+            self.rejected += 1
+            logger.warning("交易对 %s 不允许的状态转换: %s -> %s", self.pair_id, old_state, new_state)
+            return False
+        now = time.monotonic()
+        duration = now - self.entered_at
+        self.time_in_state[old_state] += duration
+        self.state = new_state
+        self.entered_at = now
+        self.transitions += 1
+        logger.info("交易对 %s 状态: %s -> %s (%.3f 秒)%s", self.pair_id, old_state, new_state, duration,
+                    f": {reason}" if reason else "")
+        if self.store is not None:
+            self.store.save(self.pair_id, new_state)
+        for hook in self.hooks:
+            try:
+                hook(self.pair_id, old_state, new_state, duration, reason)
+            except Exception as e:
+                logger.error("状态转换钩子失败 %s: %s", self.pair_id, e)
+        return True
+
+    def snapshot(self, now=None):
+        """指标快照"""
+        if now is None:
+            now = time.monotonic()
+        time_in_state = dict(self.time_in_state)
+        time_in_state[self.state] += now - self.entered_at
+        return {
+            'state': self.state,
+            'state_age': now - self.entered_at,
+            'transitions': self.transitions,
+            'rejected': self.rejected,
+            'time_in_state': time_in_state,
+        }
@@ -0,0 +1,440 @@
+"""
+策略参数扫描工具
+
+对 config.yaml 中的 stop_loss_threshold / leverage / position_size 进行网格搜索或随机搜索，
+使用 HedgePair 的止损判定规则在历史行情数据上回放每组参数，并输出按收益排序的结果。
+
+行情数据写入临时文件后以内存映射方式在进程池中共享，每个工作进程只读映射同一份数据，
+不会为每组参数复制行情。
+
+使用方法:
+    uv run python -m src.param_sweep --ticks ticks.csv --grid sweep.yaml --config config.yaml
+"""
+
+import argparse
+import csv
+import itertools
+import logging
+import math
+import mmap
+import os
+import random
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from src.hedge_trader import stop_loss_triggered
+from src.logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+SWEEP_KEYS = ('stop_loss_threshold', 'leverage', 'position_size')
+
+# 分块极值的块大小：整块都在强平区间内时可以整块跳过
+BLOCK_SIZE = 64
+
+# 工作进程内的共享状态（由 _init_worker 设置）
+_worker_mmap = None
+_worker_prices = None
+_worker_sim_params = None
+_worker_blocks = None
+_worker_cache = {}
+
+
+def load_ticks(ticks_path):
+    """
+    加载历史行情数据
+
+    Args:
+        ticks_path (str): CSV 文件路径，需包含 price 列（可选 timestamp 列）
+
+    Returns:
+        array: 价格序列 (array('d'))
+    """
+    if not os.path.exists(ticks_path):
+        raise FileNotFoundError(f"行情数据文件 {ticks_path} 不存在")
+
+    prices = array('d')
+    with open(ticks_path, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.DictReader(file)
+        if not reader.fieldnames or 'price' not in reader.fieldnames:
+            raise ValueError(f"行情数据文件 {ticks_path} 缺少 price 列")
+        for row in reader:
+            prices.append(float(row['price']))
+
+    if len(prices) < 2:
+        raise ValueError(f"行情数据文件 {ticks_path} 至少需要2条数据")
+    return prices
+
+
+def _expand_values(name, spec):
+    """将网格搜索的参数定义展开为取值列表"""
+    if isinstance(spec, list):
+        return spec
+    if isinstance(spec, dict) and {'min', 'max', 'step'} <= spec.keys():
+        count = int(math.floor((spec['max'] - spec['min']) / spec['step'] + 1e-9)) + 1
+        return [spec['min'] + i * spec['step'] for i in range(count)]
+    if isinstance(spec, (int, float)):
+        return [spec]
+    raise ValueError(f"参数 {name} 的网格定义无效: {spec}")
+
+
+def _sample_value(name, spec, rng):
+    """按随机搜索的参数定义采样一个取值"""
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    if isinstance(spec, dict) and {'min', 'max'} <= spec.keys():
+        value = rng.uniform(spec['min'], spec['max'])
+        if 'step' in spec:
+            value = spec['min'] + round((value - spec['min']) / spec['step']) * spec['step']
+        return value
+    if isinstance(spec, (int, float)):
+        return spec
+    raise ValueError(f"参数 {name} 的随机搜索定义无效: {spec}")
+
+
+def build_combinations(sweep_config, base_config=None):
+    """
+    根据扫描配置生成参数组合
+
+    Args:
+        sweep_config (dict): 扫描配置，包含 mode (grid/random)、params、samples、seed
+        base_config (dict): 基础配置，未扫描的参数取其中的值
+
+    Returns:
+        list: 参数组合列表，每项为包含 SWEEP_KEYS 的字典
+    """
+    base_config = base_config or {}
+    params = sweep_config.get('params', {})
+    mode = sweep_config.get('mode', 'grid')
+
+    unknown = set(params) - set(SWEEP_KEYS)
+    if unknown:
+        raise ValueError(f"不支持扫描的参数: {', '.join(sorted(unknown))}")
+
+    specs = {}
+    for key in SWEEP_KEYS:
+        if key in params:
+            specs[key] = params[key]
+        elif key in base_config:
+            specs[key] = [base_config[key]]
+        else:
+            raise ValueError(f"参数 {key} 既未在扫描配置中定义，也不在基础配置中")
+
+    if mode == 'grid':
+        value_lists = [_expand_values(key, specs[key]) for key in SWEEP_KEYS]
+        return [dict(zip(SWEEP_KEYS, values)) for values in itertools.product(*value_lists)]
+    if mode == 'random':
+        rng = random.Random(sweep_config.get('seed'))
+        samples = int(sweep_config.get('samples', 1000))
+        return [
+            {key: _sample_value(key, specs[key], rng) for key in SWEEP_KEYS}
+            for _ in range(samples)
+        ]
+    raise ValueError(f"不支持的扫描模式: {mode}，仅支持 'grid' 或 'random'")
+
+
+def build_blocks(prices, block_size=BLOCK_SIZE):
+    """
+    预计算每个块的最低价和最高价
+
+    Args:
+        prices: 价格序列
+        block_size (int): 块大小
+
+    Returns:
+        tuple: (block_size, 块最低价列表, 块最高价列表)
+    """
+    block_min = []
+    block_max = []
+    for start in range(0, len(prices), block_size):
+        block = prices[start:start + block_size]
+        block_min.append(min(block))
+        block_max.append(max(block))
+    return block_size, block_min, block_max
+
+
+def simulate_normalized(prices, leverage, stop_ratio, fee_rate=0.0, maintenance_margin=0.0,
+                        blocks=None):
+    """
+    以单位名义金额回放对冲交易对
+
+    两条腿同价开仓，任一腿价格波动超过保证金时被强平；之后浮动盈亏按
+    stop_loss_triggered 判定止损，平仓后在下一条行情重新开仓。
+    所有金额以 1 USD 名义金额为单位，因此结果只依赖 (leverage, stop_ratio)。
+
+    Args:
+        prices: 价格序列（支持 array/memoryview/list）
+        leverage (float): 杠杆倍数
+        stop_ratio (float): 止损阈值 / 开仓金额
+        fee_rate (float): 单边手续费率
+        maintenance_margin (float): 维持保证金率
+        blocks (tuple): build_blocks 的结果，默认现场计算
+
+    Returns:
+        dict: 单位名义金额下的 net_pnl、max_drawdown、volume 以及 cycles/stops/liquidations 次数
+    """
+    n = len(prices)
+    block_size, block_min, block_max = blocks or build_blocks(prices)
+    margin = 1.0 / leverage
+    liq_move = max(margin - maintenance_margin, 0.0)
+
+    realized = 0.0
+    peak = 0.0
+    max_drawdown = 0.0
+    volume = 0.0
+    cycles = stops = liquidations = 0
+
+    i = 0
+    while i < n:
+        p0 = prices[i]
+        lo = p0 * (1 - liq_move)
+        hi = p0 * (1 + liq_move)
+        cycles += 1
+        realized -= 2 * fee_rate
+        volume += 2
+
+        long_alive = short_alive = True
+        dead_pnl = 0.0
+        unrealized = 0.0
+        j = i + 1
+        next_open = n
+        while j < n:
+            # 两条腿都在时浮动盈亏恒为0，只需检查是否进入强平区间
+            if long_alive and short_alive:
+                if j % block_size == 0:
+                    block = j // block_size
+                    if block_min[block] > lo and block_max[block] < hi:
+                        j += block_size
+                        continue
+                p = prices[j]
+                if lo < p < hi:
+                    j += 1
+                    continue
+            else:
+                p = prices[j]
+
+            if long_alive and p <= lo:
+                long_alive = False
+                dead_pnl -= margin
+                liquidations += 1
+            if short_alive and p >= hi:
+                short_alive = False
+                dead_pnl -= margin
+                liquidations += 1
+
+            ret = (p - p0) / p0
+            unrealized = dead_pnl
+            if long_alive:
+                unrealized += ret
+            if short_alive:
+                unrealized -= ret
+
+            equity = realized + unrealized
+            if equity > peak:
+                peak = equity
+            elif peak - equity > max_drawdown:
+                max_drawdown = peak - equity
+
+            triggered = stop_loss_triggered(unrealized, stop_ratio)
+            if triggered or not (long_alive or short_alive):
+                alive_legs = long_alive + short_alive
+                realized += unrealized - alive_legs * fee_rate
+                volume += alive_legs
+                unrealized = 0.0
+                if triggered:
+                    stops += 1
+                next_open = j + 1
+                break
+            j += 1
+
+        if next_open >= n:
+            # 回放结束时按最后价格计算未平仓盈亏
+            realized += unrealized
+            break
+        i = next_open
+
+    equity = realized
+    if peak - equity > max_drawdown:
+        max_drawdown = peak - equity
+
+    return {
+        'net_pnl': realized,
+        'max_drawdown': max_drawdown,
+        'volume': volume,
+        'cycles': cycles,
+        'stops': stops,
+        'liquidations': liquidations,
+    }
+
+
+def evaluate_combination(prices, combination, fee_rate=0.0, maintenance_margin=0.0, cache=None,
+                         blocks=None):
+    """
+    评估单组参数
+
+    Args:
+        prices: 价格序列
+        combination (dict): 参数组合
+        fee_rate (float): 单边手续费率
+        maintenance_margin (float): 维持保证金率
+        cache (dict): 以 (leverage, stop_ratio) 为键的回放结果缓存
+        blocks (tuple): build_blocks 的结果
+
+    Returns:
+        dict: 参数组合及以 USD 计的回测指标
+    """
+    position_size = float(combination['position_size'])
+    leverage = float(combination['leverage'])
+    stop_ratio = abs(float(combination['stop_loss_threshold'])) / position_size
+
+    key = (leverage, stop_ratio)
+    stats = cache.get(key) if cache is not None else None
+    if stats is None:
+        stats = simulate_normalized(prices, leverage, stop_ratio, fee_rate, maintenance_margin, blocks)
+        if cache is not None:
+            cache[key] = stats
+
+    result = dict(combination)
+    result.update({
+        'net_pnl': stats['net_pnl'] * position_size,
+        'max_drawdown': stats['max_drawdown'] * position_size,
+        'volume': stats['volume'] * position_size,
+        'cycles': stats['cycles'],
+        'stops': stats['stops'],
+        'liquidations': stats['liquidations'],
+    })
+    return result
+
+
+def _init_worker(prices_path, sim_params):
+    """工作进程初始化：只读映射共享行情文件"""
+    global _worker_mmap, _worker_prices, _worker_sim_params, _worker_blocks
+    with open(prices_path, 'rb') as file:
+        _worker_mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_prices = memoryview(_worker_mmap).cast('d')
+    _worker_blocks = build_blocks(_worker_prices)
+    _worker_sim_params = sim_params
+    _worker_cache.clear()
+
+
+def _evaluate_chunk(combinations):
+    """在工作进程中评估一批参数组合"""
+    return [
+        evaluate_combination(_worker_prices, combination, cache=_worker_cache, blocks=_worker_blocks,
+                             **_worker_sim_params)
+        for combination in combinations
+    ]
+
+
+def run_sweep(prices, combinations, workers=None, fee_rate=0.0, maintenance_margin=0.0,
+              rank_by='net_pnl'):
+    """
+    并行执行参数扫描
+
+    Args:
+        prices (array): 价格序列 (array('d'))
+        combinations (list): 参数组合列表
+        workers (int): 进程数，默认使用全部CPU核心
+        fee_rate (float): 单边手续费率
+        maintenance_margin (float): 维持保证金率
+        rank_by (str): 排序指标（降序）
+
+    Returns:
+        list: 按 rank_by 降序排列的评估结果
+    """
+    if not combinations:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    sim_params = {'fee_rate': fee_rate, 'maintenance_margin': maintenance_margin}
+
+    # 相同 (leverage, stop_ratio) 的组合放在同一批次以命中工作进程缓存
+    ordered = sorted(
+        combinations,
+        key=lambda c: (float(c['leverage']), abs(float(c['stop_loss_threshold'])) / float(c['position_size']))
+    )
+    chunk_size = max(1, math.ceil(len(ordered) / (workers * 4)))
+    chunks = [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+
+    fd, prices_path = tempfile.mkstemp(prefix='sweep_ticks_', suffix='.bin')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            prices.tofile(file)
+
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(prices_path, sim_params)) as executor:
+            for chunk_results in executor.map(_evaluate_chunk, chunks):
+                results.extend(chunk_results)
+    finally:
+        os.remove(prices_path)
+
+    results.sort(key=lambda r: r[rank_by], reverse=True)
+    return results
+
+
+def write_results(results, output_path):
+    """将扫描结果写入CSV文件"""
+    if not results:
+        return
+    with open(output_path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="对冲策略参数扫描")
+    parser.add_argument('--ticks', required=True, help="历史行情CSV文件（包含 price 列）")
+    parser.add_argument('--grid', required=True, help="扫描配置YAML文件")
+    parser.add_argument('--config', help="基础配置文件，未扫描的参数取其中的值")
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认CPU核心数）")
+    parser.add_argument('--top', type=int, default=20, help="输出排名前N的结果")
+    parser.add_argument('--output', help="将全部排序结果写入CSV文件")
+    args = parser.parse_args(argv)
+    configure_logging({'format': 'text'})
+
+    with open(args.grid, 'r', encoding='utf-8') as file:
+        sweep_config = yaml.safe_load(file) or {}
+
+    base_config = None
+    if args.config:
+        from src.config_manager import load_config
+        base_config = load_config(args.config)
+
+    prices = load_ticks(args.ticks)
+    combinations = build_combinations(sweep_config, base_config)
+    logger.info("开始参数扫描: %s 组参数, %s 条行情", len(combinations), len(prices))
+
+    started = time.perf_counter()
+    results = run_sweep(
+        prices,
+        combinations,
+        workers=args.workers,
+        fee_rate=sweep_config.get('fee_rate', 0.0),
+        maintenance_margin=sweep_config.get('maintenance_margin', 0.0),
+        rank_by=sweep_config.get('rank_by', 'net_pnl'),
+    )
+    logger.info("参数扫描完成，耗时 %.1f 秒", time.perf_counter() - started)
+
+    print(f"{'排名':<4} {'止损阈值':>10} {'杠杆':>6} {'开仓金额':>10} {'净盈亏':>12} "
+          f"{'最大回撤':>10} {'止损次数':>8} {'强平次数':>8}")
+    for rank, result in enumerate(results[:args.top], start=1):
+        print(f"{rank:<4} {result['stop_loss_threshold']:>10.2f} {result['leverage']:>6.1f} "
+              f"{result['position_size']:>10.2f} {result['net_pnl']:>12.2f} "
+              f"{result['max_drawdown']:>10.2f} {result['stops']:>8} {result['liquidations']:>8}")
+
+    if args.output:
+        write_results(results, args.output)
+        logger.info("扫描结果已写入 %s", args.output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
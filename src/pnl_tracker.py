@@ -0,0 +1,300 @@
+"""
+盈亏记账与时间序列存储
+
+每次止损检查后按交易对的每条腿记录一个盈亏样本，包含四个分量：
+
+- realized: 已实现盈亏（持仓的 realized_pnl）
+- unrealized: 浮动盈亏（持仓的 unrealized_pnl）
+- funding: 资金费（持仓的 total_funding_paid_out 取负，SDK 未提供时为 0）
+- fees: 手续费估算（交易对累计成交金额 × fee_bps）
+
+最近的样本保存在每条腿一个的环形缓冲区中；后台任务定期把样本按 resolution 降采样
+（每个时间桶取最后一个样本）写入 sqlite，写入在线程中执行，不阻塞事件循环。
+query() 合并数据库中的历史和内存中的新样本，按请求的分辨率返回时间序列，
+例如"交易对 X 最近24小时每分钟的盈亏"，无需扫描原始日志。在事件循环中使用 query_async()：
+内存中的样本在事件循环线程中复制，只有数据库读取在线程中执行。
+"""
+
+import asyncio
+import collections
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = ('realized', 'unrealized', 'funding', 'fees')
+LEGS = ('long', 'short')
+
+
+class PnlSample:
+    """一条腿在某一时刻的盈亏分量"""
+
+    __slots__ = ('timestamp',) + COMPONENTS
+
+    def __init__(self, timestamp, realized=0.0, unrealized=0.0, funding=0.0, fees=0.0):
+        self.timestamp = timestamp
+        self.realized = realized
+        self.unrealized = unrealized
+        self.funding = funding
+        self.fees = fees
+
+    @property
+    def total(self):
+        """净盈亏（手续费为成本）"""
+        return self.realized + self.unrealized + self.funding - self.fees
+
+    def to_dict(self):
+        result = {'timestamp': self.timestamp}
+        result.update((component, getattr(self, component)) for component in COMPONENTS)
+        result['total'] = self.total
+        return result
+
+
+def downsample(samples, resolution):
+    """
+    按时间桶降采样（每个桶取最后一个样本）
+
+    Args:
+        samples: 按时间排序的 PnlSample
+        resolution (float): 时间桶长度（秒）
+
+    Returns:
+        dict: 桶开始时间 -> PnlSample
+    """
+    buckets = {}
+    for sample in samples:
+        buckets[sample.timestamp // resolution * resolution] = sample
+    return buckets
+
+
+class PnlTracker:
+    """按交易对和腿记录盈亏分量"""
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict): pnl 配置段
+                - ring_size: 每条腿在内存中保留的样本数，默认4096
+                - database: sqlite 数据库路径，默认不持久化
+                - persist_interval: 写入数据库的间隔（秒），默认60
+                - resolution: 写入数据库时的降采样分辨率（秒），默认60
+                - retention_days: 数据库保留天数，默认30
+                - fee_bps: 手续费率（基点），用于按成交金额估算手续费，默认0
+        """
+        config = config or {}
+        self.ring_size = config.get('ring_size', 4096)
+        self.database = config.get('database')
+        self.persist_interval = config.get('persist_interval', 60)
+        self.resolution = config.get('resolution', 60)
+        self.retention_days = config.get('retention_days', 30)
+        self.fee_bps = config.get('fee_bps', 0)
+
+        self._rings = {}            # (交易对, 腿) -> deque[PnlSample]
+        self._persisted_until = {}  # (交易对, 腿) -> 已写入数据库的最后一个样本时间
+        self._connection = None
+        self._db_lock = threading.Lock()
+        self.running = False
+
+    def record(self, pair, components, traded_notional=0.0, timestamp=None):
+        """
+        记录交易对一次检查的盈亏分量
+
+        Args:
+            pair (str): 交易对名称
+            components (dict): 腿 -> {'realized', 'unrealized', 'funding'}
+            traded_notional (float): 交易对每条腿的累计成交金额（USD），用于估算手续费
+            timestamp (float): Unix 时间戳，默认当前时间
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        fees = traded_notional * self.fee_bps / 10000 if self.fee_bps else 0.0
+        for leg, values in components.items():
+            ring = self._rings.get((pair, leg))
+            if ring is None:
+                ring = self._rings[(pair, leg)] = collections.deque(maxlen=self.ring_size)
+            ring.append(PnlSample(
+                timestamp,
+                realized=values.get('realized', 0.0),
+                unrealized=values.get('unrealized', 0.0),
+                funding=values.get('funding', 0.0),
+                fees=fees,
+            ))
+
+    def latest(self, pair):
+        """
+        交易对最近一次记录的盈亏
+
+        Returns:
+            dict or None: 腿 -> 分量字典，另含合计 'total'
+        """
+        result = {}
+        for leg in LEGS:
+            ring = self._rings.get((pair, leg))
+            if ring:
+                result[leg] = ring[-1].to_dict()
+        if not result:
+            return None
+        result['total'] = sum(values['total'] for values in result.values())
+        return result
+
+    def pairs(self):
+        """有记录的交易对名称"""
+        return sorted({pair for pair, _ in self._rings})
+
+    def query(self, pair, start, end=None, resolution=60):
+        """
+        查询交易对在时间范围内的盈亏时间序列
+
+        Args:
+            pair (str): 交易对名称
+            start (float): 开始时间（Unix 时间戳）
+            end (float): 结束时间，默认当前时间
+            resolution (float): 分辨率（秒）
+
+        Returns:
+            list: [{'timestamp': 桶开始时间, 'realized', 'unrealized', 'funding', 'fees', 'total'}, ...]
+                  每个桶是两条腿在桶内最后一个样本之和；某条腿在桶内没有样本时沿用其上一个值
+        """
+        if end is None:
+            end = time.time()
+        recent = self._recent(pair, start, end)
+        return self._series(self._load_history(pair, start, end, recent), recent, resolution)
+
+    async def query_async(self, pair, start, end=None, resolution=60):
+        """
+        同 query()，供事件循环中调用：内存中的样本在事件循环线程中复制，只有数据库读取在线程中执行，
+        避免在其他线程遍历 record() 正在追加的环形缓冲区
+        """
+        if end is None:
+            end = time.time()
+        recent = self._recent(pair, start, end)
+        history = await asyncio.to_thread(self._load_history, pair, start, end, recent)
+        return self._series(history, recent, resolution)
+
+    def _recent(self, pair, start, end):
+        """
+        复制内存中时间范围内的样本
+
+        Returns:
+            dict: 腿 -> (时间范围内的样本列表, 环形缓冲区中最早样本的时间或 None)
+        """
+        recent = {}
+        for leg in LEGS:
+            ring = self._rings.get((pair, leg))
+            if not ring:
+                recent[leg] = ([], None)
+                continue
+            recent[leg] = ([sample for sample in ring if start <= sample.timestamp <= end], ring[0].timestamp)
+        return recent
+
+    def _load_history(self, pair, start, end, recent):
+        """读取每条腿在数据库中的样本（内存中仍有的时间段直接使用内存中的原始样本）"""
+        return {leg: self._load(pair, leg, start, end, recent[leg][1]) for leg in LEGS}
+
+    @staticmethod
+    def _series(history, recent, resolution):
+        """合并数据库和内存中的样本，按分辨率生成时间序列"""
+        legs = {}
+        for leg in LEGS:
+            samples = history[leg] + recent[leg][0]
+            samples.sort(key=lambda sample: sample.timestamp)
+            legs[leg] = downsample(samples, resolution)
+
+        series = []
+        last = {}
+        for bucket in sorted(set().union(*legs.values())):
+            for leg, buckets in legs.items():
+                if bucket in buckets:
+                    last[leg] = buckets[bucket]
+            point = {'timestamp': bucket}
+            for component in COMPONENTS:
+                point[component] = sum(getattr(sample, component) for sample in last.values())
+            point['total'] = sum(sample.total for sample in last.values())
+            series.append(point)
+        return series
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.database, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pnl_samples ("
+                " pair TEXT NOT NULL, leg TEXT NOT NULL, bucket REAL NOT NULL, timestamp REAL NOT NULL,"
+                " realized REAL, unrealized REAL, funding REAL, fees REAL,"
+                " PRIMARY KEY (pair, leg, bucket))"
+            )
+        return self._connection
+
+    def _load(self, pair, leg, start, end, ring_start=None):
+        """从数据库读取一条腿在时间范围内已降采样的样本（未配置数据库时为空），不读取 ring_start 之后的样本"""
+        if self.database is None:
+            return []
+        if ring_start is not None:
+            end = min(end, ring_start - 1e-6)
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT timestamp, realized, unrealized, funding, fees FROM pnl_samples"
+                " WHERE pair = ? AND leg = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp",
+                (pair, leg, start, end)
+            ).fetchall()
+        return [PnlSample(*row) for row in rows]
+
+    def _pending_rows(self):
+        """尚未写入数据库的样本（按 resolution 降采样）"""
+        rows = []
+        marks = {}
+        for (pair, leg), ring in self._rings.items():
+            persisted = self._persisted_until.get((pair, leg), float('-inf'))
+            pending = [sample for sample in ring if sample.timestamp > persisted]
+            if not pending:
+                continue
+            for bucket, sample in downsample(pending, self.resolution).items():
+                rows.append((pair, leg, bucket, sample.timestamp, sample.realized, sample.unrealized,
+                             sample.funding, sample.fees))
+            marks[(pair, leg)] = pending[-1].timestamp
+        return rows, marks
+
+    def _write(self, rows):
+        with self._db_lock:
+            connection = self._connect()
+            with connection:
+                # 同一时间桶保留最新的样本
+                connection.executemany(
+                    "INSERT OR REPLACE INTO pnl_samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                connection.execute(
+                    "DELETE FROM pnl_samples WHERE timestamp < ?",
+                    (time.time() - self.retention_days * 86400,)
+                )
+
+    async def flush(self):
+        """把新样本降采样后写入数据库（未配置数据库时不做任何事）"""
+        if self.database is None:
+            return 0
+        rows, marks = self._pending_rows()
+        if not rows:
+            return 0
+        await asyncio.to_thread(self._write, rows)
+        self._persisted_until.update(marks)
+        return len(rows)
+
+    async def run(self):
+        """后台任务：定期写入数据库，直到被取消"""
+        self.running = True
+        try:
+            while self.running:
+                await asyncio.sleep(self.persist_interval)
+                try:
+                    await self.flush()
+                except (sqlite3.Error, OSError) as e:
+                    logger.error("写入盈亏数据失败: %s", e)
+        finally:
+            self.running = False
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,158 @@
+"""
+报价质量检查
+
+get_market_price 的报价直接决定开仓数量。单个异常的订单簿快照（单边、价差异常、过期数据、
+偏离正常价格的跳价）会导致下错数量，之后还要靠再平衡修正。QuoteGuard 在使用报价前检查：
+
+- 单边订单簿或买卖价交叉
+- 报价年龄超过 max_age（本地订单簿距最近一次更新的时间）
+- 买卖价差超过 max_spread_bps
+- 中间价偏离同一市场最近 window 个已接受报价的中位数超过 max_deviation_bps
+
+检查只使用内存中最近的报价，不发起额外请求。被拒绝的报价不计入中位数；
+连续 min_samples 个互相一致的偏离报价视为价格确实发生了变化，以它们重建历史。
+同一次订单簿更新只检查一次：重复读取同一份订单簿时直接返回该次更新的检查结果，
+不重复计入历史或连续偏离（否则一个异常快照被读取 min_samples 次就会被当作新价格接受）。
+"""
+
+import collections
+import logging
+import statistics
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteGuard:
+    """按市场检查报价质量"""
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict): quote_guard 配置段
+                - enabled: 是否启用，默认启用（关闭时仍拒绝单边和交叉的报价）
+                - max_age: 报价最大年龄（秒），默认10
+                - max_spread_bps: 最大买卖价差（基点），默认200
+                - max_deviation_bps: 中间价偏离中位数的上限（基点），默认500
+                - window: 计算中位数的最近报价数，默认20
+                - min_samples: 开始检查偏离所需的报价数，默认5
+        """
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.max_age = config.get('max_age', 10)
+        self.max_spread_bps = config.get('max_spread_bps', 200)
+        self.max_deviation_bps = config.get('max_deviation_bps', 500)
+        self.window = config.get('window', 20)
+        self.min_samples = config.get('min_samples', 5)
+        self._history = {}   # 市场ID -> 最近接受的中间价
+        self._outliers = {}  # 市场ID -> 连续偏离的中间价
+        self._checked = {}   # 市场ID -> (订单簿更新标识, 检查结果)
+        self.accepted = 0
+        self.rejected = collections.Counter()  # 拒绝原因 -> 次数
+
+    def _reject(self, market_id, reason, message):
+        self.rejected[reason] += 1
+        logger.warning("市场 %s 报价被拒绝: %s", market_id, message)
+        return message
+
+    def check(self, market_id, bid, ask, age=None, update=None):
+        """
+        检查一个报价
+
+        Args:
+            market_id: 市场ID
+            bid (float): 最优买价（没有买盘时为 None）
+            ask (float): 最优卖价（没有卖盘时为 None）
+            age (float): 报价年龄（秒）
+            update: 报价所属订单簿更新的标识（可选），与上一次检查相同时直接返回上一次的结果
+
+        Returns:
+            str or None: 拒绝原因，报价可用时返回 None
+        """
+        if update is not None:
+            cached = self._checked.get(market_id)
+            if cached is not None and cached[0] == update:
+                error = cached[1]
+                if error is None and self.enabled and age is not None and age > self.max_age:
+                    return self._reject(market_id, 'stale', f"报价已过期 ({age:.1f} 秒)")
+                return error
+        error = self._check(market_id, bid, ask, age)
+        if update is not None:
+            self._checked[market_id] = (update, error)
+        return error
+
+    def _check(self, market_id, bid, ask, age):
+        if bid is None or ask is None:
+            return self._reject(market_id, 'one_sided', "订单簿只有单边报价")
+        if bid <= 0 or bid >= ask:
+            return self._reject(market_id, 'crossed', f"买卖价无效 (买 {bid}, 卖 {ask})")
+        if not self.enabled:
+            return None
+        if age is not None and age > self.max_age:
+            return self._reject(market_id, 'stale', f"报价已过期 ({age:.1f} 秒)")
+        mid = (bid + ask) / 2
+        spread_bps = (ask - bid) / mid * 10000
+        if spread_bps > self.max_spread_bps:
+            return self._reject(market_id, 'wide_spread', f"买卖价差过大 ({spread_bps:.0f} bps)")
+
+        history = self._history.setdefault(market_id, collections.deque(maxlen=self.window))
+        if len(history) >= self.min_samples:
+            median = statistics.median(history)
+            deviation_bps = abs(mid - median) / median * 10000
+            if deviation_bps > self.max_deviation_bps:
+                outliers = self._outliers.setdefault(market_id, collections.deque(maxlen=self.min_samples))
+                outliers.append(mid)
+                if not self._consistent(outliers):
+                    return self._reject(
+                        market_id, 'deviation', f"中间价 {mid} 偏离最近中位数 {median} ({deviation_bps:.0f} bps)"
+                    )
+                logger.warning("市场 %s 连续 %s 个报价偏离中位数 %s，以新价格重建历史", market_id, len(outliers), median)
+                history.clear()
+                history.extend(outliers)
+                outliers.clear()
+                self.accepted += 1
+                return None
+        self._outliers.pop(market_id, None)
+        history.append(mid)
+        self.accepted += 1
+        return None
+
+    def _consistent(self, outliers):
+        """连续偏离的报价是否已经足够多且互相一致"""
+        if len(outliers) < self.min_samples:
+            return False
+        median = statistics.median(outliers)
+        return all(abs(mid - median) / median * 10000 <= self.max_deviation_bps for mid in outliers)
+
+    def median(self, market_id):
+        """市场最近接受报价的中间价中位数（没有报价时为 None）"""
+        history = self._history.get(market_id)
+        return statistics.median(history) if history else None
+
+    def snapshot(self):
+        """指标快照"""
+        return {'accepted': self.accepted, 'rejected': dict(self.rejected)}
+
+
+_guards = {}
+
+
+def get_quote_guard(network, config=None):
+    """
+    获取（或创建）网络的报价检查器，同一网络的所有客户端共享报价历史
+
+    Args:
+        network (str): 网络（mainnet / testnet）
+        config (dict): quote_guard 配置段（首次创建时使用）
+
+    Returns:
+        QuoteGuard: 报价检查器
+    """
+    guard = _guards.get(network)
+    if guard is None:
+        guard = _guards[network] = QuoteGuard(config)
+    return guard
+
+
+def all_quote_guards():
+    """所有已创建的报价检查器（网络 -> 检查器）"""
+    return dict(_guards)
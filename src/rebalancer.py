@@ -0,0 +1,298 @@
+"""
+对冲再平衡
+
+部分成交、一条腿下单失败或平仓只成功一半时，两条腿的持仓量会不相等，对冲悄悄变成单边头寸。
+再平衡器定期按带符号的持仓计算每个对冲单元的净敞口，超出容忍区间时下最小数量的只减仓市价单：
+
+- 对冲单元：同一市场上由交易对连接起来的一组账户。多个交易对共用同一账户同一市场时，
+  账户持仓是这些交易对的合计，因此合并为一个单元计算净敞口，每个 (账户, 市场) 最多一笔修正订单
+- 净敞口 = 单元内各账户带符号持仓之和（多为正、空为负），目标为 0
+- 容忍区间：|净敞口| <= tolerance × 单边持仓量时不修正
+- 修正订单只减少较大一侧的持仓（reduce_only），不会重新打开已平掉的腿；
+  数量低于市场 min_base_amount 的修正不提交
+- 同一账户的所有修正订单通过一次批量下单提交，不同账户并发提交
+- 默认关闭：修正会提交真实的市价单，需要在配置中显式启用；市场精度未知时不修正
+"""
+
+import asyncio
+import logging
+import time
+
+from src.account_snapshot import AccountSnapshotService
+from src.fixed_point import to_decimal
+from src.request_scheduler import Lane, request_lane
+
+logger = logging.getLogger(__name__)
+
+account_key = AccountSnapshotService.account_key
+
+
+class HedgeUnit:
+    """同一市场上由交易对连接起来的一组账户"""
+
+    def __init__(self, symbol, market_index):
+        self.symbol = symbol
+        self.market_index = market_index
+        self.accounts = {}  # 账户键 -> API客户端
+        self.pairs = []     # 交易对ID
+
+    def add(self, pair_id, api_long, api_short):
+        self.accounts.setdefault(account_key(api_long), api_long)
+        self.accounts.setdefault(account_key(api_short), api_short)
+        if pair_id not in self.pairs:
+            self.pairs.append(pair_id)
+
+
+def build_units(pairs):
+    """
+    把交易对的各市场按共用的 (账户, 市场) 合并为对冲单元
+
+    Args:
+        pairs (list): 交易对（需要 hedge_markets()、api_long、api_short、pair_id）
+
+    Returns:
+        list: HedgeUnit 列表
+    """
+    parent = {}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    entries = []
+    for pair in pairs:
+        for symbol, market_index in pair.hedge_markets():
+            nodes = [(market_index, account_key(pair.api_long)), (market_index, account_key(pair.api_short))]
+            for node in nodes:
+                parent.setdefault(node, node)
+            parent[find(nodes[1])] = find(nodes[0])
+            entries.append((pair, symbol, market_index, nodes[0]))
+
+    units = {}
+    for pair, symbol, market_index, node in entries:
+        root = find(node)
+        unit = units.get(root)
+        if unit is None:
+            unit = units[root] = HedgeUnit(symbol, market_index)
+        unit.add(pair.pair_id, pair.api_long, pair.api_short)
+    return list(units.values())
+
+
+class Rebalancer:
+    """按净敞口修正对冲头寸"""
+
+    def __init__(self, config=None, account_snapshots=None):
+        """
+        Args:
+            config (dict): rebalance 配置段
+                - enabled: 是否启用，默认关闭
+                - interval: 检查间隔（秒），默认60
+                - tolerance: 容忍区间（净敞口占单边持仓量的比例），默认0.02
+                - slippage_bps: 修正市价单的最差成交价相对当前价格的偏离（基点），默认50
+            account_snapshots (AccountSnapshotService): 账户持仓快照（未设置时直接查询）
+        """
+        config = config or {}
+        self.enabled = config.get('enabled', False)
+        self.interval = config.get('interval', 60)
+        self.tolerance = to_decimal(config.get('tolerance', 0.02))
+        self.slippage_bps = config.get('slippage_bps', 50)
+        self.account_snapshots = account_snapshots
+        self.last_run = None  # time.monotonic()
+        self.orders = 0       # 已提交的修正订单数
+        self.failures = 0     # 失败的修正订单数
+
+    def due(self, now=None):
+        """是否到了下一次检查时间"""
+        if not self.enabled:
+            return False
+        if now is None:
+            now = time.monotonic()
+        return self.last_run is None or now - self.last_run >= self.interval
+
+    async def _positions(self, api):
+        if self.account_snapshots is not None:
+            return await self.account_snapshots.get_positions(api)
+        return await api.get_open_positions(market_index=None)
+
+    async def plan(self, pairs):
+        """
+        计算需要的修正订单（不下单）
+
+        Args:
+            pairs (list): 交易对
+
+        Returns:
+            tuple: (orders, skipped)
+                orders: [{'api', 'account', 'symbol', 'market_index', 'side', 'base_amount', 'net_delta', 'pairs'}, ...]
+                skipped: [{'symbol', 'pairs', 'net_delta', 'reason'}, ...]  超出容忍区间但无法修正的单元
+        """
+        units = build_units(pairs)
+        apis = {}
+        for unit in units:
+            apis.update(unit.accounts)
+        keys = list(apis)
+        results = await asyncio.gather(*(self._positions(apis[key]) for key in keys), return_exceptions=True)
+        positions = {}
+        for key, result in zip(keys, results):
+            if isinstance(result, BaseException) or not result.get('success', False):
+                continue
+            positions[key] = result['positions']
+
+        orders = []
+        skipped = []
+        for unit in units:
+            if any(key not in positions for key in unit.accounts):
+                skipped.append({'symbol': unit.symbol, 'pairs': unit.pairs, 'net_delta': None,
+                                'reason': '持仓查询失败'})
+                continue
+
+            signed = {
+                key: sum(
+                    (position.position_raw for position in positions[key]
+                     if position.market_id == unit.market_index),
+                    to_decimal(0)
+                )
+                for key in unit.accounts
+            }
+            net = sum(signed.values(), to_decimal(0))
+            gross = sum(abs(size) for size in signed.values()) / 2
+            if net == 0 or abs(net) <= self.tolerance * gross:
+                continue
+            scale = self._market_scale(unit)
+            if scale is None:
+                skipped.append({'symbol': unit.symbol, 'pairs': unit.pairs, 'net_delta': float(net),
+                                'reason': '市场精度未知'})
+                continue
+
+            # 净多头时卖出多头账户的持仓，净空头时买回空头账户的持仓，从持仓最大的账户开始
+            side = 'sell' if net > 0 else 'buy'
+            candidates = sorted(
+                (key for key, size in signed.items() if (size > 0 if net > 0 else size < 0)),
+                key=lambda key: abs(signed[key]),
+                reverse=True
+            )
+            remaining = abs(net)
+            for key in candidates:
+                if remaining <= 0:
+                    break
+                amount = min(remaining, abs(signed[key]))
+                remaining -= amount
+                api = unit.accounts[key]
+                base_amount = scale.to_base_amount(amount)
+                if base_amount <= 0 or base_amount < scale.min_base_amount:
+                    skipped.append({'symbol': unit.symbol, 'pairs': unit.pairs, 'net_delta': float(net),
+                                    'reason': f"修正数量 {base_amount} 小于最小基础数量 {scale.min_base_amount}"})
+                    continue
+                orders.append({
+                    'api': api,
+                    'account': api.account_index,
+                    'symbol': unit.symbol,
+                    'market_index': unit.market_index,
+                    'side': side,
+                    'base_amount': base_amount,
+                    'net_delta': float(net),
+                    'pairs': unit.pairs,
+                })
+        return orders, skipped
+
+    @staticmethod
+    def _market_scale(unit):
+        """单元所在市场已获取的定点缩放因子（没有客户端查找过该市场时为 None，不能按默认精度下单）"""
+        for api in unit.accounts.values():
+            scale = api.market_scales.get(unit.market_index)
+            if scale is not None:
+                return scale
+        return None
+
+    async def _worst_prices(self, orders):
+        """每个市场查询一次价格，计算修正市价单的最差成交价（查询失败时不设置）"""
+        markets = {}
+        for order in orders:
+            markets.setdefault(order['market_index'], order['api'])
+        results = await asyncio.gather(
+            *(api.get_market_price(market_index) for market_index, api in markets.items()),
+            return_exceptions=True
+        )
+        prices = {}
+        for market_index, result in zip(markets, results):
+            if not isinstance(result, BaseException) and result.get('success', False) and result['price'] > 0:
+                prices[market_index] = result['price']
+        return prices
+
+    async def _submit_account(self, account_orders, prices):
+        """提交同一账户的所有修正订单（LighterAPI.place_orders 一次批量提交）"""
+        params = []
+        for order in account_orders:
+            price = prices.get(order['market_index'])
+            if price is not None:
+                offset = self.slippage_bps / 10000
+                price = price * (1 + offset) if order['side'] == 'buy' else price * (1 - offset)
+            params.append({
+                'market_index': order['market_index'], 'side': order['side'], 'price': price,
+                'base_amount': order['base_amount'], 'reduce_only': True,
+            })
+        try:
+            return await account_orders[0]['api'].place_orders(params)
+        except Exception as e:
+            return [{'success': False, 'error': str(e)} for _ in account_orders]
+
+    async def rebalance(self, pairs):
+        """
+        检查所有交易对并提交修正订单
+
+        Args:
+            pairs (list): 交易对
+
+        Returns:
+            dict: {
+                'success': bool,      # 所有修正订单是否都提交成功
+                'orders': list,       # 修正订单及提交结果（不含 API 客户端）
+                'skipped': list,      # 超出容忍区间但无法修正的单元
+                'timestamp': float
+            }
+        """
+        self.last_run = time.monotonic()
+        orders, skipped = await self.plan(pairs)
+        for item in skipped:
+            logger.warning("对冲单元 %s %s 无法再平衡: %s", item['symbol'], item['pairs'], item['reason'])
+
+        report = []
+        if orders:
+            by_account = {}
+            for order in orders:
+                by_account.setdefault(account_key(order['api']), []).append(order)
+            with request_lane(Lane.OPEN):
+                prices = await self._worst_prices(orders)
+                batches = list(by_account.values())
+                results = await asyncio.gather(*(self._submit_account(batch, prices) for batch in batches))
+            for batch, batch_results in zip(batches, results):
+                for order, result in zip(batch, batch_results):
+                    entry = {key: value for key, value in order.items() if key != 'api'}
+                    entry['success'] = result.get('success', False)
+                    entry['error'] = result.get('error')
+                    report.append(entry)
+                    self.orders += 1
+                    if entry['success']:
+                        logger.info(
+                            "再平衡 %s %s: 净敞口 %s，账户 %s %s %s",
+                            entry['symbol'], entry['pairs'], entry['net_delta'],
+                            entry['account'], entry['side'], entry['base_amount']
+                        )
+                    else:
+                        self.failures += 1
+                        logger.error(
+                            "再平衡订单失败 %s 账户 %s: %s", entry['symbol'], entry['account'], entry['error']
+                        )
+
+        return {
+            'success': all(entry['success'] for entry in report),
+            'orders': report,
+            'skipped': skipped,
+            'timestamp': time.time(),
+        }
+
+    def snapshot(self):
+        """指标快照"""
+        return {'enabled': self.enabled, 'orders': self.orders, 'failures': self.failures}
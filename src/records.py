@@ -0,0 +1,166 @@
+"""
+紧凑的结果与持仓记录
+
+高频调用（持仓查询、价格查询、下单）返回带 __slots__ 的记录对象而不是字典，
+持仓记录直接包装 SDK 返回的持仓对象，字段在访问时才解析，不复制数据。
+所有记录都兼容原有的字典访问方式（result['success']、result.get(...)、'positions' in result）。
+"""
+
+from src.fixed_point import to_decimal
+
+
+class Record:
+    """带 __slots__ 的记录基类，提供只读的字典式访问"""
+
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._fields:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def keys(self):
+        return self._fields
+
+    def to_dict(self):
+        """转换为字典（用于日志和序列化）"""
+        return {field: getattr(self, field) for field in self._fields}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+
+class OrderResult(Record):
+    """下单/撤单结果"""
+
+    __slots__ = ('success', 'tx', 'tx_hash', 'error', 'timestamp', 'client_order_index')
+    _fields = __slots__
+
+    def __init__(self, success, tx=None, tx_hash=None, error=None, timestamp=None, client_order_index=None):
+        self.success = success
+        self.tx = tx
+        self.tx_hash = tx_hash
+        self.error = error
+        self.timestamp = timestamp
+        self.client_order_index = client_order_index
+
+
+class PriceResult(Record):
+    """价格查询结果"""
+
+    __slots__ = ('success', 'price', 'error', 'timestamp')
+    _fields = __slots__
+
+    def __init__(self, success, price=0, error=None, timestamp=None):
+        self.success = success
+        self.price = price
+        self.error = error
+        self.timestamp = timestamp
+
+
+class Position(Record):
+    """
+    持仓记录（SDK 持仓对象的零拷贝视图）
+
+    只保存原始对象和市场缩放因子，持仓量在首次访问时解析并缓存。
+    """
+
+    __slots__ = ('_raw', '_scale', '_amount')
+    _fields = ('market_id', 'symbol', 'side', 'position', 'position_raw', 'base_amount',
+               'avg_entry_price', 'unrealized_pnl', 'realized_pnl', 'funding_paid')
+
+    def __init__(self, raw, scale=None):
+        self._raw = raw
+        self._scale = scale
+        self._amount = None
+
+    @property
+    def market_id(self):
+        return self._raw.market_id
+
+    @property
+    def symbol(self):
+        return self._raw.symbol
+
+    @property
+    def position_raw(self):
+        """带符号的持仓量（Decimal）"""
+        if self._amount is None:
+            try:
+                self._amount = to_decimal(self._raw.position)
+            except (ArithmeticError, ValueError, TypeError):
+                self._amount = to_decimal(0)
+        return self._amount
+
+    @property
+    def position(self):
+        """持仓量绝对值（Decimal）"""
+        return abs(self.position_raw)
+
+    @property
+    def side(self):
+        return 'long' if self.position_raw > 0 else 'short'
+
+    @property
+    def base_amount(self):
+        """带符号的整数持仓量，未知市场精度时为 None"""
+        if self._scale is None:
+            return None
+        return self._scale.to_base_amount(self.position_raw)
+
+    @property
+    def avg_entry_price(self):
+        return self._raw.avg_entry_price
+
+    @property
+    def unrealized_pnl(self):
+        return self._raw.unrealized_pnl
+
+    @property
+    def realized_pnl(self):
+        return self._raw.realized_pnl
+
+    @property
+    def funding_paid(self):
+        """累计支付的资金费（SDK 未提供时为 None）"""
+        return getattr(self._raw, 'total_funding_paid_out', None)
+
+
+class PositionsResult(Record):
+    """持仓查询结果"""
+
+    __slots__ = ('success', 'positions', 'error', 'timestamp')
+    _fields = __slots__
+
+    def __init__(self, success, positions=(), error=None, timestamp=None):
+        self.success = success
+        self.positions = positions
+        self.error = error
+        self.timestamp = timestamp
+
+    def find(self, symbol=None, market_id=None, side=None):
+        """
+        按条件迭代持仓（不创建新列表）
+
+        Args:
+            symbol (str): 交易对符号
+            market_id: 市场ID
+            side (str): 'long' 或 'short'
+        """
+        for position in self.positions:
+            if symbol is not None and position.symbol != symbol:
+                continue
+            if market_id is not None and position.market_id != market_id:
+                continue
+            if side is not None and position.side != side:
+                continue
+            yield position
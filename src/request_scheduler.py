@@ -0,0 +1,255 @@
+"""
+优先级请求调度
+
+同一代理（出口）上的请求按优先级通道排队，有空闲并发槽位时总是先发出优先级最高的请求：
+
+    EMERGENCY_CLOSE > OPEN > RECONCILE > MONITOR
+
+- 每个通道的队列有容量上限，队列满时拒绝新请求
+- 排队超过期限的请求（如过时的持仓轮询）在发出前直接丢弃，不占用请求配额
+- 紧急平仓可以额外占用预留槽位，不必等待所有在途的读请求完成
+- 每个通道记录提交、完成、失败、丢弃次数和排队等待时间
+
+请求所属的通道由调用方法的默认通道和 request_lane() 绑定的上下文通道中优先级较高者决定，
+例如止损平仓流程中的持仓查询也会走紧急通道。
+"""
+
+import asyncio
+import collections
+import contextvars
+import enum
+import time
+from contextlib import contextmanager
+
+
+class Lane(enum.IntEnum):
+    """请求通道（数值越小优先级越高）"""
+    EMERGENCY_CLOSE = 0
+    OPEN = 1
+    RECONCILE = 2
+    MONITOR = 3
+
+
+# 通道默认配置：max_queue 为 0 表示不限制，deadline 为 None 表示不过期
+LANE_DEFAULTS = {
+    Lane.EMERGENCY_CLOSE: {'max_queue': 0, 'deadline': None},
+    Lane.OPEN: {'max_queue': 1000, 'deadline': None},
+    Lane.RECONCILE: {'max_queue': 1000, 'deadline': 30},
+    Lane.MONITOR: {'max_queue': 1000, 'deadline': 5},
+}
+
+
+class SchedulerError(Exception):
+    """请求未被发出"""
+    pass
+
+
+class QueueFullError(SchedulerError):
+    """通道队列已满"""
+    pass
+
+
+class RequestExpiredError(SchedulerError):
+    """请求排队超过期限，已丢弃"""
+    pass
+
+
+_current_lane = contextvars.ContextVar('request_lane', default=None)
+# 当前任务正在占用槽位的调度器：请求内部再发起的请求（如查询持仓时查询账户）直接执行，避免嵌套排队死锁
+_holding_slot = contextvars.ContextVar('request_scheduler_slot', default=None)
+
+
+@contextmanager
+def request_lane(lane):
+    """
+    在当前上下文（及其创建的任务）中提升请求的通道优先级
+
+    Args:
+        lane (Lane): 通道
+    """
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def effective_lane(default_lane):
+    """方法默认通道与上下文通道中优先级较高的一个"""
+    current = _current_lane.get()
+    return default_lane if current is None else min(default_lane, current)
+
+
+class _LaneStats:
+    __slots__ = ('submitted', 'completed', 'failed', 'rejected', 'expired', 'wait_total', 'wait_max')
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class RequestScheduler:
+    """按优先级通道调度请求（一个代理一个实例）"""
+
+    def __init__(self, config=None, name='direct'):
+        """
+        Args:
+            config (dict): scheduler 配置段
+                - max_concurrent: 同时在途的请求数，默认4
+                - emergency_reserve: 紧急平仓额外可用的槽位，默认1
+                - lanes: 通道名（小写）到 {'max_queue', 'deadline'} 的覆盖配置
+            name (str): 调度器名称（代理名称），用于指标
+        """
+        config = config or {}
+        self.name = name
+        self.max_concurrent = config.get('max_concurrent', 4)
+        self.emergency_reserve = config.get('emergency_reserve', 1)
+        lane_overrides = config.get('lanes', {})
+        self.lane_config = {
+            lane: {**defaults, **lane_overrides.get(lane.name.lower(), {})}
+            for lane, defaults in LANE_DEFAULTS.items()
+        }
+        self._queues = {lane: collections.deque() for lane in Lane}
+        self._stats = {lane: _LaneStats() for lane in Lane}
+        self._active = 0
+
+    async def submit(self, lane, func):
+        """
+        按通道排队执行请求
+
+        Args:
+            lane (Lane): 通道
+            func: 无参协程函数
+
+        Returns:
+            func 的返回值
+
+        Raises:
+            QueueFullError: 通道队列已满
+            RequestExpiredError: 排队超过通道期限
+        """
+        if _holding_slot.get() is self:
+            return await func()
+        lane = Lane(lane)
+        stats = self._stats[lane]
+        queue = self._queues[lane]
+        max_queue = self.lane_config[lane]['max_queue']
+        if max_queue and len(queue) >= max_queue:
+            stats.rejected += 1
+            raise QueueFullError(f"请求通道 {lane.name} 队列已满 ({max_queue})")
+
+        stats.submitted += 1
+        future = asyncio.get_running_loop().create_future()
+        # 请求在调用方的上下文中执行（日志上下文、通道等 contextvars 不会串到其他请求）
+        queue.append((future, func, time.monotonic(), contextvars.copy_context()))
+        self._dispatch()
+        return await future
+
+    def _capacity(self, lane):
+        if lane == Lane.EMERGENCY_CLOSE:
+            return self.max_concurrent + self.emergency_reserve
+        return self.max_concurrent
+
+    def _dispatch(self):
+        """在槽位允许时按优先级发出排队的请求"""
+        now = time.monotonic()
+        for lane in Lane:
+            queue = self._queues[lane]
+            stats = self._stats[lane]
+            deadline = self.lane_config[lane]['deadline']
+            while queue and self._active < self._capacity(lane):
+                future, func, enqueued, context = queue.popleft()
+                if future.done():
+                    # 调用方已取消
+                    continue
+                waited = now - enqueued
+                if deadline is not None and waited > deadline:
+                    stats.expired += 1
+                    future.set_exception(RequestExpiredError(
+                        f"请求在通道 {lane.name} 排队 {waited:.1f} 秒，超过期限 {deadline} 秒，已丢弃"
+                    ))
+                    continue
+                stats.wait_total += waited
+                stats.wait_max = max(stats.wait_max, waited)
+                self._active += 1
+                asyncio.get_running_loop().create_task(self._run(lane, future, func), context=context)
+            if queue:
+                # 高优先级通道仍有排队请求时，不发出低优先级请求
+                break
+
+    async def _run(self, lane, future, func):
+        stats = self._stats[lane]
+        _holding_slot.set(self)
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+            raise
+        except Exception as e:
+            stats.failed += 1
+            if not future.done():
+                future.set_exception(e)
+        else:
+            stats.completed += 1
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._active -= 1
+            self._dispatch()
+
+    @property
+    def active(self):
+        """在途请求数"""
+        return self._active
+
+    def snapshot(self):
+        """
+        各通道的统计
+
+        Returns:
+            dict: 通道名（小写） -> {'queued', 'submitted', 'completed', 'failed',
+                                    'rejected', 'expired', 'wait_avg', 'wait_max'}
+        """
+        result = {}
+        for lane in Lane:
+            stats = self._stats[lane]
+            started = stats.completed + stats.failed
+            result[lane.name.lower()] = {
+                'queued': len(self._queues[lane]),
+                'submitted': stats.submitted,
+                'completed': stats.completed,
+                'failed': stats.failed,
+                'rejected': stats.rejected,
+                'expired': stats.expired,
+                'wait_avg': stats.wait_total / started if started else 0.0,
+                'wait_max': stats.wait_max,
+            }
+        return result
+
+
+_schedulers = {}
+
+
+def get_scheduler(name, config=None):
+    """
+    获取（或创建）指定代理的调度器，同一代理上的所有账户共享一个调度器
+
+    Args:
+        name (str): 代理名称，不使用代理时为 'direct'
+        config (dict): scheduler 配置段（只在首次创建时使用）
+    """
+    scheduler = _schedulers.get(name)
+    if scheduler is None:
+        scheduler = _schedulers[name] = RequestScheduler(config, name=name)
+    return scheduler
+
+
+def all_schedulers():
+    """所有已创建的调度器（代理名称 -> 调度器）"""
+    return dict(_schedulers)
@@ -0,0 +1,107 @@
+"""
+多 API 密钥签名通道
+
+每个 API 密钥有自己独立的 nonce 序列，账户只有一个密钥时所有签名交易都在同一个序列上排队。
+账户配置多个密钥后，LighterAPI 为每个密钥建立一个签名通道：
+
+- 每笔签名交易选择在途交易最少的可用密钥，负载相同时轮流使用
+- 某个密钥被限流（429 / rate limit）后进入冷却期，冷却期内的交易自动切换到其他密钥
+- 所有密钥都在冷却时，使用最早结束冷却的密钥
+"""
+
+import itertools
+import time
+
+RATE_LIMIT_MARKERS = ('429', 'rate limit', 'ratelimit', 'too many requests')
+
+
+def is_rate_limit_error(error):
+    """判断错误是否为限流"""
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+class SigningKey:
+    """账户的一个 API 密钥"""
+
+    def __init__(self, api_key, api_key_index, nonces=None):
+        """
+        Args:
+            api_key (str): API 私钥
+            api_key_index (int): API 密钥索引
+            nonces (NonceAllocator): 该密钥的 nonce 分配器（可选）
+        """
+        self.api_key = api_key
+        self.api_key_index = api_key_index
+        self.nonces = nonces
+        self.client = None  # SignerClient，首次使用时创建
+        self.in_flight = 0
+        self.cooldown_until = 0.0  # time.monotonic()
+        self.submitted = 0
+        self.rate_limited = 0
+
+    def snapshot(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        return {
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'rate_limited': self.rate_limited,
+            'cooling_down': self.cooldown_until > now,
+        }
+
+
+class SigningKeySelector:
+    """按负载在多个密钥之间分配签名交易"""
+
+    def __init__(self, keys, cooldown=10):
+        """
+        Args:
+            keys (list): SigningKey 列表，第一个为主密钥
+            cooldown (float): 密钥被限流后的冷却时间（秒）
+        """
+        if not keys:
+            raise ValueError("至少需要一个API密钥")
+        self.keys = list(keys)
+        self.cooldown = cooldown
+        self._turn = itertools.count()
+
+    @property
+    def primary(self):
+        return self.keys[0]
+
+    def select(self, exclude=(), now=None):
+        """
+        选择下一笔交易使用的密钥
+
+        Args:
+            exclude: 本次交易已经尝试过的密钥
+            now (float): time.monotonic()
+
+        Returns:
+            SigningKey or None: 没有可尝试的密钥时返回 None
+        """
+        if now is None:
+            now = time.monotonic()
+        candidates = [key for key in self.keys if key not in exclude]
+        if not candidates:
+            return None
+        available = [key for key in candidates if key.cooldown_until <= now]
+        if not available:
+            return min(candidates, key=lambda key: key.cooldown_until)
+        # 负载相同时从轮转位置开始选，避免总是使用第一个密钥
+        start = next(self._turn) % len(available)
+        rotated = available[start:] + available[:start]
+        return min(rotated, key=lambda key: key.in_flight)
+
+    def mark_rate_limited(self, key, now=None):
+        """密钥被限流，进入冷却期"""
+        if now is None:
+            now = time.monotonic()
+        key.rate_limited += 1
+        key.cooldown_until = now + self.cooldown
+
+    def snapshot(self):
+        """指标快照：API密钥索引 -> 统计"""
+        now = time.monotonic()
+        return {key.api_key_index: key.snapshot(now) for key in self.keys}
@@ -0,0 +1,163 @@
+"""
+冷启动耗时分析工具
+
+分两部分报告冷启动时间花在哪里：
+1. 导入耗时：在新的解释器中以 -X importtime 导入入口模块，按累计耗时列出最慢的模块
+2. 启动阶段耗时：依次执行导入、加载配置、创建机器人、创建API客户端、导入 lighter SDK
+   以及（可选）初始化市场信息，记录每个阶段的耗时
+
+使用方法:
+    uv run python -m src.startup_profile --config config.yaml
+    uv run python -m src.startup_profile --config config.yaml --initialize
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile_imports(module='src.trading_bot', top=15):
+    """
+    在新的解释器中测量模块导入耗时
+
+    Args:
+        module (str): 要导入的模块
+        top (int): 返回累计耗时最长的前N个模块
+
+    Returns:
+        dict: {
+            'success': bool,
+            'total_ms': float,    # 入口模块的累计导入耗时（毫秒）
+            'modules': list,      # [(模块名, 自身耗时毫秒, 累计耗时毫秒), ...]
+            'error': str or None
+        }
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else '未知错误'
+        return {'success': False, 'total_ms': 0.0, 'modules': [], 'error': error}
+
+    total_ms = next((cumulative for name, _, cumulative in modules if name == module), 0.0)
+    modules.sort(key=lambda item: item[2], reverse=True)
+    return {'success': True, 'total_ms': total_ms, 'modules': modules[:top], 'error': None}
+
+
+class StartupProfiler:
+    """记录启动各阶段的耗时"""
+
+    def __init__(self):
+        self.phases = []  # [(阶段名称, 耗时毫秒, 错误信息或 None), ...]
+
+    @contextmanager
+    def phase(self, name):
+        """计时一个阶段，阶段内的异常被记录而不是抛出"""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self.phases.append((name, (time.perf_counter() - started) * 1000, error))
+
+    @property
+    def total_ms(self):
+        return sum(elapsed for _, elapsed, _ in self.phases)
+
+
+def profile_startup(config_path='config.yaml', initialize=False):
+    """
+    在当前进程中依次执行启动阶段并计时
+
+    Args:
+        config_path (str): 配置文件路径
+        initialize (bool): 是否初始化所有交易对的市场信息（需要网络）
+
+    Returns:
+        StartupProfiler: 各阶段耗时
+    """
+    profiler = StartupProfiler()
+    bot = None
+
+    with profiler.phase("导入 src.trading_bot"):
+        from src.trading_bot import HedgeTradingBot
+
+    with profiler.phase("加载配置"):
+        from src.config_manager import load_config
+        load_config(config_path)
+
+    with profiler.phase("创建机器人"):
+        bot = HedgeTradingBot(config_path)
+
+    with profiler.phase("创建API客户端对象"):
+        if bot is not None:
+            for pair in bot.hedge_pairs:
+                pair.api_long, pair.api_short
+
+    with profiler.phase("导入 lighter SDK"):
+        import lighter  # noqa: F401
+
+    if initialize and bot is not None:
+        async def _initialize():
+            try:
+                await asyncio.gather(*(pair.initialize() for pair in bot.hedge_pairs))
+            finally:
+                for pair in bot.hedge_pairs:
+                    await pair.close_clients()
+
+        with profiler.phase("初始化市场信息"):
+            asyncio.run(_initialize())
+
+    return profiler
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="冷启动耗时分析")
+    parser.add_argument('--config', default='config.yaml', help="配置文件路径")
+    parser.add_argument('--module', default='src.trading_bot', help="分析导入耗时的入口模块")
+    parser.add_argument('--top', type=int, default=15, help="列出累计导入耗时最长的前N个模块")
+    parser.add_argument('--initialize', action='store_true', help="同时计时市场信息初始化（需要网络）")
+    args = parser.parse_args(argv)
+    # 只输出警告及以上的日志，避免干扰耗时报告
+    from src.logging_setup import configure_logging
+    configure_logging({'format': 'text', 'level': 'WARNING'})
+
+    imports = profile_imports(args.module, args.top)
+    print(f"== 导入耗时 ({args.module}) ==")
+    if imports['success']:
+        print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+        for name, self_ms, cumulative_ms in imports['modules']:
+            print(f"{cumulative_ms:>10.1f} {self_ms:>10.1f}  {name}")
+        print(f"入口模块累计导入耗时: {imports['total_ms']:.1f} ms")
+    else:
+        print(f"导入失败: {imports['error']}")
+
+    profiler = profile_startup(args.config, initialize=args.initialize)
+    print()
+    print("== 启动阶段耗时 ==")
+    for name, elapsed_ms, error in profiler.phases:
+        status = f"  失败: {error}" if error else ""
+        print(f"{elapsed_ms:>10.1f} ms  {name}{status}")
+    print(f"{profiler.total_ms:>10.1f} ms  合计")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
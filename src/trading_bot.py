@@ -1,12 +1,26 @@
 import time
+import signal
 import logging
 import asyncio
 from src.config_manager import load_config
+from src.config_watcher import ConfigWatcher, diff_config, is_empty_diff
 from src.hedge_trader import HedgePair
+from src.multi_market import MultiMarketHedgePair
+from src.execution import OrderExecutor
 from src.notification import NotificationManager
+from src.metrics_server import MetricsServer
+from src.loop_monitor import LoopMonitor
+from src.adaptive_polling import AdaptivePoller
+from src.account_snapshot import AccountSnapshotService
+from src.pnl_tracker import PnlTracker
+from src.rebalancer import Rebalancer
+from src.order_netting import OrderNetter
+from src.order_tracker import OrderTracker
+from src.pair_state import UNMONITORED_STATES, PairState, PairStateStore
+from src.quote_guard import all_quote_guards
+from src.logging_setup import bind_log_context, configure_logging
+from src.request_scheduler import Lane, get_scheduler, request_lane
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class HedgeTradingBot:
@@ -19,15 +33,59 @@ class HedgeTradingBot:
         Args:
             config_path (str): 配置文件路径
         """
+        self.config_path = config_path
         self.config = load_config(config_path)
         self.notification_manager = NotificationManager(self.config)
         self.hedge_pairs = []
         self.running = False
         
+        # 配置了 execution 段时，所有交易对共享一个下单执行器
+        execution_config = self.config.get('execution')
+        self.executor = OrderExecutor(execution_config) if execution_config else None
+        
+        # 配置热加载（config_reload.enabled 为 true 时启用）
+        self.config_watcher = None
+        
+        # 指标接口（metrics.enabled 为 true 时启用）
+        self.metrics_server = None
+        
+        # 事件循环健康监控（默认启用，loop_monitor.enabled 为 false 时关闭）
+        self.loop_monitor = LoopMonitor(self.config.get('loop_monitor'), on_alert=self._send_alert)
+        
+        # 止损检查的自适应轮询（按距离止损阈值的远近和盈亏波动分配检查频率）
+        self.poller = AdaptivePoller(self.config.get('polling'))
+        
+        # 账户持仓快照：每轮检查中每个账户只查询一次持仓，所有交易对共享
+        self.account_snapshots = AccountSnapshotService()
+        
+        # 跨交易对的订单轧差：共用账户的交易对同时开仓/平仓时，每个 (账户, 市场) 只提交一笔净额订单
+        self.order_netter = OrderNetter(self.config.get('netting'))
+        
+        # 订单生命周期跟踪：开仓后等待两条腿成交确认（orders.enabled 为 false 时以提交成功为准）
+        self.order_tracker = OrderTracker(self.config.get('orders'))
+        
+        # 对冲再平衡：两条腿持仓量偏离时下只减仓修正订单
+        self.rebalancer = Rebalancer(self.config.get('rebalance'), self.account_snapshots)
+        
+        # 盈亏记账：每次止损检查记录各腿的盈亏分量，pnl.database 配置时定期降采样写入 sqlite
+        self.pnl_tracker = PnlTracker(self.config.get('pnl'))
+        
+        # 交易对生命周期状态：state.file 配置时状态转换后合并保存，重启后已知开仓的交易对不再核对持仓
+        state_config = self.config.get('state', {})
+        state_file = state_config.get('file')
+        self.state_store = PairStateStore(state_file, state_config.get('flush_delay', 0.5)) if state_file else None
+        self.state_transitions = {}  # "旧状态->新状态" -> 次数
+        
+        # 优雅停止：信号或 stop_trading() 设置停止事件，交易循环退出后执行 shutdown()
+        self._shutdown_event = None
+        self._shutdown_requested = False
+        self._background_tasks = []
+        self.shutdown_report = None
+        
         # 创建对冲交易对
         self._create_hedge_pairs()
         
-        logger.info(f"对冲交易机器人初始化完成，共创建 {len(self.hedge_pairs)} 个交易对")
+        logger.info("对冲交易机器人初始化完成，共创建 %s 个交易对", len(self.hedge_pairs))
 
     def _create_hedge_pairs(self):
         """创建对冲交易对（使用配置的配对关系）"""
@@ -39,25 +97,65 @@ class HedgeTradingBot:
         
         # 使用配置的配对关系创建交易对
         for pair_config in hedge_pairs_config:
-            long_account_name = pair_config['long_account']
-            short_account_name = pair_config['short_account']
-            pair_name = pair_config['pair_name']
-            
-            # 验证账户是否存在
-            if long_account_name not in account_map:
-                logger.error(f"配置错误: 做多账户 '{long_account_name}' 不存在")
-                continue
-            if short_account_name not in account_map:
-                logger.error(f"配置错误: 做空账户 '{short_account_name}' 不存在")
-                continue
-            
-            account_long = account_map[long_account_name]
-            account_short = account_map[short_account_name]
-            
-            hedge_pair = HedgePair(account_long, account_short, self.config)
-            self.hedge_pairs.append(hedge_pair)
+            hedge_pair = self._build_hedge_pair(pair_config, account_map)
+            if hedge_pair is not None:
+                self.hedge_pairs.append(hedge_pair)
+
+    def _build_hedge_pair(self, pair_config, account_map):
+        """
+        根据单个配对配置创建对冲交易对
+        
+        Args:
+            pair_config (dict): hedge_pairs 中的一项
+            account_map (dict): 账户名称到账户信息的映射
             
-            logger.info(f"创建对冲交易对: {pair_name} ({long_account_name} <-> {short_account_name})")
+        Returns:
+            HedgePair or None: 账户不存在时返回 None
+        """
+        long_account_name = pair_config['long_account']
+        short_account_name = pair_config['short_account']
+        pair_name = pair_config['pair_name']
+        
+        # 验证账户是否存在
+        if long_account_name not in account_map:
+            logger.error("配置错误: 做多账户 '%s' 不存在", long_account_name)
+            return None
+        if short_account_name not in account_map:
+            logger.error("配置错误: 做空账户 '%s' 不存在", short_account_name)
+            return None
+        
+        account_long = account_map[long_account_name]
+        account_short = account_map[short_account_name]
+        
+        if pair_config.get('markets'):
+            # 一对账户同时对冲多个市场
+            hedge_pair = MultiMarketHedgePair(
+                account_long, account_short, self.config, pair_config['markets'],
+                stop_loss_threshold=pair_config.get('stop_loss_threshold'), executor=self.executor
+            )
+        else:
+            hedge_pair = HedgePair(account_long, account_short, self.config, executor=self.executor)
+        hedge_pair.pair_name = pair_name
+        hedge_pair.account_snapshots = self.account_snapshots
+        hedge_pair.order_netter = self.order_netter
+        if self.state_store is not None:
+            hedge_pair.lifecycle.attach(self.state_store)
+        hedge_pair.lifecycle.add_hook(self._on_pair_transition)
+        if self.order_tracker.enabled:
+            hedge_pair.order_tracker = self.order_tracker
+        
+        logger.info("创建对冲交易对: %s (%s <-> %s)", pair_name, long_account_name, short_account_name)
+        return hedge_pair
+
+    def _on_pair_transition(self, pair_id, old_state, new_state, duration, reason):
+        """交易对状态转换钩子：统计转换次数，进入 ERROR 时告警"""
+        key = f"{old_state}->{new_state}"
+        self.state_transitions[key] = self.state_transitions.get(key, 0) + 1
+        if new_state == PairState.ERROR:
+            self.notification_manager.send_notification(
+                "交易对状态异常",
+                f"交易对 {pair_id} 从 {old_state} 进入 error 状态（{reason or '未知原因'}），持仓需要核对。"
+            )
 
     def start_trading(self):
         """开始交易"""
@@ -69,30 +167,424 @@ class HedgeTradingBot:
 
     async def _run_trading_loop(self):
         """运行交易循环"""
-        # 为所有交易对开仓
-        await self._open_all_positions()
+        self._shutdown_event = asyncio.Event()
+        self._install_signal_handlers()
+        
+        # 通知在后台发送，不阻塞事件循环
+        self.notification_manager.start()
+        
+        # 启动配置热加载
+        reload_config = self.config.get('config_reload', {})
+        if reload_config.get('enabled', False):
+            self.config_watcher = ConfigWatcher(
+                self.config_path,
+                self.apply_config,
+                interval=reload_config.get('interval', 5)
+            )
+            self.config_watcher.prime()
+            self._background_tasks.append(asyncio.create_task(self.config_watcher.run()))
+        
+        # 启动事件循环健康监控
+        if self.config.get('loop_monitor', {}).get('enabled', True):
+            self._background_tasks.append(asyncio.create_task(self.loop_monitor.run()))
+        
+        # 轮询待确认订单的状态
+        if self.order_tracker.enabled:
+            self._background_tasks.append(asyncio.create_task(self.order_tracker.run()))
+        
+        # 定期写入盈亏数据
+        if self.pnl_tracker.database is not None:
+            self._background_tasks.append(asyncio.create_task(self.pnl_tracker.run()))
+        
+        # 启动指标接口
+        metrics_config = self.config.get('metrics', {})
+        if metrics_config.get('enabled', False):
+            self.metrics_server = MetricsServer(
+                self.get_metrics_snapshot,
+                host=metrics_config.get('host', '127.0.0.1'),
+                port=metrics_config.get('port', 9100),
+                routes={'/pnl': self.query_pnl}
+            )
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                # 指标接口不可用不影响交易
+                logger.error("指标接口启动失败: %s", e)
+                self.metrics_server = None
+        
+        try:
+            # 初始化所有交易对的市场信息
+            await asyncio.gather(*(pair.initialize() for pair in self.hedge_pairs))
+            
+            # 为所有交易对开仓
+            await self._open_all_positions()
+            
+            # 进入监控循环
+            await self._monitor_loop()
+        finally:
+            self._remove_signal_handlers()
+            # 只有收到停止请求时才平仓；异常退出时只释放资源
+            self.shutdown_report = await self.shutdown(close_positions=self._shutdown_requested)
+
+    def _install_signal_handlers(self):
+        """SIGINT/SIGTERM 触发优雅停止"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.request_shutdown, sig.name)
+            except (NotImplementedError, RuntimeError):
+                # Windows 或非主线程不支持，退回默认行为
+                pass
+
+    def _remove_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    def request_shutdown(self, reason='stop_trading'):
+        """
+        请求停止交易（在事件循环中调用，立即返回）
         
-        # 进入监控循环
-        await self._monitor_loop()
+        监控循环在当前检查结束后退出，随后交易循环执行 shutdown() 平仓所有交易对。
+        
+        Args:
+            reason (str): 停止原因（如信号名称）
+        """
+        if self._shutdown_requested:
+            logger.warning("已在停止中，忽略重复的停止请求: %s", reason)
+            return
+        logger.info("收到停止请求 (%s)，正在停止交易...", reason)
+        self._shutdown_requested = True
+        self.running = False
+        if self._shutdown_event is not None:
+            self._shutdown_event.set()
 
-    async def _open_all_positions(self):
-        """为所有交易对开仓（安全版本 - 防止重复开仓）"""
+    async def _sleep_unless_shutdown(self, seconds):
+        """等待指定时间，收到停止请求时立即返回"""
+        if self._shutdown_event is None:
+            await asyncio.sleep(seconds)
+            return
+        try:
+            await asyncio.wait_for(self._shutdown_event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def shutdown(self, close_positions=True):
+        """
+        优雅停止
+        
+        1. 停止接收新工作（配置热加载、开仓）
+        2. 在停止期限内并发平仓所有交易对
+        3. 发送剩余通知
+        4. 并发关闭所有API客户端，停止监控和指标接口
+        
+        Args:
+            close_positions (bool): 是否平仓
+            
+        Returns:
+            dict: {
+                'success': bool,       # 所有交易对是否都已平仓
+                'pairs': list,         # 每个交易对的平仓结果，见 _close_all_positions()
+                'failed': list,        # 平仓失败的交易对名称
+                'notifications_flushed': bool,
+                'duration': float,     # 总耗时（秒）
+                'timestamp': float
+            }
+        """
+        started = time.monotonic()
+        shutdown_config = self.config.get('shutdown', {})
+        self.running = False
+        
+        # 停止接收新工作
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        
+        pair_reports = []
+        if close_positions:
+            pair_reports = await self._close_all_positions(deadline=shutdown_config.get('deadline', 30))
+        failed = [report['pair_name'] for report in pair_reports if not report['success']]
+        if failed:
+            self.notification_manager.send_notification(
+                "停止时平仓失败",
+                f"以下 {len(failed)} 个交易对在停止时未能平仓，请手动处理: {', '.join(failed)}"
+            )
+        
+        # 发送剩余通知
+        notifications_flushed = await self.notification_manager.stop(
+            timeout=shutdown_config.get('notification_timeout', 10)
+        )
+        
+        # 并发关闭所有API客户端
+        await asyncio.gather(*(pair.close_clients() for pair in self.hedge_pairs), return_exceptions=True)
+        
+        # 停止后台任务和指标接口
+        self.loop_monitor.stop()
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks = []
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        
+        # 写入剩余的盈亏数据
+        try:
+            await self.pnl_tracker.flush()
+        except Exception as e:
+            logger.error("写入盈亏数据失败: %s", e)
+        self.pnl_tracker.close()
+        
+        # 写入交易对的最终状态
+        if self.state_store is not None:
+            await self.state_store.flush()
+        
+        duration = time.monotonic() - started
+        logger.info(
+            "对冲交易已停止: 平仓 %s 个交易对，失败 %s 个，总耗时 %.2f 秒",
+            len(pair_reports), len(failed), duration
+        )
+        return {
+            'success': not failed,
+            'pairs': pair_reports,
+            'failed': failed,
+            'notifications_flushed': notifications_flushed,
+            'duration': duration,
+            'timestamp': time.time()
+        }
+
+    async def _send_alert(self, title, message):
+        """发送告警通知（后台发送，不阻塞事件循环）"""
+        self.notification_manager.send_notification(title, message)
+
+    def get_metrics_snapshot(self):
+        """
+        机器人运行状态快照（只读取内存中的状态，不发起请求）
+        
+        Returns:
+            dict: {
+                'timestamp': float,   # Unix 时间戳
+                'running': bool,
+                'loop_lag': dict,     # 事件循环监控快照，见 LoopMonitor.snapshot()
+                'api': dict,          # 所有账户的在途请求、请求、重试、失败次数
+                'schedulers': dict,   # 代理名称 -> 各请求通道的统计，见 RequestScheduler.snapshot()
+                'signing_keys': dict, # 网络/账户索引/API密钥索引 -> 签名交易和 nonce 分配统计，
+                                      # 见 SigningKey.snapshot()、NonceAllocator.snapshot()
+                'polling': dict,      # 自适应轮询状态，见 AdaptivePoller.snapshot()
+                'account_snapshots': dict,  # 持仓快照的查询/读取次数，见 AccountSnapshotService.snapshot()
+                'rebalance': dict,    # 再平衡修正订单数和失败次数
+                'netting': dict,      # 订单轧差的意图数、提交订单数和内部抵消数量
+                'orders': dict,       # 订单跟踪的待确认订单数和各结束状态的订单数，见 OrderTracker.snapshot()
+                'pair_states': dict,  # 各状态的交易对数量 'counts' 和状态转换次数 'transitions'
+                'quotes': dict,       # 网络 -> 报价检查的接受次数和各原因的拒绝次数，见 QuoteGuard.snapshot()
+                'pairs': list         # 每个交易对的指标，见 HedgePair.metrics()，另含当前轮询间隔 poll_interval
+            }
+        """
+        now = time.monotonic()
+        api = {'in_flight': 0, 'requests': 0, 'retries': 0, 'failures': 0}
+        schedulers = {}
+        signing_keys = {}
+        for pair in self.hedge_pairs:
+            for client in pair.api_clients():
+                api['in_flight'] += client.in_flight
+                api['requests'] += client.request_count
+                api['retries'] += client.retry_count
+                api['failures'] += client.failure_count
+                if client.scheduler is not None and client.scheduler.name not in schedulers:
+                    schedulers[client.scheduler.name] = client.scheduler.snapshot()
+                for key in client.signing_keys.keys:
+                    metrics = {'allocated': 0, 'resyncs': 0, 'errors': 0}
+                    if key.nonces is not None:
+                        metrics.update(key.nonces.snapshot())
+                    metrics.update(key.snapshot())
+                    signing_keys[f"{client.network}/{client.account_index}/{key.api_key_index}"] = metrics
+        pairs = []
+        for pair in self.hedge_pairs:
+            metrics = pair.metrics(now)
+            metrics['poll_interval'] = self.poller.interval(pair.pair_id)
+            pairs.append(metrics)
+        return {
+            'timestamp': time.time(),
+            'running': self.running,
+            'loop_lag': self.loop_monitor.snapshot(),
+            'api': api,
+            'schedulers': schedulers,
+            'signing_keys': signing_keys,
+            'polling': self.poller.snapshot(),
+            'account_snapshots': self.account_snapshots.snapshot(),
+            'rebalance': self.rebalancer.snapshot(),
+            'netting': self.order_netter.snapshot(),
+            'orders': self.order_tracker.snapshot(),
+            'pair_states': {
+                'counts': {state: sum(1 for pair in pairs if pair['state'] == state) for state in PairState.ALL},
+                'transitions': dict(self.state_transitions),
+            },
+            'quotes': {network: guard.snapshot() for network, guard in all_quote_guards().items()},
+            'pairs': pairs,
+        }
+
+    async def query_pnl(self, params):
+        """
+        查询交易对的盈亏时间序列（指标接口 /pnl 路由，在事件循环中执行，数据库读取在线程中执行）
+        
+        Args:
+            params (dict): 查询参数
+                - pair: 交易对ID（必需）
+                - window: 时间范围（秒），默认86400（24小时）
+                - resolution: 分辨率（秒），默认60
+        
+        Returns:
+            dict: {'pair', 'resolution', 'latest', 'series'}，series 见 PnlTracker.query()
+        """
+        pair = params.get('pair')
+        if not pair:
+            raise ValueError("缺少参数: pair")
+        try:
+            window = float(params.get('window', 86400))
+            resolution = float(params.get('resolution', 60))
+        except (TypeError, ValueError):
+            raise ValueError("window 和 resolution 必须是数字")
+        if window <= 0 or resolution <= 0:
+            raise ValueError("window 和 resolution 必须大于0")
+        end = time.time()
+        return {
+            'pair': pair,
+            'resolution': resolution,
+            'latest': self.pnl_tracker.latest(pair),
+            'series': await self.pnl_tracker.query_async(pair, end - window, end, resolution),
+        }
+
+    async def apply_config(self, new_config):
+        """
+        应用新配置，只处理与运行中配置的差异
+        
+        - 删除或变更的交易对：平仓并关闭客户端
+        - 新增或变更的交易对：创建、初始化并按安全检查开仓
+        - 代理变化：只替换对应账户客户端的代理
+        - 交易参数变化：在线更新所有交易对的参数
+        - 交易对或市场的止损阈值、市场开仓金额变化：在线更新对应交易对，不平仓
+        
+        未变化的交易对不会被重建。
+        
+        Args:
+            new_config (dict): 新加载并验证通过的配置
+        """
+        diff = diff_config(self.config, new_config)
+        if is_empty_diff(diff):
+            logger.info("配置内容没有需要应用的变化")
+            return
+        
+        if diff['restart_required']:
+            logger.warning("以下配置项变化需要重启才能生效，本次忽略: %s", ', '.join(diff['restart_required']))
+            # 保留运行中的值，避免部分生效
+            new_config = dict(new_config)
+            for key in diff['restart_required']:
+                if key in self.config:
+                    new_config[key] = self.config[key]
+                else:
+                    new_config.pop(key, None)
+        
+        pairs_by_name = {pair.pair_name: pair for pair in self.hedge_pairs}
+        
+        # 下线删除或变更的交易对
+        for pair_name in diff['removed_pairs'] + diff['changed_pairs']:
+            pair = pairs_by_name.get(pair_name)
+            if pair is None:
+                continue
+            self.hedge_pairs.remove(pair)
+            logger.info("下线交易对 %s，正在平仓...", pair_name)
+            if not await pair.close_positions():
+                self.notification_manager.send_notification(
+                    "平仓失败",
+                    f"交易对 {pair.pair_id} 因配置变更下线时平仓失败，请手动处理。"
+                )
+            await pair.close_clients()
+        
+        self.config = new_config
+        
+        # 在线更新交易参数和代理
+        if diff['params']:
+            logger.info("更新交易参数: %s", diff['params'])
+        if diff['pair_params']:
+            logger.info("更新交易对参数: %s", ', '.join(sorted(diff['pair_params'])))
+        pair_configs = {pair_config['pair_name']: pair_config for pair_config in new_config.get('hedge_pairs', [])}
+        for pair in self.hedge_pairs:
+            if diff['params'] or pair.pair_name in diff['pair_params']:
+                pair.update_params(new_config, pair_configs.get(pair.pair_name))
+            for api, account in ((pair.api_long, pair.account_long), (pair.api_short, pair.account_short)):
+                account_name = account['account_name']
+                if account_name in diff['proxy_changes']:
+                    proxy = diff['proxy_changes'][account_name]
+                    await api.set_proxy(proxy)
+                    if api.scheduler is not None:
+                        # 调度器按代理共享，换代理后改用新代理的调度器
+                        api.scheduler = get_scheduler(proxy['name'] if proxy else 'direct',
+                                                      new_config.get('scheduler', {}))
+        
+        if diff['notification_changed']:
+            old_manager = self.notification_manager
+            self.notification_manager = NotificationManager(new_config)
+            if old_manager.started:
+                self.notification_manager.start()
+                await old_manager.stop()
+        
+        # 创建新增或变更的交易对
+        account_map = {acc['account_name']: acc for acc in new_config['api_credentials']}
+        new_pairs = []
+        for pair_config in new_config.get('hedge_pairs', []):
+            if pair_config['pair_name'] in diff['added_pairs'] or pair_config['pair_name'] in diff['changed_pairs']:
+                pair = self._build_hedge_pair(pair_config, account_map)
+                if pair is not None:
+                    new_pairs.append(pair)
+        
+        if new_pairs:
+            await asyncio.gather(*(pair.initialize() for pair in new_pairs))
+            self.hedge_pairs.extend(new_pairs)
+            if self.running:
+                await self._open_all_positions(new_pairs)
+        
+        logger.info(
+            "配置已更新: 新增 %s 个, 删除 %s 个, 重建 %s 个, 在线更新 %s 个交易对, 更换代理 %s 个账户",
+            len(diff['added_pairs']), len(diff['removed_pairs']), len(diff['changed_pairs']),
+            len(diff['pair_params']), len(diff['proxy_changes'])
+        )
+
+    async def _open_all_positions(self, pairs=None):
+        """
+        为所有交易对开仓（安全版本 - 防止重复开仓）
+        
+        Args:
+            pairs (list): 需要开仓的交易对，默认为全部交易对
+        """
         logger.info("正在安全检查现有持仓状态...")
         
         # 检查每个交易对的持仓状态
         positions_checked = 0
         positions_opened = 0
         query_failures = 0
+        ready = []
         
-        for pair in self.hedge_pairs:
+        candidates = []
+        for pair in (self.hedge_pairs if pairs is None else pairs):
+            # 收到停止请求后不再开新仓
+            if self._shutdown_requested:
+                logger.info("正在停止，跳过剩余交易对的开仓")
+                break
             positions_checked += 1
             
-            # 检查是否已经有持仓（返回是否检测到持仓和结果是否可信）
-            has_positions, is_confident = await self._check_pair_positions(pair)
-            
+            # 已知两条腿都已建立（本进程开仓或从状态文件恢复），不需要向交易所核对
+            if pair.lifecycle.state == PairState.OPEN:
+                logger.info("交易对 %s 状态为已开仓，跳过持仓核对和开仓", pair.pair_id)
+                continue
+            candidates.append(pair)
+        
+        # 所有交易对的持仓同时核对（返回是否检测到持仓和结果是否可信）
+        checks = await asyncio.gather(*(self._check_pair_positions(pair) for pair in candidates))
+        for pair, (has_positions, is_confident) in zip(candidates, checks):
             if not is_confident:
                 query_failures += 1
-                logger.error(f"交易对 {pair.pair_id} 持仓查询不可信，跳过开仓以避免重复持仓")
+                logger.error("交易对 %s 持仓查询不可信，跳过开仓以避免重复持仓", pair.pair_id)
                 # 发送紧急通知
                 self.notification_manager.send_notification(
                     "持仓查询失败",
@@ -101,25 +593,29 @@ class HedgeTradingBot:
                 continue
             
             if has_positions:
-                logger.info(f"交易对 {pair.pair_id} 已有持仓，跳过开仓")
+                logger.info("交易对 %s 已有持仓，跳过开仓", pair.pair_id)
+                pair.lifecycle.transition(PairState.OPEN, "核对到已有持仓")
                 continue
             
-            # 没有持仓且查询可信，执行开仓
-            logger.info(f"交易对 {pair.pair_id} 确认没有持仓，正在开仓...")
-            success = await pair.open_positions()
-            
+            # 没有持仓且查询可信，等待开仓
+            logger.info("交易对 %s 确认没有持仓，正在开仓...", pair.pair_id)
+            ready.append(pair)
+        
+        # 所有待开仓的交易对同时开仓，共用账户的订单由订单轧差合并
+        results = await asyncio.gather(*(pair.open_positions() for pair in ready))
+        for pair, success in zip(ready, results):
             if success:
                 positions_opened += 1
-                logger.info(f"交易对 {pair.pair_id} 开仓成功")
+                logger.info("交易对 %s 开仓成功", pair.pair_id)
             else:
-                logger.error(f"开仓失败: {pair.pair_id}")
+                logger.error("开仓失败: %s", pair.pair_id)
                 # 发送通知
                 self.notification_manager.send_notification(
                     "开仓失败",
                     f"交易对 {pair.pair_id} 开仓失败，请检查账户状态和资金情况。"
                 )
         
-        logger.info(f"安全持仓检查完成: 检查了 {positions_checked} 个交易对，查询失败 {query_failures} 个，新开仓 {positions_opened} 个交易对")
+        logger.info("安全持仓检查完成: 检查了 %s 个交易对，查询失败 %s 个，新开仓 %s 个交易对", positions_checked, query_failures, positions_opened)
         
         if query_failures > 0:
             self.notification_manager.send_notification(
@@ -140,29 +636,35 @@ class HedgeTradingBot:
                   is_confident: 检查结果是否可信（查询成功）
         """
         try:
-            # 获取做多账户的持仓
-            result_long = await pair.api_long.get_open_positions(pair.market_index)
-            # 获取做空账户的持仓
-            result_short = await pair.api_short.get_open_positions(pair.market_index)
+            # 开仓前的持仓核对走核对通道，排在平仓和开仓请求之后、监控轮询之前
+            with request_lane(Lane.RECONCILE):
+                # 同时获取做多、做空账户的持仓
+                result_long, result_short = await asyncio.gather(
+                    pair.api_long.get_open_positions(pair.market_index),
+                    pair.api_short.get_open_positions(pair.market_index)
+                )
             
             # 检查查询是否成功
             if not result_long.get('success', False) or not result_short.get('success', False):
                 # 查询失败
                 long_error = result_long.get('error', '未知错误')
                 short_error = result_short.get('error', '未知错误')
-                logger.error(f"持仓查询失败 {pair.pair_id}: 做多账户错误={long_error}, 做空账户错误={short_error}")
+                logger.error("持仓查询失败 %s: 做多账户错误=%s, 做空账户错误=%s", pair.pair_id, long_error, short_error)
                 return True, False  # 保守起见认为有持仓，但结果不可信
             
             # 检查数据结构是否完整
             if 'positions' not in result_long or 'positions' not in result_short:
-                logger.warning(f"持仓数据结构不完整 {pair.pair_id}")
+                logger.warning("持仓数据结构不完整 %s", pair.pair_id)
                 return True, False  # 保守起见认为有持仓，但结果不可信
             
+            # 多市场交易对检查其所有市场
+            symbols = pair.symbols()
+            
             # 检查做多账户是否有做多持仓
             long_has_position = False
             long_position_amount = 0
             for position in result_long['positions']:
-                if (position.get('symbol') == pair.symbol and 
+                if (position.get('symbol') in symbols and 
                     position.get('side') == 'long'):
                     position_amount = abs(position.get('position', 0))
                     if position_amount > 0:
@@ -174,7 +676,7 @@ class HedgeTradingBot:
             short_has_position = False
             short_position_amount = 0
             for position in result_short['positions']:
-                if (position.get('symbol') == pair.symbol and 
+                if (position.get('symbol') in symbols and 
                     position.get('side') == 'short'):
                     position_amount = abs(position.get('position', 0))
                     if position_amount > 0:
@@ -184,11 +686,11 @@ class HedgeTradingBot:
             
             # 如果两个账户都有对应方向的持仓，则认为已有对冲头寸
             if long_has_position and short_has_position:
-                logger.info(f"交易对 {pair.pair_id} 检测到完整对冲头寸 (做多: {long_position_amount}, 做空: {short_position_amount})")
+                logger.info("交易对 %s 检测到完整对冲头寸 (做多: %s, 做空: %s)", pair.pair_id, long_position_amount, short_position_amount)
                 return True, True
             elif long_has_position or short_has_position:
                 # 只有一个账户有持仓，需要告警
-                logger.warning(f"交易对 {pair.pair_id} 持仓不完整: 做多账户持仓={long_has_position} ({long_position_amount}), 做空账户持仓={short_has_position} ({short_position_amount})")
+                logger.warning("交易对 %s 持仓不完整: 做多账户持仓=%s (%s), 做空账户持仓=%s (%s)", pair.pair_id, long_has_position, long_position_amount, short_has_position, short_position_amount)
                 self.notification_manager.send_notification(
                     "持仓不完整警告",
                     f"交易对 {pair.pair_id} 持仓不完整，请手动检查。做多账户持仓: {long_has_position} ({long_position_amount}), 做空账户持仓: {short_has_position} ({short_position_amount})"
@@ -197,91 +699,184 @@ class HedgeTradingBot:
                 return True, True
             else:
                 # 两个账户都没有持仓（查询成功且确认没有持仓）
-                logger.info(f"交易对 {pair.pair_id} 确认没有持仓")
+                logger.info("交易对 %s 确认没有持仓", pair.pair_id)
                 return False, True
                 
         except Exception as e:
-            logger.error(f"检查持仓状态失败 {pair.pair_id}: {str(e)}")
+            logger.error("检查持仓状态失败 %s: %s", pair.pair_id, e)
             # 如果检查失败，保守起见不进行开仓操作
             return True, False
 
     async def _monitor_loop(self):
-        """监控循环"""
+        """监控循环（按每个交易对的风险自适应安排止损检查，见 src/adaptive_polling.py）"""
         logger.info("进入监控循环...")
         
         while self.running:
             try:
-                # 检查每个交易对是否触发止损
-                for pair in self.hedge_pairs:
-                    if await pair.is_stop_loss_triggered():
-                        logger.info(f"交易对 {pair.pair_id} 触发止损，正在平仓...")
-                        
-                        # 平仓
-                        success = await pair.close_positions()
-                        
-                        if success:
-                            # 发送通知
-                            self.notification_manager.send_notification(
-                                "对冲头寸已平仓",
-                                f"交易对 {pair.pair_id} 因触发止损已平仓。"
-                            )
-                        else:
-                            # 发送错误通知
-                            self.notification_manager.send_notification(
-                                "平仓失败",
-                                f"交易对 {pair.pair_id} 平仓失败，请手动处理。"
-                            )
+                # 配置热加载可能在检查期间增删交易对；已平仓和开仓/平仓进行中的交易对不做止损检查
+                pairs = [pair for pair in self.hedge_pairs if pair.lifecycle.state not in UNMONITORED_STATES]
+                self.account_snapshots.begin_cycle()
                 
-                # 等待一段时间后继续监控
-                await asyncio.sleep(30)  # 每30秒检查一次
+                # 再平衡在每轮开始时执行，使用本轮最新的持仓快照
+                if self.rebalancer.due():
+                    await self._rebalance(pairs)
+                
+                for pair in self.poller.due_pairs(pairs):
+                    if not self.running:
+                        break
+                    with bind_log_context(pair=pair.pair_name):
+                        await self._check_stop_loss(pair)
+                
+                # 等待到下一个交易对到期（收到停止请求时立即退出）
+                await self._sleep_unless_shutdown(self.poller.next_wakeup(pairs))
                 
-            except KeyboardInterrupt:
-                logger.info("收到停止信号，正在停止交易...")
-                self.stop_trading()
-                break
             except Exception as e:
-                logger.error(f"监控循环发生错误: {str(e)}")
+                logger.error("监控循环发生错误: %s", e)
                 # 发送错误通知
                 self.notification_manager.send_notification(
                     "监控错误",
                     f"监控循环发生错误: {str(e)}"
                 )
                 # 继续运行而不是停止
-                await asyncio.sleep(60)  # 出错后等待1分钟再继续
+                await self._sleep_unless_shutdown(60)  # 出错后等待1分钟再继续
 
-    def stop_trading(self):
-        """停止交易"""
-        logger.info("正在停止对冲交易...")
-        self.running = False
+    async def _rebalance(self, pairs):
+        """修正持仓量不一致的对冲头寸，并通知修正结果"""
+        report = await self.rebalancer.rebalance(pairs)
+        if report['orders']:
+            lines = [
+                f"{order['symbol']} {', '.join(order['pairs'])}: 净敞口 {order['net_delta']}，"
+                f"账户 {order['account']} {order['side']} {order['base_amount']} "
+                f"({'成功' if order['success'] else '失败: ' + str(order['error'])})"
+                for order in report['orders']
+            ]
+            self.notification_manager.send_notification(
+                "对冲再平衡" if report['success'] else "对冲再平衡失败",
+                "\n".join(lines)
+            )
+        return report
+
+    async def _check_stop_loss(self, pair):
+        """检查单个交易对的止损，触发时平仓，并安排下一次检查"""
+        triggered = await pair.is_stop_loss_triggered()
+        if pair.last_check_ok:
+            floating_pnl, stop_loss_threshold = pair.stop_loss_state()
+            interval = self.poller.record(pair.pair_id, floating_pnl, stop_loss_threshold)
+            self.pnl_tracker.record(pair.pair_id, pair.pnl_components, pair.traded_notional)
+        else:
+            # 浮动盈亏未知：不记录轮询样本和盈亏样本（pnl_components 仍是上一次检查的值），按最短间隔重试
+            interval = self.poller.retry(pair.pair_id)
+        logger.debug("交易对 %s 浮动盈亏 %s USD，下次检查间隔 %.1f 秒", pair.pair_id, pair.last_pnl, interval)
+        if not triggered:
+            return
+        
+        logger.info("交易对 %s 触发止损，正在平仓...", pair.pair_id)
+        
+        # 平仓（多市场交易对只平掉触发止损的市场）
+        success = await pair.close_triggered_positions()
         
-        # 平仓所有头寸
-        asyncio.run(self._close_all_positions())
+        if success:
+            # 发送通知
+            self.notification_manager.send_notification(
+                "对冲头寸已平仓",
+                f"交易对 {pair.pair_id} 因触发止损已平仓。"
+            )
+        else:
+            # 发送错误通知
+            self.notification_manager.send_notification(
+                "平仓失败",
+                f"交易对 {pair.pair_id} 平仓失败，请手动处理。"
+            )
+
+    def stop_trading(self):
+        """
+        停止交易
         
-        logger.info("对冲交易已停止")
+        在事件循环中调用时只发出停止请求，由交易循环完成平仓；
+        在事件循环外调用时直接执行 shutdown()。
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            logger.info("正在停止对冲交易...")
+            self.running = False
+            self.shutdown_report = asyncio.run(self.shutdown())
+            return
+        self.request_shutdown()
 
-    async def _close_all_positions(self):
-        """平仓所有头寸"""
-        logger.info("正在平仓所有头寸...")
+    async def _close_all_positions(self, deadline=None):
+        """
+        在停止期限内并发平仓所有交易对
         
-        for pair in self.hedge_pairs:
-            success = await pair.close_positions()
-            if not success:
-                logger.error(f"平仓失败: {pair.pair_id}")
-                # 发送通知
-                self.notification_manager.send_notification(
-                    "平仓失败",
-                    f"交易对 {pair.pair_id} 平仓失败，请手动处理。"
-                )
+        Args:
+            deadline (float): 停止期限（秒），超时未完成的交易对记为失败
+            
+        Returns:
+            list: 每个交易对的结果 {
+                'pair_name': str,
+                'pair_id': str,
+                'success': bool,
+                'error': str or None,
+                'duration': float      # 平仓耗时（秒）
+            }
+        """
+        pairs = list(self.hedge_pairs)
+        if not pairs:
+            return []
+        logger.info("正在并发平仓 %s 个交易对...", len(pairs))
+        
+        async def close_pair(pair):
+            started = time.monotonic()
+            try:
+                success = await pair.close_positions()
+                error = None if success else "平仓失败"
+            except Exception as e:
+                success, error = False, str(e)
+            return {
+                'pair_name': pair.pair_name,
+                'pair_id': pair.pair_id,
+                'success': success,
+                'error': error,
+                'duration': time.monotonic() - started
+            }
+        
+        started = time.monotonic()
+        tasks = [asyncio.create_task(close_pair(pair)) for pair in pairs]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
         
-        logger.info("所有头寸平仓完成")
+        reports = []
+        for pair, task in zip(pairs, tasks):
+            if task in done:
+                report = task.result()
+            else:
+                report = {
+                    'pair_name': pair.pair_name,
+                    'pair_id': pair.pair_id,
+                    'success': False,
+                    'error': f"超过停止期限 {deadline} 秒",
+                    'duration': time.monotonic() - started
+                }
+            if report['success']:
+                logger.info("交易对 %s 已平仓，耗时 %.2f 秒", report['pair_name'], report['duration'])
+            else:
+                logger.error("交易对 %s 平仓失败 (%s)，耗时 %.2f 秒",
+                             report['pair_name'], report['error'], report['duration'])
+            reports.append(report)
+        return reports
 
 if __name__ == "__main__":
+    # 先以默认配置启动日志，加载配置后按 logging 配置段重新配置
+    configure_logging()
     try:
         # 创建并启动交易机器人
         bot = HedgeTradingBot()
+        configure_logging(bot.config.get('logging'))
         bot.start_trading()
     except Exception as e:
-        logger.error(f"启动交易机器人时发生错误: {str(e)}")
+        logger.error("启动交易机器人时发生错误: %s", e)
         # 如果有通知管理器，发送错误通知
         if 'bot' in locals() and hasattr(bot, 'notification_manager'):
             bot.notification_manager.send_notification(
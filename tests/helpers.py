@@ -0,0 +1,34 @@
+"""测试共用的模拟对象"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from src.records import Position, PositionsResult
+
+
+def make_positions_api(account_index, positions, success=True):
+    """
+    模拟账户API客户端，get_open_positions 返回指定的持仓
+
+    Args:
+        account_index (int): 账户索引
+        positions (list): [(market_id, symbol, 带符号持仓量, 浮动盈亏), ...]，可以通过 api.positions 修改
+        success (bool): 持仓查询是否成功
+    """
+    api = SimpleNamespace(base_url='https://testnet', account_index=account_index, in_flight=0, retry_count=0)
+    api.positions = positions
+
+    async def get_open_positions(market_index=None):
+        await asyncio.sleep(0.01)
+        if not success:
+            return PositionsResult(False, [], 'timeout', 0.0)
+        return PositionsResult(True, [
+            Position(SimpleNamespace(market_id=market_id, symbol=symbol, position=size,
+                                     unrealized_pnl=pnl, avg_entry_price=0, realized_pnl=0))
+            for market_id, symbol, size, pnl in api.positions
+            if market_index is None or market_id == market_index
+        ], None, 0.0)
+
+    api.get_open_positions = AsyncMock(side_effect=get_open_positions)
+    return api
@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.account_snapshot import AccountSnapshotService
+from tests.helpers import make_positions_api as make_api
+
+
+class TestAccountSnapshotService(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.service = AccountSnapshotService()
+        self.positions = [(0, 'BTC', 0.01, 5.0), (1, 'ETH', 0.2, -3.0), (1, 'ETH', 0.1, -1.0)]
+
+    def test_one_fetch_per_account_per_cycle(self):
+        """测试同一账户的多个客户端、并发读取在一轮内只查询一次"""
+        first = make_api(1, self.positions)
+        second = make_api(1, self.positions)
+
+        async def run():
+            self.service.begin_cycle()
+            return await asyncio.gather(
+                self.service.get_positions(first, 0),
+                self.service.get_positions(second, 1),
+                self.service.get_positions(first, 1),
+            )
+
+        btc, eth, eth_again = asyncio.run(run())
+        self.assertEqual(first.get_open_positions.await_count + second.get_open_positions.await_count, 1)
+        self.assertEqual([position.symbol for position in btc['positions']], ['BTC'])
+        self.assertEqual(len(eth['positions']), 2)
+        self.assertEqual(eth['positions'], eth_again['positions'])
+        self.assertEqual(self.service.snapshot()['reads'], 3)
+
+    def test_new_cycle_refetches(self):
+        """测试新一轮重新查询"""
+        api = make_api(1, self.positions)
+
+        async def run():
+            for _ in range(2):
+                self.service.begin_cycle()
+                await self.service.get_positions(api, 0)
+                await self.service.get_positions(api, 0)
+
+        asyncio.run(run())
+        self.assertEqual(api.get_open_positions.await_count, 2)
+
+    def test_missing_market_and_all_markets(self):
+        """测试无持仓的市场返回空列表，market_index 为 None 时返回全部持仓"""
+        api = make_api(1, self.positions)
+
+        async def run():
+            return (await self.service.get_positions(api, 7), await self.service.get_positions(api))
+
+        missing, everything = asyncio.run(run())
+        self.assertTrue(missing['success'])
+        self.assertEqual(missing['positions'], [])
+        self.assertEqual(len(everything['positions']), 3)
+
+    def test_failure_is_shared(self):
+        """测试查询失败时返回失败结果"""
+        api = make_api(1, [], success=False)
+        result = asyncio.run(self.service.get_positions(api, 0))
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'timeout')
+
+
+if __name__ == '__main__':
+    unittest.main()
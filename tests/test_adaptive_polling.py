@@ -0,0 +1,159 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+import yaml
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.adaptive_polling import AdaptivePoller
+from src.trading_bot import HedgeTradingBot
+
+
+def make_pairs(*pair_ids):
+    return [SimpleNamespace(pair_id=pair_id) for pair_id in pair_ids]
+
+
+class TestAdaptivePoller(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.poller = AdaptivePoller({'min_interval': 2, 'max_interval': 30, 'safety_factor': 3})
+
+    def test_interval_follows_headroom(self):
+        """测试距离止损阈值越近，检查间隔越短"""
+        self.assertEqual(self.poller.interval_for(10, 100), 30)
+        self.assertEqual(self.poller.interval_for(0, 100), 30)
+        self.assertAlmostEqual(self.poller.interval_for(-50, 100), 15)
+        self.assertEqual(self.poller.interval_for(-99, 100), 2)
+        self.assertEqual(self.poller.interval_for(-120, 100), 2)
+
+    def test_volatility_shortens_interval(self):
+        """测试盈亏波动越快，检查间隔越短"""
+        poller = self.poller
+        poller.record('pair_1', 0, 100, now=0)
+        self.assertEqual(poller.interval('pair_1'), 30)
+        # 30秒内亏损扩大 60 USD：剩余 40 USD / (2 USD/秒 × 3) ≈ 6.7 秒（仅按剩余空间为 12 秒）
+        interval = poller.record('pair_1', -60, 100, now=30)
+        self.assertAlmostEqual(interval, 40 / 6)
+
+    def test_budget_prefers_pairs_near_threshold(self):
+        """测试预算不足时优先检查剩余空间最小的交易对"""
+        poller = AdaptivePoller({'checks_per_minute': 60, 'burst': 1, 'min_interval': 2, 'max_interval': 30})
+        pairs = make_pairs('safe', 'risky')
+        poller.record('safe', -10, 100, now=0)
+        poller.record('risky', -90, 100, now=0)
+
+        due = poller.due_pairs(pairs, now=28)
+        self.assertEqual([pair.pair_id for pair in due], ['risky'])
+        self.assertEqual(poller.deferred, 1)
+        poller.record('risky', -90, 100, now=28)
+        # 推迟的交易对在预算恢复后检查
+        self.assertAlmostEqual(poller.next_wakeup(pairs, now=28), 1.0)
+        self.assertEqual([pair.pair_id for pair in poller.due_pairs(pairs, now=29)], ['safe'])
+
+    def test_max_interval_holds_with_many_pairs(self):
+        """测试交易对数量超出默认预算时，每个交易对的检查间隔仍不超过 max_interval"""
+        poller = AdaptivePoller({})
+        pairs = make_pairs(*('pair_%d' % i for i in range(200)))
+        last_checked = {}
+        now = 0.0
+        while now < 120:
+            for pair in poller.due_pairs(pairs, now=now):
+                self.assertLessEqual(now - last_checked.get(pair.pair_id, 0.0), 30)
+                last_checked[pair.pair_id] = now
+                poller.record(pair.pair_id, 0, 100, now=now)
+            now += min(poller.next_wakeup(pairs, now=now), 1.0)
+        self.assertEqual(len(last_checked), 200)
+        self.assertTrue(all(now - checked <= 30 for checked in last_checked.values()))
+        self.assertGreaterEqual(poller.snapshot()['rate'], 400)
+
+    def test_unknown_pnl_retries_without_sample(self):
+        """测试浮动盈亏未知时不记录样本，按最短间隔重试，恢复后正常计算"""
+        poller = self.poller
+        poller.record('pair_1', 0, 100, now=0)
+        self.assertEqual(poller.record('pair_1', None, 100, now=30), 2)
+        self.assertEqual(poller.due_pairs(make_pairs('pair_1'), now=31), [])
+        self.assertEqual(len(poller.due_pairs(make_pairs('pair_1'), now=32)), 1)
+        self.assertAlmostEqual(poller.record('pair_1', -60, 100, now=32), 40 / (60 / 32 * 3))
+
+    def test_new_pairs_due_and_removed_pairs_pruned(self):
+        """测试新交易对立即检查，已移除的交易对被清理"""
+        poller = self.poller
+        poller.record('old', 0, 100, now=0)
+        pairs = make_pairs('new')
+        self.assertEqual([pair.pair_id for pair in poller.due_pairs(pairs, now=1)], ['new'])
+        self.assertIsNone(poller.interval('old'))
+
+    def test_next_wakeup(self):
+        """测试等待到最早到期的交易对"""
+        poller = self.poller
+        pairs = make_pairs('pair_1', 'pair_2')
+        poller.record('pair_1', 0, 100, now=0)
+        poller.record('pair_2', -75, 100, now=0)
+        self.assertAlmostEqual(poller.next_wakeup(pairs, now=0), 7.5)
+        self.assertEqual(poller.next_wakeup([], now=0), 30)
+
+
+class TestCheckStopLossWithUnknownPnl(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.directory = tempfile.TemporaryDirectory()
+        config = {
+            'trading_pair': 'BTC',
+            'leverage': 10,
+            'position_size': 100,
+            'stop_loss_threshold': 50,
+            'proxy_pool': [{'name': 'proxy_1', 'host': '127.0.0.1', 'port': 1080}],
+            'api_credentials': [
+                {'account_name': f'account_{i}', 'api_key': f'key_{i}', 'account_index': i,
+                 'api_key_index': 0, 'network': 'mainnet'}
+                for i in (1, 2)
+            ],
+            'hedge_pairs': [{'pair_name': 'pair_1', 'long_account': 'account_1', 'short_account': 'account_2'}],
+            'loop_monitor': {'enabled': False},
+            'state': {'file': os.path.join(self.directory.name, 'state.json')},
+        }
+        path = os.path.join(self.directory.name, 'config.yaml')
+        with open(path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump(config, file)
+        self.bot = HedgeTradingBot(path)
+        self.pair = self.bot.hedge_pairs[0]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_failed_check_then_recovery(self):
+        """测试一次持仓查询失败不会中断后续检查，失败的检查不记录盈亏样本"""
+        results = iter([-10.0, None, -20.0])
+
+        async def get_floating_pnl():
+            pnl = next(results)
+            if pnl is not None:
+                self.pair.pnl_components = {'long': {'unrealized': pnl}, 'short': {'unrealized': 0.0}}
+            return pnl
+
+        self.pair.get_floating_pnl = get_floating_pnl
+
+        async def run():
+            for _ in range(3):
+                await self.bot._check_stop_loss(self.pair)
+
+        asyncio.run(run())
+        self.assertEqual(self.pair.skipped_checks, 1)
+        ring = self.bot.pnl_tracker._rings[(self.pair.pair_id, 'long')]
+        self.assertEqual([sample.unrealized for sample in ring], [-10.0, -20.0])
+        self.assertEqual(self.pair.last_pnl, -20.0)
+        self.assertEqual(self.bot.poller.interval(self.pair.pair_id), self.bot.poller.interval_for(
+            -20.0, 50, self.bot.poller.snapshot()['pairs'][self.pair.pair_id]['velocity']
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+import os
+import json
+import asyncio
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lighter_api import LighterAPI
+from src.nonce_manager import NonceAllocator
+
+
+def fake_lighter(send_tx_batch):
+    """提供批量交易接口的模拟 SDK"""
+    class SignerClient:
+        ORDER_TYPE_LIMIT = 0
+        ORDER_TYPE_MARKET = 1
+        ORDER_TIME_IN_FORCE_IMMEDIATE_OR_CANCEL = 0
+        ORDER_TIME_IN_FORCE_GOOD_TILL_TIME = 1
+        DEFAULT_IOC_EXPIRY = 0
+        TX_TYPE_CREATE_ORDER = 14
+
+    class TransactionApi:
+        def __init__(self, api_client):
+            pass
+
+    TransactionApi.send_tx_batch = send_tx_batch
+    return SimpleNamespace(SignerClient=SignerClient, TransactionApi=TransactionApi)
+
+
+class TestPlaceOrders(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.api = LighterAPI('key', network='testnet', account_index=3, api_key_index=0,
+                              nonces=NonceAllocator(('testnet', 3, 0), max_in_flight=2))
+        self.api.client = MagicMock()
+        self.api._fetch_next_nonce = AsyncMock(return_value=42)
+        self.orders = [
+            {'market_index': 1, 'side': 'buy', 'base_amount': 100, 'leverage': 5},
+            {'market_index': 2, 'side': 'sell', 'base_amount': 200, 'price': 2000},
+            {'market_index': 1, 'side': 'buy'},  # 缺少数量，本地拒绝
+            {'market_index': 3, 'side': 'sell', 'base_amount': 300, 'client_order_index': 99},
+        ]
+
+    def test_concurrent_submission_without_batch_endpoint(self):
+        """测试没有批量接口时并发提交，返回每笔订单的结果"""
+        self.api._supports_tx_batch = MagicMock(return_value=False)
+        self.api.client.create_market_order = AsyncMock(return_value=('tx', '0xabc', None))
+
+        results = asyncio.run(self.api.place_orders(self.orders))
+
+        self.assertEqual([result['success'] for result in results], [True, True, False, True])
+        self.assertIn('必须指定数量', results[2]['error'])
+        self.assertEqual(results[3]['client_order_index'], 99)
+        nonces = sorted(call.kwargs['nonce'] for call in self.api.client.create_market_order.await_args_list)
+        self.assertEqual(nonces, [42, 43, 44])
+
+    def test_batch_endpoint_signs_locally_and_chunks(self):
+        """测试批量接口：本地签名连续 nonce，按在途上限分批提交"""
+        send_tx_batch = AsyncMock(side_effect=lambda tx_types, tx_infos: SimpleNamespace(
+            tx_hash=[f"0x{json.loads(info)['nonce']}" for info in json.loads(tx_infos)]
+        ))
+        self.api.client.sign_create_order = MagicMock(
+            side_effect=lambda **kwargs: (json.dumps({'nonce': kwargs['nonce']}), None)
+        )
+
+        with patch.dict(sys.modules, {'lighter': fake_lighter(send_tx_batch)}):
+            results = asyncio.run(self.api.place_orders(self.orders))
+
+        self.assertEqual(send_tx_batch.await_count, 2)
+        self.assertEqual(json.loads(send_tx_batch.await_args_list[0].kwargs['tx_types']), [14, 14])
+        self.assertEqual(sorted(result['tx_hash'] for result in results if result['success']),
+                         ['0x42', '0x43', '0x44'])
+        self.assertFalse(results[2]['success'])
+        self.api._fetch_next_nonce.assert_awaited_once()
+        market_sign = self.api.client.sign_create_order.call_args_list[0].kwargs
+        self.assertEqual((market_sign['order_type'], market_sign['time_in_force']), (1, 0))
+
+    def test_failed_batch_fails_its_orders_and_resyncs(self):
+        """测试一批提交失败时该批订单都失败，nonce 重新同步"""
+        send_tx_batch = AsyncMock(side_effect=Exception("invalid nonce"))
+        self.api.client.sign_create_order = MagicMock(return_value=('{}', None))
+
+        with patch.dict(sys.modules, {'lighter': fake_lighter(send_tx_batch)}):
+            results = asyncio.run(self.api.place_orders(self.orders[:2]))
+
+        self.assertFalse(any(result['success'] for result in results))
+        self.assertIn('invalid nonce', results[0]['error'])
+        self.assertEqual(self.api.signing_keys.primary.nonces.snapshot()['errors'], 2)
+        self.assertEqual(self.api.signing_keys.primary.in_flight, 0)
+
+    def test_batch_response_errors_fail_unmatched_orders(self):
+        """测试批量接口返回错误码或缺少交易哈希时，对应订单失败并重新同步 nonce"""
+        responses = [SimpleNamespace(code=200, tx_hash=['0x42']), SimpleNamespace(code=21500, message='bad nonce')]
+        send_tx_batch = AsyncMock(side_effect=lambda tx_types, tx_infos: responses.pop(0))
+        self.api.client.sign_create_order = MagicMock(return_value=('{}', None))
+
+        with patch.dict(sys.modules, {'lighter': fake_lighter(send_tx_batch)}):
+            results = asyncio.run(self.api.place_orders(self.orders))
+
+        self.assertEqual([result['success'] for result in results], [True, False, False, False])
+        self.assertIn('交易哈希', results[1]['error'])
+        self.assertIn('21500', results[3]['error'])
+        nonces = self.api.signing_keys.primary.nonces.snapshot()
+        self.assertEqual((nonces['errors'], nonces['in_flight']), (2, 0))
+
+    def test_batches_from_clients_sharing_a_key_do_not_deadlock(self):
+        """测试共用同一 nonce 分配器的两个客户端同时批量下单不会互相占住在途名额"""
+        nonces = self.api.signing_keys.primary.nonces
+        other = LighterAPI('key', network='testnet', account_index=3, api_key_index=0, nonces=nonces)
+        other.client = MagicMock()
+        other._fetch_next_nonce = AsyncMock(return_value=42)
+
+        async def send(tx_types, tx_infos):
+            await asyncio.sleep(0.01)
+            return SimpleNamespace(code=200, tx_hash=[f"0x{json.loads(info)['nonce']}" for info in json.loads(tx_infos)])
+
+        for api in (self.api, other):
+            api.client.sign_create_order = MagicMock(
+                side_effect=lambda **kwargs: (json.dumps({'nonce': kwargs['nonce']}), None)
+            )
+        orders = [order for order in self.orders if 'base_amount' in order][:2]
+
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(
+                self.api.place_orders(orders), other.place_orders(orders)
+            ), timeout=1)
+
+        with patch.dict(sys.modules, {'lighter': fake_lighter(AsyncMock(side_effect=send))}):
+            first, second = asyncio.run(run())
+
+        hashes = sorted(result['tx_hash'] for result in first + second)
+        self.assertEqual(hashes, ['0x42', '0x43', '0x44', '0x45'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import copy
+import tempfile
+
+import yaml
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import load_config, validate_config, ConfigValidationError
+
+
+class TestConfigManager(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.config = {
+            'trading_pair': 'BTC',
+            'leverage': 10,
+            'position_size': 100,
+            'stop_loss_threshold': 100,
+            'proxy_pool': [
+                {'name': 'proxy_1', 'host': '127.0.0.1', 'port': 1080},
+            ],
+            'api_credentials': [
+                {'account_name': f'account_{i}', 'api_key': f'key_{i}', 'account_index': i,
+                 'api_key_index': 0, 'network': 'mainnet', 'proxy': 'proxy_1'}
+                for i in range(1, 3)
+            ],
+            'hedge_pairs': [
+                {'pair_name': 'pair_1', 'long_account': 'account_1', 'short_account': 'account_2'},
+            ]
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'config.yaml')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, config):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump(config, file)
+
+    def test_valid_config(self):
+        """测试有效配置没有错误"""
+        self.assertEqual(validate_config(self.config), [])
+
+    def test_reports_all_errors_at_once(self):
+        """测试一次报告所有错误"""
+        config = copy.deepcopy(self.config)
+        del config['leverage']
+        config['api_credentials'][0]['network'] = 'devnet'
+        config['hedge_pairs'][0]['short_account'] = 'missing'
+        errors = validate_config(config)
+        self.assertIn("配置文件缺少必要的配置项: leverage", errors)
+        self.assertIn("第1个API凭证的网络类型不支持: devnet，仅支持 'mainnet' 或 'testnet'", errors)
+        self.assertIn("第1个对冲配对的做空账户不存在: missing", errors)
+
+    def test_cross_references(self):
+        """测试代理和账户的交叉引用检查"""
+        config = copy.deepcopy(self.config)
+        config['api_credentials'][1]['proxy'] = 'proxy_9'
+        config['hedge_pairs'][0]['short_account'] = 'account_1'
+        errors = validate_config(config)
+        self.assertIn("第2个API凭证引用的代理不存在: proxy_9", errors)
+        self.assertIn("第1个对冲配对的做多账户和做空账户不能相同: account_1", errors)
+
+    def test_type_errors(self):
+        """测试类型错误"""
+        config = copy.deepcopy(self.config)
+        config['position_size'] = -1
+        config['api_credentials'][0]['account_index'] = '1'
+        errors = validate_config(config)
+        self.assertEqual(len(errors), 2)
+
+    def test_multi_market_pairs(self):
+        """测试多市场对冲配对的市场列表"""
+        config = copy.deepcopy(self.config)
+        config['hedge_pairs'][0]['markets'] = [{'symbol': 'BTC', 'stop_loss_threshold': 50}, {'symbol': 'ETH'}]
+        self.assertEqual(validate_config(config), [])
+        config['hedge_pairs'][0]['markets'] = [{'symbol': 'BTC'}, {'symbol': 'btc', 'position_size': 0}, {}]
+        errors = validate_config(config)
+        self.assertIn("第1个对冲配对的市场重复: btc", errors)
+        self.assertIn("第1个对冲配对的第2个市场的 position_size 无效: 0", errors)
+        self.assertIn("第1个对冲配对的第3个市场缺少必要的配置项: symbol", errors)
+
+    def test_additional_api_keys(self):
+        """测试API凭证的其他API密钥"""
+        config = copy.deepcopy(self.config)
+        config['api_credentials'][0]['api_keys'] = [{'api_key': 'key_1b', 'api_key_index': 1}]
+        self.assertEqual(validate_config(config), [])
+        config['api_credentials'][0]['api_keys'] = [{'api_key': 'key_1b', 'api_key_index': 0}, {'api_key': 'key_1c'}]
+        errors = validate_config(config)
+        self.assertIn("第1个API凭证的API密钥索引重复: 0", errors)
+        self.assertIn("第1个API凭证的第2个API密钥缺少必要的配置项: api_key_index", errors)
+
+    def test_load_raises_validation_error(self):
+        """测试加载无效配置时抛出包含所有错误的 ValueError"""
+        config = copy.deepcopy(self.config)
+        del config['leverage']
+        del config['position_size']
+        self._write(config)
+        with self.assertRaises(ValueError) as context:
+            load_config(self.path)
+        self.assertIsInstance(context.exception, ConfigValidationError)
+        self.assertEqual(len(context.exception.errors), 2)
+
+    def test_no_cache_written_and_changes_are_read(self):
+        """测试不在配置文件旁写入缓存（配置包含私钥），文件变化后读取新内容"""
+        self._write(self.config)
+        self.assertEqual(load_config(self.path), self.config)
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(self.path)])
+
+        config = copy.deepcopy(self.config)
+        config['leverage'] = 5
+        self._write(config)
+        self.assertEqual(load_config(self.path)['leverage'], 5)
+
+if __name__ == '__main__':
+    unittest.main()
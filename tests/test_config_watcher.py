@@ -0,0 +1,225 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+import sys
+import os
+import copy
+import asyncio
+import tempfile
+import threading
+
+import yaml
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_watcher import ConfigWatcher, diff_config, is_empty_diff
+from src.request_scheduler import get_scheduler
+from src.trading_bot import HedgeTradingBot
+
+
+class TestConfigWatcher(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.config = {
+            'trading_pair': 'BTC',
+            'leverage': 10,
+            'position_size': 100,
+            'stop_loss_threshold': 100,
+            'proxy_pool': [
+                {'name': 'proxy_1', 'host': '127.0.0.1', 'port': 1080},
+                {'name': 'proxy_2', 'host': '127.0.0.2', 'port': 1080},
+            ],
+            'api_credentials': [
+                {'account_name': f'account_{i}', 'api_key': f'key_{i}', 'account_index': i,
+                 'api_key_index': 0, 'network': 'mainnet', 'proxy': 'proxy_1'}
+                for i in range(1, 5)
+            ],
+            'hedge_pairs': [
+                {'pair_name': 'pair_1', 'long_account': 'account_1', 'short_account': 'account_2'},
+                {'pair_name': 'pair_2', 'long_account': 'account_3', 'short_account': 'account_4'},
+            ]
+        }
+
+    def test_identical_config_has_empty_diff(self):
+        """测试相同配置没有差异"""
+        self.assertTrue(is_empty_diff(diff_config(self.config, copy.deepcopy(self.config))))
+
+    def test_threshold_change_is_live_param(self):
+        """测试止损阈值变化作为在线参数，不重建交易对"""
+        new_config = copy.deepcopy(self.config)
+        new_config['stop_loss_threshold'] = 50
+        diff = diff_config(self.config, new_config)
+        self.assertEqual(diff['params'], {'stop_loss_threshold': 50})
+        self.assertEqual(diff['changed_pairs'], [])
+
+    def test_added_and_removed_pairs(self):
+        """测试新增和删除交易对"""
+        new_config = copy.deepcopy(self.config)
+        new_config['hedge_pairs'][1]['pair_name'] = 'pair_3'
+        diff = diff_config(self.config, new_config)
+        self.assertEqual(diff['added_pairs'], ['pair_3'])
+        self.assertEqual(diff['removed_pairs'], ['pair_2'])
+
+    def test_pair_threshold_change_is_live(self):
+        """测试交易对和市场的止损阈值、市场开仓金额变化在线生效，不重建交易对"""
+        self.config['hedge_pairs'][1]['markets'] = [{'symbol': 'BTC'}, {'symbol': 'ETH', 'position_size': 50}]
+        new_config = copy.deepcopy(self.config)
+        new_config['hedge_pairs'][0]['stop_loss_threshold'] = 40
+        new_config['hedge_pairs'][1]['markets'][1].update(position_size=80, stop_loss_threshold=20)
+        diff = diff_config(self.config, new_config)
+        self.assertEqual(diff['changed_pairs'], [])
+        self.assertEqual(sorted(diff['pair_params']), ['pair_1', 'pair_2'])
+        self.assertEqual(diff['pair_params']['pair_2']['markets'][1]['stop_loss_threshold'], 20)
+
+        new_config['hedge_pairs'][1]['markets'][1]['symbol'] = 'SOL'
+        diff = diff_config(self.config, new_config)
+        self.assertEqual(diff['changed_pairs'], ['pair_2'])
+        self.assertEqual(list(diff['pair_params']), ['pair_1'])
+
+    def test_component_section_change_requires_restart(self):
+        """测试启动时创建的组件的配置变化报告为需要重启"""
+        new_config = copy.deepcopy(self.config)
+        new_config['scheduler'] = {'max_concurrent': 4}
+        new_config['polling'] = {'max_interval': 10}
+        self.assertEqual(diff_config(self.config, new_config)['restart_required'], ['scheduler', 'polling'])
+
+    def test_credential_change_rebuilds_only_affected_pair(self):
+        """测试凭证变化只重建使用该账户的交易对"""
+        new_config = copy.deepcopy(self.config)
+        new_config['api_credentials'][0]['api_key'] = 'rotated'
+        diff = diff_config(self.config, new_config)
+        self.assertEqual(diff['changed_pairs'], ['pair_1'])
+        self.assertEqual(diff['proxy_changes'], {})
+
+    def test_proxy_change_swaps_proxy_only(self):
+        """测试代理变化只更换代理，不重建交易对"""
+        new_config = copy.deepcopy(self.config)
+        new_config['api_credentials'][2]['proxy'] = 'proxy_2'
+        diff = diff_config(self.config, new_config)
+        self.assertEqual(diff['changed_pairs'], [])
+        self.assertEqual(list(diff['proxy_changes']), ['account_3'])
+        self.assertEqual(diff['proxy_changes']['account_3']['host'], '127.0.0.2')
+
+    def test_trading_pair_change_requires_restart(self):
+        """测试交易对符号变化需要重启"""
+        new_config = copy.deepcopy(self.config)
+        new_config['trading_pair'] = 'ETH'
+        self.assertEqual(diff_config(self.config, new_config)['restart_required'], ['trading_pair'])
+
+    def test_watcher_reloads_only_on_content_change(self):
+        """测试内容变化时才加载新配置，无效配置被忽略"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'config.yaml')
+            with open(path, 'w', encoding='utf-8') as file:
+                yaml.safe_dump(self.config, file)
+
+            on_change = AsyncMock()
+            watcher = ConfigWatcher(path, on_change)
+            watcher.prime()
+            self.assertFalse(asyncio.run(watcher.check()))
+
+            new_config = copy.deepcopy(self.config)
+            new_config['stop_loss_threshold'] = 50
+            with open(path, 'w', encoding='utf-8') as file:
+                yaml.safe_dump(new_config, file)
+                file.write('\n')
+            self.assertTrue(asyncio.run(watcher.check()))
+            self.assertEqual(on_change.await_args.args[0]['stop_loss_threshold'], 50)
+
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('leverage: 10\n')
+            self.assertFalse(asyncio.run(watcher.check()))
+            self.assertEqual(on_change.await_count, 1)
+
+    def test_watcher_loads_off_the_event_loop(self):
+        """测试文件哈希和配置加载不在事件循环线程中执行"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'config.yaml')
+            with open(path, 'w', encoding='utf-8') as file:
+                yaml.safe_dump(self.config, file)
+            watcher = ConfigWatcher(path, AsyncMock())
+            threads = []
+
+            def load(config_path):
+                threads.append(threading.current_thread())
+                return self.config
+
+            with patch('src.config_watcher.load_config', side_effect=load):
+                self.assertTrue(asyncio.run(watcher.check()))
+            self.assertNotIn(threading.main_thread(), threads)
+            self.assertEqual(len(threads), 1)
+
+
+class TestApplyProxyChange(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = {
+            'trading_pair': 'BTC',
+            'leverage': 10,
+            'position_size': 100,
+            'stop_loss_threshold': 100,
+            'proxy_pool': [
+                {'name': 'proxy_1', 'host': '127.0.0.1', 'port': 1080},
+                {'name': 'proxy_2', 'host': '127.0.0.2', 'port': 1080},
+            ],
+            'api_credentials': [
+                {'account_name': f'account_{i}', 'api_key': f'key_{i}', 'account_index': i,
+                 'api_key_index': 0, 'network': 'mainnet', 'proxy': 'proxy_1'}
+                for i in (1, 2)
+            ],
+            'hedge_pairs': [{'pair_name': 'pair_1', 'long_account': 'account_1', 'short_account': 'account_2'}],
+            'loop_monitor': {'enabled': False},
+            'state': {'file': os.path.join(self.directory.name, 'state.json')},
+        }
+        path = os.path.join(self.directory.name, 'config.yaml')
+        with open(path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump(self.config, file)
+        self.bot = HedgeTradingBot(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_proxy_change_moves_account_to_new_scheduler(self):
+        """测试更换代理后账户改用新代理的请求调度器"""
+        pair = self.bot.hedge_pairs[0]
+        self.assertIs(pair.api_long.scheduler, get_scheduler('proxy_1'))
+
+        new_config = copy.deepcopy(self.bot.config)
+        new_config['api_credentials'][0]['proxy'] = 'proxy_2'
+        new_config['api_credentials'][1].pop('proxy')
+        asyncio.run(self.bot.apply_config(new_config))
+
+        self.assertIs(pair.api_long.scheduler, get_scheduler('proxy_2'))
+        self.assertIs(pair.api_short.scheduler, get_scheduler('direct'))
+        self.assertEqual(pair.api_long.proxy_config['name'], 'proxy_2')
+
+    def test_market_threshold_change_updates_pair_in_place(self):
+        """测试修改市场止损阈值时在线更新运行中的交易对，不平仓重建"""
+        config = copy.deepcopy(self.bot.config)
+        config['hedge_pairs'][0]['markets'] = [{'symbol': 'BTC'}, {'symbol': 'ETH'}]
+        config['hedge_pairs'][0]['stop_loss_threshold'] = 150
+        self.bot.config = config
+        self.bot.hedge_pairs = [self.bot._build_hedge_pair(
+            config['hedge_pairs'][0], {acc['account_name']: acc for acc in config['api_credentials']}
+        )]
+        pair = self.bot.hedge_pairs[0]
+        pair.close_positions = AsyncMock(return_value=True)
+
+        new_config = copy.deepcopy(config)
+        new_config['hedge_pairs'][0]['stop_loss_threshold'] = 120
+        new_config['hedge_pairs'][0]['markets'][0].update(stop_loss_threshold=30, position_size=60)
+        asyncio.run(self.bot.apply_config(new_config))
+
+        self.assertEqual(self.bot.hedge_pairs, [pair])
+        pair.close_positions.assert_not_awaited()
+        btc, eth = pair.legs
+        self.assertEqual((btc.stop_loss_threshold, btc.position_size), (30, 60))
+        self.assertEqual((eth.stop_loss_threshold, eth.position_size), (100, 100))
+        self.assertEqual(pair.stop_loss_threshold, 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import sys
+import os
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.execution import OrderExecutor, estimate_slippage_bps
+from src.order_book import OrderBook
+from src.order_tracker import OrderTracker
+
+
+class TestOrderExecutor(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.book = OrderBook(market_id=1)
+        self.book.apply_snapshot(
+            bids=[('99.9', '1'), ('99', '1'), ('95', '10')],
+            asks=[('100.1', '1'), ('101', '1'), ('105', '10')]
+        )
+        self.executor = OrderExecutor({
+            'max_slippage_bps': 20,
+            'max_child_notional': 100000,
+            'child_interval': 0,
+        })
+
+    def _make_api(self, success=True):
+        api = MagicMock()
+        api.order_books = {1: self.book}
+        api.get_market_price = AsyncMock(return_value={'success': True, 'price': 100.0})
+        api.place_order = AsyncMock(return_value={
+            'success': success, 'tx_hash': '0xhash', 'error': None if success else '下单失败'
+        })
+        return api
+
+    def _make_pair(self, api_long, api_short):
+        pair = MagicMock()
+        pair.pair_id = 'a-b'
+        pair.market_index = 1
+        pair.leverage = 5
+        pair.api_long = api_long
+        pair.api_short = api_short
+        return pair
+
+    def test_estimate_slippage(self):
+        """测试滑点估算"""
+        slippage, vwap, filled = estimate_slippage_bps(self.book, 'buy', 1)
+        self.assertEqual(filled, 1)
+        self.assertAlmostEqual(vwap, 100.1)
+        self.assertAlmostEqual(slippage, 10.0)
+
+    def test_small_order_is_not_split(self):
+        """测试冲击在上限内的订单不拆分"""
+        self.assertEqual(self.executor.plan_children(self.book, 1, 100.0), [1])
+
+    def test_large_order_is_split(self):
+        """测试冲击超过上限的订单拆分为子订单"""
+        children = self.executor.plan_children(self.book, 5, 100.0)
+        self.assertGreater(len(children), 1)
+        self.assertAlmostEqual(sum(children), 5)
+
+    def test_limit_price(self):
+        """测试子订单最差成交价"""
+        self.assertAlmostEqual(self.executor.limit_price('buy', 100.0), 100.2)
+        self.assertAlmostEqual(self.executor.limit_price('sell', 100.0), 99.8)
+
+    def test_execute_pair_reports_fill_quality(self):
+        """测试两条腿同步执行并生成成交质量报告"""
+        api_long, api_short = self._make_api(), self._make_api()
+        pair = self._make_pair(api_long, api_short)
+        report = asyncio.run(self.executor.execute_pair(pair, 3))
+
+        self.assertTrue(report['success'])
+        self.assertIs(self.executor.reports['a-b'], report)
+        long_leg = report['legs']['long']
+        self.assertAlmostEqual(long_leg['submitted_quantity'], 3)
+        self.assertEqual(long_leg['child_orders'], api_long.place_order.await_count)
+        self.assertEqual(api_short.place_order.await_args.kwargs['side'], 'sell')
+
+    def test_execute_pair_stops_after_failed_child(self):
+        """测试任一腿子订单失败后停止后续子订单"""
+        api_long, api_short = self._make_api(), self._make_api(success=False)
+        pair = self._make_pair(api_long, api_short)
+        report = asyncio.run(self.executor.execute_pair(pair, 3))
+
+        self.assertFalse(report['success'])
+        # 做多腿只提交了第一笔子订单，随后用只减仓订单平掉
+        self.assertEqual(api_long.place_order.await_count, 2)
+        first, unwind = api_long.place_order.await_args_list
+        self.assertEqual(unwind.kwargs['side'], 'sell')
+        self.assertTrue(unwind.kwargs['reduce_only'])
+        self.assertAlmostEqual(unwind.kwargs['quantity'], first.kwargs['quantity'])
+        self.assertEqual(api_short.place_order.await_count, 1)
+        self.assertEqual(list(report['unwind']), ['long'])
+        self.assertTrue(report['unwind']['long']['success'])
+
+    def test_tracked_fills_are_reported_and_partial_fill_unwound(self):
+        """测试订单跟踪的实际成交均价写入报告，部分成交的腿按实际成交数量平掉"""
+        tracker = OrderTracker({'timeout': 1})
+        apis = []
+        for index in (1, 2):
+            api = self._make_api()
+            api.base_url, api.account_index = 'https://testnet', index
+            api.place_order = AsyncMock(return_value={'success': True, 'tx_hash': '0x', 'client_order_index': index})
+            apis.append(api)
+        pair = self._make_pair(*apis)
+
+        async def run():
+            executing = asyncio.ensure_future(self.executor.execute_pair(pair, 1, order_tracker=tracker))
+            await asyncio.sleep(0.01)
+            tracker.apply_update(('https://testnet', 1), {
+                'client_order_index': 1, 'status': 'filled', 'filled_base_amount': '1', 'filled_quote_amount': '100.1'
+            })
+            tracker.apply_update(('https://testnet', 2), {
+                'client_order_index': 2, 'status': 'canceled', 'filled_base_amount': '0.4',
+                'filled_quote_amount': '39.96', 'remaining_base_amount': '0.6'
+            })
+            return await executing
+
+        report = asyncio.run(run())
+        self.assertFalse(report['success'])
+        self.assertAlmostEqual(report['legs']['long']['fill_vwap'], 100.1)
+        self.assertAlmostEqual(report['legs']['long']['fill_slippage_bps'], 10.0)
+        self.assertAlmostEqual(report['legs']['short']['fill_vwap'], 99.9)
+        self.assertAlmostEqual(report['unwind']['long']['quantity'], 1)
+        self.assertAlmostEqual(report['unwind']['short']['quantity'], 0.4)
+        self.assertEqual(report['unwind']['short']['side'], 'buy')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fixed_point import MarketScale, to_decimal
+from src.hedge_trader import HedgePair
+
+
+class MarketInfo:
+    supported_size_decimals = 5
+    supported_price_decimals = 1
+    min_base_amount = '0.0002'
+
+
+class TestFixedPoint(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.scale = MarketScale.from_market_info(MarketInfo())
+
+    def test_to_decimal_uses_decimal_repr(self):
+        """测试浮点数按十进制表示转换"""
+        self.assertEqual(to_decimal(0.1), Decimal('0.1'))
+
+    def test_base_amount_has_no_float_error(self):
+        """测试数量换算没有浮点误差（浮点计算 int(0.00007 * 100000) 为 6）"""
+        self.assertEqual(self.scale.to_base_amount(0.00007), 7)
+        self.assertEqual(self.scale.to_base_amount(0.0002), 20)
+        self.assertEqual(self.scale.min_base_amount, 20)
+
+    def test_worst_price_rounds_toward_mid(self):
+        """测试最差成交价向中间价方向舍入"""
+        self.assertEqual(self.scale.worst_price('buy', 100.19), 1001)
+        self.assertEqual(self.scale.worst_price('sell', 99.81), 999)
+
+    def test_notional_to_base_amount(self):
+        """测试USD金额换算为整数数量"""
+        self.assertEqual(self.scale.notional_to_base_amount(100, '50000'), 200)
+
+    def test_validate_base_amount(self):
+        """测试提交前的数量校验"""
+        self.assertIsNone(self.scale.validate_base_amount(20))
+        self.assertIsNotNone(self.scale.validate_base_amount(19))
+        self.assertIsNotNone(self.scale.validate_base_amount(0))
+
+    def test_round_trip(self):
+        """测试整数与十进制互转"""
+        self.assertEqual(self.scale.base_amount_to_decimal(20), Decimal('0.0002'))
+        self.assertEqual(self.scale.price_to_decimal(1001), Decimal('100.1'))
+
+
+
+class TestSharedMarketScales(unittest.TestCase):
+
+    def test_short_leg_uses_scale_found_by_long_leg(self):
+        """测试做多账户查找市场后，做空账户的客户端使用同一市场精度"""
+        accounts = [
+            {'account_name': f'scale_{i}', 'api_key': f'key_{i}', 'account_index': i, 'network': 'testnet'}
+            for i in range(2)
+        ]
+        pair = HedgePair(accounts[0], accounts[1], {'trading_pair': 'SCALE', 'leverage': 1, 'position_size': 100})
+        market_info = MarketInfo()
+        market_info.symbol, market_info.market_id = 'SCALE', 77
+        market_info.status, market_info.min_quote_amount = 'active', 10
+        pair.api_long._initialize_client = lambda: None
+        pair.api_long.get_all_order_books = AsyncMock(return_value={
+            'success': True, 'order_books': SimpleNamespace(order_books=[market_info])
+        })
+
+        asyncio.run(pair.initialize())
+
+        scale = pair.api_short.get_market_scale(77)
+        self.assertEqual((scale.size_decimals, scale.price_decimals, scale.min_base_amount), (5, 1, 20))
+        self.assertEqual(scale.to_price(100.19), 1002)
+
+
+if __name__ == '__main__':
+    unittest.main()
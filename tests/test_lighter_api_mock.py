@@ -105,6 +105,9 @@ class MockLighterAPITester:
             position = result['positions'][0]
             assert position['symbol'] == "BTC"
             assert position['side'] == "long"
+            # 按市场过滤
+            assert len((await self.api.get_open_positions(market_index=0))['positions']) == 1
+            assert len((await self.api.get_open_positions(market_index=1))['positions']) == 0
             logger.info("✓ 获取持仓信息测试通过")
             
             # 测试下单
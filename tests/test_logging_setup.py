@@ -0,0 +1,115 @@
+import unittest
+import sys
+import os
+import json
+import time
+import queue
+import logging
+import tempfile
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logging_setup import (
+    configure_logging, shutdown_logging, bind_log_context, NonBlockingQueueHandler
+)
+
+
+class CountingRepr:
+    """记录被格式化次数的对象"""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'order'
+
+
+class TestLoggingSetup(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'bot.log')
+        self.logger = logging.getLogger('test_logging_setup')
+
+    def tearDown(self):
+        shutdown_logging()
+        self.directory.cleanup()
+
+    def _configure(self, **config):
+        configure_logging({'file': self.path, **config})
+
+    def _read(self):
+        shutdown_logging()
+        with open(self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_json_output_with_pair_context(self):
+        """测试输出 JSON 并附加交易对上下文"""
+        self._configure()
+        with bind_log_context(pair='pair_1'):
+            self.logger.info("触发止损 %s: 浮动盈亏 %s USD", 'a-b', -12.5)
+        self.logger.info("无上下文")
+        first, second = self._read()
+        self.assertEqual(first['message'], "触发止损 a-b: 浮动盈亏 -12.5 USD")
+        self.assertEqual(first['pair'], 'pair_1')
+        self.assertEqual(first['level'], 'INFO')
+        self.assertNotIn('pair', second)
+
+    def test_filtered_records_are_not_formatted(self):
+        """测试被级别过滤的日志不会格式化参数"""
+        self._configure(level='INFO')
+        order = CountingRepr()
+        self.logger.debug("做多订单: %s", order)
+        self.logger.info("做多订单: %s", order)
+        records = self._read()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(order.formatted, 1)
+
+    def test_sampling_reports_dropped_count(self):
+        """测试高频日志采样并在下一个窗口报告丢弃条数"""
+        self._configure(sampling={'loggers': ['test_logging_setup'], 'level': 'INFO', 'interval': 0.05, 'burst': 2})
+        for i in range(5):
+            self.logger.info("轮询 %s", i)
+        self.logger.warning("警告不采样")
+        self.logger.warning("警告不采样")
+        self.logger.warning("警告不采样")
+        time.sleep(0.06)
+        self.logger.info("轮询 %s", 5)
+        records = self._read()
+        messages = [record['message'] for record in records]
+        self.assertEqual(messages.count("警告不采样"), 3)
+        polls = [record for record in records if record['message'].startswith("轮询")]
+        self.assertEqual([record['message'] for record in polls], ["轮询 0", "轮询 1", "轮询 5"])
+        self.assertEqual(polls[-1]['sampled_dropped'], 3)
+
+    def test_sampling_is_opt_in_and_skips_audit_logs(self):
+        """测试默认不采样，列出的审计 logger 的 INFO 日志也不采样"""
+        self._configure()
+        for i in range(30):
+            self.logger.info("轮询 %s", i)
+        self.assertEqual(len(self._read()), 30)
+
+        self._configure(level='DEBUG', sampling={'loggers': ['src'], 'level': 'INFO', 'burst': 2})
+        for i in range(5):
+            logging.getLogger('src.hedge_trader').info("对冲头寸已平仓: %s", i)
+            logging.getLogger('src.hedge_trader').debug("做多订单: %s", i)
+            logging.getLogger('src.order_book').info("订单簿更新 %s", i)
+        messages = [record['message'] for record in self._read()[30:]]
+        self.assertEqual(sum(message.startswith("对冲头寸已平仓") for message in messages), 5)
+        self.assertEqual(sum(message.startswith("做多订单") for message in messages), 2)
+        self.assertEqual(sum(message.startswith("订单簿更新") for message in messages), 2)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """测试队列满时丢弃日志而不是阻塞"""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord('x', logging.INFO, __file__, 1, "msg", None, None)
+        for _ in range(3):
+            handler.emit(record)
+        self.assertEqual(handler.dropped, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+import time
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.loop_monitor import LoopMonitor
+
+
+def blocking_call(seconds):
+    """模拟同步阻塞调用（如同步发送邮件）"""
+    time.sleep(seconds)
+
+
+class TestLoopMonitor(unittest.TestCase):
+
+    def _run_with_block(self, monitor, block_seconds):
+        async def culprit():
+            blocking_call(block_seconds)
+
+        async def run():
+            task = asyncio.create_task(monitor.run())
+            await asyncio.sleep(monitor.interval * 2)
+            await asyncio.create_task(culprit(), name='culprit-task')
+            await asyncio.sleep(monitor.interval * 3)
+            monitor.stop()
+            await task
+
+        asyncio.run(run())
+        return monitor.snapshot()
+
+    def test_slow_callback_is_attributed(self):
+        """测试慢回调被归因到具体函数和任务"""
+        monitor = LoopMonitor({'interval': 0.02, 'block_threshold': 0.05})
+        snapshot = self._run_with_block(monitor, 0.3)
+        self.assertGreaterEqual(snapshot['max'], 0.25)
+        self.assertEqual(snapshot['slow_callbacks'], 1)
+        event = snapshot['recent'][0]
+        self.assertIn('blocking_call', event['location'])
+        self.assertEqual(event['task'], 'culprit-task')
+        self.assertGreaterEqual(event['duration'], 0.25)
+        self.assertEqual(snapshot['by_location'][event['location']]['count'], 1)
+
+    def test_alert_when_lag_exceeds_threshold(self):
+        """测试调度延迟超过阈值时告警，并包含归因"""
+        on_alert = AsyncMock()
+        monitor = LoopMonitor({'interval': 0.02, 'block_threshold': 0.05, 'alert_lag': 0.2}, on_alert=on_alert)
+        snapshot = self._run_with_block(monitor, 0.3)
+        self.assertEqual(snapshot['alerts'], 1)
+        self.assertIn('blocking_call', on_alert.await_args.args[1])
+
+    def test_no_slow_callbacks_when_idle(self):
+        """测试空闲时不报告慢回调"""
+        monitor = LoopMonitor({'interval': 0.02, 'block_threshold': 0.1})
+        snapshot = self._run_with_block(monitor, 0)
+        self.assertEqual(snapshot['slow_callbacks'], 0)
+        self.assertEqual(snapshot['alerts'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
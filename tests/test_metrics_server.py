@@ -0,0 +1,100 @@
+import unittest
+import sys
+import os
+import json
+import asyncio
+import tempfile
+
+import yaml
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.trading_bot import HedgeTradingBot
+from src.metrics_server import MetricsServer, render_prometheus
+
+
+class TestMetricsServer(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        config = {
+            'trading_pair': 'BTC',
+            'leverage': 10,
+            'position_size': 100,
+            'stop_loss_threshold': 50,
+            'proxy_pool': [{'name': 'proxy_1', 'host': '127.0.0.1', 'port': 1080}],
+            'api_credentials': [
+                {'account_name': f'account_{i}', 'api_key': f'key_{i}', 'account_index': i,
+                 'api_key_index': 0, 'network': 'mainnet'}
+                for i in range(1, 5)
+            ],
+            'hedge_pairs': [
+                {'pair_name': 'pair_1', 'long_account': 'account_1', 'short_account': 'account_2'},
+                {'pair_name': 'pair "2"', 'long_account': 'account_3', 'short_account': 'account_4'},
+            ]
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'config.yaml')
+        with open(path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump(config, file)
+        self.bot = HedgeTradingBot(path)
+
+        pair = self.bot.hedge_pairs[0]
+        pair.last_pnl = -12.5
+        pair.last_check_time = 0.0
+        pair.long_size = 0.002
+        pair.short_size = 0.002
+        pair.api_long.retry_count = 2
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_snapshot_reads_memory_only(self):
+        """测试快照只读取内存状态，未创建的客户端不会被创建"""
+        snapshot = self.bot.get_metrics_snapshot()
+        first, second = snapshot['pairs']
+        self.assertEqual(first['floating_pnl'], -12.5)
+        self.assertEqual(first['retries'], 2)
+        self.assertIsNone(second['last_check_age'])
+        self.assertEqual(snapshot['api']['retries'], 2)
+        self.assertEqual(self.bot.hedge_pairs[1].api_clients(), [])
+
+    def test_prometheus_rendering(self):
+        """测试 Prometheus 文本格式及标签转义"""
+        text = render_prometheus(self.bot.get_metrics_snapshot())
+        self.assertIn('hedge_bot_pair_floating_pnl{pair="pair_1"} -12.5', text)
+        self.assertIn('hedge_bot_pair_leg_size{pair="pair_1",leg="long"} 0.002', text)
+        self.assertIn('hedge_bot_pair_floating_pnl{pair="pair \\"2\\""} NaN', text)
+        self.assertIn('hedge_bot_api_retries_total 2.0', text)
+        self.assertIn('hedge_bot_pair_state{pair="pair_1",state="init"} 1', text)
+        self.assertIn('hedge_bot_scheduler_requests_total{scheduler="direct",lane="emergency_close"} 0.0', text)
+
+    def test_http_routes(self):
+        """测试 HTTP 路由"""
+        async def fetch(port, path):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.partition(b'\r\n\r\n')
+            return head.split(b' ')[1], body
+
+        async def run():
+            server = MetricsServer(self.bot.get_metrics_snapshot, port=0)
+            await server.start()
+            try:
+                return [await fetch(server.port, path) for path in ('/metrics.json', '/metrics', '/other')]
+            finally:
+                await server.stop()
+
+        (json_status, json_body), (text_status, text_body), (missing_status, _) = asyncio.run(run())
+        self.assertEqual(json_status, b'200')
+        self.assertEqual(json.loads(json_body)['pairs'][0]['pair_name'], 'pair_1')
+        self.assertEqual(text_status, b'200')
+        self.assertIn(b'hedge_bot_pairs 2', text_body)
+        self.assertEqual(missing_status, b'404')
+
+
+if __name__ == '__main__':
+    unittest.main()
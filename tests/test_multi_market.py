@@ -0,0 +1,145 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.account_snapshot import AccountSnapshotService
+from src.multi_market import MultiMarketHedgePair
+from src.records import OrderResult
+from tests.helpers import make_positions_api
+
+
+def make_api(account_index, positions):
+    """模拟账户API客户端，positions 为 [(market_id, symbol, size, pnl), ...]"""
+    api = make_positions_api(account_index, positions)
+    api.close_position = AsyncMock(return_value={'success': True})
+    return api
+
+
+class TestMultiMarketHedgePair(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        config = {'trading_pair': 'BTC', 'leverage': 5, 'position_size': 100, 'stop_loss_threshold': 50}
+        self.pair = MultiMarketHedgePair(
+            {'account_name': 'account_1', 'api_key': 'key_1'},
+            {'account_name': 'account_2', 'api_key': 'key_2'},
+            config,
+            [{'symbol': 'BTC', 'stop_loss_threshold': 30}, {'symbol': 'ETH'}],
+            stop_loss_threshold=60
+        )
+        for leg, market_index in zip(self.pair.legs, (1, 2)):
+            leg.market_index = market_index
+        self.pair.api_long = make_api(1, [(1, 'BTC', 0.01, -20.0), (2, 'ETH', 0.1, 5.0)])
+        self.pair.api_short = make_api(2, [(1, 'BTC', -0.01, 0.0), (2, 'ETH', -0.1, -4.0)])
+        self.pair.account_snapshots = AccountSnapshotService()
+
+    def test_one_snapshot_per_account(self):
+        """测试所有市场共用每个账户的一次持仓查询"""
+        pnl = asyncio.run(self.pair.get_floating_pnl())
+        self.assertAlmostEqual(pnl, -19.0)
+        self.assertEqual(self.pair.api_long.get_open_positions.await_count, 1)
+        self.assertEqual(self.pair.api_short.get_open_positions.await_count, 1)
+        btc, eth = self.pair.legs
+        self.assertEqual((btc.last_pnl, eth.last_pnl), (-20.0, 1.0))
+        self.assertEqual(btc.long_size, 0.01)
+
+    def test_market_stop_loss_closes_only_that_market(self):
+        """测试单个市场触发止损时只平掉该市场"""
+        self.pair.api_long.positions[0] = (1, 'BTC', 0.01, -35.0)
+
+        async def run():
+            triggered = await self.pair.is_stop_loss_triggered()
+            closed = await self.pair.close_triggered_positions()
+            return triggered, closed
+
+        self.assertEqual(asyncio.run(run()), (True, True))
+        closed_markets = {call.kwargs['market_index'] for call in self.pair.api_long.close_position.await_args_list}
+        self.assertEqual(closed_markets, {1})
+        self.assertEqual(self.pair.symbols(), ('ETH',))
+
+    def test_aggregate_stop_loss_closes_all_markets(self):
+        """测试总止损触发时平掉所有市场"""
+        self.pair.api_long.positions = [(1, 'BTC', 0.01, -25.0), (2, 'ETH', 0.1, -40.0)]
+
+        async def run():
+            triggered = await self.pair.is_stop_loss_triggered()
+            await self.pair.close_triggered_positions()
+            return triggered
+
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(self.pair.api_long.close_position.await_count, 2)
+        self.assertEqual(self.pair.active_legs(), [])
+
+    def test_failed_leg_query_skips_check(self):
+        """测试做空账户持仓查询失败时不按做多账户的亏损触发止损"""
+        self.pair.api_long.positions = [(1, 'BTC', 0.01, -100.0), (2, 'ETH', 0.1, -100.0)]
+        self.pair.api_short = make_positions_api(2, [], success=False)
+        self.assertFalse(asyncio.run(self.pair.is_stop_loss_triggered()))
+        self.assertEqual(self.pair.triggered_legs, [])
+        self.assertEqual([leg.last_pnl for leg in self.pair.legs], [None, None])
+        self.assertEqual(self.pair.skipped_checks, 1)
+
+    def test_rejected_leg_fails_open(self):
+        """测试未启用订单跟踪时，下单结果 success=False 的市场开仓失败"""
+        for api in (self.pair.api_long, self.pair.api_short):
+            api.usd_to_quantity = AsyncMock(return_value={
+                'success': True, 'quantity': 0.01, 'base_amount': 1000, 'price': 100.0
+            })
+        self.pair.api_long.place_order = AsyncMock(return_value=OrderResult(True, tx_hash='0x'))
+        self.pair.api_short.place_order = AsyncMock(side_effect=lambda **kwargs: OrderResult(
+            kwargs['market_index'] == 1, error=None if kwargs['market_index'] == 1 else 'margin'
+        ))
+        self.assertFalse(asyncio.run(self.pair.open_positions()))
+        self.assertEqual(self.pair.traded_notional, self.pair.legs[0].position_size)
+
+    def test_failed_leg_does_not_cancel_sibling(self):
+        """测试一条腿下单抛出异常时，另一条腿的下单不被取消"""
+        for api in (self.pair.api_long, self.pair.api_short):
+            api.usd_to_quantity = AsyncMock(return_value={
+                'success': True, 'quantity': 0.01, 'base_amount': 1000, 'price': 100.0
+            })
+        long_done = []
+
+        async def place_long(**kwargs):
+            await asyncio.sleep(0.01)
+            long_done.append(kwargs['market_index'])
+            return OrderResult(True, tx_hash='0x')
+
+        self.pair.api_long.place_order = place_long
+        self.pair.api_short.place_order = AsyncMock(side_effect=RuntimeError('boom'))
+        self.assertFalse(asyncio.run(self.pair.open_positions()))
+        self.assertEqual(sorted(long_done), [1, 2])
+        btc = self.pair.legs[0]
+        self.assertTrue(btc.order_long['success'])
+        self.assertEqual(btc.order_short['error'], 'boom')
+
+    def test_update_params_applies_per_market_settings(self):
+        """测试在线更新各市场单独指定的参数和总止损阈值"""
+        config = {'trading_pair': 'BTC', 'leverage': 5, 'position_size': 200, 'stop_loss_threshold': 80}
+        self.pair.update_params(config, {
+            'pair_name': 'basket', 'stop_loss_threshold': 90,
+            'markets': [{'symbol': 'BTC', 'stop_loss_threshold': 20, 'position_size': 50}, {'symbol': 'ETH'}],
+        })
+        btc, eth = self.pair.legs
+        self.assertEqual((btc.stop_loss_threshold, btc.position_size), (20, 50))
+        self.assertEqual((eth.stop_loss_threshold, eth.position_size), (80, 200))
+        self.assertEqual(self.pair.stop_loss_threshold, 90)
+
+        self.pair.update_params(config, {'pair_name': 'basket', 'markets': [{'symbol': 'BTC'}, {'symbol': 'ETH'}]})
+        self.assertEqual((btc.stop_loss_threshold, btc.position_size), (80, 200))
+        self.assertEqual(self.pair.stop_loss_threshold, 80)
+
+    def test_stop_loss_state_picks_closest_check(self):
+        """测试自适应轮询使用最接近触发的止损检查"""
+        asyncio.run(self.pair.is_stop_loss_triggered())
+        self.assertEqual(self.pair.stop_loss_state(), (-20.0, 30))
+        self.assertEqual(len(self.pair.metrics()['markets']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
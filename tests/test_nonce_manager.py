@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lighter_api import LighterAPI
+from src.nonce_manager import NonceAllocator, get_nonce_allocator
+
+
+class TestNonceAllocator(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.fetch = AsyncMock(return_value=100)
+
+    def test_local_allocation_after_one_sync(self):
+        """测试只同步一次，之后在本地连续分配"""
+        allocator = NonceAllocator(('testnet', 1, 0))
+
+        async def run():
+            nonces = []
+            for _ in range(5):
+                async with allocator.lease(self.fetch) as lease:
+                    nonces.append(lease.nonce)
+            return nonces
+
+        self.assertEqual(asyncio.run(run()), [100, 101, 102, 103, 104])
+        self.assertEqual(self.fetch.await_count, 1)
+
+    def test_concurrent_leases_are_unique_and_bounded(self):
+        """测试并发交易拿到不同的 nonce，在途数量不超过上限"""
+        allocator = NonceAllocator(('testnet', 1, 0), max_in_flight=3)
+        peak = []
+
+        async def submit():
+            async with allocator.lease(self.fetch) as lease:
+                peak.append(allocator.in_flight)
+                await asyncio.sleep(0.01)
+                return lease.nonce
+
+        async def run():
+            return await asyncio.gather(*(submit() for _ in range(10)))
+
+        nonces = asyncio.run(run())
+        self.assertEqual(sorted(nonces), list(range(100, 110)))
+        self.assertLessEqual(max(peak), 3)
+        self.assertEqual(self.fetch.await_count, 1)
+
+    def test_failure_resyncs_after_in_flight_drains(self):
+        """测试交易失败后，等在途交易结束再重新同步"""
+        allocator = NonceAllocator(('testnet', 1, 0))
+        self.fetch.side_effect = [100, 200]
+
+        async def run():
+            first = await allocator.acquire(self.fetch)
+            second = await allocator.acquire(self.fetch)
+            allocator.release(ok=False)
+            waiting = asyncio.ensure_future(allocator.acquire(self.fetch))
+            await asyncio.sleep(0.01)
+            # 仍有一个在途交易，不能同步
+            self.assertFalse(waiting.done())
+            allocator.release(ok=True)
+            third = await waiting
+            return first, second, third
+
+        self.assertEqual(asyncio.run(run()), (100, 101, 200))
+        self.assertEqual(allocator.snapshot()['resyncs'], 2)
+        self.assertEqual(allocator.snapshot()['errors'], 1)
+
+    def test_exception_marks_failure(self):
+        """测试提交时抛出异常视为失败"""
+        allocator = NonceAllocator(('testnet', 1, 0))
+
+        async def run():
+            with self.assertRaises(RuntimeError):
+                async with allocator.lease(self.fetch):
+                    raise RuntimeError("网络错误")
+            async with allocator.lease(self.fetch) as lease:
+                return lease.nonce
+
+        self.assertEqual(asyncio.run(run()), 100)
+        self.assertEqual(self.fetch.await_count, 2)
+
+    def test_registry_shares_by_key(self):
+        """测试同一账户同一API密钥共享分配器"""
+        self.assertIs(get_nonce_allocator('testnet', 7, 1), get_nonce_allocator('testnet', 7, 1))
+        self.assertIsNot(get_nonce_allocator('testnet', 7, 1), get_nonce_allocator('testnet', 7, 2))
+
+
+class TestSignedTransactions(unittest.TestCase):
+
+    def test_place_order_passes_allocated_nonce(self):
+        """测试下单时传递本地分配的 nonce 和 API密钥索引"""
+        api = LighterAPI('key', network='testnet', account_index=3, api_key_index=2,
+                         nonces=NonceAllocator(('testnet', 3, 2)))
+        api.client = MagicMock()
+        api.client.create_market_order = AsyncMock(return_value=('tx', '0xabc', None))
+        api._fetch_next_nonce = AsyncMock(return_value=42)
+
+        async def run():
+            return await asyncio.gather(*(
+                api.place_order(market_index=1, side='buy', base_amount=100) for _ in range(3)
+            ))
+
+        results = asyncio.run(run())
+        self.assertTrue(all(result['success'] for result in results))
+        nonces = sorted(call.kwargs['nonce'] for call in api.client.create_market_order.await_args_list)
+        self.assertEqual(nonces, [42, 43, 44])
+        self.assertEqual(api.client.create_market_order.await_args.kwargs['api_key_index'], 2)
+        api._fetch_next_nonce.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
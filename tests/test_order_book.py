@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.order_book import OrderBook
+
+
+class TestOrderBook(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.book = OrderBook(market_id=1)
+        self.book.apply_snapshot(
+            bids=[('99', '1'), ('98', '2'), ('97', '5')],
+            asks=[{'price': '101', 'size': '1'}, {'price': '102', 'size': '2'}, {'price': '103', 'size': '5'}],
+            offset=10
+        )
+
+    def test_best_prices_and_mid(self):
+        """测试最优价和中间价"""
+        self.assertEqual(self.book.best_bid(), (99.0, 1.0))
+        self.assertEqual(self.book.best_ask(), (101.0, 1.0))
+        self.assertEqual(self.book.mid_price(), 100.0)
+
+    def test_apply_delta_updates_and_removes_levels(self):
+        """测试增量更新：新增、修改和删除档位"""
+        self.assertTrue(self.book.apply_delta(bids=[('99.5', '3')], asks=[('101', '0')], offset=11))
+        self.assertEqual(self.book.best_bid(), (99.5, 3.0))
+        self.assertEqual(self.book.best_ask(), (102.0, 2.0))
+
+    def test_stale_delta_is_ignored(self):
+        """测试序号过期的增量更新被忽略"""
+        self.assertFalse(self.book.apply_delta(bids=[('100', '1')], offset=9))
+        self.assertEqual(self.book.best_bid(), (99.0, 1.0))
+
+    def test_snapshot_aggregates_orders_at_same_price(self):
+        """测试快照中同一价格的订单合并为一个档位"""
+        book = OrderBook(market_id=1)
+        book.apply_snapshot(bids=[('99', '1'), ('99', '2')], asks=[('101', '1')])
+        self.assertEqual(book.best_bid(), (99.0, 3.0))
+
+    def test_one_sided_book(self):
+        """测试单边订单簿不返回中间价"""
+        book = OrderBook(market_id=1)
+        book.apply_snapshot(bids=[('99', '1')], asks=[])
+        self.assertFalse(book.is_two_sided())
+        self.assertIsNone(book.mid_price())
+        self.assertIsNone(book.depth_weighted_mid())
+
+    def test_depth_weighted_mid_leans_to_thin_side(self):
+        """测试深度加权中间价偏向深度较薄的一侧"""
+        book = OrderBook(market_id=1)
+        book.apply_snapshot(bids=[('99', '10')], asks=[('101', '1')])
+        self.assertGreater(book.depth_weighted_mid(), 100.0)
+
+    def test_vwap_for_size(self):
+        """测试按数量吃单的成交均价"""
+        vwap, filled = self.book.vwap_for_size('buy', 3)
+        self.assertEqual(filled, 3)
+        self.assertAlmostEqual(vwap, (101 + 102 * 2) / 3)
+
+        vwap, filled = self.book.vwap_for_size('sell', 100)
+        self.assertEqual(filled, 8)
+
+    def test_quantity_for_notional(self):
+        """测试按USD金额吃单可成交数量"""
+        quantity, vwap, complete = self.book.quantity_for_notional('buy', 101 + 102)
+        self.assertTrue(complete)
+        self.assertAlmostEqual(quantity, 2.0)
+        self.assertAlmostEqual(vwap, 101.5)
+
+        quantity, vwap, complete = self.book.quantity_for_notional('buy', 1000000)
+        self.assertFalse(complete)
+        self.assertEqual(quantity, 8.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
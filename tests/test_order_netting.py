@@ -0,0 +1,155 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.order_netting import OrderNetter
+from src.records import OrderResult
+
+
+def make_api(account_index, success=True):
+    """模拟账户API客户端"""
+    api = SimpleNamespace(base_url='https://testnet', account_index=account_index)
+    if success:
+        api.place_order = AsyncMock(return_value=OrderResult(True, tx_hash='0xabc', timestamp=0.0))
+    else:
+        api.place_order = AsyncMock(return_value=OrderResult(False, error='余额不足', timestamp=0.0))
+
+    async def close_position(market_index, order_index):
+        await asyncio.sleep(0.01)
+        return {'success': True, 'tx_hash': '0xdef'}
+
+    api.close_position = AsyncMock(side_effect=close_position)
+    return api
+
+
+class TestOrderNetter(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.netter = OrderNetter({'window': 0.01})
+
+    def test_same_side_intents_merge(self):
+        """测试同一账户同一市场的同向意图合并为一笔订单"""
+        api = make_api(1)
+
+        async def run():
+            return await asyncio.gather(
+                self.netter.place_order(api, 'a', 1, 'buy', 100),
+                self.netter.place_order(api, 'b', 1, 'buy', 250),
+            )
+
+        first, second = asyncio.run(run())
+        self.assertEqual(api.place_order.await_count, 1)
+        kwargs = api.place_order.await_args.kwargs
+        self.assertEqual((kwargs['side'], kwargs['base_amount']), ('buy', 350))
+        self.assertEqual((first['order_amount'], second['order_amount']), (100, 250))
+        self.assertTrue(first['success'] and second['success'])
+        self.assertEqual(first['tx_hash'], '0xabc')
+
+    def test_opposite_intents_cross_internally(self):
+        """测试反方向意图内部抵消，只提交净额"""
+        api = make_api(1)
+
+        async def run():
+            return await asyncio.gather(
+                self.netter.place_order(api, 'a', 1, 'buy', 100, price=101),
+                self.netter.place_order(api, 'b', 1, 'sell', 40),
+                self.netter.place_order(api, 'c', 1, 'buy', 30, price=100),
+            )
+
+        a, b, c = asyncio.run(run())
+        kwargs = api.place_order.await_args.kwargs
+        self.assertEqual((kwargs['side'], kwargs['base_amount'], kwargs['price']), ('buy', 90, 100))
+        self.assertEqual((a['netted_amount'], a['order_amount']), (40, 60))
+        self.assertEqual((b['netted_amount'], b['order_amount']), (40, 0))
+        self.assertEqual((c['netted_amount'], c['order_amount']), (0, 30))
+        self.assertEqual(self.netter.snapshot(), {'intents': 3, 'orders': 1, 'netted': 40})
+
+    def test_fully_crossed_submits_nothing(self):
+        """测试完全抵消时不提交订单"""
+        api = make_api(1)
+
+        async def run():
+            return await asyncio.gather(
+                self.netter.place_order(api, 'a', 1, 'buy', 50),
+                self.netter.place_order(api, 'b', 1, 'sell', 50),
+            )
+
+        results = asyncio.run(run())
+        api.place_order.assert_not_awaited()
+        self.assertTrue(all(result['success'] for result in results))
+
+    def test_different_markets_and_accounts_are_separate(self):
+        """测试不同账户、不同市场分别提交"""
+        first, second = make_api(1), make_api(2)
+
+        async def run():
+            await asyncio.gather(
+                self.netter.place_order(first, 'a', 1, 'buy', 10),
+                self.netter.place_order(first, 'b', 2, 'buy', 10),
+                self.netter.place_order(second, 'c', 1, 'buy', 10),
+            )
+
+        asyncio.run(run())
+        self.assertEqual(first.place_order.await_count, 2)
+        self.assertEqual(second.place_order.await_count, 1)
+
+    def test_different_order_parameters_are_separate(self):
+        """测试只减仓的平仓意图不与开仓意图合并"""
+        api = make_api(1)
+
+        async def run():
+            await asyncio.gather(
+                self.netter.place_order(api, 'a', 1, 'buy', 100, leverage=5),
+                self.netter.place_order(api, 'b', 1, 'sell', 100, leverage=5, reduce_only=True),
+            )
+
+        asyncio.run(run())
+        calls = sorted((call.kwargs['side'], call.kwargs.get('reduce_only', False))
+                       for call in api.place_order.await_args_list)
+        self.assertEqual(calls, [('buy', False), ('sell', True)])
+        self.assertEqual(self.netter.netted, 0)
+
+    def test_failed_net_order(self):
+        """测试净额订单失败时，由订单成交的意图失败，内部抵消的意图成功"""
+        api = make_api(1, success=False)
+
+        async def run():
+            return await asyncio.gather(
+                self.netter.place_order(api, 'a', 1, 'buy', 100),
+                self.netter.place_order(api, 'b', 1, 'sell', 40),
+            )
+
+        a, b = asyncio.run(run())
+        self.assertFalse(a['success'])
+        self.assertEqual(a['error'], '余额不足')
+        self.assertEqual(a['netted_amount'], 40)
+        self.assertTrue(b['success'])
+
+    def test_duplicate_cancels_are_shared(self):
+        """测试相同的并发撤单只提交一次"""
+        api = make_api(1)
+
+        async def run():
+            return await asyncio.gather(*(self.netter.cancel_order(api, 1, 0) for _ in range(3)))
+
+        results = asyncio.run(run())
+        self.assertEqual(api.close_position.await_count, 1)
+        self.assertTrue(all(result['success'] for result in results))
+
+    def test_disabled_passes_through(self):
+        """测试禁用时直接下单"""
+        netter = OrderNetter({'enabled': False})
+        api = make_api(1)
+        asyncio.run(netter.place_order(api, 'a', 1, 'buy', 10, leverage=3))
+        self.assertEqual(api.place_order.await_args.kwargs['leverage'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
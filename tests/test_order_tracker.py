@@ -0,0 +1,241 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.execution import OrderExecutor
+from src.fixed_point import MarketScale
+from src.hedge_trader import HedgePair
+from src.lighter_api import LighterAPI
+from src.order_netting import OrderNetter
+from src.order_tracker import OrderState, OrderTracker, order_state
+from src.records import OrderResult
+
+ACCOUNT = ('https://testnet', 1)
+
+
+def make_api(active=(), inactive=()):
+    """模拟账户API客户端"""
+    api = SimpleNamespace(base_url='https://testnet', account_index=1)
+    api.get_active_orders = AsyncMock(return_value={
+        'success': True, 'orders': SimpleNamespace(orders=list(active))
+    })
+    api.get_inactive_orders = AsyncMock(return_value={
+        'success': True, 'orders': SimpleNamespace(orders=list(inactive))
+    })
+    return api
+
+
+def exchange_order(client_order_index, status, filled='0', remaining='0'):
+    """模拟交易所订单"""
+    return SimpleNamespace(client_order_index=client_order_index, status=status,
+                           filled_base_amount=filled, remaining_base_amount=remaining)
+
+
+class TestOrderState(unittest.TestCase):
+
+    def test_status_mapping(self):
+        """测试交易所订单状态解析"""
+        self.assertEqual(order_state(exchange_order(1, 'filled', '1.0'))[:2], (OrderState.FILLED, True))
+        self.assertEqual(order_state(exchange_order(1, 'open'))[:2], (OrderState.OPEN, False))
+        self.assertEqual(order_state(exchange_order(1, 'open', '0.4', '0.6'))[:2],
+                         (OrderState.PARTIALLY_FILLED, False))
+        self.assertEqual(order_state(exchange_order(1, 'canceled-no-liquidity'))[:2],
+                         (OrderState.CANCELED, True))
+        self.assertEqual(order_state({'status': 'canceled', 'filled_base_amount': '0.4'})[:2],
+                         (OrderState.PARTIALLY_FILLED, True))
+        self.assertIsNone(order_state(exchange_order(1, 'unknown'))[0])
+
+
+class TestOrderTracker(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.tracker = OrderTracker({'timeout': 5})
+
+    def test_push_update_resolves_future(self):
+        """测试推送的成交更新结束订单并唤醒等待方"""
+        api = make_api()
+
+        async def run():
+            order = self.tracker.track(api, 1, OrderResult(True, tx_hash='0xabc', client_order_index=7), 100)
+            waiting = asyncio.ensure_future(self.tracker.wait(order))
+            await asyncio.sleep(0)
+            self.assertTrue(self.tracker.apply_update(ACCOUNT, {'client_order_index': 7, 'status': 'open'}))
+            self.assertEqual(order.state, OrderState.OPEN)
+            self.tracker.apply_update(ACCOUNT, {'client_order_index': 7, 'status': 'filled',
+                                                'filled_base_amount': '0.1'})
+            return await waiting
+
+        order = asyncio.run(run())
+        self.assertTrue(order.filled)
+        self.assertEqual(order.result()['filled_base_amount'], 0.1)
+        self.assertEqual(self.tracker.snapshot()['pending'], 0)
+        self.assertEqual(self.tracker.snapshot()['filled'], 1)
+
+    def test_poll_batches_by_account_and_market(self):
+        """测试轮询时同一账户同一市场只查询一次"""
+        api = make_api(
+            active=[exchange_order(2, 'open', '0.5', '0.5')],
+            inactive=[exchange_order(1, 'filled', '1.0'), exchange_order(3, 'canceled')],
+        )
+
+        async def run():
+            orders = [self.tracker.track(api, 1, {'success': True, 'client_order_index': index}, 100)
+                      for index in (1, 2, 3)]
+            finished = await self.tracker.poll_once()
+            return orders, finished
+
+        (first, second, third), finished = asyncio.run(run())
+        self.assertEqual(finished, 2)
+        api.get_active_orders.assert_awaited_once_with(market_id=1)
+        api.get_inactive_orders.assert_awaited_once()
+        self.assertEqual(first.state, OrderState.FILLED)
+        self.assertEqual((second.state, second.done), (OrderState.PARTIALLY_FILLED, False))
+        self.assertEqual(third.state, OrderState.CANCELED)
+
+    def test_failed_submission_is_rejected(self):
+        """测试提交失败的订单直接标记为被拒绝"""
+        async def run():
+            return self.tracker.track(make_api(), 1, OrderResult(False, error='余额不足'), 100)
+
+        order = asyncio.run(run())
+        self.assertEqual((order.state, order.done, order.error), (OrderState.REJECTED, True, '余额不足'))
+
+    def test_fully_netted_intent_is_filled(self):
+        """测试轧差时完全内部抵消的意图视为已成交"""
+        async def run():
+            return self.tracker.track(make_api(), 1, {'success': True, 'order_amount': 0}, 100)
+
+        self.assertTrue(asyncio.run(run()).filled)
+
+    def test_netted_order_is_shared_by_all_pairs(self):
+        """测试轧差后共享同一笔净额订单的交易对都收到成交结果"""
+        api = make_api()
+        api.place_order = AsyncMock(return_value=OrderResult(True, tx_hash='0xabc', client_order_index=5))
+        netter = OrderNetter({'window': 0.01})
+
+        async def run():
+            results = await asyncio.gather(
+                netter.place_order(api, 'a', 1, 'buy', 100),
+                netter.place_order(api, 'b', 1, 'buy', 50),
+            )
+            orders = [self.tracker.track(api, 1, result, result['base_amount']) for result in results]
+            self.tracker.apply_update(ACCOUNT, exchange_order(5, 'filled', '1.5'))
+            return await asyncio.gather(*(self.tracker.wait(order, timeout=1) for order in orders))
+
+        first, second = asyncio.run(run())
+        self.assertTrue(first.filled and second.filled)
+        self.assertEqual(self.tracker.snapshot()['pending'], 0)
+
+    def test_unconfirmed_orders_expire(self):
+        """测试超时未结束的订单不再跟踪"""
+        tracker = OrderTracker({'timeout': 0})
+        api = make_api()
+
+        async def run():
+            order = tracker.track(api, 1, {'success': True, 'client_order_index': 9}, 100)
+            await tracker.poll_once()
+            return order
+
+        order = asyncio.run(run())
+        self.assertTrue(order.expired)
+        self.assertEqual(order.state, OrderState.PENDING)
+        self.assertEqual(tracker.snapshot()['expired'], 1)
+
+
+class TestHedgePairFillConfirmation(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        account = {'account_name': 'a', 'api_key': 'k', 'account_index': 1, 'api_key_index': 0}
+        config = {'trading_pair': 'ETH', 'leverage': 1, 'position_size': 100, 'stop_loss_threshold': 10}
+        self.pair = HedgePair(account, dict(account, account_name='b', account_index=2), config)
+        self.pair.market_index = 1
+        self.pair.order_tracker = OrderTracker({'timeout': 1})
+        for index, api in ((1, MagicMock()), (2, MagicMock())):
+            api.base_url, api.account_index = 'https://testnet', index
+            api.usd_to_quantity = AsyncMock(return_value={
+                'success': True, 'quantity': 0.05, 'base_amount': 500, 'price': 2000.0
+            })
+            api.place_order = AsyncMock(return_value=OrderResult(True, tx_hash='0x', client_order_index=index))
+            if index == 1:
+                self.pair.api_long = api
+            else:
+                self.pair.api_short = api
+
+    def _fill(self, statuses):
+        async def run():
+            opening = asyncio.ensure_future(self.pair.open_positions())
+            await asyncio.sleep(0.01)
+            for index, status in statuses.items():
+                self.pair.order_tracker.apply_update(('https://testnet', index),
+                                                     {'client_order_index': index, 'status': status})
+            return await opening
+        return asyncio.run(run())
+
+    def test_open_waits_for_both_fills(self):
+        """测试两条腿都成交后才算开仓成功"""
+        self.assertTrue(self._fill({1: 'filled', 2: 'filled'}))
+        self.assertEqual(self.pair.traded_notional, 100)
+
+    def test_open_fails_when_leg_is_canceled(self):
+        """测试一条腿未成交时开仓失败"""
+        self.assertFalse(self._fill({1: 'filled', 2: 'canceled'}))
+        self.assertEqual(self.pair.traded_notional, 0)
+
+    def test_rejected_leg_fails_without_tracker(self):
+        """测试未启用订单跟踪时，下单结果 success=False 的腿仍使开仓失败"""
+        self.pair.order_tracker = None
+        self.pair.api_short.place_order.return_value = OrderResult(False, error='margin')
+        self.assertFalse(asyncio.run(self.pair.open_positions()))
+        self.assertEqual(self.pair.traded_notional, 0)
+
+    def test_sibling_fill_is_confirmed_when_leg_fails(self):
+        """测试一条腿下单失败时仍确认另一条腿的成交"""
+        self.pair.api_short.place_order.return_value = OrderResult(False, error='margin')
+        self.assertFalse(self._fill({1: 'filled'}))
+        self.assertEqual(self.pair.order_tracker.counts[OrderState.FILLED], 1)
+        self.assertEqual(self.pair.order_tracker.snapshot()['pending'], 0)
+
+    def test_executor_child_orders_are_confirmed(self):
+        """测试执行器提交的子订单也等待成交确认"""
+        self.pair.executor = OrderExecutor()
+        for api in (self.pair.api_long, self.pair.api_short):
+            api.order_books = {}
+            api.get_market_price = AsyncMock(return_value={'success': True, 'price': 2000.0})
+            api.get_market_scale = MagicMock(return_value=MarketScale())
+        self.assertFalse(self._fill({1: 'filled', 2: 'canceled'}))
+        self.assertEqual(self.pair.traded_notional, 0)
+        self.assertTrue(self._fill({1: 'filled', 2: 'filled'}))
+        self.assertEqual(self.pair.traded_notional, 100)
+
+
+class TestClientOrderIndex(unittest.TestCase):
+
+    def test_place_order_assigns_unique_indexes(self):
+        """测试下单时分配唯一的客户端订单索引并在结果中返回"""
+        api = LighterAPI('key', network='testnet', account_index=3)
+        api.client = MagicMock()
+        api.client.create_market_order = AsyncMock(return_value=('tx', '0xabc', None))
+
+        async def run():
+            return [await api.place_order(market_index=1, side='buy', base_amount=100) for _ in range(2)] + [
+                await api.place_order(market_index=1, side='sell', base_amount=100, price=2000,
+                                      client_order_index=12345)
+            ]
+
+        first, second, explicit = asyncio.run(run())
+        self.assertNotEqual(first['client_order_index'], second['client_order_index'])
+        submitted = [call.kwargs['client_order_index'] for call in api.client.create_market_order.await_args_list]
+        self.assertEqual(submitted[:2], [first['client_order_index'], second['client_order_index']])
+        self.assertEqual(explicit['client_order_index'], 12345)
+
+
+if __name__ == '__main__':
+    unittest.main()
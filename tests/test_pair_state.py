@@ -0,0 +1,198 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import threading
+
+import yaml
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pair_state import PairLifecycle, PairState, PairStateStore
+from src.trading_bot import HedgeTradingBot
+
+
+class TestPairLifecycle(unittest.TestCase):
+
+    def test_transitions_hooks_and_timing(self):
+        """测试状态转换调用钩子并累计每个状态的停留时间"""
+        lifecycle = PairLifecycle('a-b')
+        calls = []
+        lifecycle.add_hook(lambda *args: calls.append(args))
+        self.assertTrue(lifecycle.transition(PairState.OPENING))
+        self.assertTrue(lifecycle.transition(PairState.OPEN))
+        self.assertEqual([(old, new) for _, old, new, _, _ in calls],
+                         [(PairState.INIT, PairState.OPENING), (PairState.OPENING, PairState.OPEN)])
+        snapshot = lifecycle.snapshot()
+        self.assertEqual((snapshot['state'], snapshot['transitions']), (PairState.OPEN, 2))
+        self.assertGreaterEqual(snapshot['time_in_state'][PairState.INIT], 0.0)
+
+    def test_invalid_transition_is_rejected(self):
+        """测试不允许的状态转换被拒绝"""
+        lifecycle = PairLifecycle('a-b')
+        lifecycle.transition(PairState.OPENING)
+        self.assertFalse(lifecycle.transition(PairState.CLOSING))
+        self.assertEqual(lifecycle.state, PairState.OPENING)
+        self.assertEqual(lifecycle.rejected, 1)
+
+    def test_hook_errors_do_not_block_transition(self):
+        """测试钩子出错不影响状态转换"""
+        lifecycle = PairLifecycle('a-b')
+        lifecycle.add_hook(MagicMock(side_effect=RuntimeError("boom")))
+        self.assertTrue(lifecycle.transition(PairState.FLAT))
+        self.assertEqual(lifecycle.state, PairState.FLAT)
+
+
+class TestPairStateStore(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'state.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_restore_open_state(self):
+        """测试重启后恢复已开仓状态，其他状态仍需核对"""
+        store = PairStateStore(self.path)
+        for pair_id, states in (('a-b', (PairState.OPENING, PairState.OPEN)), ('c-d', (PairState.FLAT,))):
+            lifecycle = PairLifecycle(pair_id, store)
+            for state in states:
+                lifecycle.transition(state)
+
+        store = PairStateStore(self.path)
+        self.assertEqual(PairLifecycle('a-b', store).state, PairState.OPEN)
+        restored = PairLifecycle('c-d', store)
+        self.assertEqual((restored.state, restored.restored), (PairState.INIT, PairState.FLAT))
+
+    def test_transitions_in_loop_are_batched_off_thread(self):
+        """测试事件循环中的多次状态转换合并为一次写入，且不在事件循环线程中写入"""
+        store = PairStateStore(self.path, flush_delay=0.01)
+        threads = []
+        replace = os.replace
+
+        def record_replace(src, dst):
+            threads.append(threading.current_thread())
+            replace(src, dst)
+
+        async def run():
+            for i in range(20):
+                PairLifecycle(f'pair-{i}', store).transition(PairState.OPENING)
+            self.assertEqual(store.writes, 0)
+            await asyncio.sleep(0.05)
+
+        with patch('src.pair_state.os.replace', side_effect=record_replace):
+            asyncio.run(run())
+        self.assertEqual(store.writes, 1)
+        self.assertNotIn(threading.main_thread(), threads)
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)), 20)
+
+    def test_pending_state_written_when_loop_ends(self):
+        """测试事件循环在合并写入前结束时仍写入最后的状态"""
+        store = PairStateStore(self.path, flush_delay=10)
+
+        async def run():
+            PairLifecycle('a-b', store).transition(PairState.OPEN)
+
+        asyncio.run(run())
+        self.assertEqual(PairStateStore(self.path).get('a-b'), PairState.OPEN)
+
+    def test_corrupt_file_is_ignored(self):
+        """测试状态文件损坏时从空状态开始"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+        self.assertIsNone(PairStateStore(self.path).get('a-b'))
+
+
+class TestBotUsesKnownState(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.directory.name, 'state.json')
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump({'account_1-account_2': {'state': 'open', 'updated_at': 0}}, f)
+        config = {
+            'trading_pair': 'BTC',
+            'leverage': 10,
+            'position_size': 100,
+            'stop_loss_threshold': 50,
+            'proxy_pool': [{'name': 'proxy_1', 'host': '127.0.0.1', 'port': 1080}],
+            'api_credentials': [
+                {'account_name': f'account_{i}', 'api_key': f'key_{i}', 'account_index': i,
+                 'api_key_index': 0, 'network': 'mainnet'}
+                for i in range(1, 5)
+            ],
+            'hedge_pairs': [
+                {'pair_name': f'pair_{i}', 'long_account': f'account_{2 * i - 1}', 'short_account': f'account_{2 * i}'}
+                for i in range(1, 3)
+            ],
+            'loop_monitor': {'enabled': False},
+            'state': {'file': self.state_path},
+        }
+        path = os.path.join(self.directory.name, 'config.yaml')
+        with open(path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump(config, file)
+        self.bot = HedgeTradingBot(path)
+        self.bot.notification_manager.send_email = MagicMock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_startup_skips_reconcile_for_known_open_pair(self):
+        """测试已知开仓的交易对启动时不查询持仓、不重复开仓"""
+        restored, fresh = self.bot.hedge_pairs
+        self.bot._check_pair_positions = AsyncMock(return_value=(False, True))
+        for pair in self.bot.hedge_pairs:
+            pair._open_positions = AsyncMock(return_value=True)
+
+        asyncio.run(self.bot._open_all_positions())
+
+        self.bot._check_pair_positions.assert_awaited_once_with(fresh)
+        restored._open_positions.assert_not_awaited()
+        self.assertEqual(fresh.lifecycle.state, PairState.OPEN)
+        self.assertEqual(self.bot.state_transitions, {'init->opening': 1, 'opening->open': 1})
+        with open(self.state_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['account_3-account_4']['state'], PairState.OPEN)
+
+    def test_known_flat_pair_is_not_closed_or_monitored(self):
+        """测试已平仓的交易对不再提交平仓、不做止损检查"""
+        pair = self.bot.hedge_pairs[0]
+        pair._close_positions = AsyncMock(return_value=True)
+        self.assertTrue(asyncio.run(pair.close_positions()))
+        self.assertEqual(pair.lifecycle.state, PairState.FLAT)
+        self.assertTrue(asyncio.run(pair.close_positions()))
+        pair._close_positions.assert_awaited_once()
+
+        other = self.bot.hedge_pairs[1]
+        other.is_stop_loss_triggered = AsyncMock(return_value=False)
+        pair.is_stop_loss_triggered = AsyncMock(return_value=False)
+        self.bot.running = True
+
+        async def run():
+            self.bot._shutdown_event = asyncio.Event()
+            self.bot._sleep_unless_shutdown = AsyncMock(side_effect=lambda _: setattr(self.bot, 'running', False))
+            await self.bot._monitor_loop()
+
+        asyncio.run(run())
+        pair.is_stop_loss_triggered.assert_not_awaited()
+        other.is_stop_loss_triggered.assert_awaited_once()
+
+    def test_failed_close_enters_error_and_notifies(self):
+        """测试平仓失败进入 ERROR 状态并告警"""
+        pair = self.bot.hedge_pairs[1]
+        pair._close_positions = AsyncMock(return_value=False)
+        self.bot.notification_manager.send_notification = MagicMock()
+        self.assertFalse(asyncio.run(pair.close_positions()))
+        self.assertEqual(pair.lifecycle.state, PairState.ERROR)
+        self.assertEqual(self.bot.notification_manager.send_notification.call_args.args[0], "交易对状态异常")
+
+
+if __name__ == '__main__':
+    unittest.main()
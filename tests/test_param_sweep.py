@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+from array import array
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.param_sweep import build_combinations, simulate_normalized, evaluate_combination, run_sweep
+
+
+class TestParamSweep(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        # 价格先下跌20%使做多腿在10倍杠杆下被强平，随后反弹
+        self.prices = array('d', [100, 99, 95, 89, 85, 88, 92, 100, 101])
+        self.sweep_config = {
+            'mode': 'grid',
+            'params': {
+                'stop_loss_threshold': [1, 50],
+                'leverage': [10],
+                'position_size': {'min': 100, 'max': 200, 'step': 100},
+            }
+        }
+
+    def test_build_grid_combinations(self):
+        """测试网格参数组合生成"""
+        combinations = build_combinations(self.sweep_config)
+        self.assertEqual(len(combinations), 4)
+        self.assertIn({'stop_loss_threshold': 1, 'leverage': 10, 'position_size': 200}, combinations)
+
+    def test_build_random_combinations_uses_base_config(self):
+        """测试随机搜索从基础配置补齐未扫描参数"""
+        sweep_config = {
+            'mode': 'random',
+            'samples': 5,
+            'seed': 1,
+            'params': {'leverage': {'min': 2, 'max': 20}},
+        }
+        combinations = build_combinations(sweep_config, {'stop_loss_threshold': 10, 'position_size': 100})
+        self.assertEqual(len(combinations), 5)
+        for combination in combinations:
+            self.assertEqual(combination['position_size'], 100)
+            self.assertTrue(2 <= combination['leverage'] <= 20)
+
+    def test_build_combinations_rejects_unknown_param(self):
+        """测试不支持的参数会报错"""
+        with self.assertRaises(ValueError):
+            build_combinations({'params': {'trading_pair': ['BTC']}})
+
+    def test_simulate_stop_loss_after_liquidation(self):
+        """测试强平后浮亏超过阈值触发止损"""
+        stats = simulate_normalized(self.prices, leverage=10, stop_ratio=0.01)
+        self.assertEqual(stats['liquidations'], 1)
+        self.assertEqual(stats['stops'], 1)
+
+    def test_simulate_without_liquidation_has_no_pnl(self):
+        """测试未强平时对冲头寸盈亏为0"""
+        stats = simulate_normalized(self.prices, leverage=2, stop_ratio=0.01)
+        self.assertEqual(stats['liquidations'], 0)
+        self.assertEqual(stats['stops'], 0)
+        self.assertAlmostEqual(stats['net_pnl'], 0.0)
+
+    def test_evaluate_scales_with_position_size(self):
+        """测试结果按开仓金额线性缩放并复用缓存"""
+        cache = {}
+        small = evaluate_combination(self.prices, {'stop_loss_threshold': 1, 'leverage': 10, 'position_size': 100}, cache=cache)
+        large = evaluate_combination(self.prices, {'stop_loss_threshold': 2, 'leverage': 10, 'position_size': 200}, cache=cache)
+        self.assertEqual(len(cache), 1)
+        self.assertAlmostEqual(large['net_pnl'], small['net_pnl'] * 2)
+
+    def test_run_sweep_ranks_results(self):
+        """测试进程池扫描结果按净盈亏降序排列"""
+        combinations = build_combinations(self.sweep_config)
+        results = run_sweep(self.prices, combinations, workers=2)
+        self.assertEqual(len(results), len(combinations))
+        pnls = [result['net_pnl'] for result in results]
+        self.assertEqual(pnls, sorted(pnls, reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.hedge_trader import pnl_components
+from src.pnl_tracker import PnlTracker
+from src.records import Position
+
+
+def components(unrealized, realized=0.0, funding=0.0):
+    return {
+        'long': {'realized': realized, 'unrealized': unrealized, 'funding': funding},
+        'short': {'realized': 0.0, 'unrealized': -unrealized / 2, 'funding': 0.0},
+    }
+
+
+class TestPnlTracker(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmpdir.name, 'pnl.db')
+
+    def tearDown(self):
+        """测试后的清理工作"""
+        self.tmpdir.cleanup()
+
+    def test_components_from_positions(self):
+        """测试从持仓汇总盈亏分量（支付的资金费为负收益）"""
+        positions = [
+            Position(SimpleNamespace(market_id=1, symbol='BTC', position='0.01', unrealized_pnl='-2.5',
+                                     avg_entry_price=0, realized_pnl='1.0', total_funding_paid_out='0.3')),
+            Position(SimpleNamespace(market_id=2, symbol='ETH', position='0.1', unrealized_pnl='4',
+                                     avg_entry_price=0, realized_pnl='0')),
+        ]
+        result = pnl_components(positions, 'BTC')
+        self.assertAlmostEqual(result['realized'], 1.0)
+        self.assertAlmostEqual(result['unrealized'], -2.5)
+        self.assertAlmostEqual(result['funding'], -0.3)
+
+    def test_latest_and_fees(self):
+        """测试最新盈亏和按成交金额估算的手续费"""
+        tracker = PnlTracker({'fee_bps': 5})
+        tracker.record('pair_1', components(10.0, realized=2.0, funding=-1.0), traded_notional=1000, timestamp=100)
+        latest = tracker.latest('pair_1')
+        self.assertAlmostEqual(latest['long']['fees'], 0.5)
+        self.assertAlmostEqual(latest['long']['total'], 10.0 + 2.0 - 1.0 - 0.5)
+        self.assertAlmostEqual(latest['total'], latest['long']['total'] + latest['short']['total'])
+        self.assertIsNone(tracker.latest('unknown'))
+
+    def test_ring_buffer_is_bounded(self):
+        """测试内存中每条腿只保留 ring_size 个样本"""
+        tracker = PnlTracker({'ring_size': 10})
+        for i in range(50):
+            tracker.record('pair_1', components(float(i)), timestamp=i)
+        series = tracker.query('pair_1', 0, 100, resolution=1)
+        self.assertEqual(len(series), 10)
+        self.assertEqual(series[0]['timestamp'], 40)
+
+    def test_query_downsamples_to_resolution(self):
+        """测试查询按分辨率取每个时间桶内最后一个样本，并合计两条腿"""
+        tracker = PnlTracker()
+        for t in range(0, 180, 10):
+            tracker.record('pair_1', components(float(t)), timestamp=t)
+        series = tracker.query('pair_1', 0, 179, resolution=60)
+        self.assertEqual([point['timestamp'] for point in series], [0, 60, 120])
+        self.assertEqual([point['unrealized'] for point in series], [25.0, 55.0, 85.0])
+
+    def test_flush_persists_and_query_merges_history(self):
+        """测试写入数据库后，内存中已淘汰的样本仍可以从数据库查询"""
+        # 使用接近当前的时间戳（数据库按保留天数清理旧数据）
+        base = time.time() // 3600 * 3600 - 3600
+
+        async def run():
+            tracker = PnlTracker({'database': self.database, 'ring_size': 5, 'resolution': 60})
+            for t in range(0, 600, 30):
+                tracker.record('pair_1', components(float(t)), timestamp=base + t)
+                if t % 120 == 90:
+                    await tracker.flush()
+            await tracker.flush()
+            series = tracker.query('pair_1', base, base + 600, resolution=60)
+            # 事件循环中查询：环形缓冲区在事件循环线程中复制，只有数据库读取在线程中执行
+            threads = {}
+            recent, load = tracker._recent, tracker._load
+            tracker._recent = lambda *args: threads.setdefault('recent', threading.get_ident()) and recent(*args)
+            tracker._load = lambda *args: threads.setdefault('load', threading.get_ident()) and load(*args)
+            self.assertEqual(await tracker.query_async('pair_1', base, base + 600, resolution=60), series)
+            self.assertEqual(threads['recent'], threading.get_ident())
+            self.assertNotEqual(threads['load'], threading.get_ident())
+            tracker.close()
+            return series
+
+        series = asyncio.run(run())
+        self.assertEqual([point['timestamp'] - base for point in series], list(range(0, 600, 60)))
+        # 每个桶取最后一个样本：t=30, 90, 150 ...
+        self.assertEqual(series[0]['unrealized'], 15.0)
+        self.assertEqual(series[-1]['unrealized'], 285.0)
+
+        # 重启后从数据库读取历史
+        reopened = PnlTracker({'database': self.database})
+        hourly = reopened.query('pair_1', base, base + 600, resolution=300)
+        reopened.close()
+        self.assertEqual([point['timestamp'] - base for point in hourly], [0, 300])
+        self.assertEqual(hourly[-1]['unrealized'], 285.0)
+
+    def test_flush_without_database(self):
+        """测试未配置数据库时不写入"""
+        tracker = PnlTracker()
+        tracker.record('pair_1', components(1.0), timestamp=1)
+        self.assertEqual(asyncio.run(tracker.flush()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
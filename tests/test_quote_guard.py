@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lighter_api import LighterAPI
+from src.quote_guard import QuoteGuard, get_quote_guard
+
+
+class TestQuoteGuard(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.guard = QuoteGuard({'min_samples': 3, 'max_deviation_bps': 500})
+
+    def test_basic_rejections(self):
+        """测试单边、交叉、过期和价差过大的报价被拒绝"""
+        self.assertIn('单边', self.guard.check(1, 100.0, None))
+        self.assertIsNotNone(self.guard.check(1, 101.0, 100.0))
+        self.assertIn('过期', self.guard.check(1, 100.0, 100.1, age=30))
+        self.assertIn('价差', self.guard.check(1, 95.0, 105.0))
+        self.assertIsNone(self.guard.check(1, 100.0, 100.1, age=0.5))
+        self.assertEqual(self.guard.snapshot(), {
+            'accepted': 1,
+            'rejected': {'one_sided': 1, 'crossed': 1, 'stale': 1, 'wide_spread': 1},
+        })
+
+    def test_deviation_from_rolling_median(self):
+        """测试偏离最近报价中位数的跳价被拒绝，且不计入中位数"""
+        for _ in range(3):
+            self.assertIsNone(self.guard.check(1, 99.9, 100.1))
+        self.assertIn('中位数', self.guard.check(1, 119.9, 120.1))
+        self.assertEqual(self.guard.median(1), 100.0)
+        self.assertIsNone(self.guard.check(1, 100.9, 101.1))
+        # 其他市场有自己的历史
+        self.assertIsNone(self.guard.check(2, 119.9, 120.1))
+
+    def test_consistent_outliers_rebuild_history(self):
+        """测试连续一致的偏离报价视为价格变化，重建历史"""
+        for _ in range(3):
+            self.guard.check(1, 99.9, 100.1)
+        results = [self.guard.check(1, 119.9, 120.1) for _ in range(3)]
+        self.assertIsNotNone(results[0])
+        self.assertIsNone(results[-1])
+        self.assertEqual(self.guard.median(1), 120.0)
+
+    def test_disabled_still_rejects_one_sided(self):
+        """测试关闭检查时仍拒绝单边报价"""
+        guard = QuoteGuard({'enabled': False})
+        self.assertIsNotNone(guard.check(1, None, 100.0))
+        self.assertIsNone(guard.check(1, 50.0, 150.0, age=100))
+
+    def test_registry_shares_by_network(self):
+        """测试同一网络共享报价检查器"""
+        self.assertIs(get_quote_guard('testnet'), get_quote_guard('testnet'))
+        self.assertIsNot(get_quote_guard('testnet'), get_quote_guard('mainnet'))
+
+
+class TestGuardedMarketPrice(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.api = LighterAPI('key', network='testnet', quote_guard=QuoteGuard({'min_samples': 2}))
+        self.api.client = MagicMock()
+
+    def _order_books(self, bids, asks):
+        order_book = SimpleNamespace(bids=bids, asks=asks)
+        order_api = MagicMock()
+        order_api.order_books = AsyncMock(return_value=SimpleNamespace(order_books=[order_book]))
+        return patch.dict(sys.modules, {'lighter': SimpleNamespace(OrderApi=MagicMock(return_value=order_api))})
+
+    def test_one_sided_book_returns_error(self):
+        """测试只有买盘的订单簿返回错误而不是抛出异常"""
+        with self._order_books([(100.0, 1.0)], []):
+            result = asyncio.run(self.api.get_market_price(1))
+        self.assertFalse(result['success'])
+        self.assertIn('单边', result['error'])
+
+    def test_bad_quote_is_rejected_before_sizing(self):
+        """测试跳价在计算数量前被拒绝，使用缓存的本地订单簿不发起额外请求"""
+        self.api.get_market_min_base_amount = AsyncMock(return_value={'success': False})
+        for price in (100.0, 100.2):
+            self.api.update_order_book(1, {'bids': [(price - 0.1, 5.0)], 'asks': [(price + 0.1, 5.0)]},
+                                       snapshot=True)
+            self.assertTrue(asyncio.run(self.api.usd_to_quantity(1, 100))['success'])
+
+        self.api.update_order_book(1, {'bids': [(149.9, 5.0)], 'asks': [(150.1, 5.0)]}, snapshot=True)
+        result = asyncio.run(self.api.usd_to_quantity(1, 100))
+        self.assertFalse(result['success'])
+        self.assertIn('偏离', result['error'])
+        self.assertEqual(self.api.request_count, 0)
+
+    def test_repeated_reads_of_bad_book_stay_rejected(self):
+        """测试反复读取同一份异常订单簿时一直被拒绝，且不计入连续偏离"""
+        guard = self.api.quote_guard
+        for price in (100.0, 100.2):
+            self.api.update_order_book(1, {'bids': [(price - 0.1, 5.0)], 'asks': [(price + 0.1, 5.0)]},
+                                       snapshot=True)
+            self.assertTrue(asyncio.run(self.api.get_market_price(1))['success'])
+
+        self.api.update_order_book(1, {'bids': [(149.9, 5.0)], 'asks': [(150.1, 5.0)]}, snapshot=True)
+        for _ in range(5):
+            result = asyncio.run(self.api.get_market_price(1))
+            self.assertFalse(result['success'])
+            self.assertIn('偏离', result['error'])
+        self.assertEqual(guard.rejected['deviation'], 1)
+        self.assertAlmostEqual(guard.median(1), 100.1)
+
+        # 连续的新更新仍然一致偏离时视为价格确实变化
+        self.api.update_order_book(1, {'bids': [(149.8, 5.0)], 'asks': [(150.0, 5.0)]}, snapshot=True)
+        self.assertTrue(asyncio.run(self.api.get_market_price(1))['success'])
+        self.assertEqual(guard.rejected['deviation'], 1)
+
+    def test_repeated_reads_do_not_fill_history(self):
+        """测试重复读取同一份订单簿只计入一次历史"""
+        self.api.update_order_book(1, {'bids': [(99.9, 5.0)], 'asks': [(100.1, 5.0)]}, snapshot=True)
+        for _ in range(5):
+            self.assertTrue(asyncio.run(self.api.get_market_price(1))['success'])
+        self.assertEqual(self.api.quote_guard.snapshot()['accepted'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import AsyncMock
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fixed_point import MarketScale
+from src.rebalancer import Rebalancer, build_units
+from src.records import OrderResult, PriceResult
+from tests.helpers import make_positions_api
+
+
+def make_api(account_index, positions, success=True):
+    """模拟账户API客户端，positions 为 [(market_id, 带符号持仓量), ...]"""
+    api = make_positions_api(account_index, [(market_id, 'BTC', size, 0) for market_id, size in positions], success)
+    api.get_market_price = AsyncMock(return_value=PriceResult(True, 100.0, None, 0.0))
+    api.place_order = AsyncMock(return_value=OrderResult(True, tx_hash='0xabc', timestamp=0.0))
+
+    async def place_orders(orders):
+        return [await api.place_order(**order) for order in orders]
+
+    api.place_orders = AsyncMock(side_effect=place_orders)
+    api.market_scales = {1: MarketScale(size_decimals=4, min_base_amount='0.001')}
+    return api
+
+
+def make_pair(pair_id, api_long, api_short, market_index=1):
+    return SimpleNamespace(
+        pair_id=pair_id, api_long=api_long, api_short=api_short,
+        hedge_markets=lambda: [('BTC', market_index)]
+    )
+
+
+class TestRebalancer(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.rebalancer = Rebalancer({'enabled': True, 'tolerance': 0.02, 'slippage_bps': 50})
+
+    def test_within_tolerance(self):
+        """测试净敞口在容忍区间内时不下单"""
+        api_long = make_api(1, [(1, '0.1')])
+        api_short = make_api(2, [(1, '-0.099')])
+        report = asyncio.run(self.rebalancer.rebalance([make_pair('p1', api_long, api_short)]))
+        self.assertTrue(report['success'])
+        self.assertEqual(report['orders'], [])
+        api_long.place_order.assert_not_awaited()
+
+    def test_partial_fill_reduces_larger_leg(self):
+        """测试部分成交时只减少较大一侧的持仓"""
+        api_long = make_api(1, [(1, '0.1')])
+        api_short = make_api(2, [(1, '-0.06')])
+        report = asyncio.run(self.rebalancer.rebalance([make_pair('p1', api_long, api_short)]))
+        self.assertEqual(len(report['orders']), 1)
+        self.assertTrue(report['orders'][0]['success'])
+        api_short.place_order.assert_not_awaited()
+        api_long.place_orders.assert_awaited_once()
+        kwargs = api_long.place_order.await_args.kwargs
+        self.assertEqual(kwargs['side'], 'sell')
+        self.assertEqual(kwargs['base_amount'], 400)
+        self.assertTrue(kwargs['reduce_only'])
+        self.assertAlmostEqual(kwargs['price'], 99.5)
+
+    def test_shared_account_is_one_unit(self):
+        """测试共用账户的交易对合并为一个单元，每个账户只查询一次持仓、只下一笔修正订单"""
+        shared = make_api(1, [(1, '0.2')])
+        short_a = make_api(2, [(1, '-0.1')])
+        short_b = make_api(3, [(1, '-0.05')])
+        pairs = [make_pair('a', shared, short_a), make_pair('b', shared, short_b)]
+        self.assertEqual(len(build_units(pairs)), 1)
+
+        report = asyncio.run(self.rebalancer.rebalance(pairs))
+        self.assertEqual(len(report['orders']), 1)
+        self.assertEqual(report['orders'][0]['pairs'], ['a', 'b'])
+        self.assertEqual(shared.place_order.await_args.kwargs['base_amount'], 500)
+        self.assertEqual(shared.get_open_positions.await_count, 1)
+
+    def test_net_short_buys_back_largest_short(self):
+        """测试净空头时从持仓最大的空头账户买回"""
+        api_long = make_api(1, [(1, '0.05')])
+        api_short = make_api(2, [(1, '-0.1')])
+        asyncio.run(self.rebalancer.rebalance([make_pair('p1', api_long, api_short)]))
+        kwargs = api_short.place_order.await_args.kwargs
+        self.assertEqual((kwargs['side'], kwargs['base_amount']), ('buy', 500))
+
+    def test_below_min_base_amount_is_skipped(self):
+        """测试修正数量低于 min_base_amount 时不下单"""
+        rebalancer = Rebalancer({'enabled': True, 'tolerance': 0})
+        api_long = make_api(1, [(1, '0.1005')])
+        api_short = make_api(2, [(1, '-0.1')])
+        report = asyncio.run(rebalancer.rebalance([make_pair('p1', api_long, api_short)]))
+        self.assertEqual(report['orders'], [])
+        self.assertEqual(len(report['skipped']), 1)
+        api_long.place_order.assert_not_awaited()
+
+    def test_unknown_market_scale_is_skipped(self):
+        """测试没有客户端获取过市场精度时不按默认精度下单"""
+        api_long = make_api(1, [(1, '0.1')])
+        api_short = make_api(2, [(1, '-0.06')])
+        api_long.market_scales = api_short.market_scales = {}
+        report = asyncio.run(self.rebalancer.rebalance([make_pair('p1', api_long, api_short)]))
+        self.assertEqual(report['orders'], [])
+        self.assertEqual(report['skipped'][0]['reason'], '市场精度未知')
+        api_long.place_order.assert_not_awaited()
+
+    def test_failed_positions_query_is_skipped(self):
+        """测试持仓查询失败时不修正"""
+        api_long = make_api(1, [(1, '0.1')])
+        api_short = make_api(2, [], success=False)
+        report = asyncio.run(self.rebalancer.rebalance([make_pair('p1', api_long, api_short)]))
+        self.assertEqual(report['orders'], [])
+        self.assertEqual(report['skipped'][0]['reason'], '持仓查询失败')
+
+    def test_due(self):
+        """测试检查间隔和禁用"""
+        self.assertTrue(self.rebalancer.due(now=0))
+        self.rebalancer.last_run = 100
+        self.assertFalse(self.rebalancer.due(now=130))
+        self.assertTrue(self.rebalancer.due(now=160))
+        self.assertFalse(Rebalancer({'enabled': False}).due())
+        self.assertFalse(Rebalancer().due())
+
+
+if __name__ == '__main__':
+    unittest.main()
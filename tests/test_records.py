@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+from decimal import Decimal
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fixed_point import MarketScale
+from src.records import OrderResult, Position, PositionsResult
+
+
+class TestRecords(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.raw = SimpleNamespace(
+            market_id=1, symbol='BTC', position='-0.00007',
+            avg_entry_price='50000', unrealized_pnl='-1.5', realized_pnl='0'
+        )
+
+    def test_record_dict_access(self):
+        """测试记录兼容字典访问方式"""
+        result = OrderResult(True, tx_hash='0xhash', timestamp=1.0)
+        self.assertTrue(result['success'])
+        self.assertEqual(result.get('tx_hash'), '0xhash')
+        self.assertIn('error', result)
+        self.assertNotIn('positions', result)
+        self.assertEqual(result.get('positions', []), [])
+        with self.assertRaises(KeyError):
+            result['positions']
+
+    def test_records_have_no_instance_dict(self):
+        """测试记录没有实例字典"""
+        self.assertFalse(hasattr(OrderResult(True), '__dict__'))
+        self.assertFalse(hasattr(Position(self.raw), '__dict__'))
+
+    def test_position_view(self):
+        """测试持仓视图按需解析字段"""
+        position = Position(self.raw, MarketScale(size_decimals=5))
+        self.assertEqual(position['symbol'], 'BTC')
+        self.assertEqual(position.side, 'short')
+        self.assertEqual(position.position, Decimal('0.00007'))
+        self.assertEqual(position.base_amount, -7)
+        self.assertIsNone(Position(self.raw).base_amount)
+
+    def test_positions_result_find(self):
+        """测试按条件迭代持仓"""
+        other = SimpleNamespace(market_id=2, symbol='ETH', position='1')
+        result = PositionsResult(True, [Position(self.raw), Position(other)])
+        self.assertEqual([p.symbol for p in result.find(symbol='ETH')], ['ETH'])
+        self.assertEqual([p.symbol for p in result.find(side='short')], ['BTC'])
+
+
+if __name__ == '__main__':
+    unittest.main()
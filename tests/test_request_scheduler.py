@@ -0,0 +1,179 @@
+import unittest
+import sys
+import os
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.request_scheduler import (
+    Lane, RequestScheduler, QueueFullError, RequestExpiredError, request_lane
+)
+from src.lighter_api import LighterAPI
+from src.hedge_trader import HedgePair
+from tests.helpers import make_positions_api
+
+
+class TestRequestScheduler(unittest.TestCase):
+
+    def _blocker(self, scheduler, release):
+        """占用一个槽位直到 release 被设置"""
+        async def hold():
+            await release.wait()
+        return asyncio.create_task(scheduler.submit(Lane.MONITOR, hold))
+
+    def test_higher_lanes_dispatch_first(self):
+        """测试槽位空出时按通道优先级发出请求"""
+        async def run():
+            scheduler = RequestScheduler({'max_concurrent': 1, 'emergency_reserve': 0})
+            release = asyncio.Event()
+            blocker = self._blocker(scheduler, release)
+            await asyncio.sleep(0)
+            order = []
+
+            def request(name):
+                async def func():
+                    order.append(name)
+                return func
+
+            tasks = [
+                asyncio.create_task(scheduler.submit(lane, request(lane.name)))
+                for lane in (Lane.MONITOR, Lane.RECONCILE, Lane.OPEN, Lane.EMERGENCY_CLOSE)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            await asyncio.gather(blocker, *tasks)
+            return order
+
+        order = asyncio.run(run())
+        self.assertEqual(order, ['EMERGENCY_CLOSE', 'OPEN', 'RECONCILE', 'MONITOR'])
+
+    def test_emergency_uses_reserved_slot(self):
+        """测试紧急平仓不必等待在途的读请求"""
+        async def run():
+            scheduler = RequestScheduler({'max_concurrent': 1, 'emergency_reserve': 1})
+            release = asyncio.Event()
+            blocker = self._blocker(scheduler, release)
+            await asyncio.sleep(0)
+
+            async def close():
+                return 'closed'
+
+            result = await asyncio.wait_for(scheduler.submit(Lane.EMERGENCY_CLOSE, close), timeout=1)
+            release.set()
+            await blocker
+            return result
+
+        self.assertEqual(asyncio.run(run()), 'closed')
+
+    def test_stale_reads_are_dropped(self):
+        """测试排队超过期限的读请求在发出前被丢弃"""
+        calls = []
+
+        async def run():
+            scheduler = RequestScheduler({
+                'max_concurrent': 1, 'lanes': {'monitor': {'deadline': 0.05}}
+            })
+            release = asyncio.Event()
+            blocker = self._blocker(scheduler, release)
+            await asyncio.sleep(0)
+
+            async def read():
+                calls.append('read')
+
+            stale = asyncio.create_task(scheduler.submit(Lane.MONITOR, read))
+            await asyncio.sleep(0.1)
+            release.set()
+            await blocker
+            with self.assertRaises(RequestExpiredError):
+                await stale
+            return scheduler.snapshot()
+
+        snapshot = asyncio.run(run())
+        self.assertEqual(calls, [])
+        self.assertEqual(snapshot['monitor']['expired'], 1)
+        self.assertEqual(snapshot['monitor']['completed'], 1)
+
+    def test_bounded_queue_rejects(self):
+        """测试通道队列满时拒绝新请求"""
+        async def run():
+            scheduler = RequestScheduler({
+                'max_concurrent': 1, 'lanes': {'monitor': {'max_queue': 1}}
+            })
+            release = asyncio.Event()
+            blocker = self._blocker(scheduler, release)
+            await asyncio.sleep(0)
+
+            async def read():
+                return True
+
+            queued = asyncio.create_task(scheduler.submit(Lane.MONITOR, read))
+            await asyncio.sleep(0)
+            with self.assertRaises(QueueFullError):
+                await scheduler.submit(Lane.MONITOR, read)
+            release.set()
+            await asyncio.gather(blocker, queued)
+            return scheduler.snapshot()
+
+        snapshot = asyncio.run(run())
+        self.assertEqual(snapshot['monitor']['rejected'], 1)
+        self.assertEqual(snapshot['monitor']['queued'], 0)
+
+    def test_nested_request_does_not_deadlock(self):
+        """测试请求内部发起的请求使用外层槽位"""
+        async def run():
+            scheduler = RequestScheduler({'max_concurrent': 1})
+
+            async def inner():
+                return 'inner'
+
+            async def outer():
+                return await scheduler.submit(Lane.MONITOR, inner)
+
+            return await asyncio.wait_for(scheduler.submit(Lane.MONITOR, outer), timeout=1)
+
+        self.assertEqual(asyncio.run(run()), 'inner')
+
+    def test_request_lane_raises_priority(self):
+        """测试 request_lane() 提升 LighterAPI 请求的通道"""
+        async def run():
+            scheduler = RequestScheduler()
+            api = LighterAPI(api_key='key', scheduler=scheduler)
+
+            async def read():
+                return {'success': True}
+
+            await api._call_with_retry(read, "查询", is_critical=False, lane=Lane.MONITOR)
+            with request_lane(Lane.EMERGENCY_CLOSE):
+                await api._call_with_retry(read, "查询", is_critical=False, lane=Lane.MONITOR)
+            with request_lane(Lane.MONITOR):
+                await api._call_with_retry(read, "平仓", is_critical=True, lane=Lane.OPEN)
+            return scheduler.snapshot()
+
+        snapshot = asyncio.run(run())
+        self.assertEqual(snapshot['monitor']['completed'], 1)
+        self.assertEqual(snapshot['emergency_close']['completed'], 1)
+        self.assertEqual(snapshot['open']['completed'], 1)
+
+
+class TestShedMonitorReads(unittest.TestCase):
+
+    def test_missing_leg_skips_stop_loss_check(self):
+        """测试一条腿的持仓查询被丢弃时浮动盈亏未知，跳过止损检查而不是只按另一条腿判断"""
+        pair = HedgePair({'account_name': 'a', 'api_key': 'key_a'}, {'account_name': 'b', 'api_key': 'key_b'},
+                         {'trading_pair': 'BTC', 'leverage': 1, 'position_size': 100, 'stop_loss_threshold': 50})
+        pair.market_index = 1
+        pair.api_long = make_positions_api(1, [(1, 'BTC', 0.01, -80.0)])
+        pair.api_short = make_positions_api(2, [], success=False)
+
+        self.assertFalse(asyncio.run(pair.is_stop_loss_triggered()))
+        self.assertIsNone(pair.last_pnl)
+        self.assertEqual(pair.metrics()['skipped_checks'], 1)
+
+        pair.api_short = make_positions_api(2, [(1, 'BTC', -0.01, 75.0)])
+        self.assertFalse(asyncio.run(pair.is_stop_loss_triggered()))
+        self.assertEqual(pair.last_pnl, -5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
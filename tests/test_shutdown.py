@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+import time
+import signal
+import asyncio
+import tempfile
+
+import yaml
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.trading_bot import HedgeTradingBot
+from src.notification import NotificationManager
+
+
+class TestShutdown(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        config = {
+            'trading_pair': 'BTC',
+            'leverage': 10,
+            'position_size': 100,
+            'stop_loss_threshold': 50,
+            'proxy_pool': [{'name': 'proxy_1', 'host': '127.0.0.1', 'port': 1080}],
+            'api_credentials': [
+                {'account_name': f'account_{i}', 'api_key': f'key_{i}', 'account_index': i,
+                 'api_key_index': 0, 'network': 'mainnet'}
+                for i in range(1, 7)
+            ],
+            'hedge_pairs': [
+                {'pair_name': f'pair_{i}', 'long_account': f'account_{2 * i - 1}', 'short_account': f'account_{2 * i}'}
+                for i in range(1, 4)
+            ],
+            'loop_monitor': {'enabled': False},
+            'shutdown': {'deadline': 0.5, 'notification_timeout': 1},
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'config.yaml')
+        with open(path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump(config, file)
+        self.bot = HedgeTradingBot(path)
+        self.bot.notification_manager.send_email = MagicMock()
+        for pair in self.bot.hedge_pairs:
+            pair.close_clients = AsyncMock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _slow_close(self, seconds, success=True):
+        async def close_positions():
+            await asyncio.sleep(seconds)
+            return success
+        return close_positions
+
+    def test_pairs_close_concurrently_under_deadline(self):
+        """测试并发平仓，超过期限的交易对记为失败"""
+        first, second, third = self.bot.hedge_pairs
+        first.close_positions = self._slow_close(0.2)
+        second.close_positions = self._slow_close(0.2, success=False)
+        third.close_positions = self._slow_close(5)
+
+        async def run():
+            self.bot.notification_manager.start()
+            return await self.bot.shutdown()
+
+        started = time.monotonic()
+        report = asyncio.run(run())
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertFalse(report['success'])
+        self.assertEqual(report['failed'], ['pair_2', 'pair_3'])
+        self.assertIn('超过停止期限', report['pairs'][2]['error'])
+        self.assertGreaterEqual(report['pairs'][0]['duration'], 0.2)
+        self.assertTrue(report['notifications_flushed'])
+        self.bot.notification_manager.send_email.assert_called_once()
+        for pair in self.bot.hedge_pairs:
+            pair.close_clients.assert_awaited_once()
+
+    def test_signal_triggers_graceful_shutdown(self):
+        """测试 SIGTERM 触发停止：监控循环立即退出并平仓"""
+        for pair in self.bot.hedge_pairs:
+            pair.initialize = AsyncMock()
+            pair.is_stop_loss_triggered = AsyncMock(return_value=False)
+            pair.close_positions = AsyncMock(return_value=True)
+        self.bot._open_all_positions = AsyncMock()
+
+        async def run():
+            self.bot.running = True
+            task = asyncio.create_task(self.bot._run_trading_loop())
+            await asyncio.sleep(0.1)
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.wait_for(task, timeout=5)
+
+        asyncio.run(run())
+        self.assertTrue(self.bot.shutdown_report['success'])
+        self.assertEqual(len(self.bot.shutdown_report['pairs']), 3)
+        for pair in self.bot.hedge_pairs:
+            pair.close_positions.assert_awaited_once()
+
+    def test_stop_trading_inside_loop_does_not_nest_event_loops(self):
+        """测试在事件循环中调用 stop_trading 只发出停止请求"""
+        async def run():
+            self.bot._shutdown_event = asyncio.Event()
+            self.bot.stop_trading()
+            return self.bot._shutdown_event.is_set()
+
+        self.assertTrue(asyncio.run(run()))
+        self.assertFalse(self.bot.running)
+
+    def test_notifications_are_flushed_on_stop(self):
+        """测试停止通知管理器时发送队列中的剩余通知"""
+        manager = NotificationManager({})
+        manager.send_email = MagicMock()
+
+        async def run():
+            manager.start()
+            manager.send_notification("标题", "内容")
+            return await manager.stop(timeout=1)
+
+        self.assertTrue(asyncio.run(run()))
+        manager.send_email.assert_called_once_with("标题", "内容")
+
+
+if __name__ == '__main__':
+    unittest.main()
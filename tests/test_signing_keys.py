@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lighter_api import LighterAPI
+from src.nonce_manager import NonceAllocator
+from src.signing_keys import SigningKey, SigningKeySelector, is_rate_limit_error
+
+
+class TestSigningKeySelector(unittest.TestCase):
+
+    def setUp(self):
+        """测试前的准备工作"""
+        self.keys = [SigningKey(f'key_{i}', i) for i in range(3)]
+        self.selector = SigningKeySelector(self.keys, cooldown=10)
+
+    def test_round_robin_when_idle(self):
+        """测试负载相同时轮流使用所有密钥"""
+        chosen = {self.selector.select(now=0).api_key_index for _ in range(3)}
+        self.assertEqual(chosen, {0, 1, 2})
+
+    def test_least_loaded(self):
+        """测试选择在途交易最少的密钥"""
+        self.keys[0].in_flight = 2
+        self.keys[1].in_flight = 1
+        self.keys[2].in_flight = 3
+        for _ in range(3):
+            self.assertIs(self.selector.select(now=0), self.keys[1])
+
+    def test_rate_limited_key_cools_down(self):
+        """测试被限流的密钥在冷却期内不被选择"""
+        self.selector.mark_rate_limited(self.keys[0], now=0)
+        self.selector.mark_rate_limited(self.keys[1], now=0)
+        for _ in range(3):
+            self.assertIs(self.selector.select(now=5), self.keys[2])
+        self.assertIs(self.selector.select(exclude=[self.keys[2]], now=5), self.keys[0])
+        self.assertIsNone(self.selector.select(exclude=self.keys, now=5))
+        self.assertEqual(self.keys[0].rate_limited, 1)
+
+    def test_rate_limit_detection(self):
+        """测试识别限流错误"""
+        self.assertTrue(is_rate_limit_error("HTTP 429 Too Many Requests"))
+        self.assertTrue(is_rate_limit_error(Exception("Rate limit exceeded")))
+        self.assertFalse(is_rate_limit_error("invalid nonce"))
+
+
+class TestMultiKeySigning(unittest.TestCase):
+
+    def _make_api(self):
+        keys = [SigningKey('key_0', 0, NonceAllocator(('testnet', 3, 0))),
+                SigningKey('key_1', 1, NonceAllocator(('testnet', 3, 1)))]
+        api = LighterAPI('key_0', network='testnet', account_index=3, api_key_index=0, signing_keys=keys)
+        api.max_retries = 1
+        api._fetch_next_nonce = AsyncMock(side_effect=lambda api_key_index: 100 * (api_key_index + 1))
+        clients = [MagicMock(), MagicMock()]
+        api.client = clients[0]
+        keys[1].client = clients[1]
+        return api, keys, clients
+
+    def test_concurrent_orders_spread_across_keys(self):
+        """测试并发下单分散到多个密钥，每个密钥使用自己的 nonce 序列"""
+        api, keys, clients = self._make_api()
+
+        async def slow_order(**kwargs):
+            await asyncio.sleep(0.01)
+            return ('tx', '0xabc', None)
+
+        for client in clients:
+            client.create_market_order = AsyncMock(side_effect=slow_order)
+
+        async def run():
+            return await asyncio.gather(*(
+                api.place_order(market_index=1, side='buy', base_amount=100) for _ in range(4)
+            ))
+
+        results = asyncio.run(run())
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual([client.create_market_order.await_count for client in clients], [2, 2])
+        second_nonces = sorted(call.kwargs['nonce'] for call in clients[1].create_market_order.await_args_list)
+        self.assertEqual(second_nonces, [200, 201])
+
+    def test_fails_over_when_rate_limited(self):
+        """测试密钥被限流时同一笔交易改用其他密钥"""
+        api, keys, clients = self._make_api()
+        clients[0].create_market_order = AsyncMock(return_value=(None, None, '429 Too Many Requests'))
+        clients[1].create_market_order = AsyncMock(return_value=('tx', '0xdef', None))
+        # 让第一次选择落在主密钥上
+        keys[1].in_flight = 1
+
+        result = asyncio.run(api.place_order(market_index=1, side='buy', base_amount=100))
+        keys[1].in_flight = 0
+        self.assertTrue(result['success'])
+        self.assertEqual(result['tx_hash'], '0xdef')
+        self.assertEqual(keys[0].rate_limited, 1)
+        self.assertGreater(keys[0].cooldown_until, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
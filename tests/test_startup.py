@@ -0,0 +1,49 @@
+import unittest
+import subprocess
+import sys
+import os
+
+# 添加项目根目录到 Python 路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.startup_profile import StartupProfiler, profile_imports
+
+
+class TestStartup(unittest.TestCase):
+
+    def _imported_after(self, statement):
+        """在新的解释器中执行导入，返回已加载的重量级模块"""
+        code = f"{statement}\nimport sys\nprint(','.join(m for m in ('lighter', 'aiohttp', 'smtplib') if m in sys.modules))"
+        completed = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                                   capture_output=True, text=True, check=True)
+        return completed.stdout.strip()
+
+    def test_trading_bot_import_does_not_load_sdk(self):
+        """测试导入机器人模块不会加载 lighter SDK、aiohttp 和邮件模块"""
+        self.assertEqual(self._imported_after("import src.trading_bot"), '')
+
+    def test_package_exports_lighter_api_lazily(self):
+        """测试包级导出按需加载"""
+        self.assertEqual(self._imported_after("import src"), '')
+
+    def test_profile_imports(self):
+        """测试导入耗时分析"""
+        result = profile_imports('src.records', top=3)
+        self.assertTrue(result['success'])
+        self.assertLessEqual(len(result['modules']), 3)
+        self.assertIn('src.records', [name for name, _, _ in profile_imports('src.records', top=50)['modules']])
+
+    def test_profiler_records_failed_phase(self):
+        """测试阶段失败时记录错误并继续"""
+        profiler = StartupProfiler()
+        with profiler.phase("ok"):
+            pass
+        with profiler.phase("fail"):
+            raise RuntimeError("boom")
+        self.assertEqual([name for name, _, _ in profiler.phases], ['ok', 'fail'])
+        self.assertEqual(profiler.phases[1][2], 'boom')
+
+
+if __name__ == '__main__':
+    unittest.main()